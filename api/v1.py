@@ -0,0 +1,297 @@
+"""
+Version 1 of the JSON API, mounted under ``/api/v1``.
+
+Lists are paged with the same keyset cursors as the HTML views, and the
+``fields`` query parameter (a comma-separated list of column names) selects
+only the columns the client needs. Rows are serialized straight from column
+tuples, without hydrating ORM objects. Every response carries a strong ETag
+and is compressed when the client accepts it.
+"""
+
+import gzip
+import hashlib
+import hmac
+import json
+from flask import Blueprint, Response, current_app, make_response, request
+from werkzeug.exceptions import HTTPException
+from config.config_files import ExportConfig
+from data_manager.export import EXPORT_TABLES, FORMATS, export_engine, export_filename, export_table
+from data_manager.sqlite_data_manager import MOVIE_COLUMNS, USER_MOVIE_COLUMNS
+from omdb.title_index import current_title_index
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+api_v1 = Blueprint('api_v1', __name__, url_prefix='/api/v1')
+
+MAX_PAGE_SIZE = 200
+MIN_COMPRESS_SIZE = 1024  # smaller bodies do not shrink enough to be worth it
+
+DEFAULT_MOVIE_FIELDS = ['id', 'movie_name', 'movie_poster', 'release_year', 'movie_rating']
+DEFAULT_USER_MOVIE_FIELDS = ['movie_id', 'movie_name', 'movie_poster', 'watchlist_status', 'user_rating']
+
+
+class ApiError(Exception):
+    """An error answered with a JSON body and an HTTP status code."""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def data_manager():
+    return current_app.extensions['data_manager']
+
+
+def requested_fields(available, default):
+    """
+    Reads the sparse fieldset from the ``fields`` query parameter.
+
+    Args:
+        available (dict): The columns that can be selected by name.
+        default (list): The fields returned when the parameter is missing.
+
+    Returns:
+        list: The requested field names.
+
+    Raises:
+        ApiError: If a field is unknown.
+    """
+    fields = [name.strip() for name in request.args.get('fields', '').split(',') if name.strip()]
+    unknown = [name for name in fields if name not in available]
+    if unknown:
+        raise ApiError(f"Unknown fields: {', '.join(unknown)}.")
+    return list(dict.fromkeys(fields)) or default
+
+
+def page_size():
+    """Reads the ``limit`` query parameter, clamped to 1..MAX_PAGE_SIZE."""
+    return max(1, min(request.args.get('limit', 50, type=int), MAX_PAGE_SIZE))
+
+
+def after_id():
+    """Reads an integer ``cursor`` query parameter."""
+    cursor = request.args.get('cursor')
+    if cursor is None:
+        return None
+    try:
+        return int(cursor)
+    except ValueError:
+        raise ApiError('Invalid cursor.')
+
+
+def rows_to_dicts(rows, fields):
+    """Builds JSON objects from rows, keeping only the requested fields."""
+    return [{name: getattr(row, name) for name in fields} for row in rows]
+
+
+def json_response(payload, max_age=0, status=200):
+    """
+    Serializes a payload into a compact, conditional and compressed response.
+
+    The strong ETag is a hash of the uncompressed body: the schema has no row
+    version columns, and hashing the few kilobytes of a page is much cheaper
+    than rendering it. Each encoding gets its own ETag, since the bytes differ.
+
+    Args:
+        payload: The JSON-serializable body.
+        max_age (int): Seconds shared caches and clients may reuse the response
+            without revalidating it; 0 keeps it private and always revalidated.
+        status (int): The HTTP status code.
+
+    Returns:
+        Response: The response, or an empty 304 if the client's copy is current.
+    """
+    body = json.dumps(payload, separators=(',', ':'), ensure_ascii=False).encode()
+    etag = hashlib.sha1(body).hexdigest()
+
+    encoding = None
+    if len(body) >= MIN_COMPRESS_SIZE:
+        accepted = request.accept_encodings
+        if brotli is not None and accepted['br']:
+            encoding = 'br'
+        elif accepted['gzip']:
+            encoding = 'gzip'
+    if encoding:
+        etag = f'{etag}-{encoding}'
+
+    if status == 200 and etag in request.if_none_match:
+        response = make_response('', 304)
+    else:
+        if encoding == 'br':
+            body = brotli.compress(body, quality=5)
+        elif encoding == 'gzip':
+            body = gzip.compress(body, compresslevel=6)
+        response = make_response(body, status)
+        response.content_type = 'application/json'
+        if encoding:
+            response.content_encoding = encoding
+    response.set_etag(etag)
+    response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = f'public, max-age={max_age}' if max_age else 'private, no-cache'
+    return response
+
+
+@api_v1.errorhandler(ApiError)
+def handle_api_error(e):
+    return json_response({'error': e.message}, status=e.status_code)
+
+
+@api_v1.errorhandler(ValueError)
+def handle_value_error(e):
+    return json_response({'error': str(e)}, status=400)
+
+
+@api_v1.errorhandler(Exception)
+def handle_internal_error(e):
+    if isinstance(e, HTTPException):
+        return json_response({'error': e.description}, status=e.code)
+    current_app.logger.error(f"Internal Server Error on {request.method} {request.path}: {str(e)}", exc_info=e)
+    return json_response({'error': 'Internal Server Error'}, status=500)
+
+
+@api_v1.route('/users', methods=['GET'])
+def list_users():
+    """
+    Lists users, ordered by ID.
+
+    Returns:
+        A JSON object with the page's items and the cursor of the next page.
+    """
+    users, next_cursor = data_manager().get_users_page(after_id=after_id(), limit=page_size())
+    return json_response({'items': rows_to_dicts(users, ['id', 'user_name']), 'next_cursor': next_cursor})
+
+
+@api_v1.route('/users/<int:user_id>', methods=['GET'])
+def get_user(user_id):
+    """
+    Returns one user.
+
+    Args:
+        user_id (int): The ID of the user.
+
+    Returns:
+        A JSON object with the user, or a 404 error.
+    """
+    user = data_manager().get_user_by_id(user_id)
+    if user is None:
+        raise ApiError(f'User with ID {user_id} not found', 404)
+    return json_response({'id': user.id, 'user_name': user.user_name})
+
+
+@api_v1.route('/movies', methods=['GET'])
+def list_movies():
+    """
+    Lists the movie catalog, ordered by ID.
+
+    Catalog pages rarely change, so clients may reuse them for a minute.
+
+    Returns:
+        A JSON object with the page's items and the cursor of the next page.
+    """
+    fields = requested_fields(MOVIE_COLUMNS, DEFAULT_MOVIE_FIELDS)
+    movies, next_cursor = data_manager().get_movies_page(after_id=after_id(), limit=page_size(), columns=fields)
+    return json_response({'items': rows_to_dicts(movies, fields), 'next_cursor': next_cursor}, max_age=60)
+
+
+@api_v1.route('/movies/<int:movie_id>', methods=['GET'])
+def get_movie(movie_id):
+    """
+    Returns one movie, with every field unless ``fields`` selects some.
+
+    Args:
+        movie_id (int): The ID of the movie.
+
+    Returns:
+        A JSON object with the movie, or a 404 error.
+    """
+    fields = requested_fields(MOVIE_COLUMNS, list(MOVIE_COLUMNS))
+    movie = data_manager().get_movie_by_id(movie_id)
+    if movie is None:
+        raise ApiError(f'Movie with ID {movie_id} not found', 404)
+    return json_response({name: getattr(movie, name) for name in fields}, max_age=60)
+
+
+@api_v1.route('/titles', methods=['GET'])
+def suggest_titles():
+    """
+    Suggests known titles for a partially typed title, for autocompletion.
+
+    Answers from the title index, without querying the database or OMDb:
+    the catalog and cached OMDb titles starting with ``q`` come first,
+    then titles close to it. ``limit`` caps the suggestions (10 by default).
+
+    Returns:
+        A JSON object with the suggested titles and their catalog movie IDs
+        (null for titles OMDb knows but the catalog does not hold yet),
+        or a 404 error if the title index is disabled.
+    """
+    title_index = current_title_index()
+    if title_index is None:
+        raise ApiError('Title suggestions not found', 404)
+    limit = max(1, min(request.args.get('limit', 10, type=int), 50))
+    suggestions = title_index.suggest(request.args.get('q', ''), limit)
+    # Nothing is suggested while the index is being built, and that answer must not be reused
+    return json_response({'items': [{'title': match.title, 'movie_id': match.movie_id} for match in suggestions],
+                          'ready': title_index.ready}, max_age=60 if title_index.ready else 0)
+
+
+@api_v1.route('/users/<int:user_id>/movies', methods=['GET'])
+def list_user_movies(user_id):
+    """
+    Lists a user's movies.
+
+    Accepts the ``status``, ``sort`` and ``direction`` query parameters of
+    the HTML view; ``cursor`` is the opaque cursor returned with the previous page.
+
+    Args:
+        user_id (int): The ID of the user.
+
+    Returns:
+        A JSON object with the page's items and the cursor of the next page.
+    """
+    fields = requested_fields(USER_MOVIE_COLUMNS, DEFAULT_USER_MOVIE_FIELDS)
+    movies, next_cursor = data_manager().query_user_movies(
+        user_id, request.args.get('status') or None, request.args.get('sort', 'added'),
+        request.args.get('direction', 'asc'), page_size(), request.args.get('cursor'), columns=fields)
+    return json_response({'items': rows_to_dicts(movies, fields), 'next_cursor': next_cursor})
+
+
+@api_v1.route('/export/<table>', methods=['GET'])
+def export(table):
+    """
+    Streams a whole table (users, movies or users_movies) as a file download.
+
+    The ``format`` query parameter picks csv (the default), ndjson or
+    parquet. Rows are read and encoded one chunk at a time while the
+    response is sent, and gzip-compressed on the fly when the client
+    accepts it.
+
+    The endpoint is only served with EXPORT_API enabled and an
+    EXPORT_API_TOKEN set, to clients sending that token in an
+    ``Authorization: Bearer`` header.
+
+    Args:
+        table (str): The table to export.
+
+    Returns:
+        A streamed response, or a 400, 401 or 404 error.
+    """
+    if not (ExportConfig.api_enabled and ExportConfig.api_token) or table not in EXPORT_TABLES:
+        raise ApiError(f'Export of {table} not found', 404)
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    if scheme.lower() != 'bearer' or not hmac.compare_digest(token.encode(), ExportConfig.api_token.encode()):
+        raise ApiError('A valid export token is required.', 401)
+    file_format = request.args.get('format', 'csv')
+    compress = bool(request.accept_encodings['gzip'])
+    stream = export_table(export_engine(data_manager()), table, file_format, compress)
+    response = Response(stream, content_type=FORMATS[file_format][1])
+    response.headers['Content-Disposition'] = f'attachment; filename="{export_filename(table, file_format)}"'
+    if compress:
+        response.content_encoding = 'gzip'
+    response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = 'no-store'
+    return response
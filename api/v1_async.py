@@ -0,0 +1,174 @@
+"""
+Async views of the JSON API, mounted under ``/api/v1/async``.
+
+They run on the AsyncSQLiteDataManager, so a view can await several
+database queries and OMDb lookups at once instead of one after the other.
+Responses use the same serialization, ETags and compression as ``/api/v1``.
+
+Only the batch add is async: it waits on OMDb, which the other views do
+not. Flask runs each async view in an event loop of its own, on a worker
+thread, so a view that only reads the database is slower async than sync
+(see benchmarks/async_views.py); the reads are served by ``/api/v1``.
+"""
+
+import asyncio
+import requests
+from flask import Blueprint, current_app, request
+from api.v1 import ApiError, handle_api_error, handle_internal_error, handle_value_error, json_response
+from config.config_files import OMDbClientConfig
+from data_manager.async_sqlite_data_manager import AsyncSQLiteDataManager
+from omdb.cache import NOT_FOUND
+from omdb.client import movie_from_response
+from omdb.title_index import current_title_index
+from utils.titles import normalize_title
+
+api_v1_async = Blueprint('api_v1_async', __name__, url_prefix='/api/v1/async')
+api_v1_async.register_error_handler(ApiError, handle_api_error)
+api_v1_async.register_error_handler(ValueError, handle_value_error)
+api_v1_async.register_error_handler(Exception, handle_internal_error)
+
+MAX_TITLES = 100
+
+
+def data_manager():
+    return AsyncSQLiteDataManager.for_app(current_app)
+
+
+async def gather(*aws):
+    """
+    Awaits several awaitables concurrently and returns their results.
+
+    Unlike ``asyncio.gather``, every awaitable has finished when an error is
+    raised, so none is left running when Flask closes the request's event loop.
+    """
+    results = await asyncio.gather(*aws, return_exceptions=True)
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    return results
+
+
+def lookup_omdb(app, title):
+    """
+    Looks a title up through the OMDb cache and client, in a worker thread.
+
+    The thread pushes an app context of its own, so the cache writes use a
+    session of their own instead of blocking the event loop on the database.
+
+    Args:
+        app (Flask): The Flask application instance.
+        title (str): The title to look up.
+
+    Returns:
+        The parsed OMDb response.
+    """
+    with app.app_context():
+        omdb_cache = app.extensions['omdb_cache']
+        parsed_resp = omdb_cache.get(title)
+        if parsed_resp is None:
+            parsed_resp = app.extensions['omdb_client'].lookup(title)
+            omdb_cache.put(title, parsed_resp)
+            title_index = app.extensions.get('title_index')
+            if title_index and isinstance(parsed_resp, dict) and parsed_resp.get('Title'):
+                title_index.add(parsed_resp['Title'], omdb_key=normalize_title(title))
+        return parsed_resp
+
+
+async def resolve_title(title):
+    """
+    Finds the details of a title in the catalog, the OMDb cache or OMDb itself.
+
+    A title typed differently from a known one is first resolved through
+    the title index. The blocking OMDb lookup runs in a worker thread, so
+    the lookups of several titles overlap with each other and with the
+    database queries.
+
+    Args:
+        title (str): The title to resolve.
+
+    Returns:
+        dict: The movie columns, or None if OMDb does not know the title.
+
+    Raises:
+        RequestException: If OMDb cannot be reached (or its circuit breaker is open).
+        ValueError: If OMDb answered with an error or invalid data.
+    """
+    existing_movie = await data_manager().get_movie_by_name(title)
+    title_index = current_title_index()
+    match = title_index.resolve(title) if existing_movie is None and title_index else None
+    if match and match.movie_id:
+        existing_movie = await data_manager().get_movie_by_id(match.movie_id)
+    if existing_movie:
+        return {'movie_name': existing_movie.movie_name}
+
+    parsed_resp = await asyncio.to_thread(lookup_omdb, current_app._get_current_object(),
+                                          match.omdb_key if match and match.omdb_key else title)
+    if parsed_resp == NOT_FOUND:
+        return None
+    if isinstance(parsed_resp, str):
+        raise ValueError(parsed_resp)
+    # Store OMDb's spelling of the title, so other spellings find the same movie
+    canonical_title = parsed_resp.get('Title') or title
+    if normalize_title(canonical_title) != normalize_title(title):
+        existing_movie = await data_manager().get_movie_by_name(canonical_title)
+        if existing_movie:
+            return {'movie_name': existing_movie.movie_name}
+    try:
+        return movie_from_response(parsed_resp, canonical_title)
+    except KeyError as e:
+        raise ValueError(f"Invalid data in API response: {str(e)}")
+
+
+@api_v1_async.route('/users/<int:user_id>/movies', methods=['POST'])
+async def add_movies(user_id):
+    """
+    Adds several titles to a user's list in one request.
+
+    The JSON body holds ``titles`` and optionally ``watchlist_status`` and
+    ``user_rating`` (an integer from 1 to 5), applied to every title. Titles are resolved concurrently,
+    at most as many at a time as the OMDb client has pooled connections.
+
+    Args:
+        user_id (int): The ID of the user.
+
+    Returns:
+        A JSON object listing the titles that were added, already in the list,
+        not found, or failed (with the error).
+    """
+    body = request.get_json(silent=True) or {}
+    titles = body.get('titles')
+    if not isinstance(titles, list) or not all(isinstance(title, str) and title.strip() for title in titles):
+        raise ApiError('titles must be a list of movie titles.')
+    if len(titles) > MAX_TITLES:
+        raise ApiError(f'At most {MAX_TITLES} titles can be added at once.')
+    watchlist_status = body.get('watchlist_status', 'wishlist')
+    if watchlist_status not in ('watched', 'watching', 'wishlist'):
+        raise ApiError("watchlist_status must be 'watched', 'watching' or 'wishlist'.")
+    user_rating = body.get('user_rating')
+    if user_rating is not None and (isinstance(user_rating, bool) or not isinstance(user_rating, int)
+                                    or not 1 <= user_rating <= 5):
+        raise ApiError('user_rating must be an integer between 1 and 5.')
+    if await data_manager().get_user_by_id(user_id) is None:
+        raise ApiError(f'User with ID {user_id} not found', 404)
+
+    result = {'added': [], 'existing': [], 'not_found': [], 'errors': {}}
+    semaphore = asyncio.Semaphore(OMDbClientConfig.pool_maxsize)
+
+    async def add(title):
+        async with semaphore:
+            try:
+                movie = await resolve_title(title)
+                if movie is None:
+                    result['not_found'].append(title)
+                elif await data_manager().add_movie(movie, user_id, watchlist_status, user_rating):
+                    current_app.extensions['poster_store'].prefetch(movie.get('movie_poster'))
+                    result['added'].append(title)
+                else:
+                    result['existing'].append(title)
+            except (requests.exceptions.RequestException, ValueError) as e:
+                result['errors'][title] = str(e)
+
+    # Titles that only differ in case or spacing would race for the same movie row
+    unique_titles = {normalize_title(title): title.strip() for title in titles}
+    await gather(*(add(title) for title in unique_titles.values()))
+    return json_response(result)
@@ -1,305 +1,113 @@
-import os
-import requests
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
+"""
+The Flask application factory.
+
+``create_app`` builds a configured app without touching the database:
+the schema is created and migrated by ``flask db-upgrade``, run once per
+deployment, instead of by every worker as it boots. Subsystems that are
+only used by CLI commands or background jobs (NumPy and SciPy for the
+recommendation batch job, Pillow for the poster thumbnails) are imported
+when they are first used, the async data manager behind ``/api/v1/async``
+is created by the first async request, and ``wsgi.py`` builds the app once so a
+preforking server can load it in its master process before forking the
+workers (see ``gunicorn.conf.py``).
+"""
+
+from flask import Flask
+from api.v1 import api_v1
+from api.v1_async import api_v1_async
+from config.config_files import AppConfig, InstrumentationConfig, PageCacheConfig, PosterConfig, TitleIndexConfig
+from data_manager.backends import create_data_manager
+from data_manager.bulk_import import import_watchlists_command
+from data_manager.data_models import db
+from data_manager.export import export_command
+from data_manager.migrations import db_upgrade_command, setup_schema
+from data_manager.recommendations import refresh_recommendations_command
 from data_manager.sqlite_data_manager import SQLiteDataManager
-from config.config_files import APIkeys
-from utils.errors import NotFoundError, handle_internal_server_error
+from data_manager.stats import rebuild_stats_command
+from omdb.cache import create_cache
+from omdb.client import create_client
+from omdb.enrichment import enrich_movies_command
+from omdb.movie_jobs import run_movie_jobs_command
+from omdb.posters import create_poster_store, fetch_posters_command
+from omdb.title_index import TitleIndex
+from utils.instrumentation import Instrumentation
+from utils.page_cache import PageCache
+from web.views import web
 
-app = Flask(__name__)
-db_path = os.path.join(os.getcwd(), 'data', 'movie_app.sqlite')
-app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
-app.config['SECRET_KEY'] = "your secret key"
-data_manager = SQLiteDataManager(app)
 
-@app.route('/', methods=['GET'])
-def home():
+def create_app(config=None, auto_migrate=None):
     """
-    Handles the home page request.
-
-    Returns:
-        The rendered index.html template with a list of all movies.
-    """
-    try:
-        movies = data_manager.get_all_movies()
-        return render_template('index.html', movies=movies)
-    except Exception as e:
-        flash(f'An error occurred while retrieving movies: {str(e)}', 'error')
-        return render_template('index.html', movies=[])
-
-
-@app.route('/<int:movie_id>', methods=['GET'])
-def movie_details(movie_id):
-    """
-    Handles requests for individual movie details.
-
-    Args:
-        movie_id (int): The ID of the movie to retrieve.
-
-    Returns:
-        The rendered movie.html template with the movie details.
-        Raises a NotFoundError if the movie is not found.
-    """
-    try:
-        movie = data_manager.get_movie_by_id(movie_id)
-        if movie is None:
-            raise NotFoundError(f"Movie with ID {movie_id} not found")
-        return render_template('movie.html', movie=movie)
-    except NotFoundError as e:
-        flash(str(e), 'error')
-        return redirect(url_for('home'))
-    except Exception as e:
-        return handle_internal_server_error(app, e)
-
-
-@app.route('/users', methods=['GET'])
-def list_users():
-    """
-    Handles requests for a list of all users.
-
-    Returns:
-        The rendered users.html template with a list of users.
-    """
-    try:
-        users = data_manager.get_all_users()
-        return render_template('users.html', users=users)
-    except Exception as e:
-        return handle_internal_server_error(app, e)
-
-
-@app.route('/users/<int:user_id>',methods=['GET'])
-def user_movies(user_id):
-    """
-    Handles requests for a user's movies.
-
-    Args:
-        user_id (int): The ID of the user.
-
-    Returns:
-        The rendered user_movies.html template with the user's movies.
-    """
-    try:
-        user_movies = data_manager.get_user_movies(user_id)
-        return render_template('user_movies.html', user_movies=user_movies)
-    except Exception as e:
-        return handle_internal_server_error(app, e)
-
-
-@app.route('/users/<int:user_id>/sort', methods=['POST'])
-def movies_sort(user_id):
-    """
-    Handles requests for sorting a user's movies based on watch status.
-
-    Args:
-        user_id (int): The ID of the user.
-
-    Returns:
-        The rendered user_movies.html template with the sorted movies.
-    """
-    try:
-        watch_status = request.form.get('watch_status')
-        if watch_status:
-            movies = data_manager.get_movie_by_watch_status(user_id, watch_status)
-        else:
-            movies = data_manager.get_user_movies(user_id)
-
-        return render_template('user_movies.html', user_movies=movies)
-    except Exception as e:
-        # Handle the exception here
-        print(f"An error occurred: {e}")
-        flash("An error occurred while sorting movies.", "error")
-        return redirect(url_for('user_movies', user_id=user_id))
-
-
-@app.route('/add_user', methods=['GET', 'POST'])
-def add_user():
-    """
-    Handles requests for adding a new user.
-
-    Returns:
-        The rendered add_user.html template if the request is a GET.
-        Redirects to the users page if the request 
-        is a POST and the user is successfully added.
-    """
-    if request.method == 'POST':
-        username = request.form['username']
-
-        # Create a new user object
-        user = {'user_name': username}
-
-        # Add the user to the database
-        try:
-            data_manager.add_user(user)
-            return redirect('/users', code=302)
-        except Exception as e:
-            return handle_internal_server_error(app, e)
-
-    return render_template('add_user.html')
-
-
-def response_parser(resp):
-    """
-    Parses the response from an HTTP request and
-    returns the appropriate data or error message.
+    Creates and configures the Flask application.
 
     Args:
-    resp (requests.Response): The response object
-        from the HTTP request.
+        config (dict, optional): Settings overriding the defaults, e.g. SQLALCHEMY_DATABASE_URI.
+        auto_migrate (bool, optional): Create and migrate the schema now;
+            AppConfig.auto_migrate (DB_AUTO_MIGRATE) by default.
 
     Returns:
-    dict or str: If the response status code is OK
-                and the JSON response indicates success,
-                returns the JSON data.
-                If the JSON response indicates failure,
-                returns an error message.
-                If the response status code is not OK,
-                returns an error message with the status code.
-    """
-    if resp.status_code == requests.codes.ok:
-        if resp.json()['Response'] == 'False':
-            error_resp = resp.json()
-            return f"Error: {error_resp['Error']}"
-        else:
-            return resp.json()
-    else:
-        return f"Error: {resp.status_code}"
-
-
-@app.route('/users/<int:user_id>/add_movie', methods=['GET', 'POST'])
-def add_movie(user_id):
-    """
-    Handles requests for adding a new movie to a user's list.
+        Flask: The application.
+    """
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = AppConfig.database_url
+    app.config['SECRET_KEY'] = AppConfig.secret_key
+    app.config['CATALOG_PAGE_SIZE'] = 50
+    app.config['SEARCH_PAGE_SIZE'] = 20
+    app.config['USER_MOVIES_PAGE_SIZE'] = 50
+    app.config['USE_X_SENDFILE'] = PosterConfig.x_sendfile
+    app.config.update(config or {})
+
+    if InstrumentationConfig.enabled:
+        Instrumentation.from_config(InstrumentationConfig).init_app(app)
+    instrumentation = app.extensions.get('instrumentation')
+    page_cache = PageCache.from_config(PageCacheConfig, registry=instrumentation.registry if instrumentation else None)
+    page_cache.init_app(app)
+    data_manager = create_data_manager(app, page_cache=page_cache)
+    app.extensions['omdb_cache'] = create_cache(db)
+    app.extensions['omdb_client'] = create_client()
+    app.extensions['poster_store'] = create_poster_store(app)
+    if TitleIndexConfig.enabled:
+        TitleIndex.from_config(TitleIndexConfig).init_app(app)
+
+    app.register_blueprint(web)
+    app.register_blueprint(api_v1)
+    if isinstance(data_manager, SQLiteDataManager):
+        app.register_blueprint(api_v1_async) # its data manager is created by the first async request
+    app.cli.add_command(db_upgrade_command)
+    app.cli.add_command(rebuild_stats_command)
+    app.cli.add_command(refresh_recommendations_command)
+    app.cli.add_command(import_watchlists_command)
+    app.cli.add_command(export_command)
+    app.cli.add_command(enrich_movies_command)
+    app.cli.add_command(run_movie_jobs_command)
+    app.cli.add_command(fetch_posters_command)
+
+    if AppConfig.auto_migrate if auto_migrate is None else auto_migrate:
+        with app.app_context():
+            setup_schema()
+    return app
+
+
+def reset_after_fork(app):
+    """
+    Drops the database connections a forked worker inherited from its parent.
+
+    SQLite connections must not be shared between processes; the pool is
+    discarded without closing the parent's connections, and each worker
+    opens its own.
 
     Args:
-        user_id (int): The ID of the user.
-
-    Returns:
-        The rendered add_movie.html template for GET requests.
-        Redirects to the user_movies page if the request 
-        is a POST and the movie is successfully added.
-    """
-    if request.method == 'POST':
-        movie_name = request.form['movie_name']
-        watchlist_status = request.form['watchlist_status']
-        user_rating = request.form.get('user_rating')
-        api_url = f'http://www.omdbapi.com/?apikey={APIkeys.APIkey}&t={movie_name}'
-
-        try:
-            response = requests.get(api_url)
-            parsed_resp = response_parser(response)
-
-            if parsed_resp == 'Error: Movie not found!':
-                flash(f"The movie {movie_name} doesn't exist", 'warning')
-            elif type(parsed_resp) == str:
-                flash(parsed_resp, 'error')
-            else:
-                try:
-                    rating = 0
-                    if parsed_resp['Ratings'] == []:
-                        reting = 0.0
-                    else:
-                        rating = float(parsed_resp['Ratings'][0]['Value'].split('/')[0])
-                    year_str = parsed_resp['Year']
-                    year = year_str[0:4]
-
-                    movie = {
-                        'movie_poster': parsed_resp['Poster'],
-                        'movie_name': movie_name,
-                        'movie_director': parsed_resp['Director'],
-                        'release_year': year,
-                        'movie_rating': rating,
-                        'movie_plot': parsed_resp['Plot']
-                    }
-
-                    # Add the movie to the user's list (handle potential data errors)
-                    try:
-                        data_manager.add_movie(movie, user_id, watchlist_status, user_rating)
-                        return redirect(url_for('user_movies', user_id=user_id))
-                    except Exception as e:
-                        flash(f"An error occurred while adding the movie: {str(e)}", 'error')
-                        return render_template('add_movie.html')
-
-                except (ValueError, KeyError) as e:
-                    flash(f"Invalid data in API response: {str(e)}", 'error')
-                    return render_template('add_movie.html')
-
-        except requests.exceptions.RequestException as e:
-            # Handle any errors during the API request
-            return handle_internal_server_error(app, e)
-
-    # Render the form for GET requests
-    return render_template('add_movie.html')
-
-
-@app.route('/users/<int:user_id>/update_movie/<int:movie_id>', methods=['GET', 'POST'])
-def update_movie(user_id, movie_id):
-    """
-    Handles requests for updating a movie in a user's list.
-
-    Args:
-        user_id (int): The ID of the user.
-        movie_id (int): The ID of the movie to update.
-
-    Returns:
-        The rendered update_movie.html template for GET 
-        requests with pre-filled user movie data.
-        Redirects to the user_movies page if the request 
-        is a POST and the movie is successfully updated.
-    """
-    try:
-        user_movie = data_manager.get_movie_by_movie_by_user(movie_id, user_id)
-        if user_movie is None:
-            raise NotFoundError("Movie not found or not in user's list")
-
-        if request.method == 'POST':
-            # Extract the rating and status from the request data
-            try:
-                rating = int(request.form.get('rating'))
-                status = request.form.get('status')
-
-                # Update the movie using the data manager
-                if data_manager.update_movie(user_id, movie_id, rating, status):
-                    return redirect(url_for('user_movies', user_id=user_id))
-                else:
-                    # Use custom error
-                    raise NotFoundError("Movie not found or not in user's list")
-            except ValueError:
-                flash("Invalid rating. Please enter a valid integer.", "error")
-                return render_template('update_movie.html', user_movie=user_movie)
-
-        # Render the HTML form for updating the movie
-        return render_template('update_movie.html', user_movie=user_movie)
-    except NotFoundError as e:
-        flash(str(e), 'error')
-        return redirect(url_for('user_movies', user_id=user_id))
-    except Exception as e:
-        return handle_internal_server_error(app, e)  # Handle unexpected errors
-
-
-@app.route('/users/<int:user_id>/delete_movie/<int:movie_id>', methods = ['POST'])
-def delete_movie(user_id, movie_id):
-    """
-    Deletes a movie from a user's list.
-
-    Args:
-        user_id (int): The ID of the user.
-        movie_id (int): The ID of the movie.
-
-    Returns:
-        Redirect to the user's movie list if successful, 
-        or to the user's movie list with an error message if unsuccessful.
+        app (Flask): The application loaded before the fork.
     """
-    try:
-        if data_manager.delete_movie(user_id, movie_id):
-            flash('Movie deleted successfully', 'success')
-            return redirect(url_for('user_movies', user_id=user_id))
-        else:
-            raise NotFoundError("Movie not found or not associated with the user")
-    except NotFoundError as e:
-        flash(str(e), 'error')
-        return redirect(url_for('user_movies', user_id=user_id))
-    except Exception as e:
-        return handle_internal_server_error(app, e)
+    with app.app_context():
+        db.engine.dispose(close=False)
+    if 'async_data_manager' in app.extensions:
+        app.extensions['async_data_manager'].engine.sync_engine.dispose(close=False)
+    data_manager = app.extensions['data_manager']
+    if getattr(data_manager, 'engine', None) is not None:
+        data_manager.engine.dispose(close=False)
+    if getattr(data_manager, 'read_router', None) is not None:
+        data_manager.read_router.dispose()
 
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    create_app(auto_migrate=True).run(debug=True)
@@ -0,0 +1,14 @@
+"""
+ASGI entry point, for ASGI servers such as uvicorn or hypercorn:
+
+    uvicorn asgi:asgi_app
+
+Flask is a WSGI framework, so each request still runs on a worker thread;
+the async batch add awaits its OMDb lookups and database queries
+concurrently within that request.
+"""
+
+from asgiref.wsgi import WsgiToAsgi
+from wsgi import app
+
+asgi_app = WsgiToAsgi(app)
@@ -0,0 +1,69 @@
+"""
+Load test of the async batch add against the sync form.
+
+The app runs on a threaded WSGI server against a fresh database, with OMDb
+replaced by a local fake server that answers after a fixed latency. N new
+titles are added one form POST at a time through ``/users/<id>/add_movie``,
+and in one request to ``/api/v1/async/users/<id>/movies``.
+
+Only views waiting on OMDb are async: a view that only reads the database
+gets no concurrency to gain from its own event loop, and measured about
+three times slower than its sync counterpart, so the async read views
+were dropped.
+
+Usage (from the repository root):
+    python -m benchmarks.async_views --titles 40 --omdb-latency 0.2
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import uuid
+import requests
+from benchmarks.common import fake_omdb_server, serve
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--titles', type=int, default=40)
+    parser.add_argument('--omdb-latency', type=float, default=0.2)
+    args = parser.parse_args()
+
+    omdb = fake_omdb_server(args.omdb_latency)
+    with tempfile.TemporaryDirectory() as tmp:
+        # The app reads its settings when its modules are imported
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'bench.sqlite')}"
+        os.environ['OMDB_BASE_URL'] = f'http://127.0.0.1:{omdb.server_port}/'
+        os.environ['MOVIE_ASYNC_ADD'] = 'false'
+        from app import create_app
+        app = create_app(auto_migrate=True)
+        data_manager = app.extensions['data_manager']
+
+        with app.app_context():
+            data_manager.add_user({'user_name': 'bench'})
+
+        server = serve(app)
+        base = f'http://127.0.0.1:{server.server_port}'
+        print(f'adding {args.titles} new titles, OMDb latency {args.omdb_latency * 1000:.0f} ms:')
+        titles = [f'Title {uuid.uuid4().hex[:8]}' for _ in range(args.titles)]
+        start = time.perf_counter()
+        with requests.Session() as session:
+            for title in titles:
+                session.post(f'{base}/users/1/add_movie', allow_redirects=False,
+                             data={'movie_name': title, 'watchlist_status': 'wishlist'})
+        print(f"{'sync':>8}: {time.perf_counter() - start:8.2f} s")
+
+        titles = [f'Title {uuid.uuid4().hex[:8]}' for _ in range(args.titles)]
+        start = time.perf_counter()
+        added = requests.post(f'{base}/api/v1/async/users/1/movies', json={'titles': titles}).json()['added']
+        print(f"{'async':>8}: {time.perf_counter() - start:8.2f} s ({len(added)} added)")
+
+        server.shutdown()
+        with app.app_context():
+            data_manager.db.engine.dispose()
+    omdb.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+"""
+Speed of the storage backends behind DataManagerInterface.
+
+Every backend is seeded with the same synthetic catalog and lists, then
+each operation of the hot paths is repeated and its throughput printed
+(their behavior is checked by tests/test_conformance.py):
+
+- memory: InMemoryDataManager;
+- sqlite: SQLiteDataManager (Flask-SQLAlchemy) on a migrated SQLite file;
+- sql-sqlite: SQLDataManager (SQLAlchemy Core) on a migrated SQLite file;
+- sql-postgresql: SQLDataManager on the database at ``--postgres-url``, if given.
+  Its tables are dropped and recreated.
+
+Usage (from the repository root):
+    python -m benchmarks.backends --movies 5000 --users 50 --seconds 2
+"""
+
+import argparse
+import contextlib
+import os
+import random
+import tempfile
+import time
+from flask import Flask
+from data_manager.data_models import db
+from data_manager.memory_data_manager import InMemoryDataManager
+from data_manager.migrations import setup_schema
+from data_manager.sql_data_manager import SQLDataManager
+from data_manager.sqlite_data_manager import SQLiteDataManager
+
+STATUSES = ('watched', 'watching', 'wishlist')
+
+
+@contextlib.contextmanager
+def memory_backend():
+    yield InMemoryDataManager()
+
+
+@contextlib.contextmanager
+def sqlite_backend():
+    with tempfile.TemporaryDirectory() as tmp:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(tmp, 'bench.sqlite')}"
+        manager = SQLiteDataManager(app)
+        with app.app_context():
+            setup_schema()
+            try:
+                yield manager
+            finally:
+                db.session.remove()
+                db.engine.dispose()
+
+
+@contextlib.contextmanager
+def sql_sqlite_backend():
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = SQLDataManager(f"sqlite:///{os.path.join(tmp, 'bench.sqlite')}")
+        manager.create_schema()
+        try:
+            yield manager
+        finally:
+            manager.engine.dispose()
+
+
+def sql_postgresql_backend(url):
+    @contextlib.contextmanager
+    def factory():
+        manager = SQLDataManager(url)
+        db.metadata.drop_all(manager.engine)
+        manager.create_schema()
+        try:
+            yield manager
+        finally:
+            manager.engine.dispose()
+    return factory
+
+
+def seed(manager, movies, users):
+    """Adds ``users`` users, each listing ``movies / users * 2`` random catalog movies."""
+    for index in range(users):
+        manager.add_user({'user_name': f'user{index}'})
+    user_ids = [user.id for user in manager.get_all_users()]
+    words = ['night', 'city', 'river', 'ghost', 'summer', 'king', 'blue', 'last', 'road', 'war']
+    catalog = [{'movie_name': f'{random.choice(words).title()} {random.choice(words)} {index}',
+                'movie_poster': 'N/A', 'movie_director': f'Director {index % 97}',
+                'release_year': 1950 + index % 70, 'movie_rating': round(random.uniform(1, 10), 1),
+                'movie_plot': ' '.join(random.choices(words, k=12))}
+               for index in range(movies)]
+    per_user = max(1, movies * 2 // users)
+    for user_id in user_ids:
+        picks = random.sample(catalog, min(per_user, movies))
+        for start in range(0, len(picks), 500):
+            manager.add_movies(user_id, [(movie, random.choice(STATUSES), random.randint(2, 4))
+                                         for movie in picks[start:start + 500]])
+    return user_ids, [movie.id for movie in manager.get_all_movies()]
+
+
+def operations(manager, user_ids, movie_ids):
+    """The timed operations, as functions of a random generator."""
+    def toggle(rng):
+        user_id = rng.choice(user_ids)
+        rows, _ = manager.query_user_movies(user_id, limit=1, columns=['movie_id'])
+        if rows:
+            manager.update_movie(user_id, rows[0].movie_id, rng.randint(2, 4), rng.choice(STATUSES))
+
+    return {
+        'get_movie_by_id': lambda rng: manager.get_movie_by_id(rng.choice(movie_ids)),
+        'get_movies_page': lambda rng: manager.get_movies_page(after_id=rng.choice(movie_ids), limit=50),
+        'query_user_movies': lambda rng: manager.query_user_movies(rng.choice(user_ids), rng.choice(STATUSES),
+                                                                   sort='title', limit=50),
+        'search_movies': lambda rng: manager.search_movies(rng.choice(['night', 'king blue', 'ghost ci'])),
+        'get_movie_stats': lambda rng: manager.get_movie_stats(rng.choice(movie_ids)),
+        'update_movie': toggle,
+    }
+
+
+def measure(operation, seconds):
+    """Runs an operation repeatedly for ``seconds`` and returns the operations per second."""
+    rng = random.Random(0)
+    count = 0
+    started = time.perf_counter()
+    deadline = started + seconds
+    while time.perf_counter() < deadline:
+        operation(rng)
+        count += 1
+    return count / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--movies', type=int, default=5000, help='Catalog size.')
+    parser.add_argument('--users', type=int, default=50, help='Number of users.')
+    parser.add_argument('--seconds', type=float, default=2, help='Duration of each measurement.')
+    parser.add_argument('--postgres-url', help='Also benchmark SQLDataManager on this PostgreSQL database.')
+    args = parser.parse_args()
+
+    backends = {'memory': memory_backend, 'sqlite': sqlite_backend, 'sql-sqlite': sql_sqlite_backend}
+    if args.postgres_url:
+        backends['sql-postgresql'] = sql_postgresql_backend(args.postgres_url)
+
+    results = {}
+    for name, factory in backends.items():
+        print(name)
+        random.seed(0)
+        with factory() as manager:
+            started = time.perf_counter()
+            user_ids, movie_ids = seed(manager, args.movies, args.users)
+            print(f'  seeded in {time.perf_counter() - started:.1f}s')
+            results[name] = {operation: measure(function, args.seconds)
+                             for operation, function in operations(manager, user_ids, movie_ids).items()}
+
+    if results:
+        names = list(results)
+        print(f"\n{'ops/s':<18}" + ''.join(f'{name:>16}' for name in names))
+        for operation in next(iter(results.values())):
+            print(f'{operation:<18}' + ''.join(f'{results[name][operation]:16.0f}' for name in names))
+
+
+if __name__ == '__main__':
+    main()
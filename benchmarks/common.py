@@ -0,0 +1,73 @@
+"""Helpers shared by the benchmarks: a fake OMDb API, a WSGI server and latency statistics."""
+
+import json
+import logging
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from werkzeug.serving import make_server
+
+
+def fake_omdb_server(latency=0.0):
+    """
+    Starts a fake OMDb API on a free local port, in a background thread.
+
+    It knows every title and answers after ``latency`` seconds.
+
+    Args:
+        latency (float): Seconds each answer is delayed, to mimic the real API.
+
+    Returns:
+        ThreadingHTTPServer: The running server (see ``server_port``).
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(latency)
+            title = parse_qs(urlparse(self.path).query).get('t', [''])[0]
+            body = json.dumps({'Response': 'True', 'Title': title, 'Year': '2001', 'Poster': 'N/A',
+                               'Director': 'Director', 'Plot': 'Plot', 'Ratings': [{'Value': '7.0/10'}]})
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.end_headers()
+            self.wfile.write(body.encode())
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def serve(app):
+    """Runs an app on a threaded WSGI server on a free local port and returns the server."""
+    logging.getLogger('werkzeug').setLevel(logging.ERROR) # no line per request
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def summarize(latencies, seconds, errors=0):
+    """
+    Summarizes request latencies.
+
+    Args:
+        latencies (list): Seconds taken by each request.
+        seconds (float): Wall-clock duration of the run.
+        errors (int): Requests that failed.
+
+    Returns:
+        dict: Request and error counts, throughput and latency percentiles in milliseconds.
+    """
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': len(latencies) / seconds if seconds else 0.0,
+        'mean_ms': statistics.fmean(latencies) * 1000 if latencies else 0.0,
+        'p50_ms': quantiles[49] * 1000 if latencies else 0.0,
+        'p90_ms': quantiles[89] * 1000 if latencies else 0.0,
+        'p99_ms': quantiles[98] * 1000 if latencies else 0.0,
+    }
@@ -0,0 +1,300 @@
+"""
+Latency, throughput and memory benchmark of the app's hot routes.
+
+For every dataset size, a synthetic catalog of ``size`` movies and ``size``
+users_movies rows (spread over ``size / 100`` users) is generated into a
+temporary SQLite file. Each route is then benchmarked in a fresh process,
+so its peak RSS is its own, in two modes:
+
+- client: sequential requests through Flask's test client (no network);
+- wsgi: concurrent clients against a real threaded WSGI server.
+
+OMDb is replaced by a local fake server. Results are written as JSON
+(to benchmarks/results/ by default), and two result files can be compared
+to spot regressions between commits.
+
+Usage (from the repository root):
+    python -m benchmarks.routes run --sizes 10000,100000 --requests 300 --clients 8
+    python -m benchmarks.routes compare benchmarks/results/old.json benchmarks/results/new.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from sqlalchemy import create_engine
+from benchmarks.common import fake_omdb_server, serve, summarize
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+STATUSES = ('watched', 'watching', 'wishlist')
+
+
+def route_requests(route, movies, users):
+    """
+    Builds a factory of randomized requests for a route.
+
+    Args:
+        route (str): One of ROUTES.
+        movies (int): The number of movies in the dataset.
+        users (int): The number of users in the dataset.
+
+    Returns:
+        callable: Returns (method, path, form data) for the next request.
+    """
+    if route == 'home':
+        return lambda: ('GET', f'/?after={random.randint(0, movies)}', None)
+    if route == 'user_movies':
+        return lambda: ('GET', f'/users/{random.randint(1, users)}', None)
+    if route == 'user_movies_sorted':
+        return lambda: ('GET', f'/users/{random.randint(1, users)}?sort=title&direction=desc', None)
+    if route == 'sort':
+        return lambda: ('POST', f'/users/{random.randint(1, users)}/sort',
+                        {'watch_status': random.choice(STATUSES)})
+    if route == 'add_movie':
+        return lambda: ('POST', f'/users/{random.randint(1, users)}/add_movie',
+                        {'movie_name': f'Bench {uuid.uuid4().hex}', 'watchlist_status': 'wishlist'})
+    raise ValueError(f'Unknown route: {route}')
+
+
+ROUTES = ['home', 'user_movies', 'user_movies_sorted', 'sort', 'add_movie']
+
+
+def generate_dataset(path, size, seed=0):
+    """
+    Generates a synthetic dataset into a new SQLite file.
+
+    Args:
+        path (str): The database file to create.
+        size (int): The number of movies, and of users_movies rows.
+        seed (int): The random seed, so runs are reproducible.
+
+    Returns:
+        dict: The number of movies, users and users_movies rows.
+    """
+    from data_manager.data_models import db
+    from data_manager.migrations import MIGRATIONS, upgrade
+
+    engine = create_engine(f'sqlite:///{path}')
+    db.metadata.create_all(engine)
+    upgrade(engine)
+    engine.dispose()
+
+    rng = random.Random(seed)
+    users = max(size // 100, 10)
+    per_user = size // users
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.executemany('INSERT INTO users (id, user_name) VALUES (?, ?)',
+                         ((i, f'user{i}') for i in range(1, users + 1)))
+        conn.executemany(
+            'INSERT INTO movies (id, movie_poster, movie_name, movie_key, movie_director, '
+            'release_year, movie_rating, movie_plot) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            ((i, f'https://example.com/posters/{i}.jpg', f'Movie {i}', f'movie {i}', f'Director {i % 5000}',
+              rng.randint(1920, 2025), round(rng.uniform(1, 10), 1), f'The plot of movie {i}.')
+             for i in range(1, size + 1)))
+        conn.executemany(
+            'INSERT INTO users_movies (user_id, movie_id, watchlist_status, user_rating) VALUES (?, ?, ?, ?)',
+            ((user_id, movie_id, rng.choice(STATUSES), rng.randint(1, 5))
+             for user_id in range(1, users + 1)
+             for movie_id in rng.sample(range(1, size + 1), per_user)))
+    conn.execute('ANALYZE')
+    conn.close()
+    return {'movies': size, 'users': users, 'users_movies': users * per_user, 'schema_version': MIGRATIONS[-1][0]}
+
+
+def bench_client(app, next_request, count):
+    """Sends ``count`` sequential requests through the test client."""
+    client = app.test_client()
+    latencies, errors = [], 0
+    started = time.perf_counter()
+    for _ in range(count):
+        method, path, data = next_request()
+        start = time.perf_counter()
+        response = client.open(path, method=method, data=data, follow_redirects=True)
+        latencies.append(time.perf_counter() - start)
+        errors += response.status_code >= 400
+    return summarize(latencies, time.perf_counter() - started, errors)
+
+
+def bench_wsgi(app, next_request, count, clients):
+    """Sends ``count`` requests from ``clients`` concurrent clients to a real WSGI server."""
+    import requests
+
+    server = serve(app)
+    base = f'http://127.0.0.1:{server.server_port}'
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    remaining = [count]
+
+    def client():
+        with requests.Session() as session:
+            while True:
+                with lock:
+                    if remaining[0] == 0:
+                        return
+                    remaining[0] -= 1
+                    method, path, data = next_request()
+                start = time.perf_counter()
+                ok = session.request(method, base + path, data=data).status_code < 400
+                elapsed = time.perf_counter() - start
+                with lock:
+                    latencies.append(elapsed)
+                    errors[0] += not ok
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+    return summarize(latencies, elapsed, errors[0])
+
+
+def peak_rss_mb():
+    """Returns the peak resident set size of this process, in MiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024 # bytes on macOS, KiB on Linux
+
+
+def run_route(args):
+    """Benchmarks one route against an existing dataset and prints the result as JSON."""
+    omdb = fake_omdb_server(args.omdb_latency)
+    # The app reads its settings when its modules are imported
+    os.environ['DATABASE_URL'] = f'sqlite:///{args.db}'
+    os.environ['OMDB_BASE_URL'] = f'http://127.0.0.1:{omdb.server_port}/'
+    os.environ['MOVIE_ASYNC_ADD'] = 'false'
+    from app import create_app
+    app = create_app() # generate_dataset created the schema
+
+    random.seed(args.seed)
+    next_request = route_requests(args.route, args.movies, args.users)
+    result = {'route': args.route}
+    result['client'] = bench_client(app, next_request, args.requests)
+    result['wsgi'] = bench_wsgi(app, next_request, args.requests, args.clients)
+    result['peak_rss_mb'] = peak_rss_mb()
+    omdb.shutdown()
+    print(json.dumps(result))
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    """Generates the datasets and benchmarks every route, then writes the results."""
+    routes = args.routes.split(',') if args.routes else ROUTES
+    results = {
+        'commit': git_commit(),
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'settings': {'requests': args.requests, 'clients': args.clients, 'omdb_latency': args.omdb_latency},
+        'sizes': {},
+    }
+    for size in (int(size) for size in args.sizes.split(',')):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'bench.sqlite')
+            start = time.perf_counter()
+            dataset = generate_dataset(path, size, args.seed)
+            print(f'{size} movies: dataset generated in {time.perf_counter() - start:.1f}s', file=sys.stderr)
+            routes_results = {}
+            for route in routes:
+                # A fresh copy per route, so writes of one route do not skew the next
+                route_path = os.path.join(tmp, f'{route}.sqlite')
+                with sqlite3.connect(path) as source, sqlite3.connect(route_path) as target:
+                    source.backup(target)
+                output = subprocess.run(
+                    [sys.executable, '-m', 'benchmarks.routes', 'route', '--db', route_path, '--route', route,
+                     '--movies', str(dataset['movies']), '--users', str(dataset['users']),
+                     '--requests', str(args.requests), '--clients', str(args.clients),
+                     '--omdb-latency', str(args.omdb_latency), '--seed', str(args.seed)],
+                    cwd=tmp, env={**os.environ, 'PYTHONPATH': ROOT}, capture_output=True, text=True)
+                if output.returncode != 0:
+                    sys.exit(f'{route} failed:\n{output.stderr}')
+                result = json.loads(output.stdout.strip().splitlines()[-1])
+                routes_results[route] = result
+                print(f"{size:>8} {route:<20} client p50 {result['client']['p50_ms']:7.2f} ms  "
+                      f"wsgi {result['wsgi']['rps']:7.0f} req/s p99 {result['wsgi']['p99_ms']:7.2f} ms  "
+                      f"peak RSS {result['peak_rss_mb']:6.1f} MiB", file=sys.stderr)
+                os.remove(route_path)
+            results['sizes'][str(size)] = {'dataset': dataset, 'routes': routes_results}
+
+    output_path = args.output or os.path.join(
+        RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{results['commit'] or 'nocommit'}.json")
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    with open(output_path, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(output_path)
+
+
+def compare(args):
+    """Prints the change of every metric between two result files."""
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+    print(f"{baseline['commit']} -> {candidate['commit']}")
+    for size, data in candidate['sizes'].items():
+        for route, result in data['routes'].items():
+            old = baseline['sizes'].get(size, {}).get('routes', {}).get(route)
+            if old is None:
+                continue
+            changes = []
+            for mode, metric in (('client', 'p50_ms'), ('wsgi', 'rps'), ('wsgi', 'p99_ms')):
+                before, after = old[mode][metric], result[mode][metric]
+                change = (after - before) / before * 100 if before else 0.0
+                changes.append(f'{mode} {metric} {before:8.2f} -> {after:8.2f} ({change:+6.1f}%)')
+            changes.append(f"peak RSS {old['peak_rss_mb']:6.1f} -> {result['peak_rss_mb']:6.1f} MiB")
+            print(f'{size:>8} {route:<20} ' + '  '.join(changes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='Benchmark the routes and write the results.')
+    run_parser.add_argument('--sizes', default='10000', help='Comma-separated dataset sizes.')
+    run_parser.add_argument('--routes', help=f"Comma-separated routes, by default {','.join(ROUTES)}.")
+    run_parser.add_argument('--output', help='The result file, by default in benchmarks/results/.')
+    run_parser.set_defaults(handler=run)
+
+    route_parser = commands.add_parser('route', help='Benchmark one route (used by run).')
+    route_parser.add_argument('--db', required=True)
+    route_parser.add_argument('--route', required=True, choices=ROUTES)
+    route_parser.add_argument('--movies', type=int, required=True)
+    route_parser.add_argument('--users', type=int, required=True)
+    route_parser.set_defaults(handler=run_route)
+
+    for sub_parser in (run_parser, route_parser):
+        sub_parser.add_argument('--requests', type=int, default=300, help='Requests per route and mode.')
+        sub_parser.add_argument('--clients', type=int, default=8, help='Concurrent clients in wsgi mode.')
+        sub_parser.add_argument('--omdb-latency', type=float, default=0.0, help='Seconds of fake OMDb latency.')
+        sub_parser.add_argument('--seed', type=int, default=0)
+
+    compare_parser = commands.add_parser('compare', help='Compare two result files.')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('candidate')
+    compare_parser.set_defaults(handler=compare)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Concurrent read/write throughput of SQLite with and without the tuning profile.
+
+Reader threads page through the catalog the way the home page does while
+writer threads add movies to users' lists. The run is repeated against a
+fresh database with SQLite's defaults and with the tuning profile, and the
+operations per second and "database is locked" errors are printed.
+
+Usage (from the repository root):
+    python -m benchmarks.sqlite_tuning --seconds 10 --readers 8 --writers 2
+"""
+
+import argparse
+import dataclasses
+import os
+import random
+import tempfile
+import threading
+import time
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from config.config_files import SQLiteTuningConfig
+from data_manager.data_models import db
+from data_manager.sqlite_tuning import apply_tuning, engine_options
+
+
+def seed(engine, movies, users):
+    """Creates the schema and fills it with synthetic movies and users."""
+    db.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(text('INSERT INTO users (user_name) VALUES (:name)'),
+                     [{'name': f'user{i}'} for i in range(users)])
+        conn.execute(text('INSERT INTO movies (movie_poster, movie_name, movie_key, movie_director, '
+                          'release_year, movie_rating, movie_plot) '
+                          'VALUES (:poster, :name, :key, :director, 2000, 7.5, :plot)'),
+                     [{'poster': f'https://example.com/{i}.jpg', 'name': f'Movie {i}', 'key': f'movie {i}',
+                       'director': 'Director', 'plot': 'Plot ' * 50} for i in range(movies)])
+
+
+def run(profile, seconds, readers, writers, movies, users):
+    """Runs the workload against a fresh database and returns the counters."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.sqlite')
+        options = engine_options(profile) or {'connect_args': {'check_same_thread': False}}
+        engine = create_engine(f'sqlite:///{path}', **options)
+        apply_tuning(engine, profile)
+        seed(engine, movies, users)
+
+        counts = {'reads': 0, 'writes': 0, 'locked': 0}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + seconds
+
+        def count(key):
+            with lock:
+                counts[key] += 1
+
+        def reader():
+            while time.perf_counter() < deadline:
+                after_id = random.randint(0, movies)
+                with engine.connect() as conn:
+                    conn.execute(text('SELECT id, movie_name, movie_poster FROM movies '
+                                      'WHERE id > :after ORDER BY id LIMIT 51'), {'after': after_id}).all()
+                count('reads')
+
+        def writer():
+            while time.perf_counter() < deadline:
+                try:
+                    with engine.begin() as conn:
+                        conn.execute(text('INSERT OR REPLACE INTO users_movies '
+                                          '(user_id, movie_id, watchlist_status, user_rating) '
+                                          'VALUES (:user_id, :movie_id, :status, 3)'),
+                                     {'user_id': random.randint(1, users), 'movie_id': random.randint(1, movies),
+                                      'status': random.choice(['watched', 'watching', 'wishlist'])})
+                    count('writes')
+                except OperationalError:
+                    count('locked')
+
+        threads = [threading.Thread(target=reader) for _ in range(readers)]
+        threads += [threading.Thread(target=writer) for _ in range(writers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        engine.dispose()
+    return {key: value / seconds if key != 'locked' else value for key, value in counts.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--movies', type=int, default=20000)
+    parser.add_argument('--users', type=int, default=1000)
+    args = parser.parse_args()
+
+    tuned = SQLiteTuningConfig(enabled=True)
+    default = dataclasses.replace(tuned, enabled=False)
+    for name, profile in (('default', default), ('tuned', tuned)):
+        result = run(profile, args.seconds, args.readers, args.writers, args.movies, args.users)
+        print(f"{name:>8}: {result['reads']:9.0f} reads/s {result['writes']:8.0f} writes/s "
+              f"{result['locked']:5d} locked errors")
+
+
+if __name__ == '__main__':
+    main()
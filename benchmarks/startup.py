@@ -0,0 +1,156 @@
+"""
+Cold start benchmark of the web app.
+
+Each sample runs in a fresh Python process against a migrated copy of a
+small database, and times the phases of a worker's boot:
+
+- import: importing the app's modules;
+- create: ``create_app()``;
+- first request: the first GET of the catalog page (first connection,
+  template compilation, page rendered and cached).
+
+Boots are measured with the schema work deferred to ``flask db-upgrade``
+(the default) and with ``DB_AUTO_MIGRATE`` on, which is what every worker
+used to do. A last mode loads the app once, as gunicorn's ``preload_app``
+does, and forks the samples from it: a forked worker only pays for its
+first request. The optional modules a boot imported are listed, to catch
+a heavy import creeping back into the startup path.
+
+Usage (from the repository root):
+    python -m benchmarks.startup run --runs 10
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OPTIONAL_MODULES = ('numpy', 'scipy', 'PIL')
+
+
+def create_database(path):
+    """Creates and migrates a database holding one user with a short list."""
+    os.environ['DATABASE_URL'] = f'sqlite:///{path}'
+    from app import create_app
+    app = create_app(auto_migrate=True)
+    with app.app_context():
+        data_manager = app.extensions['data_manager']
+        data_manager.add_user({'user_name': 'bench'})
+        for i in range(50):
+            data_manager.add_movie({'movie_name': f'Seed {i}', 'movie_poster': 'N/A', 'movie_director': 'D',
+                                    'release_year': 2000, 'movie_rating': 7.0, 'movie_plot': 'P'},
+                                   1, 'wishlist', 3)
+        data_manager.db.engine.dispose()
+
+
+def boot(args):
+    """Boots the app in this process and prints the timings of its phases as JSON."""
+    started = time.perf_counter()
+    from app import create_app
+    imported = time.perf_counter()
+    app = create_app()
+    created = time.perf_counter()
+    status = app.test_client().get('/').status_code
+    served = time.perf_counter()
+    print(json.dumps({
+        'import_ms': (imported - started) * 1000,
+        'create_ms': (created - imported) * 1000,
+        'first_request_ms': (served - created) * 1000,
+        'total_ms': (served - started) * 1000,
+        'status': status,
+        'optional_modules': [name for name in OPTIONAL_MODULES if name in sys.modules],
+    }))
+
+
+def fork_boots(runs):
+    """Loads the app once, then times the first request of ``runs`` forked children."""
+    from app import create_app, reset_after_fork
+    app = create_app()
+    results = []
+    for _ in range(runs):
+        read_end, write_end = os.pipe()
+        started = time.perf_counter()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_end)
+            reset_after_fork(app)
+            status = app.test_client().get('/').status_code
+            served = time.perf_counter()
+            os.write(write_end, json.dumps({'first_request_ms': (served - started) * 1000,
+                                            'total_ms': (served - started) * 1000,
+                                            'status': status}).encode())
+            os._exit(0)
+        os.close(write_end)
+        with os.fdopen(read_end) as f:
+            results.append(json.loads(f.read()))
+        os.waitpid(pid, 0)
+    return results
+
+
+def median(results, key):
+    return statistics.median(result[key] for result in results) if key in results[0] else None
+
+
+def run(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.sqlite')
+        subprocess.run([sys.executable, '-m', 'benchmarks.startup', 'create-db', '--db', path],
+                       cwd=ROOT, check=True)
+        env = {**os.environ, 'DATABASE_URL': f'sqlite:///{path}', 'PYTHONPATH': ROOT}
+        modes = {}
+        for mode, auto_migrate in (('deferred', 'false'), ('auto_migrate', 'true')):
+            results = []
+            for _ in range(args.runs):
+                output = subprocess.run([sys.executable, '-m', 'benchmarks.startup', 'boot'], cwd=tmp,
+                                        env={**env, 'DB_AUTO_MIGRATE': auto_migrate},
+                                        capture_output=True, text=True)
+                if output.returncode != 0:
+                    sys.exit(f'{mode} boot failed:\n{output.stderr}')
+                results.append(json.loads(output.stdout.strip().splitlines()[-1]))
+            modes[mode] = results
+        if hasattr(os, 'fork'):
+            os.environ.update(env)
+            modes['preload_fork'] = fork_boots(args.runs)
+
+    summary = {}
+    print(f"{'mode':<14} {'import':>9} {'create':>9} {'1st req':>9} {'total':>9}  optional modules")
+    for mode, results in modes.items():
+        summary[mode] = {key: median(results, key)
+                         for key in ('import_ms', 'create_ms', 'first_request_ms', 'total_ms')}
+        summary[mode]['statuses'] = sorted({result['status'] for result in results})
+        summary[mode]['optional_modules'] = results[0].get('optional_modules', [])
+        cells = ' '.join(f'{value:7.1f}ms' if value is not None else f"{'-':>9}"
+                         for key, value in summary[mode].items() if key.endswith('_ms'))
+        print(f"{mode:<14} {cells}  {', '.join(summary[mode]['optional_modules']) or '-'}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'runs': args.runs, 'modes': summary}, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='Benchmark the boot modes.')
+    run_parser.add_argument('--runs', type=int, default=10, help='Boots per mode.')
+    run_parser.add_argument('--output', help='Also write the medians to this JSON file.')
+    run_parser.set_defaults(handler=run)
+
+    boot_parser = commands.add_parser('boot', help='Boot the app once (used by run).')
+    boot_parser.set_defaults(handler=boot)
+
+    create_parser = commands.add_parser('create-db', help='Create the benchmark database (used by run).')
+    create_parser.add_argument('--db', required=True)
+    create_parser.set_defaults(handler=lambda args: create_database(args.db))
+
+    args = parser.parse_args()
+    args.handler(args)
+
+
+if __name__ == '__main__':
+    main()
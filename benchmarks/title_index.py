@@ -0,0 +1,100 @@
+"""
+Latency of the title index (omdb.title_index) on a large synthetic catalog.
+
+The index is loaded with ``--titles`` generated titles, then typed titles
+are resolved (exact spellings, other spellings and typos) and partial
+titles are completed, and the median, p99 and worst latencies of each
+kind of lookup are printed. The lookups should stay under 10 ms with a
+million titles.
+
+Usage (from the repository root):
+    python -m benchmarks.title_index --titles 1000000 --queries 2000
+"""
+
+import argparse
+import random
+import statistics
+import time
+from itertools import accumulate
+from omdb.title_index import TitleIndex
+
+WORDS = ['night', 'city', 'river', 'ghost', 'summer', 'king', 'blue', 'last', 'road', 'war', 'star', 'dark',
+         'love', 'house', 'dead', 'secret', 'black', 'man', 'girl', 'world', 'time', 'life', 'story', 'game']
+LETTERS = 'etaoinshrdlcumwfgypbvkjxqz'
+
+
+def synthetic_titles(count, rng):
+    """
+    Generates ``count`` distinct titles of one to six words, some with an article or a sequel number.
+
+    Words are drawn with a Zipf distribution from a vocabulary of common
+    words and made-up words (with letters as frequent as in English), so a
+    few trigrams are very common, as in a real catalog.
+    """
+    letter_weights = list(accumulate(1 / rank ** 0.7 for rank in range(1, len(LETTERS) + 1)))
+    vocabulary = WORDS + list({''.join(rng.choices(LETTERS, cum_weights=letter_weights, k=rng.randint(3, 9)))
+                               for _ in range(50000)})
+    weights = list(accumulate(1 / rank for rank in range(1, len(vocabulary) + 1)))
+    titles = set()
+    while len(titles) < count:
+        words = rng.choices(vocabulary, cum_weights=weights, k=rng.randint(1, 6))
+        title = ' '.join(words).title()
+        if rng.random() < 0.3:
+            title = f"{rng.choice(['The', 'A'])} {title}"
+        if rng.random() < 0.2:
+            title = f'{title} {rng.randint(2, 9)}'
+        titles.add(title)
+    return list(titles)
+
+
+def typo(title, rng):
+    """Swaps two neighbouring letters of a title."""
+    position = rng.randrange(len(title) - 1)
+    return title[:position] + title[position + 1] + title[position] + title[position + 2:]
+
+
+def measure(lookup, queries):
+    """Runs a lookup on every query and returns the latencies in milliseconds, sorted."""
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        lookup(query)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return sorted(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--titles', type=int, default=1000000, help='Number of titles in the index.')
+    parser.add_argument('--queries', type=int, default=2000, help='Lookups of each kind.')
+    args = parser.parse_args()
+    rng = random.Random(0)
+
+    titles = synthetic_titles(args.titles, rng)
+    index = TitleIndex()
+    started = time.perf_counter()
+    pages = [list(enumerate(titles[start:start + 5000], start + 1)) for start in range(0, len(titles), 5000)]
+    index.load(lambda after_id: pages[after_id // 5000] if after_id // 5000 < len(pages) else [], [])
+    del pages  # a million tuples would slow the garbage collector down, unlike the index
+    print(f'loaded {len(titles)} titles in {time.perf_counter() - started:.1f}s: {index.stats()}')
+
+    picks = rng.sample(titles, args.queries)
+    kinds = {
+        'resolve exact': (index.resolve, picks),
+        'resolve respelled': (index.resolve, [f"  {title.lower().removeprefix('the ')}." for title in picks]),
+        'resolve typo': (index.resolve, [typo(title, rng) for title in picks]),
+        'resolve unknown': (index.resolve, [f'{title} zz' for title in picks]),
+        'suggest prefix': (index.suggest, [title[:rng.randint(3, 12)] for title in picks]),
+        'suggest typo': (index.suggest, [typo(title, rng)[:rng.randint(8, 20)] for title in picks]),
+    }
+    print(f"\n{'ms':<20}{'p50':>8}{'p99':>8}{'max':>8}")
+    for kind, (lookup, queries) in kinds.items():
+        latencies = measure(lookup, queries)
+        print(f'{kind:<20}{statistics.median(latencies):8.2f}{latencies[int(len(latencies) * 0.99)]:8.2f}'
+              f'{latencies[-1]:8.2f}')
+    resolved = sum(index.resolve(typo(title, rng)) is not None for title in picks[:500])
+    print(f'\ntypos resolved: {resolved / 5:.0f}%')
+
+
+if __name__ == '__main__':
+    main()
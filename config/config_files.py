@@ -1,9 +1,12 @@
 import os
 from dataclasses import dataclass
-from dotenv import load_dotenv, find_dotenv
+from dotenv import load_dotenv
+
+# The .env file next to this module, or DOTENV_PATH; an explicit path spares
+# find_dotenv's walk up the directory tree on every import
+load_dotenv(os.getenv('DOTENV_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env')))
 
 
-load_dotenv(find_dotenv())
 @dataclass(frozen=True)
 class APIkeys:
     """
@@ -13,4 +16,271 @@ class APIkeys:
         APIkey (str): The API key value.
     """
     APIkey: str = os.getenv('apiKey')
-    
\ No newline at end of file
+    
+
+@dataclass(frozen=True)
+class OMDbCacheConfig:
+    """
+    Class representing the OMDb response cache settings.
+
+    Attributes:
+        max_entries (int): Number of responses kept in the in-process LRU.
+        ttl (int): Seconds a found movie stays cached.
+        negative_ttl (int): Seconds a "Movie not found!" answer stays cached.
+    """
+    max_entries: int = int(os.getenv('OMDB_CACHE_MAX_ENTRIES', '1024'))
+    ttl: int = int(os.getenv('OMDB_CACHE_TTL', str(7 * 24 * 3600)))
+    negative_ttl: int = int(os.getenv('OMDB_CACHE_NEGATIVE_TTL', str(24 * 3600)))
+
+
+@dataclass(frozen=True)
+class OMDbClientConfig:
+    """
+    Class representing the OMDb HTTP client settings.
+
+    Attributes:
+        base_url (str): The OMDb endpoint, overridable to point at a local stub server.
+        connect_timeout (float): Seconds to wait for the TCP connection.
+        read_timeout (float): Seconds to wait for the response.
+        max_retries (int): Retries for connection errors and 5xx answers.
+        backoff_factor (float): Exponential backoff factor between retries.
+        pool_maxsize (int): Keep-alive connections kept in the pool.
+        failure_threshold (int): Consecutive failures that open the circuit breaker.
+        reset_timeout (float): Seconds the breaker stays open before a trial request.
+    """
+    base_url: str = os.getenv('OMDB_BASE_URL', 'http://www.omdbapi.com/')
+    connect_timeout: float = float(os.getenv('OMDB_CONNECT_TIMEOUT', '3.05'))
+    read_timeout: float = float(os.getenv('OMDB_READ_TIMEOUT', '10'))
+    max_retries: int = int(os.getenv('OMDB_MAX_RETRIES', '2'))
+    backoff_factor: float = float(os.getenv('OMDB_BACKOFF_FACTOR', '0.3'))
+    pool_maxsize: int = int(os.getenv('OMDB_POOL_MAXSIZE', '10'))
+    failure_threshold: int = int(os.getenv('OMDB_FAILURE_THRESHOLD', '5'))
+    reset_timeout: float = float(os.getenv('OMDB_RESET_TIMEOUT', '30'))
+
+
+@dataclass(frozen=True)
+class MovieJobConfig:
+    """
+    Class representing the asynchronous add_movie settings.
+
+    Attributes:
+        async_add (bool): Queue OMDb lookups instead of making them inside the request.
+        poll_interval (float): Seconds the job worker sleeps when the queue is empty.
+        max_attempts (int): Claims of a job before it is marked as failed.
+        lease (float): Seconds after which a claimed but unfinished job is retried.
+    """
+    async_add: bool = os.getenv('MOVIE_ASYNC_ADD', 'false').lower() in ('1', 'true', 'yes')
+    poll_interval: float = float(os.getenv('MOVIE_JOB_POLL_INTERVAL', '1'))
+    max_attempts: int = int(os.getenv('MOVIE_JOB_MAX_ATTEMPTS', '5'))
+    lease: float = float(os.getenv('MOVIE_JOB_LEASE', '300'))
+
+
+@dataclass(frozen=True)
+class SQLiteTuningConfig:
+    """
+    Class representing the SQLite tuning profile applied to every new connection.
+
+    Attributes:
+        enabled (bool): Apply the profile; when off SQLite runs with its defaults.
+        journal_mode (str): The journal mode; WAL lets readers run alongside a writer.
+        synchronous (str): The fsync level; NORMAL is safe with WAL and avoids an fsync per commit.
+        busy_timeout (int): Milliseconds to wait for a lock before raising "database is locked".
+        mmap_size (int): Bytes of the database file read through memory mapping.
+        cache_size (int): Page cache size, in KiB when negative (SQLite convention).
+        temp_store (str): Where temporary tables and indices live.
+        pool_size (int): Connections kept open per process.
+        max_overflow (int): Extra connections allowed under bursts.
+    """
+    enabled: bool = os.getenv('SQLITE_TUNING', 'true').lower() in ('1', 'true', 'yes')
+    journal_mode: str = os.getenv('SQLITE_JOURNAL_MODE', 'WAL')
+    synchronous: str = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+    busy_timeout: int = int(os.getenv('SQLITE_BUSY_TIMEOUT', '5000'))
+    mmap_size: int = int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))
+    cache_size: int = int(os.getenv('SQLITE_CACHE_SIZE', '-65536'))
+    temp_store: str = os.getenv('SQLITE_TEMP_STORE', 'MEMORY')
+    pool_size: int = int(os.getenv('SQLITE_POOL_SIZE', '8'))
+    max_overflow: int = int(os.getenv('SQLITE_MAX_OVERFLOW', '8'))
+
+
+@dataclass(frozen=True)
+class ReadRoutingConfig:
+    """
+    Class representing the routing of the SQLite data manager's reads to a read-only pool.
+
+    Attributes:
+        enabled (bool): Route the reads; off by default.
+        url (str): The SQLAlchemy URL of a replica of the database; by default the
+            database file itself, opened read-only.
+        pool_size (int): Connections kept in the read pool (and as many more under load).
+        sticky_seconds (float): Seconds a client's reads stay on the primary after it
+            wrote, so it sees its own writes on a lagging replica.
+    """
+    enabled: bool = os.getenv('DB_READ_ROUTING', 'false').lower() in ('1', 'true', 'yes')
+    url: str = os.getenv('DATABASE_READ_URL')
+    pool_size: int = int(os.getenv('DB_READ_POOL_SIZE', '16'))
+    sticky_seconds: float = float(os.getenv('DB_READ_STICKY_SECONDS', '5'))
+
+
+@dataclass(frozen=True)
+class UserListCacheConfig:
+    """
+    Class representing the cache of users' movie lists.
+
+    Attributes:
+        max_entries (int): Lists kept in the in-process LRU.
+        ttl (float): Seconds a list stays cached, bounding staleness after
+            writes made by other processes (e.g. the import or job workers).
+    """
+    max_entries: int = int(os.getenv('USER_LIST_CACHE_MAX_ENTRIES', '2048'))
+    ttl: float = float(os.getenv('USER_LIST_CACHE_TTL', '60'))
+
+
+@dataclass(frozen=True)
+class InstrumentationConfig:
+    """
+    Class representing the request instrumentation settings.
+
+    Attributes:
+        enabled (bool): Record timings and serve /metrics; off by default.
+        slowest_statements (int): Slowest SQL statements logged per request.
+        n_plus_one_threshold (int): Executions of one statement within a request
+            from which the request is flagged as an N+1 pattern.
+        profile_rate (float): Fraction of requests run under the sampling profiler.
+        profile_interval (float): Seconds between two profiler samples.
+        profile_dir (str, optional): Directory the folded stacks of profiled requests are written to.
+    """
+    enabled: bool = os.getenv('INSTRUMENTATION', 'false').lower() in ('1', 'true', 'yes')
+    slowest_statements: int = int(os.getenv('INSTRUMENTATION_SLOWEST_STATEMENTS', '3'))
+    n_plus_one_threshold: int = int(os.getenv('INSTRUMENTATION_N_PLUS_ONE_THRESHOLD', '10'))
+    profile_rate: float = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+    profile_interval: float = float(os.getenv('PROFILE_INTERVAL', '0.005'))
+    profile_dir: str = os.getenv('PROFILE_DIR')
+
+
+@dataclass(frozen=True)
+class RecommendationConfig:
+    """
+    Class representing the movie recommendation settings.
+
+    Attributes:
+        top_n (int): Recommendations kept per user.
+        neighbors (int): Most similar movies kept per movie.
+        batch_cells (int): Matrix cells computed at once by the batch job,
+            bounding its memory use to about 4 bytes per cell.
+    """
+    top_n: int = int(os.getenv('RECOMMENDATIONS_TOP_N', '20'))
+    neighbors: int = int(os.getenv('RECOMMENDATIONS_NEIGHBORS', '50'))
+    batch_cells: int = int(os.getenv('RECOMMENDATIONS_BATCH_CELLS', '16000000'))
+
+
+@dataclass(frozen=True)
+class PosterConfig:
+    """
+    Class representing the local poster cache settings.
+
+    Attributes:
+        directory (str): Directory the posters are stored in, data/posters by default.
+        thumbnail_width (int): Width in pixels of the thumbnails shown in lists (needs Pillow).
+        max_bytes (int): Largest poster downloaded.
+        timeout (float): Seconds to wait for the image host.
+        retry_after (float): Seconds before a failed download is tried again.
+        workers (int): Background threads downloading posters.
+        x_sendfile (bool): Let the front web server send the files (X-Sendfile header).
+    """
+    directory: str = os.getenv('POSTER_DIR')
+    thumbnail_width: int = int(os.getenv('POSTER_THUMBNAIL_WIDTH', '240'))
+    max_bytes: int = int(os.getenv('POSTER_MAX_BYTES', str(5 * 1024 * 1024)))
+    timeout: float = float(os.getenv('POSTER_TIMEOUT', '10'))
+    retry_after: float = float(os.getenv('POSTER_RETRY_AFTER', '3600'))
+    workers: int = int(os.getenv('POSTER_WORKERS', '2'))
+    x_sendfile: bool = os.getenv('POSTER_X_SENDFILE', 'false').lower() in ('1', 'true', 'yes')
+
+
+@dataclass(frozen=True)
+class PageCacheConfig:
+    """
+    Class representing the full-page cache of the catalog and movie pages.
+
+    Attributes:
+        enabled (bool): Cache the pages; on by default.
+        max_entries (int): Pages kept in the in-process LRU.
+        ttl (float): Seconds a page stays cached, bounding staleness after
+            writes made by other processes.
+        max_age (int): Seconds browsers may reuse a page without revalidating it.
+        min_compress_size (int): Smallest page stored gzip-compressed as well.
+    """
+    enabled: bool = os.getenv('PAGE_CACHE', 'true').lower() in ('1', 'true', 'yes')
+    max_entries: int = int(os.getenv('PAGE_CACHE_MAX_ENTRIES', '1024'))
+    ttl: float = float(os.getenv('PAGE_CACHE_TTL', '60'))
+    max_age: int = int(os.getenv('PAGE_CACHE_MAX_AGE', '0'))
+    min_compress_size: int = int(os.getenv('PAGE_CACHE_MIN_COMPRESS_SIZE', '1024'))
+
+
+@dataclass(frozen=True)
+class AppConfig:
+    """
+    Class representing the application startup settings.
+
+    Attributes:
+        database_url (str): The SQLAlchemy URI of the database, data/movie_app.sqlite by default.
+        secret_key (str): The key signing the session cookie.
+        auto_migrate (bool): Create the tables and apply pending migrations when the app
+            is created; off by default, run ``flask db-upgrade`` when deploying instead.
+    """
+    database_url: str = os.getenv('DATABASE_URL', f"sqlite:///{os.path.join(os.getcwd(), 'data', 'movie_app.sqlite')}")
+    secret_key: str = os.getenv('SECRET_KEY', 'your secret key')
+    auto_migrate: bool = os.getenv('DB_AUTO_MIGRATE', 'false').lower() in ('1', 'true', 'yes')
+
+
+@dataclass(frozen=True)
+class StorageConfig:
+    """
+    Class representing the storage backend behind the data manager.
+
+    Attributes:
+        backend (str): 'sqlite' (the Flask-SQLAlchemy data manager, the default),
+            'sql' (SQLAlchemy Core, for SQLite or PostgreSQL) or 'memory' (in-process dictionaries).
+        url (str): The SQLAlchemy URL of the 'sql' backend's database, DATABASE_URL by default.
+        snapshot_url (str): The database the 'memory' backend is loaded from when the app starts;
+            it starts empty if unset, and its writes are never persisted.
+    """
+    backend: str = os.getenv('DATA_BACKEND', 'sqlite').lower()
+    url: str = os.getenv('DATA_BACKEND_URL')
+    snapshot_url: str = os.getenv('MEMORY_SNAPSHOT_URL')
+
+
+@dataclass(frozen=True)
+class ExportConfig:
+    """
+    Class representing the streaming exports of the tables (flask export and /api/v1/export).
+
+    Attributes:
+        api_enabled (bool): Serve the export endpoint; off by default.
+        api_token (str): The bearer token export requests must carry; the endpoint
+            stays off until one is set, since the exports hold every user's lists.
+        chunk_size (int): Rows fetched from the database and encoded at a time.
+        gzip_level (int): The gzip compression level of compressed exports.
+    """
+    api_enabled: bool = os.getenv('EXPORT_API', 'false').lower() in ('1', 'true', 'yes')
+    api_token: str = os.getenv('EXPORT_API_TOKEN')
+    chunk_size: int = int(os.getenv('EXPORT_CHUNK_SIZE', '5000'))
+    gzip_level: int = int(os.getenv('EXPORT_GZIP_LEVEL', '6'))
+
+
+@dataclass(frozen=True)
+class TitleIndexConfig:
+    """
+    Class representing the local title index consulted before OMDb.
+
+    Attributes:
+        enabled (bool): Resolve typed titles through the index and serve the autocomplete endpoint; on by default.
+        threshold (float): Smallest trigram similarity (0 to 1) a fuzzy match needs to stand for a typed title.
+        suggest_threshold (float): Smallest trigram similarity of a fuzzy autocomplete suggestion.
+        margin (float): How much more similar than the runner-up a fuzzy match must be to stand for a typed title.
+        refresh_interval (float): Seconds between two looks for movies added by other workers.
+    """
+    enabled: bool = os.getenv('TITLE_INDEX', 'true').lower() in ('1', 'true', 'yes')
+    threshold: float = float(os.getenv('TITLE_MATCH_THRESHOLD', '0.85'))
+    suggest_threshold: float = float(os.getenv('TITLE_SUGGEST_THRESHOLD', '0.45'))
+    margin: float = float(os.getenv('TITLE_MATCH_MARGIN', '0.05'))
+    refresh_interval: float = float(os.getenv('TITLE_INDEX_REFRESH', '5'))
@@ -0,0 +1,350 @@
+import asyncio
+import threading
+from sqlalchemy import select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+from config.config_files import SQLiteTuningConfig
+from data_manager.data_manager_interface import AsyncDataManagerInterface, check_list_update
+from data_manager.data_models import Movie, MovieJob, User, UserMovie
+from data_manager.sqlite_data_manager import (MOVIE_COLUMNS, columns_for, movie_list_inserts, resolved_movies,
+                                              user_movies_page, user_movies_select)
+from data_manager.sqlite_tuning import apply_tuning
+from utils.page_cache import MOVIE_PAGE_KEY
+from utils.titles import normalize_title
+
+
+class AsyncSQLiteDataManager(AsyncDataManagerInterface):
+    """
+    Asynchronous SQLite data manager, on SQLAlchemy's asyncio engine with aiosqlite.
+
+    It works on the database of a SQLiteDataManager, whose schema is created
+    and migrated by ``flask db-upgrade``, and shares its list and page caches so writes made
+    through either manager invalidate the same cached lists and pages.
+
+    Flask runs every async view in an event loop of its own, and aiosqlite
+    connections are bound to the loop that opened them, so connections are
+    not pooled: each session opens a fresh one (a cheap local file open).
+    """
+    _create_lock = threading.Lock()
+
+    def __init__(self, database_uri, list_cache=None, page_cache=None):
+        """
+        Initializes the data manager.
+
+        Args:
+            database_uri (str): The SQLite URI of the database (sqlite:///...).
+            list_cache (UserMovieListCache, optional): The cache of users' movie lists to invalidate.
+            page_cache (PageCache, optional): The cache of rendered pages to invalidate.
+        """
+        url = make_url(database_uri).set(drivername='sqlite+aiosqlite')
+        connect_args = {}
+        if SQLiteTuningConfig.enabled:
+            connect_args['timeout'] = SQLiteTuningConfig.busy_timeout / 1000
+        self.engine = create_async_engine(url, poolclass=NullPool, connect_args=connect_args)
+        if url.database and url.database != ':memory:':
+            apply_tuning(self.engine.sync_engine, SQLiteTuningConfig)
+        self.sessionmaker = async_sessionmaker(self.engine, expire_on_commit=False)
+        self.list_cache = list_cache
+        self.page_cache = page_cache
+        self._initialize_dialect()
+
+    def _initialize_dialect(self):
+        """
+        Opens a first connection, so SQLAlchemy initializes the dialect right away.
+
+        The initialization is guarded by an asyncio lock bound to the event loop
+        that runs it; done here, requests running on other loops never contend
+        for it. It runs in a thread of its own in case the caller is in a loop.
+        """
+        async def connect():
+            async with self.engine.connect():
+                pass
+
+        thread = threading.Thread(target=asyncio.run, args=(connect(),))
+        thread.start()
+        thread.join()
+
+    @classmethod
+    def for_app(cls, app):
+        """
+        Returns the async data manager of a Flask app, creating it on first use.
+
+        The manager is created by the first async request rather than with the
+        app, so workers that never serve one neither build the aiosqlite
+        engine nor open its first connection. It is kept in ``app.extensions``.
+
+        Args:
+            app (Flask): The Flask application instance, whose data manager is a SQLiteDataManager.
+
+        Returns:
+            AsyncSQLiteDataManager: The app's async data manager.
+        """
+        manager = app.extensions.get('async_data_manager')
+        if manager is None:
+            with cls._create_lock:
+                manager = app.extensions.get('async_data_manager')
+                if manager is None:
+                    data_manager = app.extensions['data_manager']
+                    manager = cls(app.config['SQLALCHEMY_DATABASE_URI'], data_manager.list_cache,
+                                  data_manager.page_cache)
+                    app.extensions['async_data_manager'] = manager
+        return manager
+
+    async def get_all_movies(self):
+        """
+        Retrieves all movies from the database.
+
+        Returns:
+            list: A list of Movie objects.
+        """
+        async with self.sessionmaker() as session:
+            return (await session.scalars(select(Movie))).all()
+
+    async def get_movies_page(self, after_id=None, limit=50, columns=None):
+        """
+        Retrieves one page of the movie catalog using keyset pagination.
+
+        Args:
+            after_id (int, optional): The ID of the last movie on the previous page.
+            limit (int): The maximum number of movies to return.
+            columns (list, optional): Names from MOVIE_COLUMNS to select,
+                by default id, movie_name and movie_poster.
+
+        Returns:
+            tuple: A list of rows with the columns as attributes (plus id) and the
+            cursor for the next page (None if this is the last page).
+
+        Raises:
+            ValueError: If a column is invalid.
+        """
+        columns = columns or ['id', 'movie_name', 'movie_poster']
+        entities = columns_for(MOVIE_COLUMNS, columns)
+        if 'id' not in columns:
+            entities.append(Movie.id) # needed for the cursor
+        statement = select(*entities).where(resolved_movies())
+        if after_id is not None:
+            statement = statement.where(Movie.id > after_id)
+        async with self.sessionmaker() as session:
+            rows = (await session.execute(statement.order_by(Movie.id).limit(limit + 1))).all()
+        next_cursor = rows[limit - 1].id if len(rows) > limit else None
+        return rows[:limit], next_cursor
+
+    async def get_movie_by_id(self, movie_id):
+        """
+        Retrieves a movie by its ID from the database.
+
+        Args:
+            movie_id (int): The ID of the movie.
+
+        Returns:
+            Movie: A Movie object or None if the movie is not found.
+        """
+        async with self.sessionmaker() as session:
+            return await session.get(Movie, movie_id)
+
+    async def get_movie_by_name(self, movie_name):
+        """
+        Retrieves a movie by its name from the database (case and spacing insensitive).
+
+        Args:
+            movie_name (str): The name of the movie.
+
+        Returns:
+            Movie: A Movie object or None if the movie is not found.
+        """
+        async with self.sessionmaker() as session:
+            return await session.scalar(select(Movie).where(Movie.movie_key == normalize_title(movie_name)))
+
+    async def get_movie_by_movie_by_user(self, movie_id, user_id):
+        """
+        Retrieves a movie from a user's list.
+
+        Args:
+            movie_id (int): The ID of the movie.
+            user_id (int): The ID of the user.
+
+        Returns:
+            UserMovie: A UserMovie object or None if the movie is not in the user's list.
+        """
+        async with self.sessionmaker() as session:
+            return await session.get(UserMovie, (user_id, movie_id))
+
+    async def get_user_by_id(self, user_id):
+        """
+        Retrieves a user by its ID from the database.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            User: A User object or None if the user is not found.
+        """
+        async with self.sessionmaker() as session:
+            return await session.get(User, user_id)
+
+    async def get_all_users(self):
+        """
+        Retrieves all users from the database.
+
+        Returns:
+            list: A list of User objects.
+        """
+        async with self.sessionmaker() as session:
+            return (await session.scalars(select(User))).all()
+
+    async def get_user_movies(self, user_id):
+        """
+        Retrieves all movies associated with a user, including their names and posters.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            list: A list of tuples containing UserMovie objects, movie names, and movie posters.
+        """
+        return (await self.query_user_movies(user_id))[0]
+
+    async def query_user_movies(self, user_id, watch_status=None, sort='added', direction='asc',
+                                limit=None, cursor=None, columns=None):
+        """
+        Retrieves a user's movies, filtered, sorted and paged in the database.
+
+        Takes the same arguments as SQLiteDataManager.query_user_movies.
+
+        Returns:
+            tuple: The page's rows and the cursor for the next page (None if this is the last page).
+
+        Raises:
+            ValueError: If the sort key, direction, cursor or a column is invalid.
+        """
+        statement = user_movies_select(user_id, watch_status, sort, direction, limit, cursor, columns)
+        async with self.sessionmaker() as session:
+            rows = (await session.execute(statement)).all()
+        return user_movies_page(rows, limit, columns)
+
+    async def get_pending_movie_ids(self, user_id):
+        """
+        Retrieves the movies of a user that are still waiting for their details.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            set: The IDs of the pending movies.
+        """
+        async with self.sessionmaker() as session:
+            movie_ids = await session.scalars(select(MovieJob.movie_id).where(
+                MovieJob.user_id == user_id, MovieJob.status.in_(('pending', 'running'))))
+            return set(movie_ids)
+
+    async def add_user(self, user):
+        async with self.sessionmaker() as session:
+            session.add(User(**user))
+            await session.commit()
+
+    async def add_movie(self, movie, user_id, watchlist_status, user_rating):
+        """
+        Adds a movie to a user's list.
+
+        Args:
+            movie (dict): A dictionary containing movie data (expected keys: 'movie_name', etc.).
+                A dictionary with only 'movie_name' refers to a movie already in the catalog.
+            user_id (int): The ID of the user.
+            watchlist_status (str): The watchlist status for the movie (e.g., 'watched', 'watching', 'wishlist').
+            user_rating (int, optional): The user's rating for the movie (between 1 and 5).
+
+        Returns:
+            bool: True if the movie was added, False if it was already in the user's list.
+        """
+        return bool(await self.add_movies(user_id, [(movie, watchlist_status, user_rating)]))
+
+    async def add_movies(self, user_id, items):
+        """
+        Adds movies to a user's list in a single transaction, see SQLiteDataManager.add_movies.
+
+        Args:
+            user_id (int): The ID of the user.
+            items (iterable): (movie, watchlist_status, user_rating) tuples.
+
+        Returns:
+            list: The IDs of the movies that were added to the user's list.
+        """
+        statements = movie_list_inserts(user_id, items)
+        if statements is None:
+            return []
+        insert_movies, select_movie_ids, insert_user_movies = statements
+        async with self.sessionmaker() as session:
+            new_movies = (await session.execute(*insert_movies)).all() if insert_movies is not None else []
+            movie_ids = dict((await session.execute(select_movie_ids)).all())
+            added = (await session.execute(*insert_user_movies(movie_ids))).all() if movie_ids else []
+            await session.commit()
+        for status in {watchlist_status for _, watchlist_status in added}:
+            self._invalidate_list(user_id, status)
+        self._invalidate_pages(None if new_movies else [movie_id for movie_id, _ in added])
+        return [movie_id for movie_id, _ in added]
+
+    async def update_movie(self, user_id, movie_id, rating, status):
+        """
+        Updates the watchlist status and rating for a movie in a user's list.
+
+        Args:
+            user_id (int): The ID of the user.
+            movie_id (int): The ID of the movie.
+            rating (int): The new rating for the movie (between 1 and 5).
+            status (str): The new watchlist status for the movie (e.g., 'watched', 'watching', 'wishlist').
+
+        Raises:
+            ValueError: If the rating is invalid (not an integer between 1 and 5) or the status is invalid.
+
+        Returns:
+            bool: True if the update was successful, False otherwise.
+        """
+        check_list_update(rating, status)
+
+        async with self.sessionmaker() as session:
+            user_movie = await session.get(UserMovie, (user_id, movie_id))
+            if not user_movie:
+                return False
+            old_status = user_movie.watchlist_status
+            user_movie.watchlist_status = status
+            user_movie.user_rating = rating
+            await session.commit()
+        self._invalidate_list(user_id, old_status, status)
+        self._invalidate_pages([movie_id])
+        return True
+
+    async def delete_movie(self, user_id, movie_id):
+        """
+        Deletes a movie from a user's list.
+
+        Args:
+            user_id (int): The ID of the user.
+            movie_id (int): The ID of the movie.
+
+        Returns:
+            bool: True if the deletion was successful, False otherwise.
+        """
+        async with self.sessionmaker() as session:
+            user_movie = await session.get(UserMovie, (user_id, movie_id))
+            if not user_movie:
+                return False
+            await session.delete(user_movie)
+            await session.commit()
+        self._invalidate_list(user_id, user_movie.watchlist_status)
+        self._invalidate_pages([movie_id])
+        return True
+
+    def _invalidate_list(self, user_id, *watch_statuses):
+        """Drops the cached lists a committed change affected, if there is a list cache."""
+        if self.list_cache is not None:
+            self.list_cache.invalidate(user_id, *watch_statuses)
+
+    def _invalidate_pages(self, movie_ids=None):
+        """Drops the cached pages a committed change affected, see SQLiteDataManager._invalidate_pages."""
+        if self.page_cache is None:
+            return
+        if movie_ids is None:
+            self.page_cache.invalidate_all()
+        elif movie_ids:
+            self.page_cache.invalidate(*(MOVIE_PAGE_KEY.format(movie_id=movie_id) for movie_id in movie_ids))
@@ -0,0 +1,55 @@
+"""
+Selection of the storage backend behind DataManagerInterface.
+
+- sqlite: SQLiteDataManager, on Flask-SQLAlchemy and the tuned SQLite
+  database of SQLALCHEMY_DATABASE_URI (the default);
+- sql: SQLDataManager, on SQLAlchemy Core, for a SQLite or PostgreSQL
+  database at DATA_BACKEND_URL;
+- memory: InMemoryDataManager, for tests and demos, optionally loaded
+  from a database at startup and never written back.
+
+The OMDb cache, the poster files and the CLI commands keep using
+Flask-SQLAlchemy on SQLALCHEMY_DATABASE_URI whatever the backend, and
+the async API is only served by the sqlite backend.
+"""
+
+from config.config_files import StorageConfig
+from data_manager.data_models import db
+from data_manager.memory_data_manager import InMemoryDataManager
+from data_manager.sql_data_manager import SQLDataManager
+from data_manager.sqlite_data_manager import SQLiteDataManager
+
+BACKENDS = ('sqlite', 'sql', 'memory')
+
+
+def create_data_manager(app, page_cache=None, backend=None):
+    """
+    Creates the data manager of an app and registers it in ``app.extensions``.
+
+    Args:
+        app (Flask): The Flask application instance.
+        page_cache (PageCache, optional): The cache of rendered pages to invalidate.
+        backend (str, optional): One of BACKENDS; StorageConfig.backend (DATA_BACKEND) by default.
+
+    Returns:
+        DataManagerInterface: The data manager.
+
+    Raises:
+        ValueError: If the backend is unknown.
+    """
+    backend = backend or StorageConfig.backend
+    if backend not in BACKENDS:
+        raise ValueError(f"Invalid DATA_BACKEND: must be one of {', '.join(BACKENDS)}.")
+    if backend == 'sqlite':
+        return SQLiteDataManager(app, page_cache=page_cache)
+
+    db.init_app(app)
+    if backend == 'sql':
+        data_manager = SQLDataManager(StorageConfig.url or app.config['SQLALCHEMY_DATABASE_URI'],
+                                      page_cache=page_cache)
+    elif StorageConfig.snapshot_url:
+        data_manager = InMemoryDataManager.from_database(StorageConfig.snapshot_url, page_cache=page_cache)
+    else:
+        data_manager = InMemoryDataManager(page_cache=page_cache)
+    app.extensions['data_manager'] = data_manager
+    return data_manager
@@ -0,0 +1,286 @@
+import csv
+import json
+import os
+import time
+from itertools import islice
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import insert, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from data_manager.data_manager_interface import WATCHLIST_STATUSES
+from data_manager.data_models import db, Movie, OMDbCacheEntry, User, UserMovie, PLACEHOLDER_MOVIE
+from omdb.client import movie_from_response
+from utils.titles import normalize_title
+
+def batched(values, size=500):
+    """Splits a list into slices small enough for an SQL IN clause."""
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def read_rows(path, file_format=None):
+    """
+    Streams watchlist rows from a CSV or JSONL file.
+
+    Every row must provide ``user_name`` and ``movie_name``;
+    ``watchlist_status`` and ``user_rating`` are optional. Rows are not
+    validated here (see validate_row), and a JSONL line that is not valid
+    JSON is yielded as None, so one bad row does not end the import.
+
+    Args:
+        path (str): The path of the input file.
+        file_format (str, optional): 'csv' or 'jsonl', guessed from the extension if omitted.
+
+    Yields:
+        tuple: The line number of the row (its last line, for a CSV row spanning several) and
+        the row (a dict, or None).
+    """
+    file_format = file_format or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+    with open(path, newline='', encoding='utf-8') as handle:
+        if file_format == 'csv':
+            reader = csv.DictReader(handle)
+            for row in reader:
+                yield reader.line_num, row
+        else:
+            for line_number, line in enumerate(handle, 1):
+                if line.strip():
+                    try:
+                        yield line_number, json.loads(line)
+                    except ValueError:
+                        yield line_number, None
+
+
+def validate_row(row):
+    """
+    Checks a watchlist row and returns its cleaned values.
+
+    Args:
+        row (dict): The row as read by read_rows.
+
+    Returns:
+        dict: The user name, stripped, the movie title with its spaces collapsed,
+        the watchlist status (None if empty) and the rating (an int, or None).
+
+    Raises:
+        ValueError: If the row is not an object, a name is missing, or the status or rating is invalid.
+    """
+    if not isinstance(row, dict):
+        raise ValueError('Not a JSON object.')
+    names = {}
+    for field in ('user_name', 'movie_name'):
+        value = row.get(field)
+        if not isinstance(value, str) or not value.strip():
+            raise ValueError(f'Missing {field}.')
+        names[field] = value.strip() if field == 'user_name' else ' '.join(value.split())
+    status = row.get('watchlist_status') or None
+    if status is not None and status not in WATCHLIST_STATUSES:
+        raise ValueError(f'Invalid watchlist_status {status!r}.')
+    rating = row.get('user_rating')
+    if rating in (None, ''):
+        rating = None
+    else:
+        try:
+            rating = int(str(rating).strip())
+        except ValueError:
+            raise ValueError(f'Invalid user_rating {rating!r}: must be an integer between 1 and 5.') from None
+        if not 1 <= rating <= 5:
+            raise ValueError(f'Invalid user_rating {rating!r}: must be an integer between 1 and 5.')
+    return {**names, 'watchlist_status': status, 'user_rating': rating}
+
+
+def load_metadata(path):
+    """
+    Loads an offline metadata file of OMDb responses, one JSON body per line.
+
+    Args:
+        path (str): The path of the JSONL file.
+
+    Returns:
+        dict: OMDb bodies keyed by normalized title.
+    """
+    metadata = {}
+    with open(path, encoding='utf-8') as handle:
+        for line in handle:
+            if line.strip():
+                body = json.loads(line)
+                metadata[normalize_title(body['Title'])] = body
+    return metadata
+
+
+class WatchlistImporter:
+    """
+    Writes watchlist rows to the database in large chunked transactions.
+
+    User and movie IDs are remembered in memory, so each distinct user name
+    and movie title is looked up or inserted only once per import. Movies
+    and associations are written with multi-row upserts, one commit per chunk.
+    Invalid rows are skipped and recorded in ``rejected`` with their line number.
+    """
+    def __init__(self, session, metadata=None):
+        """
+        Initializes the importer.
+
+        Args:
+            session (Session): The SQLAlchemy session to write with.
+            metadata (dict, optional): Offline OMDb bodies keyed by normalized title.
+        """
+        self.session = session
+        self.metadata = metadata or {}
+        self.user_ids = {}
+        self.movie_ids = {}
+        self.unresolved = 0
+        self.rejected = []  # (line number, reason) of the invalid rows
+
+    def import_chunk(self, rows):
+        """
+        Imports the valid rows of a chunk and commits them.
+
+        Args:
+            rows (list): (line number, row) pairs as produced by read_rows.
+
+        Returns:
+            int: The number of rows imported.
+        """
+        valid = []
+        for line_number, row in rows:
+            try:
+                valid.append(validate_row(row))
+            except ValueError as e:
+                self.rejected.append((line_number, str(e)))
+        if not valid:
+            return 0
+        self._resolve_users({row['user_name'] for row in valid})
+        self._resolve_movies({normalize_title(row['movie_name']): row['movie_name'] for row in valid})
+
+        user_movies = {}
+        for row in valid:
+            key = (self.user_ids[row['user_name']], self.movie_ids[normalize_title(row['movie_name'])])
+            user_movies[key] = {
+                'user_id': key[0],
+                'movie_id': key[1],
+                'watchlist_status': row['watchlist_status'],
+                'user_rating': row['user_rating']
+            }
+        stmt = sqlite_insert(UserMovie)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[UserMovie.user_id, UserMovie.movie_id],
+            set_={'watchlist_status': stmt.excluded.watchlist_status,
+                  'user_rating': stmt.excluded.user_rating})
+        self.session.execute(stmt, list(user_movies.values()))
+        self.session.commit()
+        return len(valid)
+
+    def _resolve_users(self, names):
+        """Maps user names to IDs, creating the users that do not exist yet."""
+        missing = [name for name in names if name not in self.user_ids]
+        if not missing:
+            return
+        self._load_user_ids(missing)
+        new_users = [{'user_name': name} for name in missing if name not in self.user_ids]
+        if new_users:
+            self.session.execute(insert(User), new_users)
+            self._load_user_ids([user['user_name'] for user in new_users])
+
+    def _load_user_ids(self, names):
+        for batch in batched(names):
+            rows = self.session.execute(
+                select(User.id, User.user_name).where(User.user_name.in_(batch)).order_by(User.id))
+            for user_id, user_name in rows:
+                self.user_ids.setdefault(user_name, user_id)
+
+    def _resolve_movies(self, titles):
+        """Maps normalized titles to movie IDs, inserting the movies that do not exist yet."""
+        missing = {key: title for key, title in titles.items() if key not in self.movie_ids}
+        if not missing:
+            return
+        self._load_movie_ids(missing)
+        missing = {key: title for key, title in missing.items() if key not in self.movie_ids}
+        if not missing:
+            return
+
+        cached = {}
+        for keys in batched(list(missing)):
+            cached.update(self.session.execute(
+                select(OMDbCacheEntry.title_key, OMDbCacheEntry.payload)
+                .where(OMDbCacheEntry.title_key.in_(keys), OMDbCacheEntry.payload.is_not(None))).all())
+        new_movies = []
+        for key, title in missing.items():
+            body = self.metadata.get(key)
+            if body is None and key in cached:
+                body = json.loads(cached[key])
+            movie = None
+            if body is not None:
+                try:
+                    movie = movie_from_response(body, body.get('Title', title))
+                except (KeyError, ValueError):
+                    pass
+            if movie is None:
+                movie = dict(PLACEHOLDER_MOVIE, movie_name=title, enriched_at=None)
+                self.unresolved += 1
+            new_movies.append(movie)
+
+        self.session.execute(sqlite_insert(Movie).on_conflict_do_nothing(), new_movies)
+        self._load_movie_ids(missing)
+
+    def _load_movie_ids(self, titles):
+        for keys in batched(list(titles)):
+            rows = self.session.execute(select(Movie.id, Movie.movie_key).where(Movie.movie_key.in_(keys)))
+            for movie_id, movie_key in rows:
+                self.movie_ids[movie_key] = movie_id
+
+
+def read_checkpoint(path):
+    """Returns the number of input rows already imported according to the checkpoint file."""
+    if path and os.path.exists(path):
+        with open(path, encoding='utf-8') as handle:
+            return json.load(handle)['rows_done']
+    return 0
+
+
+def write_checkpoint(path, rows_done):
+    """Atomically records the number of input rows imported so far."""
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as handle:
+        json.dump({'rows_done': rows_done}, handle)
+    os.replace(tmp_path, path)
+
+
+@click.command('import-watchlists')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'file_format', type=click.Choice(['csv', 'jsonl']),
+              help='Input format, guessed from the file extension by default.')
+@click.option('--metadata', type=click.Path(exists=True, dir_okay=False),
+              help='JSONL file of OMDb responses used to fill in movie details.')
+@click.option('--chunk-size', default=5000, show_default=True, help='Rows written per transaction.')
+@click.option('--checkpoint', type=click.Path(dir_okay=False),
+              help='File recording progress, used to resume an interrupted import.')
+@click.option('--max-reported', default=20, show_default=True, help='Invalid rows listed at the end.')
+@with_appcontext
+def import_watchlists_command(path, file_format, metadata, chunk_size, checkpoint, max_reported):
+    """Bulk imports users and watchlists from a CSV or JSONL file, skipping invalid rows."""
+    importer = WatchlistImporter(db.session, load_metadata(metadata) if metadata else None)
+    rows_done = read_checkpoint(checkpoint)
+    rows = islice(read_rows(path, file_format), rows_done, None)
+    if rows_done:
+        click.echo(f'Resuming after {rows_done} rows')
+
+    started = time.perf_counter()
+    imported = 0
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        imported += importer.import_chunk(chunk)
+        rows_done += len(chunk)
+        if checkpoint:
+            write_checkpoint(checkpoint, rows_done)
+        elapsed = time.perf_counter() - started
+        click.echo(f'{rows_done} rows read, {imported} imported ({imported / elapsed:.0f} rows/sec)')
+
+    click.echo(f'Done: {imported} rows in {time.perf_counter() - started:.1f}s, '
+               f'{len(importer.movie_ids)} movies, {importer.unresolved} without metadata, '
+               f'{len(importer.rejected)} invalid rows skipped')
+    for line_number, reason in importer.rejected[:max_reported]:
+        click.echo(f'  line {line_number}: {reason}', err=True)
+    if len(importer.rejected) > max_reported:
+        click.echo(f'  ... and {len(importer.rejected) - max_reported} more', err=True)
@@ -1,4 +1,23 @@
 from abc import ABC, abstractmethod
+from data_manager.read_routing import primary_reads
+from utils.page_cache import MOVIE_PAGE_KEY
+
+WATCHLIST_STATUSES = ('watched', 'watching', 'wishlist')
+
+
+def check_list_update(rating, status):
+    """
+    Validates the rating and watchlist status of a list update, the same way for every backend.
+
+    Raises:
+        ValueError: If the rating is invalid (not an integer between 1 and 5) or the status is invalid.
+    """
+    if not isinstance(rating, int) or int(rating) <= 1 or int(rating) >= 5:
+        raise ValueError("Invalid rating: Rating must be an integer between 1 and 5.")
+
+    if status not in WATCHLIST_STATUSES:
+        raise ValueError("Invalid status: Status must be 'watched', 'watching', or 'wishlist'.")
+
 
 class DataManagerInterface(ABC):
     """
@@ -6,6 +25,17 @@ class DataManagerInterface(ABC):
 
     This interface defines the methods that a data manager 
     class must implement to handle user and movie data.
+
+    Every implementation behaves the same way for the same calls, which
+    tests/test_conformance.py checks, so the storage can be picked per
+    deployment (see data_manager.backends). Rows expose their columns as
+    attributes: movies have the columns of the ``movies`` table, users
+    ``id`` and ``user_name``, and list entries ``user_id``, ``movie_id``,
+    ``watchlist_status`` and ``user_rating``.
+
+    Implementations hold a ``list_cache`` (UserMovieListCache) and an
+    optional ``page_cache`` (PageCache), which the helpers at the end of
+    this class read through and invalidate.
     """
 
     @abstractmethod
@@ -18,6 +48,33 @@ class DataManagerInterface(ABC):
         """
         pass
 
+    @abstractmethod
+    def get_user_by_id(self, user_id):
+        """
+        Retrieves a user by its ID.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            A user object, or None if the user is not found.
+        """
+        pass
+
+    @abstractmethod
+    def get_users_page(self, after_id=None, limit=50):
+        """
+        Retrieves one page of users, ordered by ID.
+
+        Args:
+            after_id (int, optional): The ID of the last user on the previous page.
+            limit (int): The maximum number of users to return.
+
+        Returns:
+            A tuple of the page's (id, user_name) rows and the cursor for the next page.
+        """
+        pass
+
     @abstractmethod
     def get_all_movies(self):
         """
@@ -28,6 +85,101 @@ class DataManagerInterface(ABC):
         """
         pass
 
+    @abstractmethod
+    def get_movies_page(self, after_id=None, limit=50, columns=None):
+        """
+        Retrieves one page of movies, ordered by ID, leaving out the placeholders of pending movies.
+
+        Args:
+            after_id (int, optional): The ID of the last movie on the previous page.
+            limit (int): The maximum number of movies to return.
+            columns (list, optional): Names from MOVIE_COLUMNS to select,
+                by default id, movie_name and movie_poster.
+
+        Returns:
+            A tuple of the page's movies and the cursor for the next page.
+
+        Raises:
+            ValueError: If a column is invalid.
+        """
+        pass
+
+    @abstractmethod
+    def search_movies(self, query, limit=20, cursor=None):
+        """
+        Searches movie titles, directors and plots.
+
+        Every word of the query must match, as a word or a word prefix;
+        title matches rank first.
+
+        Args:
+            query (str): The search text as typed by the user.
+            limit (int): The maximum number of results to return.
+            cursor (str, optional): The cursor returned with the previous page.
+
+        Returns:
+            A tuple of (id, movie_name, movie_poster, movie_director, release_year)
+            rows and the cursor for the next page.
+
+        Raises:
+            ValueError: If the cursor is malformed.
+        """
+        pass
+
+    @abstractmethod
+    def get_movie_by_id(self, movie_id):
+        """
+        Retrieves a movie by its ID.
+
+        Args:
+            movie_id (int): The ID of the movie.
+
+        Returns:
+            A movie object, or None if the movie is not found.
+        """
+        pass
+
+    @abstractmethod
+    def get_movie_by_name(self, movie_name):
+        """
+        Retrieves a movie by its name, case and spacing insensitive.
+
+        Args:
+            movie_name (str): The name of the movie.
+
+        Returns:
+            A movie object, or None if the movie is not found.
+        """
+        pass
+
+    @abstractmethod
+    def get_movie_by_movie_by_user(self, movie_id, user_id):
+        """
+        Retrieves a user's list entry for a movie.
+
+        Args:
+            movie_id (int): The ID of the movie.
+            user_id (int): The ID of the user.
+
+        Returns:
+            A list entry, or None if the movie is not on the user's list.
+        """
+        pass
+
+    @abstractmethod
+    def get_movie_by_watch_status(self, user_id, watch_status):
+        """
+        Retrieves the movies of a user's list with a watchlist status.
+
+        Args:
+            user_id (int): The ID of the user.
+            watch_status (str): The watchlist status to filter by.
+
+        Returns:
+            A list of (list entry, movie name, movie poster) tuples.
+        """
+        pass
+
     @abstractmethod
     def get_user_movies(self, user_id):
         """
@@ -37,7 +189,84 @@ class DataManagerInterface(ABC):
             user_id (int): The ID of the user.
 
         Returns:
-            A list of movie objects.
+            A list of (list entry, movie name, movie poster) tuples.
+        """
+        pass
+
+    @abstractmethod
+    def query_user_movies(self, user_id, watch_status=None, sort='added', direction='asc',
+                          limit=None, cursor=None, columns=None):
+        """
+        Retrieves a user's movies, filtered, sorted and paged.
+
+        Args:
+            user_id (int): The ID of the user.
+            watch_status (str, optional): The watchlist status to filter by, every status if None.
+            sort (str): One of 'added', 'title', 'year', 'rating' and 'user_rating'.
+            direction (str): 'asc' or 'desc'.
+            limit (int, optional): The page size; the whole list is returned if None.
+            cursor (str, optional): The cursor returned with the previous page.
+            columns (list, optional): Names from USER_MOVIE_COLUMNS to select as rows.
+
+        Returns:
+            A tuple of the page's (list entry, movie name, movie poster) tuples, or rows
+            with the requested columns, and the cursor for the next page.
+
+        Raises:
+            ValueError: If the sort key, direction, cursor or a column is invalid.
+        """
+        pass
+
+    @abstractmethod
+    def get_pending_movie_ids(self, user_id):
+        """
+        Retrieves the movies of a user that are still waiting for their details.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            A set of movie IDs.
+        """
+        pass
+
+    @abstractmethod
+    def get_movie_stats(self, movie_id):
+        """
+        Retrieves the summary of the users' lists a movie is on.
+
+        Args:
+            movie_id (int): The ID of the movie.
+
+        Returns:
+            ListStats: The movie's stats, all zeros if it is on no list.
+        """
+        pass
+
+    @abstractmethod
+    def get_user_stats(self, user_ids):
+        """
+        Retrieves the summaries of several users' lists.
+
+        Args:
+            user_ids (iterable): The IDs of the users.
+
+        Returns:
+            A dict of the ListStats of each user ID.
+        """
+        pass
+
+    @abstractmethod
+    def get_recommendations(self, user_id, limit=None):
+        """
+        Retrieves a user's movie recommendations, none of them on the user's list.
+
+        Args:
+            user_id (int): The ID of the user.
+            limit (int, optional): The maximum number of recommendations to return.
+
+        Returns:
+            A list of (movie_id, movie_name, movie_poster, score) rows, best first.
         """
         pass
 
@@ -57,10 +286,27 @@ class DataManagerInterface(ABC):
         Adds a new movie to the data source, associated with a specific user.
 
         Args:
-            movie: A movie object.
+            movie (dict): The movie columns; only 'movie_name' for a movie already in the catalog.
             user_id (int): The ID of the user.
-            watchlist_status (bool): Whether the movie is on the user's watchlist.
+            watchlist_status (str): The watchlist status for the movie.
             user_rating (int): The user's rating for the movie.
+
+        Returns:
+            bool: True if the movie was added, False if it was already on the user's list.
+        """
+        pass
+
+    @abstractmethod
+    def add_movies(self, user_id, items):
+        """
+        Adds movies to a user's list at once.
+
+        Args:
+            user_id (int): The ID of the user.
+            items (iterable): (movie, watchlist_status, user_rating) tuples, with movie as in add_movie.
+
+        Returns:
+            list: The IDs of the movies that were added to the user's list.
         """
         pass
 
@@ -73,16 +319,263 @@ class DataManagerInterface(ABC):
             user_id (int): The ID of the user.
             movie_id (int): The ID of the movie.
             rating (int): The new rating for the movie.
-            status (bool): The new watchlist status for the movie.
+            status (str): The new watchlist status for the movie.
+
+        Returns:
+            bool: True if the movie was updated, False if it is not on the user's list.
+
+        Raises:
+            ValueError: If the rating or the status is invalid (see check_list_update).
+        """
+        pass
+
+    @abstractmethod
+    def delete_movie(self, user_id, movie_id):
+        """
+        Deletes a movie from a user's list.
+
+        Args:
+            user_id (int): The ID of the user.
+            movie_id (int): The ID of the movie.
+
+        Returns:
+            bool: True if the movie was deleted, False if it was not on the user's list.
+        """
+        pass
+
+    @abstractmethod
+    def update_movies_metadata(self, updates):
+        """
+        Updates the OMDb-provided columns of many movies at once.
+
+        Args:
+            updates (list): Dictionaries holding the movie 'id' and the columns to set.
+        """
+        pass
+
+    @abstractmethod
+    def add_pending_movie(self, movie_name, user_id, watchlist_status, user_rating):
+        """
+        Adds a placeholder movie to a user's list and queues the lookup of its details.
+
+        If the title is already in the catalog, e.g. added by a concurrent
+        request, the user's entry goes to that movie, with a job only while
+        its details are still pending.
+
+        Args:
+            movie_name (str): The title typed by the user.
+            user_id (int): The ID of the user.
+            watchlist_status (str): The watchlist status for the movie.
+            user_rating (int, optional): The user's rating for the movie.
+        """
+        pass
+
+    @abstractmethod
+    def claim_movie_jobs(self, limit, lease):
+        """
+        Claims queued movie jobs for a worker, never handing a job to two workers.
+
+        Args:
+            limit (int): The maximum number of jobs to claim.
+            lease (float): Seconds after which an unfinished claim expires.
+
+        Returns:
+            list: Rows with the job id, user_id, movie_id, movie_name and attempts.
+        """
+        pass
+
+    @abstractmethod
+    def complete_movie_job(self, job_id, movie_id, metadata):
+        """
+        Stores the fetched details of a pending movie and marks its job as done.
+
+        Args:
+            job_id (int): The ID of the job.
+            movie_id (int): The ID of the placeholder movie.
+            metadata (dict): The movie columns to set. A 'movie_name' renames the placeholder, or merges it
+                into the catalog movie that already has that title.
+
+        Returns:
+            int: The ID of the movie holding the details.
+        """
+        pass
+
+    @abstractmethod
+    def retry_movie_job(self, job_id, error, give_up=False):
+        """
+        Records a failed attempt of a movie job.
+
+        Args:
+            job_id (int): The ID of the job.
+            error (str): The error of the attempt.
+            give_up (bool): Mark the job as failed and remove its placeholder movie, as
+                drop_pending_movie does, instead of queueing it again.
+        """
+        pass
+
+    @abstractmethod
+    def drop_pending_movie(self, movie_id, error):
+        """
+        Removes a placeholder movie whose details cannot be fetched from the catalog and every user's list.
+
+        Args:
+            movie_id (int): The ID of the placeholder movie.
+            error (str): The reason, kept on the failed jobs.
+        """
+        pass
+
+    def get_cached_user_movies(self, user_id, watch_status=None, limit=None):
+        """
+        Retrieves the first page of a user's movie list through the list cache.
+
+        Args:
+            user_id (int): The ID of the user.
+            watch_status (str, optional): The watchlist status to filter by, every status if None.
+            limit (int, optional): The page size; the whole list is returned if None.
+
+        Returns:
+            CachedUserMovies: The (UserMovieRow, movie name, movie poster) tuples, the cursor
+            of the next page, the IDs of the movies still pending, and the ETag of the list.
+        """
+        # Read first, so a change made while the list is read leaves the entry out of date
+        version = self._list_version(user_id)
+        cached = self.list_cache.get(user_id, watch_status)
+        if cached is None or cached.version != version:
+            # A replica may lag behind the write that invalidated the entry
+            with primary_reads():
+                user_movies, next_cursor = self.query_user_movies(user_id, watch_status, limit=limit)
+                pending_movie_ids = self.get_pending_movie_ids(user_id)
+            cached = self.list_cache.set(user_id, watch_status, user_movies, next_cursor, pending_movie_ids, version)
+        return cached
+
+    def _list_version(self, user_id):
+        """
+        Returns the version of a user's list shared by every process, None if the backend has none.
+
+        Backends whose data other processes can change override this, so a
+        cached list is not served after another worker changed it.
+        """
+        return None
+
+    def _invalidate_lists(self, owners):
+        """Drops the cached lists of (user_id, watch_status) pairs, once the change is committed."""
+        for user_id, watch_status in owners:
+            self.list_cache.invalidate(user_id, watch_status)
+
+    def _invalidate_pages(self, movie_ids=None):
+        """
+        Drops the cached pages a committed change affected, if there is a page cache.
+
+        Args:
+            movie_ids (list, optional): The movies whose lists changed; None if the catalog
+                changed, which affects every page.
+        """
+        if self.page_cache is None:
+            return
+        if movie_ids is None:
+            self.page_cache.invalidate_all()
+        elif movie_ids:
+            self.page_cache.invalidate(*(MOVIE_PAGE_KEY.format(movie_id=movie_id) for movie_id in movie_ids))
+
+class AsyncDataManagerInterface(ABC):
+    """
+    Asynchronous variant of DataManagerInterface, for async views.
+
+    The methods are coroutines with the same arguments and results as their
+    synchronous counterparts, so a view can await several of them, and
+    upstream I/O, concurrently.
+    """
+
+    @abstractmethod
+    async def get_all_users(self):
+        """
+        Retrieves all users from the data source.
+
+        Returns:
+            A list of user objects.
+        """
+        pass
+
+    @abstractmethod
+    async def get_all_movies(self):
+        """
+        Retrieves all movies from the data source.
+
+        Returns:
+            A list of movie objects.
+        """
+        pass
+
+    @abstractmethod
+    async def get_movies_page(self, after_id=None, limit=50):
+        """
+        Retrieves one page of movies, ordered by ID.
+
+        Args:
+            after_id (int, optional): The ID of the last movie on the previous page.
+            limit (int): The maximum number of movies to return.
+
+        Returns:
+            A tuple of the page's movies and the cursor for the next page.
+        """
+        pass
+
+    @abstractmethod
+    async def get_user_movies(self, user_id):
+        """
+        Retrieves all movies associated with a specific user.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            A list of movie objects.
+        """
+        pass
+
+    @abstractmethod
+    async def add_user(self, user):
+        """
+        Adds a new user to the data source.
+
+        Args:
+            user: A user object.
+        """
+        pass
+
+    @abstractmethod
+    async def add_movie(self, movie, user_id, watchlist_status, user_rating):
+        """
+        Adds a new movie to the data source, associated with a specific user.
+
+        Args:
+            movie: A movie object.
+            user_id (int): The ID of the user.
+            watchlist_status (str): The watchlist status for the movie.
+            user_rating (int): The user's rating for the movie.
+        """
+        pass
+
+    @abstractmethod
+    async def update_movie(self, user_id, movie_id, rating, status):
+        """
+        Updates the rating and watchlist status of a movie for a specific user.
+
+        Args:
+            user_id (int): The ID of the user.
+            movie_id (int): The ID of the movie.
+            rating (int): The new rating for the movie.
+            status (str): The new watchlist status for the movie.
         """
         pass
 
     @abstractmethod
-    def delete_movie(self, movie_id):
+    async def delete_movie(self, user_id, movie_id):
         """
-        Deletes a movie from the data source.
+        Deletes a movie from a user's list.
 
         Args:
+            user_id (int): The ID of the user.
             movie_id (int): The ID of the movie.
         """
-        pass
\ No newline at end of file
+        pass
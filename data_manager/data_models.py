@@ -1,7 +1,18 @@
 from flask_sqlalchemy import SQLAlchemy
+from utils.titles import normalize_title
 
 db = SQLAlchemy()
 
+# Column values for movies whose OMDb details are not known yet.
+# They are filled in later by the enrichment worker or the movie job worker.
+PLACEHOLDER_MOVIE = {
+    'movie_poster': 'N/A',
+    'movie_director': 'N/A',
+    'release_year': 0,
+    'movie_rating': 0.0,
+    'movie_plot': 'N/A'
+}
+
 class User(db.Model):
     """
     Represents a user in the system.
@@ -15,6 +26,11 @@ class User(db.Model):
     user_name = db.Column(db.String(100), nullable = False)
 
 
+def movie_key_default(context):
+    """Derives the normalized title key of a movie from the movie_name being inserted."""
+    return normalize_title(context.get_current_parameters()['movie_name'])
+
+
 class Movie(db.Model):
     """
     Represents a movie in the system.
@@ -23,19 +39,24 @@ class Movie(db.Model):
         id (int): The unique identifier for the movie (primary key).
         movie_poster (str): URL or path to the movie poster (not nullable).
         movie_name (str): The title of the movie (not nullable, unique).
+        movie_key (str): The normalized title used for lookups (not nullable, unique).
         movie_director (str): The director of the movie (not nullable).
         release_year (int): The year the movie was released (not nullable).
         movie_rating (float): The average rating of the movie (not nullable).
         movie_plot (str): A description of the movie plot (not nullable).
+        enriched_at (float): When OMDb was last asked for the details, None if never
+            (a placeholder); 'N/A' columns are then OMDb's own answer.
     """
     __tablename__ = 'movies'
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     movie_poster = db.Column(db.Text, nullable = False)
     movie_name = db.Column(db.String(250), nullable = False, unique=True)
+    movie_key = db.Column(db.String(250), nullable = False, unique=True, index=True, default=movie_key_default)
     movie_director = db.Column(db.String(100), nullable = False)
-    release_year = db.Column(db.Integer, nullable = False)
-    movie_rating = db.Column(db.Float, nullable = False)
+    release_year = db.Column(db.Integer, nullable = False, index=True)
+    movie_rating = db.Column(db.Float, nullable = False, index=True)
     movie_plot = db.Column(db.Text, nullable = False)
+    enriched_at = db.Column(db.Float, nullable = True)
 
 
 class UserMovie(db.Model):
@@ -51,6 +72,11 @@ class UserMovie(db.Model):
         movie (Movie): Relationship with the Movie model.
     """
     __tablename__ = 'users_movies'
+    __table_args__ = (
+        db.Index('ix_users_movies_user_status', 'user_id', 'watchlist_status'),
+        db.Index('ix_users_movies_movie_id', 'movie_id'),
+        db.Index('ix_users_movies_user_rating', 'user_id', 'user_rating'),
+    )
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
     movie_id = db.Column(db.Integer, db.ForeignKey('movies.id'), primary_key=True)
     watchlist_status = db.Column(db.String(10), nullable = True)  # Example: 'watched', 'watching', 'wishlist'
@@ -68,4 +94,171 @@ class UserMovie(db.Model):
         status_string = f" (watchlist status: {self.watchlist_status})" if self.watchlist_status else ""
         rating_string = f" (rating: {self.user_rating})" if self.user_rating else ""
 
-        return f"UserMovie(user_id={self.user_id}, movie_id={self.movie_id}{status_string}{rating_string})"
\ No newline at end of file
+        return f"UserMovie(user_id={self.user_id}, movie_id={self.movie_id}{status_string}{rating_string})"
+
+
+class OMDbCacheEntry(db.Model):
+    """
+    Represents a cached OMDb lookup result.
+
+    Attributes:
+        title_key (str): The normalized movie title the lookup was made for (primary key).
+        payload (str, optional): The JSON body returned by OMDb, or None for a cached "not found".
+        expires_at (float): Unix timestamp after which the entry is stale.
+    """
+    __tablename__ = 'omdb_cache'
+    title_key = db.Column(db.String(250), primary_key=True)
+    payload = db.Column(db.Text, nullable = True)
+    expires_at = db.Column(db.Float, nullable = False, index=True)
+
+
+class MovieJob(db.Model):
+    """
+    Represents a queued request to fetch OMDb details for a pending movie.
+
+    Attributes:
+        id (int): The unique identifier for the job (primary key).
+        user_id (int): The user who added the movie.
+        movie_id (int): The placeholder movie waiting for its details.
+        status (str): 'pending', 'running', 'done' or 'failed'.
+        attempts (int): How many times a worker has claimed the job.
+        last_error (str, optional): The error of the last failed attempt.
+        created_at (float): Unix timestamp of the enqueue.
+        claimed_at (float, optional): Unix timestamp of the last claim, used to recover crashed workers.
+    """
+    __tablename__ = 'movie_jobs'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable = False)
+    movie_id = db.Column(db.Integer, db.ForeignKey('movies.id'), nullable = False)
+    status = db.Column(db.String(10), nullable = False, default='pending', index=True)
+    attempts = db.Column(db.Integer, nullable = False, default=0)
+    last_error = db.Column(db.Text, nullable = True)
+    created_at = db.Column(db.Float, nullable = False)
+    claimed_at = db.Column(db.Float, nullable = True)
+
+
+class MovieStats(db.Model):
+    """
+    Summary of the users' lists a movie is on, maintained by triggers on users_movies.
+
+    Attributes:
+        movie_id (int): The movie (primary key).
+        list_count (int): The number of lists the movie is on.
+        rating_count (int): The number of users who rated the movie.
+        rating_sum (int): The sum of the users' ratings of the movie.
+        watched_count (int): The number of lists with the 'watched' status.
+        watching_count (int): The number of lists with the 'watching' status.
+        wishlist_count (int): The number of lists with the 'wishlist' status.
+    """
+    __tablename__ = 'movie_stats'
+    movie_id = db.Column(db.Integer, db.ForeignKey('movies.id'), primary_key=True)
+    list_count = db.Column(db.Integer, nullable = False, default=0)
+    rating_count = db.Column(db.Integer, nullable = False, default=0)
+    rating_sum = db.Column(db.Integer, nullable = False, default=0)
+    watched_count = db.Column(db.Integer, nullable = False, default=0)
+    watching_count = db.Column(db.Integer, nullable = False, default=0)
+    wishlist_count = db.Column(db.Integer, nullable = False, default=0)
+
+
+class UserStats(db.Model):
+    """
+    Summary of a user's list, maintained by triggers on users_movies.
+
+    Attributes:
+        user_id (int): The user (primary key).
+        list_count (int): The number of movies on the list.
+        rating_count (int): The number of movies the user rated.
+        rating_sum (int): The sum of the user's ratings.
+        watched_count (int): The number of movies with the 'watched' status.
+        watching_count (int): The number of movies with the 'watching' status.
+        wishlist_count (int): The number of movies with the 'wishlist' status.
+    """
+    __tablename__ = 'user_stats'
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    list_count = db.Column(db.Integer, nullable = False, default=0)
+    rating_count = db.Column(db.Integer, nullable = False, default=0)
+    rating_sum = db.Column(db.Integer, nullable = False, default=0)
+    watched_count = db.Column(db.Integer, nullable = False, default=0)
+    watching_count = db.Column(db.Integer, nullable = False, default=0)
+    wishlist_count = db.Column(db.Integer, nullable = False, default=0)
+
+
+class MovieNeighbor(db.Model):
+    """
+    Represents one of a movie's most similar movies, computed from the users' lists.
+
+    Attributes:
+        movie_id (int): The movie (primary key).
+        neighbor_id (int): A similar movie (primary key).
+        similarity (float): The cosine similarity of the two movies' columns in the user x movie matrix.
+    """
+    __tablename__ = 'movie_neighbors'
+    __table_args__ = {'sqlite_with_rowid': False}
+    movie_id = db.Column(db.Integer, db.ForeignKey('movies.id'), primary_key=True)
+    neighbor_id = db.Column(db.Integer, db.ForeignKey('movies.id'), primary_key=True)
+    similarity = db.Column(db.Float, nullable = False)
+
+
+class UserRecommendation(db.Model):
+    """
+    Represents a precomputed movie recommendation for a user.
+
+    Attributes:
+        user_id (int): The user (primary key).
+        rank (int): The position in the user's recommendations, from 1 (primary key).
+        movie_id (int): The recommended movie.
+        score (float): The recommendation score, higher is better.
+    """
+    __tablename__ = 'user_recommendations'
+    __table_args__ = {'sqlite_with_rowid': False}
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    rank = db.Column(db.Integer, primary_key=True)
+    movie_id = db.Column(db.Integer, db.ForeignKey('movies.id'), nullable = False)
+    score = db.Column(db.Float, nullable = False)
+
+
+class StaleRecommendations(db.Model):
+    """
+    Marks a user whose list changed since their recommendations were computed.
+
+    Attributes:
+        user_id (int): The user (primary key).
+        version (int): Incremented on every change, so a refresh only clears the mark it saw.
+    """
+    __tablename__ = 'recommendations_stale'
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    version = db.Column(db.Integer, nullable = False, default=1)
+
+
+class UserListVersion(db.Model):
+    """
+    Version of a user's movie list, shared by every worker's list cache.
+
+    Attributes:
+        user_id (int): The user (primary key).
+        version (int): Incremented by triggers whenever the list, a movie on it or its pending jobs change.
+    """
+    __tablename__ = 'user_list_versions'
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    version = db.Column(db.Integer, nullable = False, default=1)
+
+
+class PosterFile(db.Model):
+    """
+    Represents a poster downloaded into the local poster cache.
+
+    Attributes:
+        url_hash (str): The SHA-1 of the remote poster URL (primary key).
+        source_url (str): The remote poster URL.
+        content_hash (str, optional): The SHA-256 of the image, naming its files; None if the download failed.
+        content_type (str, optional): The MIME type of the original image.
+        has_thumbnail (bool): Whether a thumbnail was generated.
+        fetched_at (float): Unix timestamp of the last download attempt.
+    """
+    __tablename__ = 'poster_files'
+    url_hash = db.Column(db.String(40), primary_key=True)
+    source_url = db.Column(db.String(500), nullable = False)
+    content_hash = db.Column(db.String(64), nullable = True)
+    content_type = db.Column(db.String(50), nullable = True)
+    has_thumbnail = db.Column(db.Boolean, nullable = False, default=False)
+    fetched_at = db.Column(db.Float, nullable = False)
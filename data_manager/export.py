@@ -0,0 +1,278 @@
+"""
+Streaming exports of the users, catalog and watchlist tables.
+
+A table is read with a server-side cursor (``yield_per``), one chunk of
+rows at a time, and each chunk is encoded and handed on before the next
+one is fetched, so memory use depends on the chunk size and not on the
+size of the table. The encoders are generators of bytes, shared by the
+``/api/v1/export`` endpoint, which streams them as the response body,
+and the ``flask export`` command, which writes them to files. Either one
+can gzip the bytes on the fly.
+
+CSV and NDJSON are always available. Parquet needs pyarrow; each chunk
+becomes a row group.
+"""
+
+import csv
+import io
+import json
+import os
+import time
+import zlib
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import select
+from config.config_files import ExportConfig
+from data_manager.data_models import Movie, User, UserMovie
+
+# The exported tables and their columns; movie_key is derived from movie_name
+EXPORT_TABLES = {
+    'users': [column for column in User.__table__.columns],
+    'movies': [column for column in Movie.__table__.columns if column.name != 'movie_key'],
+    'users_movies': [column for column in UserMovie.__table__.columns],
+}
+
+FORMATS = {
+    'csv': ('csv', 'text/csv; charset=utf-8'),
+    'ndjson': ('ndjson', 'application/x-ndjson'),
+    'parquet': ('parquet', 'application/vnd.apache.parquet'),
+}
+
+
+def _pyarrow():
+    """
+    Imports pyarrow on first use.
+
+    Raises:
+        ValueError: If pyarrow is not installed.
+    """
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ValueError('Parquet exports need pyarrow: pip install pyarrow.')
+    return pyarrow
+
+
+def export_engine(data_manager):
+    """
+    Returns the engine exports read from: the read-only pool when reads are routed.
+
+    Args:
+        data_manager (DataManagerInterface): The app's data manager.
+
+    Returns:
+        Engine: The engine of the data manager's database.
+
+    Raises:
+        ValueError: If the data manager is not backed by a SQL database.
+    """
+    router = getattr(data_manager, 'read_router', None)
+    if router is not None:
+        return router.engine
+    if getattr(data_manager, 'engine', None) is not None:
+        return data_manager.engine
+    if getattr(data_manager, 'db', None) is not None:
+        return data_manager.db.engine
+    raise ValueError('Exports need a SQL storage backend.')
+
+
+def export_chunks(engine, table, chunk_size=None):
+    """
+    Reads a table in primary key order, one chunk of rows at a time.
+
+    The connection is opened when the first chunk is requested and closed
+    when the generator is exhausted or closed.
+
+    Args:
+        engine (Engine): The database to read.
+        table (str): One of EXPORT_TABLES.
+        chunk_size (int, optional): Rows fetched per chunk; ExportConfig.chunk_size by default.
+
+    Yields:
+        list: Tuples holding the values of the table's columns.
+
+    Raises:
+        ValueError: If the table cannot be exported.
+    """
+    if table not in EXPORT_TABLES:
+        raise ValueError(f"Invalid table: must be one of {', '.join(EXPORT_TABLES)}.")
+    columns = EXPORT_TABLES[table]
+    statement = select(*columns).order_by(*columns[0].table.primary_key.columns)
+    with engine.connect() as conn:
+        result = conn.execution_options(yield_per=chunk_size or ExportConfig.chunk_size).execute(statement)
+        for partition in result.partitions():
+            yield [tuple(row) for row in partition]
+
+
+def encode_csv(names, chunks):
+    """Encodes chunks of rows as CSV with a header line, one piece of bytes per chunk."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(names)
+    for rows in chunks:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():  # only the header, for an empty table
+        yield buffer.getvalue().encode()
+
+
+def encode_ndjson(names, chunks):
+    """Encodes chunks of rows as newline-delimited JSON objects, one piece of bytes per chunk."""
+    for rows in chunks:
+        yield ''.join(json.dumps(dict(zip(names, row)), ensure_ascii=False, separators=(',', ':')) + '\n'
+                      for row in rows).encode()
+
+
+class _Drain:
+    """Write-only file object collecting what a writer produced since it was last drained."""
+    def __init__(self):
+        self._buffer = io.BytesIO()
+        self._position = 0
+        self.closed = False
+
+    def write(self, data):
+        self._position += len(data)
+        return self._buffer.write(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return data
+
+
+def encode_parquet(columns, chunks):
+    """
+    Encodes chunks of rows as a Parquet file, one row group (and piece of bytes) per chunk.
+
+    Raises:
+        ValueError: If pyarrow is not installed.
+    """
+    pa = _pyarrow()
+    types = {int: pa.int64(), float: pa.float64(), str: pa.string(), bool: pa.bool_()}
+    schema = pa.schema([pa.field(column.name, types.get(column.type.python_type, pa.string()),
+                                 nullable=column.nullable or column.primary_key) for column in columns])
+    sink = _Drain()
+    writer = pa.parquet.ParquetWriter(sink, schema, compression='zstd')
+    try:
+        for rows in chunks:
+            writer.write_table(pa.Table.from_pylist([dict(zip(schema.names, row)) for row in rows], schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()  # the footer
+
+
+def encode(file_format, table, chunks):
+    """
+    Encodes chunks of a table's rows in an export format.
+
+    Args:
+        file_format (str): One of FORMATS.
+        table (str): One of EXPORT_TABLES.
+        chunks (iterable): Chunks of rows, as yielded by export_chunks.
+
+    Returns:
+        generator: The encoded bytes.
+
+    Raises:
+        ValueError: If the format is unknown, or is Parquet and pyarrow is not installed.
+    """
+    if file_format not in FORMATS:
+        raise ValueError(f"Invalid format: must be one of {', '.join(FORMATS)}.")
+    columns = EXPORT_TABLES[table]
+    if file_format == 'parquet':
+        _pyarrow()  # fail before the response starts
+        return encode_parquet(columns, chunks)
+    names = [column.name for column in columns]
+    return encode_csv(names, chunks) if file_format == 'csv' else encode_ndjson(names, chunks)
+
+
+def gzip_stream(pieces, level=None):
+    """
+    Compresses a stream of bytes into a gzip stream, as it goes.
+
+    Args:
+        pieces (iterable): The bytes to compress.
+        level (int, optional): The compression level; ExportConfig.gzip_level by default.
+
+    Yields:
+        bytes: The compressed bytes, skipping the empty pieces.
+    """
+    compressor = zlib.compressobj(ExportConfig.gzip_level if level is None else level, zlib.DEFLATED, 31)
+    for piece in pieces:
+        compressed = compressor.compress(piece)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_table(engine, table, file_format, compress=False, chunk_size=None):
+    """
+    Streams a table as encoded, and optionally gzip-compressed, bytes.
+
+    Args:
+        engine (Engine): The database to read.
+        table (str): One of EXPORT_TABLES.
+        file_format (str): One of FORMATS.
+        compress (bool): Compress the bytes with gzip.
+        chunk_size (int, optional): Rows fetched per chunk.
+
+    Returns:
+        generator: The bytes of the export.
+
+    Raises:
+        ValueError: If the table or format is invalid.
+    """
+    if table not in EXPORT_TABLES:
+        raise ValueError(f"Invalid table: must be one of {', '.join(EXPORT_TABLES)}.")
+    pieces = encode(file_format, table, export_chunks(engine, table, chunk_size))
+    return gzip_stream(pieces) if compress else pieces
+
+
+def export_filename(table, file_format, compress=False):
+    """Returns the file name of an export, e.g. users_movies.csv.gz."""
+    return f"{table}.{FORMATS[file_format][0]}{'.gz' if compress else ''}"
+
+
+@click.command('export')
+@click.argument('tables', nargs=-1, type=click.Choice(list(EXPORT_TABLES)))
+@click.option('--format', 'file_format', type=click.Choice(list(FORMATS)), default='csv', show_default=True)
+@click.option('--directory', type=click.Path(file_okay=False), default='.', show_default=True,
+              help='Where the files are written.')
+@click.option('--gzip', 'compress', is_flag=True, help='Compress the files with gzip.')
+@click.option('--chunk-size', type=int, help='Rows fetched per chunk.')
+@with_appcontext
+def export_command(tables, file_format, directory, compress, chunk_size):
+    """Exports tables (every table by default) to files, streaming them in chunks."""
+    engine = export_engine(current_app.extensions['data_manager'])
+    os.makedirs(directory, exist_ok=True)
+    for table in tables or EXPORT_TABLES:
+        path = os.path.join(directory, export_filename(table, file_format, compress))
+        tmp_path = f'{path}.tmp'
+        started = time.perf_counter()
+        size = 0
+        try:
+            with open(tmp_path, 'wb') as handle:
+                for piece in export_table(engine, table, file_format, compress, chunk_size):
+                    handle.write(piece)
+                    size += len(piece)
+            os.replace(tmp_path, path)  # a nightly job never picks up half a file
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        click.echo(f'{path}: {size} bytes in {time.perf_counter() - started:.1f}s')
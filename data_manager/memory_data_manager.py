@@ -0,0 +1,562 @@
+"""
+In-memory implementation of DataManagerInterface.
+
+Movies, users and lists live in dictionaries with the indexes the views
+need: movie IDs kept sorted for keyset paging, normalized titles, each
+user's list in insertion order, the users who listed each movie, an
+inverted word index for search and list stats updated on every write, so
+every read is a few dictionary lookups. It suits tests, which need no
+database, and read-heavy edge nodes, which load a snapshot of the
+database when they start (StorageConfig.snapshot_url) and serve it from
+memory.
+
+Nothing is persisted, and every process holds its own copy: writes are
+not seen by other workers. A re-entrant lock serializes access, so one
+instance can be shared by the threads of a worker.
+"""
+
+import bisect
+import functools
+import math
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter, defaultdict, namedtuple
+from itertools import islice
+from sqlalchemy import create_engine, literal_column, select
+from config.config_files import RecommendationConfig, UserListCacheConfig
+from data_manager.data_manager_interface import WATCHLIST_STATUSES, DataManagerInterface, check_list_update
+from data_manager.data_models import Movie, MovieJob, User, UserMovie, PLACEHOLDER_MOVIE
+from data_manager.recommendations import list_weight
+from data_manager.sqlite_data_manager import (MOVIE_COLUMNS, NEW_MOVIE_KEYS, SORT_KEYS, USER_MOVIE_COLUMNS,
+                                              decode_cursor, encode_cursor)
+from data_manager.stats import EMPTY_STATS, STATS_COLUMNS, ListStats
+from data_manager.user_list_cache import UserMovieListCache, UserMovieRow
+from utils.cache import LRUCache
+from utils.titles import normalize_title
+
+MovieRow = namedtuple('MovieRow', [column.name for column in Movie.__table__.columns])
+UserRow = namedtuple('UserRow', ['id', 'user_name'])
+SearchRow = namedtuple('SearchRow', ['id', 'movie_name', 'movie_poster', 'movie_director', 'release_year', 'rank'])
+RecommendationRow = namedtuple('RecommendationRow', ['movie_id', 'movie_name', 'movie_poster', 'score'])
+JobRow = namedtuple('JobRow', ['id', 'user_id', 'movie_id', 'movie_name', 'attempts'])
+
+# Weights of title, director and plot matches in search ranks, as in the bm25() call of the FTS5 search
+SEARCH_FIELDS = (('movie_name', 10.0), ('movie_director', 3.0), ('movie_plot', 1.0))
+
+# The value a list entry is sorted by, for each sort key of query_user_movies
+SORT_VALUES = {
+    'added': lambda entry, movie, added: added,
+    'title': lambda entry, movie, added: movie.movie_key,
+    'year': lambda entry, movie, added: movie.release_year,
+    'rating': lambda entry, movie, added: movie.movie_rating,
+    'user_rating': lambda entry, movie, added: entry.user_rating or 0,
+}
+
+
+@functools.lru_cache(maxsize=None)
+def row_type(columns):
+    """Returns the named tuple type of rows holding the given columns (a tuple of names)."""
+    return namedtuple('Row', columns)
+
+
+def check_columns(available, names):
+    """
+    Checks that columns can be selected, like columns_for.
+
+    Raises:
+        ValueError: If a name is not selectable.
+    """
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}.")
+
+
+def words(text):
+    """Splits text into the lowercase, accent-free words the search index holds, like FTS5's unicode61."""
+    text = unicodedata.normalize('NFKD', text or '')
+    return re.findall(r'\w+', ''.join(char for char in text if not unicodedata.combining(char)).casefold())
+
+
+class InMemoryDataManager(DataManagerInterface):
+    """
+    In-memory data manager, for tests and read-heavy edge nodes.
+
+    It behaves like SQLiteDataManager, except for the search ranks, which
+    weigh matching words instead of BM25, and the recommendations, which
+    are computed on each call from list co-occurrences instead of being
+    precomputed.
+    """
+    def __init__(self, list_cache=None, page_cache=None):
+        """
+        Initializes an empty data manager.
+
+        Args:
+            list_cache (UserMovieListCache, optional): The cache of users' movie lists,
+                an in-process LRU by default.
+            page_cache (PageCache, optional): The cache of rendered pages to invalidate.
+        """
+        self.list_cache = list_cache or UserMovieListCache(
+            LRUCache(UserListCacheConfig.max_entries, UserListCacheConfig.ttl))
+        self.page_cache = page_cache
+        self._lock = threading.RLock()
+        self._movies = {}  # id -> MovieRow
+        self._movie_ids = []  # sorted, for keyset paging
+        self._movie_keys = {}  # normalized title -> id
+        self._users = {}  # id -> UserRow
+        self._lists = defaultdict(dict)  # user_id -> {movie_id: UserMovieRow}, in insertion order
+        self._added = {}  # (user_id, movie_id) -> insertion sequence, the 'added' sort value
+        self._fans = defaultdict(set)  # movie_id -> IDs of the users listing it
+        self._movie_stats = {}  # movie_id -> [counts in STATS_COLUMNS order]
+        self._user_stats = {}  # user_id -> [counts in STATS_COLUMNS order]
+        self._index = defaultdict(set)  # word -> IDs of the movies containing it
+        self._vocabulary = None  # the indexed words, sorted for prefix lookups; rebuilt after new words
+        self._movie_words = {}  # movie_id -> word sets of SEARCH_FIELDS
+        self._jobs = {}  # id -> dict of the movie_jobs columns
+        self._sequence = 0
+
+    def load(self, engine):
+        """
+        Loads the catalog, users, lists and unfinished movie jobs from a database.
+
+        Args:
+            engine (Engine): The engine of the database to copy.
+
+        Returns:
+            dict: The number of movies, users and list entries loaded.
+        """
+        movies, users, lists, jobs = Movie.__table__, User.__table__, UserMovie.__table__, MovieJob.__table__
+        added_order = literal_column('rowid') if engine.dialect.name == 'sqlite' else lists.c.movie_id
+        with engine.connect() as conn, self._lock:
+            for row in conn.execute(select(movies).order_by(movies.c.id)):
+                self._insert_movie(row._asdict())
+            for row in conn.execute(select(users).order_by(users.c.id)):
+                self._users[row.id] = UserRow(row.id, row.user_name)
+            for row in conn.execute(select(lists).order_by(added_order)):
+                self._insert_entry(UserMovieRow(row.user_id, row.movie_id, row.watchlist_status, row.user_rating))
+            for row in conn.execute(select(jobs).where(jobs.c.status.in_(('pending', 'running')))):
+                self._jobs[row.id] = row._asdict()
+        return {'movies': len(self._movies), 'users': len(self._users), 'list_entries': len(self._added)}
+
+    @classmethod
+    def from_database(cls, url, list_cache=None, page_cache=None):
+        """
+        Creates a data manager holding a copy of a database.
+
+        Args:
+            url (str): The SQLAlchemy URL of the database.
+            list_cache (UserMovieListCache, optional): The cache of users' movie lists.
+            page_cache (PageCache, optional): The cache of rendered pages to invalidate.
+
+        Returns:
+            InMemoryDataManager: The loaded data manager.
+        """
+        manager = cls(list_cache, page_cache)
+        engine = create_engine(url)
+        try:
+            manager.load(engine)
+        finally:
+            engine.dispose()
+        return manager
+
+    def get_all_users(self):
+        with self._lock:
+            return list(self._users.values())
+
+    def get_user_by_id(self, user_id):
+        return self._users.get(user_id)
+
+    def get_users_page(self, after_id=None, limit=50):
+        with self._lock:
+            user_ids = sorted(self._users)
+            start = bisect.bisect_right(user_ids, after_id) if after_id is not None else 0
+            rows = [self._users[user_id] for user_id in user_ids[start:start + limit + 1]]
+        next_cursor = rows[limit - 1].id if len(rows) > limit else None
+        return rows[:limit], next_cursor
+
+    def get_all_movies(self):
+        with self._lock:
+            return [self._movies[movie_id] for movie_id in self._movie_ids]
+
+    def get_movies_page(self, after_id=None, limit=50, columns=None):
+        columns = columns or ['id', 'movie_name', 'movie_poster']
+        check_columns(MOVIE_COLUMNS, columns)
+        names = tuple(columns) if 'id' in columns else (*columns, 'id')  # id is needed for the cursor
+        Row = row_type(names)
+        with self._lock:
+            pending = {job['movie_id'] for job in self._jobs.values() if job['status'] in ('pending', 'running')}
+            start = bisect.bisect_right(self._movie_ids, after_id) if after_id is not None else 0
+            movie_ids = (movie_id for movie_id in islice(self._movie_ids, start, None) if movie_id not in pending)
+            movies = [self._movies[movie_id] for movie_id in islice(movie_ids, limit + 1)]
+        rows = [Row(*(getattr(movie, name) for name in names)) for movie in movies]
+        next_cursor = rows[limit - 1].id if len(rows) > limit else None
+        return rows[:limit], next_cursor
+
+    def search_movies(self, query, limit=20, cursor=None):
+        """
+        Searches the word index; every word of the query must start a word of the movie.
+
+        A movie's rank is minus the weighted number of query words found in its
+        title, director and plot, so results sort like the FTS5 search.
+        """
+        query_words = words(query)
+        if not query_words:
+            return [], None
+        last = None
+        if cursor:
+            last_rank, last_id = cursor.split(':')
+            last = (float(last_rank), int(last_id))
+        with self._lock:
+            if self._vocabulary is None:
+                self._vocabulary = sorted(self._index)
+            matched = None
+            expansions = []
+            for word in query_words:
+                start = bisect.bisect_left(self._vocabulary, word)
+                expansion = set()
+                for indexed in self._vocabulary[start:]:
+                    if not indexed.startswith(word):
+                        break
+                    expansion.add(indexed)
+                expansions.append(expansion)
+                movie_ids = set().union(*(self._index[indexed] for indexed in expansion))
+                matched = movie_ids if matched is None else matched & movie_ids
+                if not matched:
+                    return [], None
+            results = []
+            for movie_id in matched:
+                field_words = self._movie_words[movie_id]
+                score = sum(weight for (_, weight), found in zip(SEARCH_FIELDS, field_words)
+                            for expansion in expansions if expansion & found)
+                results.append((-score, movie_id))
+            results.sort()
+            if last is not None:
+                results = results[bisect.bisect_right(results, last):]
+            rows = [SearchRow(movie_id, movie.movie_name, movie.movie_poster, movie.movie_director,
+                              movie.release_year, rank)
+                    for rank, movie_id in results[:limit + 1] for movie in (self._movies[movie_id],)]
+        next_cursor = f'{rows[limit - 1].rank!r}:{rows[limit - 1].id}' if len(rows) > limit else None
+        return rows[:limit], next_cursor
+
+    def get_movie_by_id(self, movie_id):
+        return self._movies.get(movie_id)
+
+    def get_movie_by_name(self, movie_name):
+        with self._lock:
+            movie_id = self._movie_keys.get(normalize_title(movie_name))
+            return self._movies.get(movie_id)
+
+    def get_movie_by_movie_by_user(self, movie_id, user_id):
+        with self._lock:
+            return self._lists[user_id].get(movie_id) if user_id in self._lists else None
+
+    def get_movie_by_watch_status(self, user_id, watch_status):
+        return self.query_user_movies(user_id, watch_status)[0]
+
+    def get_user_movies(self, user_id):
+        return self.query_user_movies(user_id)[0]
+
+    def query_user_movies(self, user_id, watch_status=None, sort='added', direction='asc',
+                          limit=None, cursor=None, columns=None):
+        if sort not in SORT_KEYS:
+            raise ValueError(f"Invalid sort: must be one of {', '.join(SORT_KEYS)}.")
+        if direction not in ('asc', 'desc'):
+            raise ValueError("Invalid direction: must be 'asc' or 'desc'.")
+        if columns is not None:
+            check_columns(USER_MOVIE_COLUMNS, columns)
+        last = decode_cursor(cursor) if cursor else None
+
+        sort_value = SORT_VALUES[sort]
+        with self._lock:
+            entries = [(sort_value(entry, self._movies[entry.movie_id], self._added[user_id, entry.movie_id]),
+                        entry.movie_id, entry)
+                       for entry in self._lists.get(user_id, {}).values()
+                       if watch_status is None or entry.watchlist_status == watch_status]
+            movies = {movie_id: self._movies[movie_id] for _, movie_id, _ in entries}
+        entries.sort(key=lambda item: item[:2], reverse=direction == 'desc')
+        if last is not None:
+            if direction == 'asc':
+                entries = [item for item in entries if item[:2] > last]
+            else:
+                entries = [item for item in entries if item[:2] < last]
+
+        next_cursor = None
+        if limit is not None and len(entries) > limit:
+            entries = entries[:limit]
+            next_cursor = encode_cursor(*entries[-1][:2])
+        if columns is None:
+            return [(entry, movies[movie_id].movie_name, movies[movie_id].movie_poster)
+                    for _, movie_id, entry in entries], next_cursor
+        Row = row_type(tuple(columns))
+        rows = [Row(*(getattr(entry, name) if name in UserMovieRow._fields else getattr(movies[movie_id], name)
+                      for name in columns))
+                for _, movie_id, entry in entries]
+        return rows, next_cursor
+
+    def get_pending_movie_ids(self, user_id):
+        with self._lock:
+            return {job['movie_id'] for job in self._jobs.values()
+                    if job['user_id'] == user_id and job['status'] in ('pending', 'running')}
+
+    def get_movie_stats(self, movie_id):
+        with self._lock:
+            counts = self._movie_stats.get(movie_id)
+            return ListStats(*counts) if counts else EMPTY_STATS
+
+    def get_user_stats(self, user_ids):
+        with self._lock:
+            return {user_id: ListStats(*self._user_stats[user_id]) if user_id in self._user_stats else EMPTY_STATS
+                    for user_id in user_ids}
+
+    def get_recommendations(self, user_id, limit=None):
+        """
+        Scores the movies listed by users who share movies with this user.
+
+        A movie's score is the sum, over the user's movies, of the list weight
+        times the cosine similarity of the two movies' sets of users.
+        """
+        with self._lock:
+            listed = self._lists.get(user_id, {})
+            scores = defaultdict(float)
+            for movie_id, entry in listed.items():
+                weight = list_weight(entry.user_rating, entry.watchlist_status)
+                fans = self._fans[movie_id]
+                shared = Counter(other_id for fan in fans if fan != user_id for other_id in self._lists[fan])
+                for other_id, count in shared.items():
+                    if other_id not in listed:
+                        scores[other_id] += weight * count / math.sqrt(len(fans) * len(self._fans[other_id]))
+            best = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+            best = best[:min(limit, RecommendationConfig.top_n) if limit else RecommendationConfig.top_n]
+            return [RecommendationRow(movie_id, self._movies[movie_id].movie_name,
+                                      self._movies[movie_id].movie_poster, score)
+                    for movie_id, score in best]
+
+    def add_user(self, user):
+        with self._lock:
+            user_id = max(self._users, default=0) + 1
+            self._users[user_id] = UserRow(user_id, user['user_name'])
+
+    def add_movie(self, movie, user_id, watchlist_status, user_rating):
+        return bool(self.add_movies(user_id, [(movie, watchlist_status, user_rating)]))
+
+    def add_movies(self, user_id, items):
+        entries = {}
+        for movie, watchlist_status, user_rating in items:
+            entries.setdefault(normalize_title(movie['movie_name']), (movie, watchlist_status, user_rating))
+        added = []
+        catalog_changed = False
+        with self._lock:
+            for key, (movie, watchlist_status, user_rating) in entries.items():
+                movie_id = self._movie_keys.get(key)
+                if movie_id is None:
+                    if not movie.keys() >= NEW_MOVIE_KEYS:
+                        continue
+                    movie_id = self._insert_movie(movie)
+                    catalog_changed = True
+                if movie_id in self._lists[user_id]:
+                    continue
+                self._insert_entry(UserMovieRow(user_id, movie_id, watchlist_status, user_rating))
+                added.append((movie_id, watchlist_status))
+        for status in {watchlist_status for _, watchlist_status in added}:
+            self.list_cache.invalidate(user_id, status)
+        self._invalidate_pages(None if catalog_changed else [movie_id for movie_id, _ in added])
+        return [movie_id for movie_id, _ in added]
+
+    def update_movie(self, user_id, movie_id, rating, status):
+        check_list_update(rating, status)
+        with self._lock:
+            entry = self.get_movie_by_movie_by_user(movie_id, user_id)
+            if entry is None:
+                return False
+            added = self._added_sequence(entry)
+            self._remove_entry(entry)
+            self._insert_entry(entry._replace(watchlist_status=status, user_rating=rating), added=added)
+        self.list_cache.invalidate(user_id, entry.watchlist_status, status)
+        self._invalidate_pages([movie_id])
+        return True
+
+    def delete_movie(self, user_id, movie_id):
+        with self._lock:
+            entry = self.get_movie_by_movie_by_user(movie_id, user_id)
+            if entry is None:
+                return False
+            self._remove_entry(entry)
+        self.list_cache.invalidate(user_id, entry.watchlist_status)
+        self._invalidate_pages([movie_id])
+        return True
+
+    def update_movies_metadata(self, updates):
+        if not updates:
+            return
+        with self._lock:
+            owners = self._list_owners([update['id'] for update in updates])
+            for update in updates:
+                movie = self._movies.get(update['id'])
+                if movie is not None:
+                    self._replace_movie(movie, {name: value for name, value in update.items() if name != 'id'})
+        self._invalidate_lists(owners)
+        self._invalidate_pages()
+
+    def add_pending_movie(self, movie_name, user_id, watchlist_status, user_rating):
+        with self._lock:
+            # A title added first by another request gets the user's entry, and a job while it is pending
+            movie_id = self._movie_keys.get(normalize_title(movie_name))
+            pending = movie_id is None or any(job['movie_id'] == movie_id and job['status'] in ('pending', 'running')
+                                              for job in self._jobs.values())
+            if movie_id is None:
+                movie_id = self._insert_movie({'movie_name': movie_name, **PLACEHOLDER_MOVIE})
+            if movie_id in self._lists[user_id]:
+                return
+            self._insert_entry(UserMovieRow(user_id, movie_id, watchlist_status, user_rating))
+            if pending:
+                job_id = max(self._jobs, default=0) + 1
+                self._jobs[job_id] = {'id': job_id, 'user_id': user_id, 'movie_id': movie_id, 'status': 'pending',
+                                      'attempts': 0, 'last_error': None, 'created_at': time.time(),
+                                      'claimed_at': None}
+        self.list_cache.invalidate(user_id, watchlist_status)
+        self._invalidate_pages()
+
+    def claim_movie_jobs(self, limit, lease):
+        now = time.time()
+        claimed = []
+        with self._lock:
+            for job_id in sorted(self._jobs):
+                job = self._jobs[job_id]
+                if job['status'] == 'pending' or job['status'] == 'running' and job['claimed_at'] < now - lease:
+                    job.update(status='running', attempts=job['attempts'] + 1, claimed_at=now)
+                    claimed.append(JobRow(job_id, job['user_id'], job['movie_id'],
+                                          self._movies[job['movie_id']].movie_name, job['attempts']))
+                    if len(claimed) == limit:
+                        break
+        return claimed
+
+    def complete_movie_job(self, job_id, movie_id, metadata):
+        with self._lock:
+            owners = self._list_owners([movie_id])
+            existing_id = None
+            if 'movie_name' in metadata:
+                existing_id = self._movie_keys.get(normalize_title(metadata['movie_name']))
+            if existing_id is not None and existing_id != movie_id:
+                self._merge_movie(movie_id, existing_id)
+                movie_id = existing_id
+            elif movie_id in self._movies:
+                self._replace_movie(self._movies[movie_id], metadata)
+            if job_id in self._jobs:
+                self._jobs[job_id].update(status='done', last_error=None)
+        self._invalidate_lists(owners)
+        self._invalidate_pages()
+        return movie_id
+
+    def _merge_movie(self, movie_id, into_id):
+        """Moves the list entries and jobs of a placeholder movie to another movie, then deletes it."""
+        for user_id in list(self._fans.get(movie_id, ())):
+            entry = self._lists[user_id][movie_id]
+            self._remove_entry(entry)
+            if into_id not in self._lists[user_id]:
+                self._insert_entry(entry._replace(movie_id=into_id))
+        for job in self._jobs.values():
+            if job['movie_id'] == movie_id:
+                job['movie_id'] = into_id
+        if movie_id in self._movies:
+            self._remove_movie(self._movies[movie_id])
+
+    def retry_movie_job(self, job_id, error, give_up=False):
+        job = self._jobs.get(job_id)
+        if job is not None and give_up:
+            self.drop_pending_movie(job['movie_id'], error)
+        elif job is not None:
+            with self._lock:
+                job.update(status='pending', last_error=error)
+
+    def drop_pending_movie(self, movie_id, error):
+        with self._lock:
+            owners = self._list_owners([movie_id])
+            for user_id in list(self._fans.get(movie_id, ())):
+                self._remove_entry(self._lists[user_id][movie_id])
+            movie = self._movies.get(movie_id)
+            if movie is not None:
+                self._remove_movie(movie)
+            for job in self._jobs.values():
+                if job['movie_id'] == movie_id and job['status'] != 'done':
+                    job.update(status='failed', last_error=error)
+        self._invalidate_lists(owners)
+        self._invalidate_pages()
+
+    def _list_owners(self, movie_ids):
+        """Returns the (user_id, watchlist_status) pairs of the lists holding any of the movies."""
+        return list({(user_id, self._lists[user_id][movie_id].watchlist_status)
+                     for movie_id in movie_ids for user_id in self._fans.get(movie_id, ())})
+
+    def _insert_movie(self, movie):
+        """Adds a movie (a dictionary of its columns, 'id' included if known) and indexes it."""
+        movie_id = movie.get('id') or (self._movie_ids[-1] + 1 if self._movie_ids else 1)
+        row = MovieRow(**{**dict.fromkeys(MovieRow._fields), **movie, 'id': movie_id,
+                          'movie_key': normalize_title(movie['movie_name'])})
+        self._movies[movie_id] = row
+        bisect.insort(self._movie_ids, movie_id)
+        self._movie_keys[row.movie_key] = movie_id
+        self._index_movie(row)
+        return movie_id
+
+    def _replace_movie(self, movie, changes):
+        """Changes columns of a movie, keeping the title key and the word index up to date."""
+        self._unindex_movie(movie)
+        del self._movie_keys[movie.movie_key]
+        movie = movie._replace(**changes)
+        movie = movie._replace(movie_key=normalize_title(movie.movie_name))
+        self._movies[movie.id] = movie
+        self._movie_keys[movie.movie_key] = movie.id
+        self._index_movie(movie)
+
+    def _remove_movie(self, movie):
+        self._unindex_movie(movie)
+        del self._movies[movie.id]
+        self._movie_ids.remove(movie.id)
+        del self._movie_keys[movie.movie_key]
+        self._movie_stats.pop(movie.id, None)
+        self._fans.pop(movie.id, None)
+
+    def _index_movie(self, movie):
+        field_words = tuple(frozenset(words(getattr(movie, field))) for field, _ in SEARCH_FIELDS)
+        self._movie_words[movie.id] = field_words
+        for word in frozenset().union(*field_words):
+            if word not in self._index:
+                self._vocabulary = None
+            self._index[word].add(movie.id)
+
+    def _unindex_movie(self, movie):
+        # Emptied words stay in the vocabulary; they match no movie
+        for word in frozenset().union(*self._movie_words.pop(movie.id, ())):
+            self._index[word].discard(movie.id)
+
+    def _added_sequence(self, entry):
+        return self._added[entry.user_id, entry.movie_id]
+
+    def _insert_entry(self, entry, added=None):
+        """Adds a list entry, updating the stats as the SQLite triggers do."""
+        if added is None:
+            self._sequence += 1
+            added = self._sequence
+        self._lists[entry.user_id][entry.movie_id] = entry
+        self._added[entry.user_id, entry.movie_id] = added
+        self._fans[entry.movie_id].add(entry.user_id)
+        self._count(entry, 1)
+
+    def _remove_entry(self, entry):
+        del self._lists[entry.user_id][entry.movie_id]
+        del self._added[entry.user_id, entry.movie_id]
+        self._fans[entry.movie_id].discard(entry.user_id)
+        self._count(entry, -1)
+
+    def _count(self, entry, sign):
+        """Adds (sign 1) or subtracts (sign -1) a list entry's contribution to its movie's and user's stats."""
+        rating = entry.user_rating or 0
+        deltas = (1, rating > 0, max(rating, 0),
+                  *(entry.watchlist_status == status for status in WATCHLIST_STATUSES))
+        for stats, key in ((self._movie_stats, entry.movie_id), (self._user_stats, entry.user_id)):
+            counts = stats.setdefault(key, [0] * len(STATS_COLUMNS))
+            for i, delta in enumerate(deltas):
+                counts[i] += sign * delta
+            if counts[0] == 0:
+                del stats[key]
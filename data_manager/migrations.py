@@ -0,0 +1,217 @@
+"""
+In-place schema migrations for existing SQLite databases.
+
+``db.create_all()`` only creates missing tables; it never alters a table
+that already exists. Every change to an existing table is therefore a
+numbered migration below. The number of the last applied migration is
+stored in SQLite's ``PRAGMA user_version``. Migrations are idempotent,
+because on a fresh database ``create_all()`` has already built the
+latest schema by the time they run, and so that a migration interrupted
+halfway can simply run again.
+"""
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from data_manager.data_models import db
+from data_manager import recommendations, stats, user_list_cache
+from utils.titles import normalize_title
+
+
+def _columns(conn, table):
+    return {row[1] for row in conn.exec_driver_sql(f'PRAGMA table_info({table})')}
+
+
+def add_movie_key(conn):
+    """
+    Adds the normalized ``movies.movie_key`` column with a unique index.
+
+    Movies whose titles only differ in case or spacing are merged into the
+    oldest one, and the users' lists are moved over to it.
+    """
+    if 'movie_key' not in _columns(conn, 'movies'):
+        conn.exec_driver_sql('ALTER TABLE movies ADD COLUMN movie_key VARCHAR(250)')
+
+    canonical_ids = {}
+    rows = conn.exec_driver_sql('SELECT id, movie_name, movie_key FROM movies ORDER BY id').fetchall()
+    for movie_id, movie_name, movie_key in rows:
+        key = normalize_title(movie_name)
+        canonical_id = canonical_ids.setdefault(key, movie_id)
+        if canonical_id != movie_id:
+            conn.exec_driver_sql('UPDATE OR IGNORE users_movies SET movie_id = ? WHERE movie_id = ?',
+                                 (canonical_id, movie_id))
+            conn.exec_driver_sql('DELETE FROM users_movies WHERE movie_id = ?', (movie_id,))
+            conn.exec_driver_sql('UPDATE movie_jobs SET movie_id = ? WHERE movie_id = ?', (canonical_id, movie_id))
+            conn.exec_driver_sql('DELETE FROM movies WHERE id = ?', (movie_id,))
+        elif movie_key != key:
+            conn.exec_driver_sql('UPDATE movies SET movie_key = ? WHERE id = ?', (key, movie_id))
+
+    conn.exec_driver_sql('CREATE UNIQUE INDEX IF NOT EXISTS ix_movies_movie_key ON movies (movie_key)')
+
+
+def add_users_movies_indexes(conn):
+    """Indexes users_movies for status filtering per user and for lookups by movie."""
+    conn.exec_driver_sql('CREATE INDEX IF NOT EXISTS ix_users_movies_user_status '
+                         'ON users_movies (user_id, watchlist_status)')
+    conn.exec_driver_sql('CREATE INDEX IF NOT EXISTS ix_users_movies_movie_id ON users_movies (movie_id)')
+
+
+def add_movies_fts(conn):
+    """
+    Adds the ``movies_fts`` FTS5 index over titles, directors and plots.
+
+    The index is an external-content table over ``movies``, so the text is
+    not stored twice; triggers keep it in sync with every write to ``movies``,
+    whichever code path makes it.
+    """
+    conn.exec_driver_sql(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS movies_fts USING fts5("
+        "movie_name, movie_director, movie_plot, "
+        "content='movies', content_rowid='id', tokenize='unicode61 remove_diacritics 2')")
+    conn.exec_driver_sql(
+        "CREATE TRIGGER IF NOT EXISTS movies_fts_insert AFTER INSERT ON movies BEGIN "
+        "INSERT INTO movies_fts (rowid, movie_name, movie_director, movie_plot) "
+        "VALUES (new.id, new.movie_name, new.movie_director, new.movie_plot); END")
+    conn.exec_driver_sql(
+        "CREATE TRIGGER IF NOT EXISTS movies_fts_delete AFTER DELETE ON movies BEGIN "
+        "INSERT INTO movies_fts (movies_fts, rowid, movie_name, movie_director, movie_plot) "
+        "VALUES ('delete', old.id, old.movie_name, old.movie_director, old.movie_plot); END")
+    conn.exec_driver_sql(
+        "CREATE TRIGGER IF NOT EXISTS movies_fts_update AFTER UPDATE ON movies BEGIN "
+        "INSERT INTO movies_fts (movies_fts, rowid, movie_name, movie_director, movie_plot) "
+        "VALUES ('delete', old.id, old.movie_name, old.movie_director, old.movie_plot); "
+        "INSERT INTO movies_fts (rowid, movie_name, movie_director, movie_plot) "
+        "VALUES (new.id, new.movie_name, new.movie_director, new.movie_plot); END")
+    conn.exec_driver_sql("INSERT INTO movies_fts (movies_fts) VALUES ('rebuild')")
+
+
+def add_sort_indexes(conn):
+    """Indexes the columns users' movie lists can be sorted by."""
+    conn.exec_driver_sql('CREATE INDEX IF NOT EXISTS ix_users_movies_user_rating '
+                         'ON users_movies (user_id, user_rating)')
+    conn.exec_driver_sql('CREATE INDEX IF NOT EXISTS ix_movies_release_year ON movies (release_year)')
+    conn.exec_driver_sql('CREATE INDEX IF NOT EXISTS ix_movies_movie_rating ON movies (movie_rating)')
+
+
+def add_list_stats(conn):
+    """
+    Adds the ``movie_stats`` and ``user_stats`` summary tables, the triggers
+    maintaining them, and fills them from the existing lists.
+    """
+    for table, key, parent in (('movie_stats', 'movie_id', 'movies'), ('user_stats', 'user_id', 'users')):
+        conn.exec_driver_sql(
+            f'CREATE TABLE IF NOT EXISTS {table} ({key} INTEGER NOT NULL REFERENCES {parent} (id), '
+            'list_count INTEGER NOT NULL, rating_count INTEGER NOT NULL, rating_sum INTEGER NOT NULL, '
+            'watched_count INTEGER NOT NULL, watching_count INTEGER NOT NULL, wishlist_count INTEGER NOT NULL, '
+            f'PRIMARY KEY ({key}))')
+    stats.create_triggers(conn)
+    stats.rebuild_stats(conn)
+
+
+def add_recommendations(conn):
+    """
+    Adds the ``movie_neighbors``, ``user_recommendations`` and
+    ``recommendations_stale`` tables and the triggers marking changed lists.
+
+    Every user with a list starts out stale; the recommendations are
+    computed by ``flask refresh-recommendations --full``.
+    """
+    conn.exec_driver_sql('CREATE TABLE IF NOT EXISTS movie_neighbors (movie_id INTEGER NOT NULL REFERENCES movies (id), '
+                         'neighbor_id INTEGER NOT NULL REFERENCES movies (id), similarity FLOAT NOT NULL, '
+                         'PRIMARY KEY (movie_id, neighbor_id)) WITHOUT ROWID')
+    conn.exec_driver_sql('CREATE TABLE IF NOT EXISTS user_recommendations (user_id INTEGER NOT NULL REFERENCES users (id), '
+                         'rank INTEGER NOT NULL, movie_id INTEGER NOT NULL REFERENCES movies (id), '
+                         'score FLOAT NOT NULL, PRIMARY KEY (user_id, rank)) WITHOUT ROWID')
+    conn.exec_driver_sql('CREATE TABLE IF NOT EXISTS recommendations_stale (user_id INTEGER NOT NULL REFERENCES users (id), '
+                         'version INTEGER NOT NULL, PRIMARY KEY (user_id))')
+    recommendations.create_triggers(conn)
+    conn.exec_driver_sql('INSERT OR IGNORE INTO recommendations_stale (user_id, version) '
+                         'SELECT DISTINCT user_id, 1 FROM users_movies')
+
+
+def add_list_versions(conn):
+    """Adds the ``user_list_versions`` table and the triggers bumping it."""
+    conn.exec_driver_sql('CREATE TABLE IF NOT EXISTS user_list_versions (user_id INTEGER NOT NULL REFERENCES users (id), '
+                         'version INTEGER NOT NULL, PRIMARY KEY (user_id))')
+    user_list_cache.create_triggers(conn)
+
+
+def add_movie_enriched_at(conn):
+    """
+    Adds ``movies.enriched_at``, the time OMDb was last asked for a movie's details.
+
+    Existing movies holding OMDb details count as enriched now; those still
+    holding 'N/A' placeholders are left to the next ``flask enrich-movies``.
+    """
+    if 'enriched_at' not in _columns(conn, 'movies'):
+        conn.exec_driver_sql('ALTER TABLE movies ADD COLUMN enriched_at FLOAT')
+    conn.exec_driver_sql("UPDATE movies SET enriched_at = CAST(strftime('%s', 'now') AS REAL) "
+                         "WHERE enriched_at IS NULL AND movie_plot != 'N/A' AND movie_director != 'N/A'")
+    conn.exec_driver_sql('CREATE INDEX IF NOT EXISTS ix_movies_not_enriched ON movies (id) WHERE enriched_at IS NULL')
+
+
+MIGRATIONS = [
+    (1, add_movie_key),
+    (2, add_users_movies_indexes),
+    (3, add_movies_fts),
+    (4, add_sort_indexes),
+    (5, add_list_stats),
+    (6, add_recommendations),
+    (7, add_list_versions),
+    (8, add_movie_enriched_at),
+]
+
+
+def schema_version(conn):
+    """Returns the number of the last migration applied to the database."""
+    return conn.exec_driver_sql('PRAGMA user_version').scalar()
+
+
+def upgrade(engine):
+    """
+    Applies every pending migration in order.
+
+    Args:
+        engine (Engine): The engine of the database to upgrade.
+
+    Returns:
+        list: The numbers of the migrations that were applied.
+    """
+    applied = []
+    for number, migration in MIGRATIONS:
+        with engine.begin() as conn:
+            if schema_version(conn) >= number:
+                continue
+            migration(conn)
+            conn.exec_driver_sql(f'PRAGMA user_version = {number}')
+        applied.append(number)
+    return applied
+
+
+def setup_schema():
+    """
+    Creates missing tables and applies every pending migration, in the current app context.
+
+    The app does not do this when it starts, so that booting many workers
+    does not run the schema checks once per worker; ``flask db-upgrade``
+    runs it once per deployment. A data manager with its own database
+    (see data_manager.backends) creates its schema as well.
+
+    Returns:
+        list: The numbers of the migrations that were applied.
+    """
+    db.create_all()
+    data_manager = current_app.extensions.get('data_manager')
+    if hasattr(data_manager, 'create_schema'):
+        data_manager.create_schema()
+    return upgrade(db.engine) if db.engine.dialect.name == 'sqlite' else []
+
+
+@click.command('db-upgrade')
+@with_appcontext
+def db_upgrade_command():
+    """Creates missing tables and migrates existing ones to the latest schema."""
+    applied = setup_schema()
+    if applied:
+        click.echo(f"Applied migrations: {', '.join(str(number) for number in applied)}")
+    click.echo(f'Database is at schema version {MIGRATIONS[-1][0]}')
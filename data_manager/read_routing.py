@@ -0,0 +1,146 @@
+"""
+Routing of the data manager's reads to a read-only connection pool.
+
+Readers then never wait for a connection, or for SQLite's lock, behind
+the writers of the primary pool. The read pool opens the database file
+read-only (``mode=ro``), or a replica of it (e.g. kept up to date by
+Litestream) at DATABASE_READ_URL.
+
+A replica can lag behind the primary, so reads stick to the primary for
+a client that just wrote:
+
+- for the rest of the app context that committed, so a view reads back
+  what it just wrote;
+- for ``sticky_seconds`` afterwards, through a cookie holding the time
+  the stickiness ends. It is read from the request without loading the
+  session, so cached pages are not made to vary on the session cookie.
+
+Reads filling a cache shared by every client (the list cache, the page
+cache) go to the primary as well, inside ``primary_reads()``: an entry
+read from a lagging replica right after an invalidation would otherwise
+be served to everybody until the next one.
+"""
+
+import time
+from contextlib import contextmanager
+from flask import after_this_request, current_app, g, has_app_context, has_request_context, request
+from flask.globals import app_ctx
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session, scoped_session, sessionmaker
+from data_manager.sqlite_tuning import apply_tuning, engine_options
+
+STICKY_COOKIE = 'db_primary_until'
+
+
+def read_only_url(url):
+    """
+    Builds the URL opening a SQLite database file read-only.
+
+    Args:
+        url (str): The SQLAlchemy URL of the database, e.g. sqlite:////srv/movie_app.sqlite.
+
+    Returns:
+        str: The same file opened as a ``mode=ro`` URI, e.g. sqlite:///file:/srv/movie_app.sqlite?mode=ro&uri=true.
+
+    Raises:
+        ValueError: If the URL is not a SQLite database file.
+    """
+    parsed = make_url(url)
+    if parsed.get_backend_name() != 'sqlite' or not parsed.database or parsed.database == ':memory:':
+        raise ValueError(f'Reads can only be routed for a SQLite database file, not {url}.')
+    if parsed.database.startswith('file:'):
+        return url
+    return f'sqlite:///file:{parsed.database}?mode=ro&uri=true'
+
+
+@contextmanager
+def primary_reads():
+    """Sends the current app context's reads to the primary for the duration of the block."""
+    if not has_app_context():
+        yield
+        return
+    previous = g.get('_db_primary_reads', False)
+    g._db_primary_reads = True
+    try:
+        yield
+    finally:
+        g._db_primary_reads = previous
+
+
+class ReadRouter:
+    """
+    Picks the session the data manager's read methods run in.
+    """
+    def __init__(self, url, profile, pool_size=16, sticky_seconds=5):
+        """
+        Initializes the router and its read-only engine.
+
+        Args:
+            url (str): The SQLAlchemy URL of the read-only database (see read_only_url).
+            profile (SQLiteTuningConfig): The tuning profile; the PRAGMAs that only matter to
+                writers are left out, and ``query_only`` is set.
+            pool_size (int): Connections kept in the read pool.
+            sticky_seconds (float): Seconds a client's reads stay on the primary after it wrote.
+        """
+        options = engine_options(profile) or {'connect_args': {'check_same_thread': False}}
+        self.engine = create_engine(url, **{**options, 'pool_size': pool_size, 'max_overflow': pool_size})
+        apply_tuning(self.engine, profile, read_only=True)
+        self.sticky_seconds = sticky_seconds
+        # One session per app context, like Flask-SQLAlchemy's db.session
+        self.session = scoped_session(sessionmaker(bind=self.engine, class_=Session),
+                                      scopefunc=lambda: id(app_ctx._get_current_object()))
+
+    def init_app(self, app, primary_session):
+        """
+        Removes the read session at the end of each app context, and watches the primary's commits.
+
+        Args:
+            app (Flask): The Flask application instance.
+            primary_session (scoped_session): The session the writes are committed in.
+        """
+        app.teardown_appcontext(lambda exception: self.session.remove())
+        event.listen(primary_session, 'after_commit', lambda session: self.mark_write())
+
+    def read_session(self, primary_session):
+        """
+        Returns the session a read runs in.
+
+        Args:
+            primary_session (scoped_session): The session of the primary.
+
+        Returns:
+            Session: The primary's session if the client wrote recently, the read session otherwise.
+        """
+        return primary_session if self.sticky() else self.session
+
+    def sticky(self):
+        """Tells whether the current client's reads must see its latest writes."""
+        if has_app_context() and (g.get('_db_wrote') or g.get('_db_primary_reads')):
+            return True
+        if not has_request_context():
+            return False
+        try:
+            return float(request.cookies.get(STICKY_COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
+
+    def mark_write(self):
+        """Sends the current app context's, and for a while the client's, reads to the primary."""
+        if not has_app_context() or g.get('_db_wrote'):
+            return
+        g._db_wrote = True
+        if not has_request_context() or not self.sticky_seconds:
+            return
+        until = time.time() + self.sticky_seconds
+
+        @after_this_request
+        def set_sticky_cookie(response):
+            response.set_cookie(STICKY_COOKIE, f'{until:.3f}', max_age=int(self.sticky_seconds) + 1,
+                                httponly=True, samesite='Lax',
+                                secure=current_app.config.get('SESSION_COOKIE_SECURE', False))
+            return response
+
+    def dispose(self):
+        """Drops the read pool's connections, e.g. after a fork."""
+        self.engine.dispose(close=False)
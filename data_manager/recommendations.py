@@ -0,0 +1,304 @@
+"""
+Item-item collaborative filtering over the users' lists.
+
+Every ``users_movies`` row is an entry of a sparse user x movie matrix,
+weighted by the user's rating, or by the watchlist status for unrated
+movies. Two movies are similar when the same users have them on their
+lists: their similarity is the cosine of their columns. A user's score
+for a movie is the sum, over the movies on their list, of the list
+weight times the movie's similarity to it, and their recommendations are
+the best scored movies not on their list.
+
+The batch job (``flask refresh-recommendations --full``) computes the
+similarities and every user's recommendations with NumPy and SciPy, in
+blocks bounded by ``RecommendationConfig.batch_cells``, and stores the
+``neighbors`` most similar movies of each movie in ``movie_neighbors``.
+Between two batch runs, triggers on ``users_movies`` mark the users whose
+list changed in ``recommendations_stale``, and their recommendations are
+recomputed in SQL from the stored neighbors, either by
+``flask refresh-recommendations`` or when they are next read.
+
+NumPy and SciPy are optional: they are only needed by the batch job, so
+they are imported when it runs rather than by every web worker.
+"""
+
+import time
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from config.config_files import RecommendationConfig
+from data_manager.data_models import db
+
+np = sparse = None  # imported by _load_numpy, only the batch job needs them
+
+# The weight of a users_movies row in the matrix
+WEIGHT_SQL = ("CASE WHEN coalesce({row}.user_rating, 0) > 0 THEN {row}.user_rating "
+              "WHEN {row}.watchlist_status = 'wishlist' THEN 2 "
+              "WHEN {row}.watchlist_status IS NULL THEN 1 ELSE 3 END")
+
+
+def list_weight(user_rating, watchlist_status):
+    """Returns the weight of a list entry, as WEIGHT_SQL computes it, for backends without SQL."""
+    if (user_rating or 0) > 0:
+        return user_rating
+    if watchlist_status == 'wishlist':
+        return 2
+    return 1 if watchlist_status is None else 3
+
+
+def _load_numpy():
+    """
+    Imports NumPy and SciPy on first use.
+
+    Raises:
+        RuntimeError: If they are not installed.
+    """
+    global np, sparse
+    if np is None:
+        try:
+            import numpy
+            from scipy import sparse as scipy_sparse
+        except ImportError as e:
+            raise RuntimeError('The recommendation batch job needs numpy and scipy: pip install numpy scipy') from e
+        np, sparse = numpy, scipy_sparse
+
+
+def create_triggers(conn):
+    """
+    Creates the triggers marking users whose list changed as stale.
+
+    Args:
+        conn (Connection): A connection inside a transaction.
+    """
+    mark = ('INSERT INTO recommendations_stale (user_id, version) VALUES ({row}.user_id, 1) '
+            'ON CONFLICT (user_id) DO UPDATE SET version = version + 1;')
+    changes = {'insert': [mark.format(row='new')],
+               'delete': [mark.format(row='old')],
+               'update': [mark.format(row='old'), mark.format(row='new')]}
+    for operation, statements in changes.items():
+        conn.exec_driver_sql(f'CREATE TRIGGER IF NOT EXISTS users_movies_recommendations_{operation} '
+                             f"AFTER {operation.upper()} ON users_movies BEGIN {' '.join(statements)} END")
+    conn.exec_driver_sql('CREATE TRIGGER IF NOT EXISTS users_recommendations_delete AFTER DELETE ON users BEGIN '
+                         'DELETE FROM user_recommendations WHERE user_id = old.id; '
+                         'DELETE FROM recommendations_stale WHERE user_id = old.id; END')
+
+
+def refresh_users(conn, user_ids, top_n):
+    """
+    Recomputes the recommendations of some users from the stored movie neighbors.
+
+    Each user costs one aggregate over their list joined with the neighbors
+    of its movies, so this is cheap enough to run when a stale user's
+    recommendations are read.
+
+    Args:
+        conn (Connection): A connection inside a transaction.
+        user_ids (iterable): The IDs of the users.
+        top_n (int): The number of recommendations to keep per user.
+    """
+    weight = WEIGHT_SQL.format(row='listed')
+    for user_id in user_ids:
+        version = conn.exec_driver_sql('SELECT version FROM recommendations_stale WHERE user_id = ?',
+                                       (user_id,)).scalar()
+        conn.exec_driver_sql('DELETE FROM user_recommendations WHERE user_id = ?', (user_id,))
+        conn.exec_driver_sql(
+            'INSERT INTO user_recommendations (user_id, rank, movie_id, score) '
+            'SELECT ?, row_number() OVER (ORDER BY score DESC, movie_id), movie_id, score FROM ('
+            f'SELECT n.neighbor_id AS movie_id, sum(n.similarity * {weight}) AS score '
+            'FROM users_movies AS listed JOIN movie_neighbors AS n ON n.movie_id = listed.movie_id '
+            'WHERE listed.user_id = ? AND n.neighbor_id NOT IN '
+            '(SELECT movie_id FROM users_movies WHERE user_id = ?) '
+            'GROUP BY n.neighbor_id ORDER BY score DESC, n.neighbor_id LIMIT ?)',
+            (user_id, user_id, user_id, top_n))
+        if version is not None:
+            conn.exec_driver_sql('DELETE FROM recommendations_stale WHERE user_id = ? AND version = ?',
+                                 (user_id, version))
+
+
+def load_matrix(conn):
+    """
+    Loads the users' lists as a sparse user x movie matrix.
+
+    Args:
+        conn (Connection): A database connection.
+
+    Returns:
+        tuple: The CSR matrix of list weights, the user ID of each row and the movie ID of each column.
+    """
+    _load_numpy()
+    # The raw cursor skips SQLAlchemy's row processing, which dominates loading millions of rows
+    rows = conn.connection.driver_connection.execute(
+        f"SELECT user_id, movie_id, {WEIGHT_SQL.format(row='users_movies')} FROM users_movies").fetchall()
+    if not rows:
+        return sparse.csr_matrix((0, 0), dtype=np.float32), np.empty(0, np.int64), np.empty(0, np.int64)
+    user_col, movie_col, weights = np.array(rows, dtype=np.int64).T
+    user_ids, user_index = np.unique(user_col, return_inverse=True)
+    movie_ids, movie_index = np.unique(movie_col, return_inverse=True)
+    matrix = sparse.csr_matrix((weights.astype(np.float32), (user_index, movie_index)),
+                               shape=(len(user_ids), len(movie_ids)))
+    return matrix, user_ids, movie_ids
+
+
+def top_per_row(block, k, offset=None):
+    """
+    Keeps the k largest positive values of each row of a sparse block.
+
+    Rows are ranked by decreasing value, ties broken by column, without
+    ever densifying the block.
+
+    Args:
+        block (spmatrix): A block of rows of a sparse matrix.
+        k (int): The number of values to keep per row.
+        offset (int, optional): The index of the block's first row in a square
+            matrix; if given, rows are numbered in the whole matrix and its diagonal is skipped.
+
+    Returns:
+        tuple: Arrays of row indices, ranks from 1, column indices and values.
+    """
+    _load_numpy()
+    block = block.tocsr()
+    block.sort_indices()
+    block = block.tocoo()
+    rows = block.row.astype(np.int64)
+    keep = block.data > 0
+    if offset is not None:
+        rows += offset
+        keep &= rows != block.col
+    rows, columns, values = rows[keep], block.col[keep], block.data[keep]
+    if not len(rows):
+        return rows, rows, columns, values
+    # One stable sort on row + (a fraction decreasing with the value) orders by
+    # row, then value, then column, and is much faster than a lexsort
+    key = rows + (1 - values / (2 * np.float64(values.max())))
+    order = np.argsort(key, kind='stable')
+    rows, columns, values = rows[order], columns[order], values[order]
+    starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+    ranks = np.arange(len(rows)) - np.repeat(starts, np.diff(np.r_[starts, len(rows)]))
+    keep = ranks < k
+    return rows[keep], ranks[keep] + 1, columns[keep], values[keep]
+
+
+def item_neighbors(matrix, neighbors, batch_cells):
+    """
+    Computes the most similar movies of each movie.
+
+    The movie x movie similarity matrix is computed one block of rows at a
+    time, and only the ``neighbors`` best similarities of each row are kept.
+
+    Args:
+        matrix (csr_matrix): The user x movie matrix.
+        neighbors (int): The number of neighbors to keep per movie.
+        batch_cells (int): Bounds the movies per block to batch_cells / number of movies.
+
+    Returns:
+        csr_matrix: The movie x movie matrix of the kept similarities.
+    """
+    _load_numpy()
+    n_movies = matrix.shape[1]
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=0)).ravel())
+    norms[norms == 0] = 1
+    normalized = (matrix @ sparse.diags(1 / norms).astype(np.float32)).tocsc()
+    transposed = normalized.T.tocsr()
+
+    batch = max(1, batch_cells // max(n_movies, 1))
+    rows, columns, values = [], [], []
+    for start in range(0, n_movies, batch):
+        block_rows, _, block_columns, block_values = top_per_row(
+            transposed[start:start + batch] @ normalized, neighbors, offset=start)
+        rows.append(block_rows)
+        columns.append(block_columns)
+        values.append(block_values)
+    if not rows:
+        return sparse.csr_matrix((n_movies, n_movies), dtype=np.float32)
+    return sparse.csr_matrix((np.concatenate(values), (np.concatenate(rows), np.concatenate(columns))),
+                             shape=(n_movies, n_movies))
+
+
+def top_movies(matrix, similarity, top_n, batch_cells):
+    """
+    Scores the movies for every user and keeps the best ones not on their list.
+
+    Args:
+        matrix (csr_matrix): The user x movie matrix.
+        similarity (csr_matrix): The movie x movie neighbor similarities.
+        top_n (int): The number of recommendations to keep per user.
+        batch_cells (int): Bounds the users per block to batch_cells / number of movies.
+
+    Yields:
+        tuple: Arrays of row indices, ranks from 1, column indices and scores, one block of users at a time.
+    """
+    n_users, n_movies = matrix.shape
+    batch = max(1, batch_cells // max(n_movies, 1))
+    for start in range(0, n_users, batch):
+        listed = matrix[start:start + batch]
+        scores = listed @ similarity
+        on_list = listed.copy()
+        on_list.data[:] = 1
+        scores = scores - scores.multiply(on_list)  # movies already on the list score 0
+        rows, ranks, columns, values = top_per_row(scores, top_n)
+        yield rows + start, ranks, columns, values
+
+
+def compute_all(engine, config):
+    """
+    Recomputes the movie neighbors and every user's recommendations.
+
+    The stale marks are read before the lists, so a list changing while
+    the job runs keeps its mark and is refreshed again incrementally.
+
+    Args:
+        engine (Engine): The database engine.
+        config (RecommendationConfig): The recommendation settings.
+
+    Returns:
+        dict: The number of users, movies, ratings, neighbors and recommendations, and the timings.
+    """
+    _load_numpy()
+    started = time.perf_counter()
+    with engine.connect() as conn:
+        stale = conn.exec_driver_sql('SELECT user_id, version FROM recommendations_stale').fetchall()
+        matrix, user_ids, movie_ids = load_matrix(conn)
+    loaded = time.perf_counter()
+
+    similarity = item_neighbors(matrix, config.neighbors, config.batch_cells)
+    neighbor_rows = similarity.tocoo()
+    neighbors = list(zip(movie_ids[neighbor_rows.row].tolist(), movie_ids[neighbor_rows.col].tolist(),
+                         neighbor_rows.data.tolist()))
+    recommendations = []
+    for rows, ranks, columns, scores in top_movies(matrix, similarity, config.top_n, config.batch_cells):
+        recommendations.extend(zip(user_ids[rows].tolist(), ranks.tolist(),
+                                   movie_ids[columns].tolist(), scores.tolist()))
+    computed = time.perf_counter()
+
+    with engine.begin() as conn:
+        conn.exec_driver_sql('DELETE FROM movie_neighbors')
+        conn.exec_driver_sql('DELETE FROM user_recommendations')
+        cursor = conn.connection.driver_connection.cursor()
+        cursor.executemany('INSERT INTO movie_neighbors (movie_id, neighbor_id, similarity) VALUES (?, ?, ?)',
+                           neighbors)
+        cursor.executemany('INSERT INTO user_recommendations (user_id, rank, movie_id, score) '
+                           'VALUES (?, ?, ?, ?)', recommendations)
+        cursor.executemany('DELETE FROM recommendations_stale WHERE user_id = ? AND version = ?', stale)
+    return {'users': len(user_ids), 'movies': len(movie_ids), 'ratings': matrix.nnz,
+            'neighbors': len(neighbors), 'recommendations': len(recommendations),
+            'load_s': loaded - started, 'compute_s': computed - loaded,
+            'write_s': time.perf_counter() - computed}
+
+
+@click.command('refresh-recommendations')
+@click.option('--full', is_flag=True, help='Recompute the movie similarities and every user (needs numpy and scipy).')
+@with_appcontext
+def refresh_recommendations_command(full):
+    """Refreshes the users' movie recommendations."""
+    if full:
+        try:
+            result = compute_all(db.engine, RecommendationConfig)
+        except RuntimeError as e:
+            raise click.ClickException(str(e))
+        click.echo(f"{result['ratings']} ratings of {result['users']} users on {result['movies']} movies: "
+                   f"{result['neighbors']} neighbors, {result['recommendations']} recommendations "
+                   f"(load {result['load_s']:.1f}s, compute {result['compute_s']:.1f}s, "
+                   f"write {result['write_s']:.1f}s)")
+        return
+    refreshed = current_app.extensions['data_manager'].refresh_stale_recommendations()
+    click.echo(f'Refreshed the recommendations of {refreshed} users')
@@ -0,0 +1,678 @@
+"""
+SQLAlchemy Core implementation of DataManagerInterface, for SQLite or PostgreSQL.
+
+It runs on its own engine, built from any SQLAlchemy URL, without Flask
+or the ORM: statements are Core selects on the model tables, rows come
+back as plain tuples, and each method uses one connection (and one
+transaction for writes), so it has no session state and less overhead
+per call than the ORM.
+
+Only portable SQL is used, with two exceptions picked by dialect: the
+``INSERT ... ON CONFLICT DO NOTHING`` of the list inserts, which SQLite
+and PostgreSQL both have, and the search, which uses the FTS5 index on a
+migrated SQLite database and case-insensitive LIKE matches elsewhere.
+The list stats are aggregated from ``users_movies`` on each call, since
+the summary tables are maintained by SQLite triggers, and the
+recommendations are read as precomputed by the batch job. The versions of
+the users' lists are bumped by SQLite triggers too; elsewhere each write
+bumps them in its own transaction. PostgreSQL
+has no rowid, so there the 'added' order of a list is the movie ID order.
+"""
+
+import re
+import time
+from itertools import groupby
+from sqlalchemy import bindparam, case, create_engine, delete, func, insert, inspect, literal, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from config.config_files import UserListCacheConfig
+from data_manager.data_manager_interface import WATCHLIST_STATUSES, DataManagerInterface, check_list_update
+from data_manager.data_models import (db, Movie, MovieJob, User, UserListVersion, UserMovie, UserRecommendation,
+                                      PLACEHOLDER_MOVIE)
+from data_manager.migrations import upgrade
+from data_manager.sqlite_data_manager import (MOVIE_COLUMNS, SORT_KEYS, columns_for, fts_search, movie_list_inserts,
+                                              resolved_movies, user_movies_page, user_movies_select)
+from data_manager.stats import EMPTY_STATS, ListStats
+from data_manager.user_list_cache import UserMovieListCache, UserMovieRow
+from utils.cache import LRUCache
+from utils.titles import normalize_title
+
+# The dialects with INSERT ... ON CONFLICT DO NOTHING, and their insert constructs
+INSERTS = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+
+# The columns of a list entry selected when query_user_movies is not given columns
+ENTRY_COLUMNS = ['movie_id', 'watchlist_status', 'user_rating', 'movie_name', 'movie_poster']
+
+movies = Movie.__table__
+users = User.__table__
+users_movies = UserMovie.__table__
+movie_jobs = MovieJob.__table__
+list_versions = UserListVersion.__table__
+
+
+def stats_columns():
+    """The aggregates of users_movies rows matching the columns of ListStats."""
+    rated = users_movies.c.user_rating > 0
+    return [func.count(),
+            func.coalesce(func.sum(case((rated, 1), else_=0)), 0),
+            func.coalesce(func.sum(case((rated, users_movies.c.user_rating), else_=0)), 0),
+            *(func.coalesce(func.sum(case((users_movies.c.watchlist_status == status, 1), else_=0)), 0)
+              for status in WATCHLIST_STATUSES)]
+
+
+class SQLDataManager(DataManagerInterface):
+    """
+    Data manager on SQLAlchemy Core, for SQLite and PostgreSQL databases.
+    """
+    def __init__(self, url, list_cache=None, page_cache=None, **engine_options):
+        """
+        Initializes the data manager and its engine.
+
+        Args:
+            url (str): The SQLAlchemy URL of the database, e.g. postgresql+psycopg://user@host/movies.
+            list_cache (UserMovieListCache, optional): The cache of users' movie lists,
+                an in-process LRU by default.
+            page_cache (PageCache, optional): The cache of rendered pages to invalidate.
+            engine_options: Keyword arguments for ``create_engine`` (e.g. pool_size).
+
+        Raises:
+            ValueError: If the database is neither SQLite nor PostgreSQL.
+        """
+        self.engine = create_engine(url, **engine_options)
+        dialect = self.engine.dialect.name
+        if dialect not in INSERTS:
+            raise ValueError(f"Unsupported database {dialect!r}: must be one of {', '.join(INSERTS)}.")
+        self.insert = INSERTS[dialect]
+        self.sort_keys = SORT_KEYS if dialect == 'sqlite' else {**SORT_KEYS, 'added': lambda: UserMovie.movie_id}
+        self._versions_by_trigger = dialect == 'sqlite'
+        self.list_cache = list_cache or UserMovieListCache(
+            LRUCache(UserListCacheConfig.max_entries, UserListCacheConfig.ttl))
+        self.page_cache = page_cache
+        self._has_fts = None
+
+    def create_schema(self):
+        """Creates the missing tables, and applies the SQLite migrations on SQLite."""
+        db.metadata.create_all(self.engine)
+        if self.engine.dialect.name == 'sqlite':
+            upgrade(self.engine)
+
+    def get_all_users(self):
+        """
+        Retrieves all users from the database.
+
+        Returns:
+            list: (id, user_name) rows, in ID order.
+        """
+        with self.engine.connect() as conn:
+            return conn.execute(select(users).order_by(users.c.id)).all()
+
+    def get_user_by_id(self, user_id):
+        """
+        Retrieves a user by its ID from the database.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            Row: The user's row or None if the user is not found.
+        """
+        with self.engine.connect() as conn:
+            return conn.execute(select(users).where(users.c.id == user_id)).first()
+
+    def get_users_page(self, after_id=None, limit=50):
+        """
+        Retrieves one page of users using keyset pagination on the ID.
+
+        Args:
+            after_id (int, optional): The ID of the last user on the previous page.
+            limit (int): The maximum number of users to return.
+
+        Returns:
+            tuple: A list of (id, user_name) rows and the cursor
+            for the next page (None if this is the last page).
+        """
+        statement = select(users.c.id, users.c.user_name)
+        if after_id is not None:
+            statement = statement.where(users.c.id > after_id)
+        with self.engine.connect() as conn:
+            rows = conn.execute(statement.order_by(users.c.id).limit(limit + 1)).all()
+        next_cursor = rows[limit - 1].id if len(rows) > limit else None
+        return rows[:limit], next_cursor
+
+    def get_all_movies(self):
+        """
+        Retrieves all movies from the database.
+
+        Returns:
+            list: Rows with the columns of the movies table, in ID order.
+        """
+        with self.engine.connect() as conn:
+            return conn.execute(select(movies).order_by(movies.c.id)).all()
+
+    def get_movies_page(self, after_id=None, limit=50, columns=None):
+        """
+        Retrieves one page of the movie catalog using keyset pagination.
+
+        Placeholders of movies still waiting for their details are left out.
+
+        Args:
+            after_id (int, optional): The ID of the last movie on the previous page.
+            limit (int): The maximum number of movies to return.
+            columns (list, optional): Names from MOVIE_COLUMNS to select,
+                by default id, movie_name and movie_poster.
+
+        Returns:
+            tuple: A list of rows with the columns as attributes (plus id) and the
+            cursor for the next page (None if this is the last page).
+
+        Raises:
+            ValueError: If a column is invalid.
+        """
+        columns = columns or ['id', 'movie_name', 'movie_poster']
+        entities = columns_for(MOVIE_COLUMNS, columns)
+        if 'id' not in columns:
+            entities.append(movies.c.id) # needed for the cursor
+        statement = select(*entities).where(resolved_movies())
+        if after_id is not None:
+            statement = statement.where(movies.c.id > after_id)
+        with self.engine.connect() as conn:
+            rows = conn.execute(statement.order_by(movies.c.id).limit(limit + 1)).all()
+        next_cursor = rows[limit - 1].id if len(rows) > limit else None
+        return rows[:limit], next_cursor
+
+    def search_movies(self, query, limit=20, cursor=None):
+        """
+        Searches with FTS5 on a migrated SQLite database, with LIKE matches elsewhere.
+
+        Without FTS5, each query word must appear in the title, director or
+        plot, and a movie's rank is minus the weighted number of words its
+        title (10), director (3) and plot (1) contain.
+
+        Args:
+            query (str): The search text as typed by the user.
+            limit (int): The maximum number of results to return.
+            cursor (str, optional): The cursor returned with the previous page.
+
+        Returns:
+            tuple: A list of (id, movie_name, movie_poster, movie_director, release_year)
+            rows and the cursor for the next page (None if this is the last page).
+
+        Raises:
+            ValueError: If the cursor is malformed.
+        """
+        with self.engine.connect() as conn:
+            if self._has_fts is None:
+                self._has_fts = self.engine.dialect.name == 'sqlite' and inspect(conn).has_table('movies_fts')
+            if self._has_fts:
+                return fts_search(conn, query, limit, cursor)
+
+            query_words = re.findall(r'\w+', query.lower())
+            if not query_words:
+                return [], None
+            fields = ((movies.c.movie_name, 10.0), (movies.c.movie_director, 3.0), (movies.c.movie_plot, 1.0))
+            matches = [[(func.lower(column).contains(word, autoescape=True), weight) for column, weight in fields]
+                       for word in query_words]
+            rank = -sum(case((match, weight), else_=0.0) for word_matches in matches for match, weight in word_matches)
+            statement = select(movies.c.id, movies.c.movie_name, movies.c.movie_poster, movies.c.movie_director,
+                               movies.c.release_year, rank.label('rank')) \
+                .where(*(or_(*(match for match, _ in word_matches)) for word_matches in matches))
+            if cursor:
+                last_rank, last_id = cursor.split(':')
+                last_rank, last_id = float(last_rank), int(last_id)
+                statement = statement.where(or_(rank > last_rank, (rank == last_rank) & (movies.c.id > last_id)))
+            rows = conn.execute(statement.order_by(rank, movies.c.id).limit(limit + 1)).all()
+        next_cursor = f'{float(rows[limit - 1].rank)!r}:{rows[limit - 1].id}' if len(rows) > limit else None
+        return rows[:limit], next_cursor
+
+    def get_movie_by_id(self, movie_id):
+        """
+        Retrieves a movie by its ID from the database.
+
+        Args:
+            movie_id (int): The ID of the movie.
+
+        Returns:
+            Row: The movie's row or None if the movie is not found.
+        """
+        with self.engine.connect() as conn:
+            return conn.execute(select(movies).where(movies.c.id == movie_id)).first()
+
+    def get_movie_by_name(self, movie_name):
+        """
+        Retrieves a movie by its name from the database (case and spacing insensitive).
+
+        Args:
+            movie_name (str): The name of the movie.
+
+        Returns:
+            Row: The movie's row or None if the movie is not found.
+        """
+        with self.engine.connect() as conn:
+            return conn.execute(select(movies).where(movies.c.movie_key == normalize_title(movie_name))).first()
+
+    def get_movie_by_movie_by_user(self, movie_id, user_id):
+        """
+        Retrieves a user's association with a movie.
+
+        Args:
+            movie_id (int): The ID of the movie.
+            user_id (int): The ID of the user.
+
+        Returns:
+            Row: The users_movies row or None if the association is not found.
+        """
+        with self.engine.connect() as conn:
+            return conn.execute(select(users_movies).where(users_movies.c.movie_id == movie_id,
+                                                           users_movies.c.user_id == user_id)).first()
+
+    def get_movie_by_watch_status(self, user_id, watch_status):
+        """
+        Retrieves a list of movies associated with a user, filtered by watchlist status.
+
+        Args:
+            user_id (int): The ID of the user.
+            watch_status (str): The watchlist status to filter by (e.g., 'watched', 'watching', 'wishlist').
+
+        Returns:
+            list: A list of (UserMovieRow, movie name, movie poster) tuples.
+        """
+        return self.query_user_movies(user_id, watch_status)[0]
+
+    def get_user_movies(self, user_id):
+        """
+        Retrieves all movies associated with a user, including their names and posters.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            list: A list of (UserMovieRow, movie name, movie poster) tuples.
+        """
+        return self.query_user_movies(user_id)[0]
+
+    def query_user_movies(self, user_id, watch_status=None, sort='added', direction='asc',
+                          limit=None, cursor=None, columns=None):
+        """
+        Retrieves a user's movies, filtered, sorted and paged in the database.
+
+        Args:
+            user_id (int): The ID of the user.
+            watch_status (str, optional): The watchlist status to filter by, every status if None.
+            sort (str): One of SORT_KEYS ('added', 'title', 'year', 'rating', 'user_rating').
+            direction (str): 'asc' or 'desc'.
+            limit (int, optional): The page size; the whole list is returned if None.
+            cursor (str, optional): The cursor returned with the previous page.
+            columns (list, optional): Names from USER_MOVIE_COLUMNS to select as plain rows.
+
+        Returns:
+            tuple: A list of (UserMovieRow, movie name, movie poster) tuples (or rows with
+            the requested columns as attributes), and the cursor for the next page (None
+            if this is the last page).
+
+        Raises:
+            ValueError: If the sort key, direction, cursor or a column is invalid.
+        """
+        statement = user_movies_select(user_id, watch_status, sort, direction, limit, cursor,
+                                       columns or ENTRY_COLUMNS, self.sort_keys)
+        with self.engine.connect() as conn:
+            rows, next_cursor = user_movies_page(conn.execute(statement).all(), limit, columns or ENTRY_COLUMNS)
+        if columns is None:
+            rows = [(UserMovieRow(user_id, row.movie_id, row.watchlist_status, row.user_rating),
+                     row.movie_name, row.movie_poster) for row in rows]
+        return rows, next_cursor
+
+    def get_pending_movie_ids(self, user_id):
+        """
+        Retrieves the movies of a user that are still waiting for their details.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            set: The IDs of the pending movies.
+        """
+        with self.engine.connect() as conn:
+            return set(conn.scalars(select(movie_jobs.c.movie_id).where(
+                movie_jobs.c.user_id == user_id, movie_jobs.c.status.in_(('pending', 'running')))))
+
+    def _list_version(self, user_id):
+        """Reads the version of a user's list, 0 if it never changed."""
+        with self.engine.connect() as conn:
+            return conn.scalar(select(list_versions.c.version).where(list_versions.c.user_id == user_id)) or 0
+
+    def _bump_list_versions(self, conn, user_ids):
+        """Bumps the versions of users' lists in the write's transaction, where no trigger does it."""
+        user_ids = sorted(set(user_ids))
+        if self._versions_by_trigger or not user_ids:
+            return
+        statement = self.insert(list_versions).values([{'user_id': user_id, 'version': 1} for user_id in user_ids])
+        conn.execute(statement.on_conflict_do_update(index_elements=[list_versions.c.user_id],
+                                                     set_={'version': list_versions.c.version + 1}))
+
+    def get_movie_stats(self, movie_id):
+        """
+        Retrieves the summary of the users' lists a movie is on, aggregated from users_movies.
+
+        Args:
+            movie_id (int): The ID of the movie.
+
+        Returns:
+            ListStats: The movie's stats, all zeros if it is on no list.
+        """
+        with self.engine.connect() as conn:
+            row = conn.execute(select(*stats_columns()).where(users_movies.c.movie_id == movie_id)).first()
+        return ListStats(*row) if row[0] else EMPTY_STATS
+
+    def get_user_stats(self, user_ids):
+        """
+        Retrieves the summaries of several users' lists, aggregated from users_movies.
+
+        Args:
+            user_ids (iterable): The IDs of the users.
+
+        Returns:
+            dict: The ListStats of each user ID, all zeros for users with an empty list.
+        """
+        user_ids = list(user_ids)
+        stats = dict.fromkeys(user_ids, EMPTY_STATS)
+        with self.engine.connect() as conn:
+            for start in range(0, len(user_ids), 500):
+                rows = conn.execute(select(users_movies.c.user_id, *stats_columns())
+                                    .where(users_movies.c.user_id.in_(user_ids[start:start + 500]))
+                                    .group_by(users_movies.c.user_id))
+                stats.update((row[0], ListStats(*row[1:])) for row in rows)
+        return stats
+
+    def get_recommendations(self, user_id, limit=None):
+        """
+        Retrieves a user's recommendations, as stored by the batch job (flask refresh-recommendations --full).
+
+        Args:
+            user_id (int): The ID of the user.
+            limit (int, optional): The maximum number of recommendations to return.
+
+        Returns:
+            list: (movie_id, movie_name, movie_poster, score) rows, best first.
+        """
+        recommendations = UserRecommendation.__table__
+        statement = select(recommendations.c.movie_id, movies.c.movie_name, movies.c.movie_poster,
+                           recommendations.c.score) \
+            .join_from(recommendations, movies, movies.c.id == recommendations.c.movie_id) \
+            .where(recommendations.c.user_id == user_id).order_by(recommendations.c.rank)
+        with self.engine.connect() as conn:
+            return conn.execute(statement.limit(limit) if limit else statement).all()
+
+    def add_user(self, user):
+        """
+        Adds a new user to the database.
+
+        Args:
+            user (dict): The user's columns, e.g. {'user_name': 'Ada'}.
+        """
+        with self.engine.begin() as conn:
+            conn.execute(insert(users).values(**user))
+
+    def add_movie(self, movie, user_id, watchlist_status, user_rating):
+        """
+        Adds a movie to a user's list.
+
+        Args:
+            movie (dict): A dictionary containing movie data (expected keys: 'movie_name', etc.).
+                A dictionary with only 'movie_name' refers to a movie already in the catalog.
+            user_id (int): The ID of the user.
+            watchlist_status (str): The watchlist status for the movie (e.g., 'watched', 'watching', 'wishlist').
+            user_rating (int, optional): The user's rating for the movie (between 1 and 5).
+
+        Returns:
+            bool: True if the movie was added, False if it was already in the user's list.
+        """
+        return bool(self.add_movies(user_id, [(movie, watchlist_status, user_rating)]))
+
+    def add_movies(self, user_id, items):
+        """
+        Adds movies to a user's list in a single transaction.
+
+        Movies missing from the catalog and the user's list rows are written
+        with INSERT ... ON CONFLICT DO NOTHING, as in SQLiteDataManager.add_movies.
+
+        Args:
+            user_id (int): The ID of the user.
+            items (iterable): (movie, watchlist_status, user_rating) tuples, with movie as in add_movie.
+
+        Returns:
+            list: The IDs of the movies that were added to the user's list.
+        """
+        statements = movie_list_inserts(user_id, items, self.insert)
+        if statements is None:
+            return []
+        insert_movies, select_movie_ids, insert_user_movies = statements
+        with self.engine.begin() as conn:
+            new_movies = conn.execute(*insert_movies).all() if insert_movies is not None else []
+            movie_ids = dict(conn.execute(select_movie_ids).all())
+            added = conn.execute(*insert_user_movies(movie_ids)).all() if movie_ids else []
+            self._bump_list_versions(conn, [user_id] if added else [])
+        for status in {watchlist_status for _, watchlist_status in added}:
+            self.list_cache.invalidate(user_id, status)
+        self._invalidate_pages(None if new_movies else [movie_id for movie_id, _ in added])
+        return [movie_id for movie_id, _ in added]
+
+    def update_movie(self, user_id, movie_id, rating, status):
+        """
+        Updates the watchlist status and rating for a movie in a user's list.
+
+        Args:
+            user_id (int): The ID of the user.
+            movie_id (int): The ID of the movie.
+            rating (int): The new rating for the movie (between 1 and 5).
+            status (str): The new watchlist status for the movie (e.g., 'watched', 'watching', 'wishlist').
+
+        Raises:
+            ValueError: If the rating or the status is invalid (see check_list_update).
+
+        Returns:
+            bool: True if the update was successful, False if the movie is not in the user's list.
+        """
+        check_list_update(rating, status)
+        entry = (users_movies.c.user_id == user_id) & (users_movies.c.movie_id == movie_id)
+        with self.engine.begin() as conn:
+            old_status = conn.execute(select(users_movies.c.watchlist_status).where(entry)).first()
+            if old_status is None:
+                return False
+            conn.execute(update(users_movies).where(entry).values(watchlist_status=status, user_rating=rating))
+            self._bump_list_versions(conn, [user_id])
+        self.list_cache.invalidate(user_id, old_status[0], status)
+        self._invalidate_pages([movie_id])
+        return True
+
+    def delete_movie(self, user_id, movie_id):
+        """
+        Deletes a movie from a user's list.
+
+        Args:
+            user_id (int): The ID of the user.
+            movie_id (int): The ID of the movie.
+
+        Returns:
+            bool: True if the deletion was successful, False if the movie was not in the user's list.
+        """
+        with self.engine.begin() as conn:
+            deleted = conn.execute(delete(users_movies).where(users_movies.c.user_id == user_id,
+                                                              users_movies.c.movie_id == movie_id)
+                                   .returning(users_movies.c.watchlist_status)).first()
+            self._bump_list_versions(conn, [user_id] if deleted else [])
+        if deleted is None:
+            return False
+        self.list_cache.invalidate(user_id, deleted[0])
+        self._invalidate_pages([movie_id])
+        return True
+
+    def update_movies_metadata(self, updates):
+        """
+        Updates the OMDb-provided columns of many movies in one transaction.
+
+        Args:
+            updates (list): Dictionaries holding the movie 'id' and the columns to set
+                (e.g. 'movie_poster', 'movie_director', 'movie_rating').
+        """
+        if not updates:
+            return
+        with self.engine.begin() as conn:
+            owners = self._list_owners(conn, [item['id'] for item in updates])
+            # One executemany per set of updated columns
+            by_columns = sorted(updates, key=sorted)
+            for names, group in groupby(by_columns, key=sorted):
+                names = [name for name in names if name != 'id']
+                statement = update(movies).where(movies.c.id == bindparam('movie_id')) \
+                    .values({name: bindparam(name) for name in names})
+                conn.execute(statement, [{'movie_id': item['id'], **{name: item[name] for name in names}}
+                                         for item in group])
+            self._bump_list_versions(conn, [user_id for user_id, _ in owners])
+        self._invalidate_lists(owners)
+        self._invalidate_pages()
+
+    def add_pending_movie(self, movie_name, user_id, watchlist_status, user_rating):
+        """
+        Adds a movie whose details are not known yet to a user's list.
+
+        The placeholder, the user's entry and the job are written in one
+        transaction. As in SQLiteDataManager.add_pending_movie, a title another
+        request added first gets the user's entry instead, with a job only while
+        it is still pending.
+
+        Args:
+            movie_name (str): The title typed by the user.
+            user_id (int): The ID of the user.
+            watchlist_status (str): The watchlist status for the movie (e.g., 'watched', 'watching', 'wishlist').
+            user_rating (int, optional): The user's rating for the movie (between 1 and 5).
+        """
+        with self.engine.begin() as conn:
+            inserted = conn.scalar(self.insert(movies).values(movie_name=movie_name, **PLACEHOLDER_MOVIE)
+                                   .on_conflict_do_nothing().returning(movies.c.id))
+            movie_id = inserted or conn.scalar(select(movies.c.id)
+                                               .where(movies.c.movie_key == normalize_title(movie_name)))
+            added = conn.scalar(self.insert(users_movies).values(
+                user_id=user_id, movie_id=movie_id, watchlist_status=watchlist_status, user_rating=user_rating)
+                .on_conflict_do_nothing().returning(users_movies.c.movie_id))
+            pending = inserted is not None or conn.scalar(select(movie_jobs.c.id).where(
+                movie_jobs.c.movie_id == movie_id, movie_jobs.c.status.in_(('pending', 'running'))).limit(1)) \
+                is not None
+            if added is not None and pending:
+                conn.execute(insert(movie_jobs).values(user_id=user_id, movie_id=movie_id, created_at=time.time()))
+            self._bump_list_versions(conn, [user_id] if added is not None else [])
+        self.list_cache.invalidate(user_id, watchlist_status)
+        self._invalidate_pages()
+
+    def claim_movie_jobs(self, limit, lease):
+        """
+        Claims queued movie jobs for a worker, with a single UPDATE so no job goes to two workers.
+
+        Args:
+            limit (int): The maximum number of jobs to claim.
+            lease (float): Seconds after which an unfinished claim expires.
+
+        Returns:
+            list: Rows with the job id, user_id, movie_id, movie_name and attempts.
+        """
+        now = time.time()
+        claimable = select(movie_jobs.c.id).where(or_(
+            movie_jobs.c.status == 'pending',
+            (movie_jobs.c.status == 'running') & (movie_jobs.c.claimed_at < now - lease))) \
+            .order_by(movie_jobs.c.id).limit(limit)
+        with self.engine.begin() as conn:
+            claimed = conn.execute(update(movie_jobs).where(movie_jobs.c.id.in_(claimable))
+                                   .values(status='running', attempts=movie_jobs.c.attempts + 1, claimed_at=now)
+                                   .returning(movie_jobs.c.id)).scalars().all()
+            if not claimed:
+                return []
+            return conn.execute(select(movie_jobs.c.id, movie_jobs.c.user_id, movie_jobs.c.movie_id,
+                                       movies.c.movie_name, movie_jobs.c.attempts)
+                                .join_from(movie_jobs, movies, movies.c.id == movie_jobs.c.movie_id)
+                                .where(movie_jobs.c.id.in_(claimed)).order_by(movie_jobs.c.id)).all()
+
+    def complete_movie_job(self, job_id, movie_id, metadata):
+        """
+        Stores the fetched details of a pending movie and marks its job as done.
+
+        Args:
+            job_id (int): The ID of the job.
+            movie_id (int): The ID of the placeholder movie.
+            metadata (dict): The movie columns to set (e.g. 'movie_poster', 'movie_plot'). A 'movie_name'
+                renames the placeholder, or merges it into the catalog movie that already has that title.
+
+        Returns:
+            int: The ID of the movie holding the details.
+        """
+        values = dict(metadata)
+        with self.engine.begin() as conn:
+            owners = self._list_owners(conn, [movie_id])
+            if 'movie_name' in values:
+                values['movie_key'] = normalize_title(values['movie_name'])
+                existing_id = conn.scalar(select(movies.c.id).where(movies.c.movie_key == values['movie_key'],
+                                                                    movies.c.id != movie_id))
+                if existing_id is not None:
+                    self._merge_movie(conn, movie_id, existing_id)
+                    movie_id = existing_id
+                    values = {}
+            if values:
+                conn.execute(update(movies).where(movies.c.id == movie_id).values(**values))
+            conn.execute(update(movie_jobs).where(movie_jobs.c.id == job_id).values(status='done', last_error=None))
+            self._bump_list_versions(conn, [user_id for user_id, _ in owners])
+        self._invalidate_lists(owners)
+        self._invalidate_pages()
+        return movie_id
+
+    def _merge_movie(self, conn, movie_id, into_id):
+        """Moves the list entries and jobs of a placeholder movie to another movie, then deletes it."""
+        entries = select(users_movies.c.user_id, literal(into_id), users_movies.c.watchlist_status,
+                         users_movies.c.user_rating).where(users_movies.c.movie_id == movie_id)
+        conn.execute(self.insert(users_movies).from_select(
+            ['user_id', 'movie_id', 'watchlist_status', 'user_rating'], entries).on_conflict_do_nothing())
+        conn.execute(delete(users_movies).where(users_movies.c.movie_id == movie_id))
+        conn.execute(update(movie_jobs).where(movie_jobs.c.movie_id == movie_id).values(movie_id=into_id))
+        conn.execute(delete(movies).where(movies.c.id == movie_id))
+
+    def retry_movie_job(self, job_id, error, give_up=False):
+        """
+        Records a failed attempt of a movie job.
+
+        Args:
+            job_id (int): The ID of the job.
+            error (str): The error of the attempt.
+            give_up (bool): Mark the job as failed and remove its placeholder movie, as
+                drop_pending_movie does, instead of queueing it again.
+        """
+        if give_up:
+            with self.engine.connect() as conn:
+                movie_id = conn.scalar(select(movie_jobs.c.movie_id).where(movie_jobs.c.id == job_id))
+            if movie_id is not None:
+                self.drop_pending_movie(movie_id, error)
+            return
+        with self.engine.begin() as conn:
+            conn.execute(update(movie_jobs).where(movie_jobs.c.id == job_id).values(status='pending', last_error=error))
+
+    def drop_pending_movie(self, movie_id, error):
+        """
+        Removes a placeholder movie whose details cannot be fetched from the catalog and every user's list.
+
+        Args:
+            movie_id (int): The ID of the placeholder movie.
+            error (str): The reason, kept on the failed jobs.
+        """
+        with self.engine.begin() as conn:
+            owners = self._list_owners(conn, [movie_id])
+            conn.execute(delete(users_movies).where(users_movies.c.movie_id == movie_id))
+            conn.execute(update(movie_jobs).where(movie_jobs.c.movie_id == movie_id, movie_jobs.c.status != 'done')
+                         .values(status='failed', last_error=error))
+            conn.execute(delete(movies).where(movies.c.id == movie_id))
+            self._bump_list_versions(conn, [user_id for user_id, _ in owners])
+        self._invalidate_lists(owners)
+        self._invalidate_pages()
+
+    @staticmethod
+    def _list_owners(conn, movie_ids):
+        """Returns the (user_id, watchlist_status) pairs of the lists holding any of the movies."""
+        owners = []
+        for start in range(0, len(movie_ids), 500):
+            owners += conn.execute(select(users_movies.c.user_id, users_movies.c.watchlist_status)
+                                   .where(users_movies.c.movie_id.in_(movie_ids[start:start + 500]))
+                                   .distinct()).all()
+        return owners
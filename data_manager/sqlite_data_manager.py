@@ -1,5 +1,215 @@
-from data_manager.data_manager_interface import DataManagerInterface
-from data_manager.data_models import db, Movie, User, UserMovie
+import base64
+import json
+import re
+import time
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from config.config_files import ReadRoutingConfig, RecommendationConfig, SQLiteTuningConfig, UserListCacheConfig
+from data_manager.data_manager_interface import DataManagerInterface, check_list_update
+from data_manager.data_models import (db, Movie, MovieJob, MovieStats, StaleRecommendations, User, UserMovie,
+                                      UserListVersion, UserRecommendation, UserStats, PLACEHOLDER_MOVIE)
+from data_manager.read_routing import ReadRouter, read_only_url
+from data_manager.recommendations import refresh_users
+from data_manager.sqlite_tuning import apply_tuning, merge_engine_options
+from data_manager.stats import EMPTY_STATS, STATS_COLUMNS, ListStats
+from data_manager.user_list_cache import UserMovieListCache
+from utils.cache import LRUCache
+from utils.titles import normalize_title
+
+# The keys a movie dictionary needs to be inserted into the catalog
+NEW_MOVIE_KEYS = {'movie_name', *PLACEHOLDER_MOVIE}
+
+# Sort keys accepted by query_user_movies, mapped to the SQL expression to order by
+SORT_KEYS = {
+    'added': lambda: db.literal_column('users_movies.rowid'),
+    'title': lambda: Movie.movie_key,
+    'year': lambda: Movie.release_year,
+    'rating': lambda: Movie.movie_rating,
+    'user_rating': lambda: db.func.coalesce(UserMovie.user_rating, 0),
+}
+
+
+# Columns that can be selected by name, for sparse fieldsets
+MOVIE_COLUMNS = {column.name: column for column in Movie.__table__.columns
+                 if column.name not in ('movie_key', 'enriched_at')}
+USER_MOVIE_COLUMNS = {
+    'movie_id': UserMovie.movie_id,
+    'watchlist_status': UserMovie.watchlist_status,
+    'user_rating': UserMovie.user_rating,
+    **{name: column for name, column in MOVIE_COLUMNS.items() if name != 'id'},
+}
+
+
+def resolved_movies():
+    """Returns the condition leaving out the placeholder movies whose details are still being fetched."""
+    return Movie.id.not_in(db.select(MovieJob.movie_id).where(MovieJob.status.in_(('pending', 'running'))))
+
+
+def columns_for(available, names):
+    """
+    Maps column names to labeled SQL columns.
+
+    Args:
+        available (dict): The selectable columns by name.
+        names (list): The requested names.
+
+    Returns:
+        list: The labeled columns.
+
+    Raises:
+        ValueError: If a name is not selectable.
+    """
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}.")
+    return [available[name].label(name) for name in names]
+
+
+def encode_cursor(sort_value, movie_id):
+    """Encodes the position after a row as an opaque, URL-safe cursor."""
+    return base64.urlsafe_b64encode(json.dumps([sort_value, movie_id]).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """
+    Decodes a cursor made by encode_cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        sort_value, movie_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return sort_value, int(movie_id)
+    except (TypeError, ValueError, UnicodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def user_movies_select(user_id, watch_status=None, sort='added', direction='asc',
+                       limit=None, cursor=None, columns=None, sort_keys=SORT_KEYS):
+    """
+    Builds the statement selecting a page of a user's movies.
+
+    It is shared by the data managers; the arguments are those of
+    SQLiteDataManager.query_user_movies, plus the SQL expressions of the
+    sort keys, and the rows are turned into a page by user_movies_page.
+
+    Raises:
+        ValueError: If the sort key, direction, cursor or a column is invalid.
+    """
+    if sort not in sort_keys:
+        raise ValueError(f"Invalid sort: must be one of {', '.join(sort_keys)}.")
+    if direction not in ('asc', 'desc'):
+        raise ValueError("Invalid direction: must be 'asc' or 'desc'.")
+
+    if columns is None:
+        entities = [UserMovie, Movie.movie_name, Movie.movie_poster]
+    else:
+        entities = columns_for(USER_MOVIE_COLUMNS, columns)
+
+    sort_value = sort_keys[sort]()
+    statement = db.select(*entities, UserMovie.movie_id.label('_movie_id'), sort_value.label('_sort_value')) \
+        .select_from(UserMovie).join(Movie).where(UserMovie.user_id == user_id)
+    if watch_status:
+        statement = statement.where(UserMovie.watchlist_status == watch_status)
+    seek_key = db.tuple_(sort_value, UserMovie.movie_id)
+    if cursor:
+        last_value, last_movie_id = decode_cursor(cursor)
+        last_key = db.tuple_(last_value, last_movie_id)
+        statement = statement.where(seek_key > last_key if direction == 'asc' else seek_key < last_key)
+    order = (db.asc if direction == 'asc' else db.desc)
+    statement = statement.order_by(order(sort_value), order(UserMovie.movie_id))
+    return statement if limit is None else statement.limit(limit + 1)
+
+
+def user_movies_page(rows, limit=None, columns=None):
+    """
+    Turns the rows selected by user_movies_select into a page.
+
+    Returns:
+        tuple: The page's rows and the cursor for the next page (None if this is the last page).
+    """
+    next_cursor = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]._sort_value, rows[-1]._movie_id)
+    if columns is None:
+        rows = [row[:3] for row in rows]
+    return rows, next_cursor
+
+
+def fts_search(connection, query, limit=20, cursor=None):
+    """
+    Runs a full-text search on the ``movies_fts`` index, see SQLiteDataManager.search_movies.
+
+    Args:
+        connection (Connection or Session): Where to run the query.
+        query (str): The search text as typed by the user.
+        limit (int): The maximum number of results to return.
+        cursor (str, optional): The cursor returned with the previous page.
+
+    Returns:
+        tuple: The page's rows and the cursor for the next page (None if this is the last page).
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    words = re.findall(r'\w+', query)
+    if not words:
+        return [], None
+    params = {'match': ' '.join(f'"{word}"*' for word in words), 'limit': limit + 1}
+    rank = 'bm25(movies_fts, 10.0, 3.0, 1.0)'
+    seek = ''
+    if cursor:
+        last_rank, last_id = cursor.split(':')
+        params.update(last_rank=float(last_rank), last_id=int(last_id))
+        seek = f'AND ({rank} > :last_rank OR ({rank} = :last_rank AND movies.id > :last_id))'
+    rows = connection.execute(db.text(
+        f'SELECT movies.id, movies.movie_name, movies.movie_poster, movies.movie_director, '
+        f'movies.release_year, {rank} AS rank '
+        f'FROM movies_fts JOIN movies ON movies.id = movies_fts.rowid '
+        f'WHERE movies_fts MATCH :match {seek} ORDER BY rank, movies.id LIMIT :limit'), params).all()
+    next_cursor = f'{rows[limit - 1].rank!r}:{rows[limit - 1].id}' if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+def movie_list_inserts(user_id, items, insert=sqlite_insert):
+    """
+    Builds the statements adding movies to a user's list, shared by the data managers.
+
+    Args:
+        user_id (int): The ID of the user.
+        items (iterable): (movie, watchlist_status, user_rating) tuples, see SQLiteDataManager.add_movies.
+        insert (callable): The ``insert`` of the database's dialect, which has ON CONFLICT DO NOTHING.
+
+    Returns:
+        tuple: The (statement, rows) inserting the new movies and returning the IDs of those
+        actually inserted (None if every movie is known),
+        the statement selecting the (movie_key, id) pairs of the movies, and a function building
+        the (statement, rows) inserting the list rows from those IDs and returning the
+        (movie_id, watchlist_status) of the added rows; None if there are no items.
+    """
+    entries = {}
+    for movie, watchlist_status, user_rating in items:
+        entries.setdefault(normalize_title(movie['movie_name']), (movie, watchlist_status, user_rating))
+    if not entries:
+        return None
+
+    # The rows of one INSERT need the same columns, whether or not the details came from OMDb
+    new_movies = [{'enriched_at': None, **movie}
+                  for movie, _, _ in entries.values() if movie.keys() >= NEW_MOVIE_KEYS]
+    insert_movies = (insert(Movie).on_conflict_do_nothing().returning(Movie.id), new_movies) \
+        if new_movies else None
+    select_movie_ids = db.select(Movie.movie_key, Movie.id).where(Movie.movie_key.in_(list(entries)))
+
+    def insert_user_movies(movie_ids):
+        rows = [{'user_id': user_id, 'movie_id': movie_ids[key],
+                 'watchlist_status': watchlist_status, 'user_rating': user_rating}
+                for key, (_, watchlist_status, user_rating) in entries.items() if key in movie_ids]
+        statement = insert(UserMovie).on_conflict_do_nothing() \
+            .returning(UserMovie.movie_id, UserMovie.watchlist_status)
+        return statement, rows
+
+    return insert_movies, select_movie_ids, insert_user_movies
+
 
 class SQLiteDataManager(DataManagerInterface):
     """
@@ -8,18 +218,57 @@ class SQLiteDataManager(DataManagerInterface):
     This class provides methods to interact with 
     a SQLite database to manage users and their movie lists.
     """
-    def __init__(self, app):
+    def __init__(self, app, list_cache=None, page_cache=None, read_router=None):
         """
         Initializes the data manager with the Flask application.
 
+        The schema is not created here: run ``flask db-upgrade`` (or
+        data_manager.migrations.setup_schema) before serving requests.
+
         Args:
             app (Flask): The Flask application instance.
+            list_cache (UserMovieListCache, optional): The cache of users' movie lists,
+                an in-process LRU by default.
+            page_cache (PageCache, optional): The cache of rendered pages to invalidate.
+            read_router (ReadRouter, optional): Routes the read methods to a read-only pool;
+                made from ReadRoutingConfig when DB_READ_ROUTING is on.
         """
         self.app = app
         self.db = db # sqlalchemy object from data_models
+        self.list_cache = list_cache or UserMovieListCache(
+            LRUCache(UserListCacheConfig.max_entries, UserListCacheConfig.ttl))
+        self.page_cache = page_cache
+        uri = app.config['SQLALCHEMY_DATABASE_URI']
+        tuned = uri.startswith('sqlite:///') and ':memory:' not in uri
+        if tuned:
+            app.config['SQLALCHEMY_ENGINE_OPTIONS'] = merge_engine_options(
+                app.config.get('SQLALCHEMY_ENGINE_OPTIONS'), SQLiteTuningConfig)
         db.init_app(app) # inizialisation of the db in the app
+        app.extensions['data_manager'] = self # lets CLI commands find the data manager
         with app.app_context():
-            self.db.create_all() # create all the tables
+            if tuned:
+                apply_tuning(self.db.engine, SQLiteTuningConfig) # pragmas for every new connection
+        if read_router is None and ReadRoutingConfig.enabled:
+            read_router = ReadRouter(ReadRoutingConfig.url or read_only_url(uri), SQLiteTuningConfig,
+                                     pool_size=ReadRoutingConfig.pool_size,
+                                     sticky_seconds=ReadRoutingConfig.sticky_seconds)
+        self.read_router = read_router
+        if read_router is not None:
+            read_router.init_app(app, self.db.session)
+
+    @property
+    def read_session(self):
+        """
+        The session the read methods run in.
+
+        It is the read-only pool's when reads are routed, except for a client
+        that just wrote, whose reads stay on the primary (see ReadRouter).
+        Objects that are modified and committed are always loaded from
+        ``self.db.session``.
+        """
+        if self.read_router is None:
+            return self.db.session
+        return self.read_router.read_session(self.db.session)
     
     def get_all_movies(self):
         """
@@ -28,8 +277,81 @@ class SQLiteDataManager(DataManagerInterface):
         Returns:
             list: A list of Movie objects.
         """
-        return self.db.session.query(Movie).all()
+        return self.read_session.query(Movie).all()
+
+    def get_movies_page(self, after_id=None, limit=50, columns=None):
+        """
+        Retrieves one page of the movie catalog using keyset pagination.
+
+        Only the columns needed by the catalog grid are selected, and the
+        page is located with an indexed ``id > after_id`` seek instead of
+        an OFFSET scan, so every page costs the same regardless of how
+        deep into the catalog it is. Placeholders of movies still waiting
+        for their details are left out.
+
+        Args:
+            after_id (int, optional): The ID of the last movie on the previous page.
+            limit (int): The maximum number of movies to return.
+            columns (list, optional): Names from MOVIE_COLUMNS to select,
+                by default id, movie_name and movie_poster.
+
+        Returns:
+            tuple: A list of rows with the columns as attributes (plus id) and the
+            cursor for the next page (None if this is the last page).
+
+        Raises:
+            ValueError: If a column is invalid.
+        """
+        columns = columns or ['id', 'movie_name', 'movie_poster']
+        entities = columns_for(MOVIE_COLUMNS, columns)
+        if 'id' not in columns:
+            entities.append(Movie.id) # needed for the cursor
+        query = self.read_session.query(*entities).filter(resolved_movies())
+        if after_id is not None:
+            query = query.filter(Movie.id > after_id)
+        rows = query.order_by(Movie.id).limit(limit + 1).all()
+        next_cursor = rows[limit - 1].id if len(rows) > limit else None
+        return rows[:limit], next_cursor
     
+    def search_movies(self, query, limit=20, cursor=None):
+        """
+        Full-text searches movie titles, directors and plots.
+
+        Every word of the query must match, and the last characters of a word
+        may be missing (prefix matching), so "matr rev" finds "The Matrix
+        Reloaded" and "The Matrix Revolutions". Results are ranked with BM25,
+        title matches weighing the most, and paged with a (rank, id) keyset
+        cursor.
+
+        Args:
+            query (str): The search text as typed by the user.
+            limit (int): The maximum number of results to return.
+            cursor (str, optional): The cursor returned with the previous page.
+
+        Returns:
+            tuple: A list of (id, movie_name, movie_poster, movie_director, release_year)
+            rows and the cursor for the next page (None if this is the last page).
+
+        Raises:
+            ValueError: If the cursor is malformed.
+        """
+        return fts_search(self.read_session, query, limit, cursor)
+
+    def update_movies_metadata(self, updates):
+        """
+        Updates the OMDb-provided columns of many movies in one transaction.
+
+        Args:
+            updates (list): Dictionaries holding the movie 'id' and the columns to set
+                (e.g. 'movie_poster', 'movie_director', 'movie_rating').
+        """
+        if updates:
+            owners = self._list_owners([update['id'] for update in updates])
+            self.db.session.execute(self.db.update(Movie), updates)
+            self.db.session.commit()
+            self._invalidate_lists(owners)
+            self._invalidate_pages()
+
     def get_movie_by_id(self, movie_id):
         """
         Retrieves a movie by its ID from the database.
@@ -40,11 +362,13 @@ class SQLiteDataManager(DataManagerInterface):
         Returns:
             Movie: A Movie object or None if the movie is not found.
         """
-        return self.db.session.query(Movie).filter(Movie.id == movie_id).first()
+        return self.read_session.query(Movie).filter(Movie.id == movie_id).first()
     
     def get_movie_by_name(self, movie_name):
         """
-        Retrieves a movie by its name from the database (case-insensitive).
+        Retrieves a movie by its name from the database (case and spacing insensitive).
+
+        The lookup goes through the unique index on the normalized movie_key.
 
         Args:
             movie_name (str): The name of the movie.
@@ -52,8 +376,7 @@ class SQLiteDataManager(DataManagerInterface):
         Returns:
             Movie: A Movie object or None if the movie is not found.
         """
-        return self.db.session.query(Movie) \
-            .filter(self.db.func.lower(Movie.movie_name) == self.db.func.lower(movie_name)).first()
+        return self.read_session.query(Movie).filter(Movie.movie_key == normalize_title(movie_name)).first()
     
     def get_movie_by_movie_by_user(self, movie_id, user_id):
         """
@@ -66,7 +389,7 @@ class SQLiteDataManager(DataManagerInterface):
         Returns:
             UserMovie: A UserMovie object or None if the association is not found.
         """
-        return self.db.session.query(UserMovie).filter(UserMovie.movie_id == movie_id, UserMovie.user_id == user_id).first()
+        return self.read_session.query(UserMovie).filter(UserMovie.movie_id == movie_id, UserMovie.user_id == user_id).first()
     
     def get_movie_by_watch_status(self,user_id, watch_status):
         """
@@ -79,8 +402,120 @@ class SQLiteDataManager(DataManagerInterface):
         Returns:
             list: A list of tuples containing UserMovie objects, movie names, and movie posters.
         """
-        return self.db.session.query(UserMovie, Movie.movie_name, Movie.movie_poster) \
-                .filter(UserMovie.user_id == user_id, UserMovie.watchlist_status == watch_status).join(Movie).all()
+        return self.query_user_movies(user_id, watch_status)[0]
+
+    def get_user_by_id(self, user_id):
+        """
+        Retrieves a user by its ID from the database.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            User: A User object or None if the user is not found.
+        """
+        return self.read_session.get(User, user_id)
+
+    def get_users_page(self, after_id=None, limit=50):
+        """
+        Retrieves one page of users using keyset pagination on the ID.
+
+        Args:
+            after_id (int, optional): The ID of the last user on the previous page.
+            limit (int): The maximum number of users to return.
+
+        Returns:
+            tuple: A list of (id, user_name) rows and the cursor
+            for the next page (None if this is the last page).
+        """
+        query = self.read_session.query(User.id, User.user_name)
+        if after_id is not None:
+            query = query.filter(User.id > after_id)
+        rows = query.order_by(User.id).limit(limit + 1).all()
+        next_cursor = rows[limit - 1].id if len(rows) > limit else None
+        return rows[:limit], next_cursor
+
+    def get_movie_stats(self, movie_id):
+        """
+        Retrieves the summary of the users' lists a movie is on.
+
+        The stats are maintained by triggers on every list change,
+        so this is a primary key lookup.
+
+        Args:
+            movie_id (int): The ID of the movie.
+
+        Returns:
+            ListStats: The movie's stats, all zeros if it is on no list.
+        """
+        columns = [getattr(MovieStats, column) for column in STATS_COLUMNS]
+        row = self.read_session.execute(db.select(*columns).where(MovieStats.movie_id == movie_id)).first()
+        return ListStats(*row) if row else EMPTY_STATS
+
+    def get_user_stats(self, user_ids):
+        """
+        Retrieves the summaries of several users' lists.
+
+        Args:
+            user_ids (iterable): The IDs of the users.
+
+        Returns:
+            dict: The ListStats of each user ID, all zeros for users with an empty list.
+        """
+        user_ids = list(user_ids)
+        stats = dict.fromkeys(user_ids, EMPTY_STATS)
+        columns = [getattr(UserStats, column) for column in STATS_COLUMNS]
+        for start in range(0, len(user_ids), 500):
+            rows = self.read_session.execute(db.select(UserStats.user_id, *columns)
+                                           .where(UserStats.user_id.in_(user_ids[start:start + 500])))
+            stats.update((row[0], ListStats(*row[1:])) for row in rows)
+        return stats
+
+    def get_recommendations(self, user_id, limit=None):
+        """
+        Retrieves a user's precomputed movie recommendations.
+
+        If the user's list changed since they were computed, they are
+        first recomputed from the stored movie neighbors.
+
+        Args:
+            user_id (int): The ID of the user.
+            limit (int, optional): The maximum number of recommendations to return.
+
+        Returns:
+            list: (movie_id, movie_name, movie_poster, score) rows, best first.
+        """
+        if self.db.session.get(StaleRecommendations, user_id) is not None:
+            refresh_users(self.db.session.connection(), [user_id], RecommendationConfig.top_n)
+            self.db.session.commit()
+        query = self.read_session.query(UserRecommendation.movie_id, Movie.movie_name, Movie.movie_poster,
+                                        UserRecommendation.score) \
+            .join(Movie, Movie.id == UserRecommendation.movie_id) \
+            .filter(UserRecommendation.user_id == user_id).order_by(UserRecommendation.rank)
+        return query.limit(limit).all() if limit else query.all()
+
+    def refresh_stale_recommendations(self, batch_size=200):
+        """
+        Recomputes the recommendations of every user whose list changed since they were computed.
+
+        Args:
+            batch_size (int): The number of users refreshed per transaction.
+
+        Returns:
+            int: The number of users refreshed.
+        """
+        refreshed = 0
+        after_id = 0
+        while True:
+            user_ids = self.db.session.scalars(
+                db.select(StaleRecommendations.user_id).where(StaleRecommendations.user_id > after_id)
+                .order_by(StaleRecommendations.user_id).limit(batch_size)).all()
+            if not user_ids:
+                return refreshed
+            refresh_users(self.db.session.connection(), user_ids, RecommendationConfig.top_n)
+            self.db.session.commit()
+            refreshed += len(user_ids)
+            after_id = user_ids[-1]
 
     def get_all_users(self):
         """
@@ -89,7 +524,7 @@ class SQLiteDataManager(DataManagerInterface):
         Returns:
             list: A list of User objects.
         """
-        return self.db.session.query(User).all()
+        return self.read_session.query(User).all()
     
     def get_user_movies(self, user_id):
         """
@@ -101,9 +536,36 @@ class SQLiteDataManager(DataManagerInterface):
         Returns:
             list: A list of tuples containing UserMovie objects, movie names, and movie posters.
         """
-        return self.db.session.query(UserMovie, Movie.movie_name, Movie.movie_poster) \
-            .filter(UserMovie.user_id == user_id) \
-            .join(Movie).all()
+        return self.query_user_movies(user_id)[0]
+
+    def query_user_movies(self, user_id, watch_status=None, sort='added', direction='asc',
+                          limit=None, cursor=None, columns=None):
+        """
+        Retrieves a user's movies, filtered, sorted and paged in the database.
+
+        Pages are located with a (sort value, movie_id) keyset seek, so a page
+        deep into a long list costs the same as the first one.
+
+        Args:
+            user_id (int): The ID of the user.
+            watch_status (str, optional): The watchlist status to filter by, every status if None.
+            sort (str): One of SORT_KEYS ('added', 'title', 'year', 'rating', 'user_rating').
+            direction (str): 'asc' or 'desc'.
+            limit (int, optional): The page size; the whole list is returned if None.
+            cursor (str, optional): The cursor returned with the previous page.
+            columns (list, optional): Names from USER_MOVIE_COLUMNS to select as plain rows,
+                instead of hydrating UserMovie objects.
+
+        Returns:
+            tuple: A list of tuples containing UserMovie objects, movie names and movie posters
+            (or rows with the requested columns as attributes), and the cursor for the next
+            page (None if this is the last page).
+
+        Raises:
+            ValueError: If the sort key, direction, cursor or a column is invalid.
+        """
+        statement = user_movies_select(user_id, watch_status, sort, direction, limit, cursor, columns)
+        return user_movies_page(self.read_session.execute(statement).all(), limit, columns)
     
     def add_user(self, user):
         user_data = User(**user)
@@ -116,33 +578,46 @@ class SQLiteDataManager(DataManagerInterface):
 
         Args:
             movie (dict): A dictionary containing movie data (expected keys: 'movie_name', etc.).
+                A dictionary with only 'movie_name' refers to a movie already in the catalog.
             user_id (int): The ID of the user.
             watchlist_status (str): The watchlist status for the movie (e.g., 'watched', 'watching', 'wishlist').
             user_rating (int, optional): The user's rating for the movie (between 1 and 5).
 
         Returns:
-            None
+            bool: True if the movie was added, False if it was already in the user's list.
         """
-        existing_movie = self.db.session.query(Movie).filter_by(movie_name=movie['movie_name']).first()
-        movie_data = Movie(**movie)
+        return bool(self.add_movies(user_id, [(movie, watchlist_status, user_rating)]))
 
-        if existing_movie:
-            # Check if the user has already added this movie
-            existing_user_movie = self.db.session.query(UserMovie).filter_by(user_id=user_id, movie_id=existing_movie.id).first()
-            movie_id = existing_movie.id # if the movie alredy exists
+    def add_movies(self, user_id, items):
+        """
+        Adds movies to a user's list in a single transaction.
 
-            if existing_user_movie:
-                # Movie already added by the user
-                return
-        else:
-            self.db.session.add(movie_data)
-            self.db.session.commit()
-            movie_id = movie_data.id # if the movie was added to the database
+        Movies missing from the catalog and the user's list rows are written
+        with INSERT ... ON CONFLICT DO NOTHING, so a title added concurrently
+        by another request never trips the unique constraints, and movies
+        already in the user's list are left as they are.
+
+        Args:
+            user_id (int): The ID of the user.
+            items (iterable): (movie, watchlist_status, user_rating) tuples, with movie as in add_movie.
+
+        Returns:
+            list: The IDs of the movies that were added to the user's list.
+        """
+        statements = movie_list_inserts(user_id, items)
+        if statements is None:
+            return []
+        insert_movies, select_movie_ids, insert_user_movies = statements
+        session = self.db.session
+        new_movies = session.execute(*insert_movies).all() if insert_movies is not None else []
+        movie_ids = dict(session.execute(select_movie_ids).all())
+        added = session.execute(*insert_user_movies(movie_ids)).all() if movie_ids else []
+        session.commit()
+        for status in {watchlist_status for _, watchlist_status in added}:
+            self.list_cache.invalidate(user_id, status)
+        self._invalidate_pages(None if new_movies else [movie_id for movie_id, _ in added])
+        return [movie_id for movie_id, _ in added]
 
-        user_movie_data = UserMovie(user_id=user_id, movie_id=movie_id, watchlist_status=watchlist_status, user_rating=user_rating)
-        self.db.session.add(user_movie_data)
-        self.db.session.commit()
-    
     def update_movie(self, user_id, movie_id, rating, status):
         """
         Updates the watchlist status and rating for a movie in a user's list.
@@ -159,19 +634,19 @@ class SQLiteDataManager(DataManagerInterface):
         Returns:
             bool: True if the update was successful, False otherwise.
         """
-        if not isinstance(rating, int) or int(rating) <= 1 or int(rating) >= 5:
-            raise ValueError("Invalid rating: Rating must be an integer between 1 and 5.")
-
-        if status not in ('watched', 'watching', 'wishlist'):
-            raise ValueError("Invalid status: Status must be 'watched', 'watching', or 'wishlist'.")
+        check_list_update(rating, status)
 
         try:
-            user_movie = self.get_movie_by_movie_by_user(movie_id, user_id)
-            print(user_movie)
+            # Loaded from the primary: the object is modified and committed there
+            user_movie = self.db.session.query(UserMovie) \
+                .filter(UserMovie.movie_id == movie_id, UserMovie.user_id == user_id).first()
             if user_movie:
+                old_status = user_movie.watchlist_status
                 user_movie.watchlist_status = status
                 user_movie.user_rating = rating
                 self.db.session.commit()
+                self.list_cache.invalidate(user_id, old_status, status)
+                self._invalidate_pages([movie_id])
                 return True  # Indicate success
             return False  # Indicate failure (movie not found)
         except Exception as e:
@@ -193,5 +668,198 @@ class SQLiteDataManager(DataManagerInterface):
         if movie_to_delete:
             self.db.session.delete(movie_to_delete)
             self.db.session.commit()
+            self.list_cache.invalidate(user_id, movie_to_delete.watchlist_status)
+            self._invalidate_pages([movie_id])
             return True
         return False
+
+    def add_pending_movie(self, movie_name, user_id, watchlist_status, user_rating):
+        """
+        Adds a movie whose details are not known yet to a user's list.
+
+        A placeholder movie, the user's association with it and a job asking
+        a worker to fetch the OMDb details are written in one transaction.
+        The placeholder is inserted with ON CONFLICT DO NOTHING, so when
+        another request added the same title first, the user's entry is
+        attached to that movie instead, with a job only if it is still pending.
+
+        Args:
+            movie_name (str): The title typed by the user.
+            user_id (int): The ID of the user.
+            watchlist_status (str): The watchlist status for the movie (e.g., 'watched', 'watching', 'wishlist').
+            user_rating (int, optional): The user's rating for the movie (between 1 and 5).
+        """
+        session = self.db.session
+        inserted = session.scalar(sqlite_insert(Movie).values(movie_name=movie_name, **PLACEHOLDER_MOVIE)
+                                  .on_conflict_do_nothing().returning(Movie.id))
+        movie_id = inserted or session.scalar(self.db.select(Movie.id)
+                                              .where(Movie.movie_key == normalize_title(movie_name)))
+        added = session.scalar(sqlite_insert(UserMovie).values(
+            user_id=user_id, movie_id=movie_id, watchlist_status=watchlist_status, user_rating=user_rating)
+            .on_conflict_do_nothing().returning(UserMovie.movie_id))
+        pending = inserted is not None or session.scalar(self.db.select(MovieJob.id).where(
+            MovieJob.movie_id == movie_id, MovieJob.status.in_(('pending', 'running'))).limit(1)) is not None
+        if added is not None and pending:
+            session.add(MovieJob(user_id=user_id, movie_id=movie_id, created_at=time.time()))
+        session.commit()
+        self.list_cache.invalidate(user_id, watchlist_status)
+        self._invalidate_pages()
+
+    def get_pending_movie_ids(self, user_id):
+        """
+        Retrieves the movies of a user that are still waiting for their details.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            set: The IDs of the pending movies.
+        """
+        rows = self.read_session.query(MovieJob.movie_id) \
+            .filter(MovieJob.user_id == user_id, MovieJob.status.in_(('pending', 'running'))).all()
+        return {row.movie_id for row in rows}
+
+    def _list_version(self, user_id):
+        """
+        Reads the version of a user's list, bumped by triggers on every change to it.
+
+        It is read on the primary, since a replica may not have the latest
+        change yet.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            int: The version, 0 if the list never changed.
+        """
+        return self.db.session.scalar(self.db.select(UserListVersion.version)
+                                      .where(UserListVersion.user_id == user_id)) or 0
+
+    def claim_movie_jobs(self, limit, lease):
+        """
+        Claims queued movie jobs for a worker.
+
+        Jobs are claimed with a single UPDATE, so concurrent workers never get
+        the same job. A job that was claimed more than ``lease`` seconds ago and
+        never finished (e.g. the worker crashed) can be claimed again.
+
+        Args:
+            limit (int): The maximum number of jobs to claim.
+            lease (float): Seconds after which an unfinished claim expires.
+
+        Returns:
+            list: Rows with the job id, user_id, movie_id, movie_name and attempts.
+        """
+        now = time.time()
+        claimable = self.db.select(MovieJob.id).where(self.db.or_(
+            MovieJob.status == 'pending',
+            self.db.and_(MovieJob.status == 'running', MovieJob.claimed_at < now - lease))) \
+            .order_by(MovieJob.id).limit(limit)
+        claimed = self.db.session.execute(
+            self.db.update(MovieJob).where(MovieJob.id.in_(claimable))
+            .values(status='running', attempts=MovieJob.attempts + 1, claimed_at=now)
+            .returning(MovieJob.id)).scalars().all()
+        self.db.session.commit()
+        if not claimed:
+            return []
+        return self.db.session.query(MovieJob.id, MovieJob.user_id, MovieJob.movie_id,
+                                     Movie.movie_name, MovieJob.attempts) \
+            .join(Movie, Movie.id == MovieJob.movie_id) \
+            .filter(MovieJob.id.in_(claimed)).order_by(MovieJob.id).all()
+
+    def complete_movie_job(self, job_id, movie_id, metadata):
+        """
+        Stores the fetched details of a pending movie and marks its job as done.
+
+        Args:
+            job_id (int): The ID of the job.
+            movie_id (int): The ID of the placeholder movie.
+            metadata (dict): The movie columns to set (e.g. 'movie_poster', 'movie_plot'). A 'movie_name'
+                renames the placeholder, or merges it into the catalog movie that already has that title.
+
+        Returns:
+            int: The ID of the movie holding the details.
+        """
+        owners = self._list_owners([movie_id])
+        values = dict(metadata)
+        if 'movie_name' in values:
+            values['movie_key'] = normalize_title(values['movie_name'])
+            existing_id = self.db.session.scalar(self.db.select(Movie.id).where(
+                Movie.movie_key == values['movie_key'], Movie.id != movie_id))
+            if existing_id is not None:
+                self._merge_movie(movie_id, existing_id)
+                movie_id = existing_id
+                values = {}
+        if values:
+            self.db.session.execute(self.db.update(Movie).where(Movie.id == movie_id).values(**values))
+        self.db.session.execute(self.db.update(MovieJob).where(MovieJob.id == job_id)
+                                .values(status='done', last_error=None))
+        self.db.session.commit()
+        self._invalidate_lists(owners)
+        self._invalidate_pages()
+        return movie_id
+
+    def _merge_movie(self, movie_id, into_id):
+        """Moves the list entries and jobs of a placeholder movie to another movie, then deletes it."""
+        entries = self.db.select(UserMovie.user_id, self.db.literal(into_id), UserMovie.watchlist_status,
+                                 UserMovie.user_rating).where(UserMovie.movie_id == movie_id)
+        # Users who already have the movie keep their own entry
+        self.db.session.execute(sqlite_insert(UserMovie).from_select(
+            ['user_id', 'movie_id', 'watchlist_status', 'user_rating'], entries).on_conflict_do_nothing())
+        self.db.session.execute(self.db.delete(UserMovie).where(UserMovie.movie_id == movie_id))
+        self.db.session.execute(self.db.update(MovieJob).where(MovieJob.movie_id == movie_id)
+                                .values(movie_id=into_id))
+        self.db.session.execute(self.db.delete(Movie).where(Movie.id == movie_id))
+
+    def retry_movie_job(self, job_id, error, give_up=False):
+        """
+        Records a failed attempt of a movie job.
+
+        Args:
+            job_id (int): The ID of the job.
+            error (str): The error of the attempt.
+            give_up (bool): Mark the job as failed and remove its placeholder movie, as
+                drop_pending_movie does, instead of queueing it again.
+        """
+        if give_up:
+            movie_id = self.db.session.scalar(self.db.select(MovieJob.movie_id).where(MovieJob.id == job_id))
+            if movie_id is not None:
+                self.drop_pending_movie(movie_id, error)
+            return
+        self.db.session.execute(self.db.update(MovieJob).where(MovieJob.id == job_id)
+                                .values(status='pending', last_error=error))
+        self.db.session.commit()
+
+    def drop_pending_movie(self, movie_id, error):
+        """
+        Removes a placeholder movie whose details cannot be fetched from the catalog and every user's list.
+
+        Args:
+            movie_id (int): The ID of the placeholder movie.
+            error (str): The reason, kept on the failed jobs.
+        """
+        owners = self._list_owners([movie_id])
+        self.db.session.query(UserMovie).filter(UserMovie.movie_id == movie_id).delete()
+        self.db.session.query(Movie).filter(Movie.id == movie_id).delete()
+        self.db.session.execute(self.db.update(MovieJob)
+                                .where(MovieJob.movie_id == movie_id, MovieJob.status != 'done')
+                                .values(status='failed', last_error=error))
+        self.db.session.commit()
+        self._invalidate_lists(owners)
+        self._invalidate_pages()
+
+    def _list_owners(self, movie_ids):
+        """
+        Finds the cached lists that contain any of the given movies.
+
+        Args:
+            movie_ids (list): The IDs of the movies about to change.
+
+        Returns:
+            list: (user_id, watchlist_status) pairs.
+        """
+        owners = []
+        for start in range(0, len(movie_ids), 500):
+            owners += self.db.session.query(UserMovie.user_id, UserMovie.watchlist_status) \
+                .filter(UserMovie.movie_id.in_(movie_ids[start:start + 500])).distinct().all()
+        return owners
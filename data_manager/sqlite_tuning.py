@@ -0,0 +1,95 @@
+from sqlalchemy import event
+
+
+def tuning_pragmas(profile, read_only=False):
+    """
+    Builds the PRAGMA statements of a tuning profile.
+
+    Args:
+        profile (SQLiteTuningConfig): The tuning profile.
+        read_only (bool): For read-only connections: the journal mode and
+            synchronous level, which a read-only connection cannot or need
+            not set, are left out, and writes are refused.
+
+    Returns:
+        list: The PRAGMA statements, in the order they must run.
+    """
+    if read_only:
+        writer_pragmas = ['PRAGMA query_only = ON']
+    else:
+        writer_pragmas = [f'PRAGMA journal_mode = {profile.journal_mode}',
+                          f'PRAGMA synchronous = {profile.synchronous}']
+    return writer_pragmas + [
+        f'PRAGMA busy_timeout = {int(profile.busy_timeout)}',
+        f'PRAGMA mmap_size = {int(profile.mmap_size)}',
+        f'PRAGMA cache_size = {int(profile.cache_size)}',
+        f'PRAGMA temp_store = {profile.temp_store}',
+    ]
+
+
+def engine_options(profile):
+    """
+    Builds the SQLAlchemy engine options matching a tuning profile.
+
+    SQLite allows one writer at a time, so a small pool of long-lived
+    connections is enough; the pysqlite ``timeout`` mirrors the busy timeout,
+    and ``check_same_thread`` is off because pooled connections move between
+    the threads of a threaded server.
+
+    Args:
+        profile (SQLiteTuningConfig): The tuning profile.
+
+    Returns:
+        dict: Keyword arguments for ``create_engine`` (SQLALCHEMY_ENGINE_OPTIONS).
+    """
+    if not profile.enabled:
+        return {}
+    return {
+        'pool_size': profile.pool_size,
+        'max_overflow': profile.max_overflow,
+        'connect_args': {'timeout': profile.busy_timeout / 1000, 'check_same_thread': False},
+    }
+
+
+def merge_engine_options(options, profile):
+    """
+    Adds the engine options of a tuning profile to options set by the application.
+
+    The application's options win, key by key, and so do its ``connect_args``,
+    which are merged with the profile's rather than replacing them; an
+    application setting only ``pool_pre_ping`` still gets the tuned pool.
+
+    Args:
+        options (dict): The SQLALCHEMY_ENGINE_OPTIONS set by the application, or None.
+        profile (SQLiteTuningConfig): The tuning profile.
+
+    Returns:
+        dict: The merged engine options.
+    """
+    defaults = engine_options(profile)
+    options = options or {}
+    merged = {**defaults, **options}
+    if 'connect_args' in defaults and 'connect_args' in options:
+        merged['connect_args'] = {**defaults['connect_args'], **options['connect_args']}
+    return merged
+
+
+def apply_tuning(engine, profile, read_only=False):
+    """
+    Runs the profile's PRAGMAs on every new connection of an engine.
+
+    Args:
+        engine (Engine): A SQLite engine.
+        profile (SQLiteTuningConfig): The tuning profile.
+        read_only (bool): The engine only reads, see tuning_pragmas.
+    """
+    if not profile.enabled or engine.dialect.name != 'sqlite':
+        return
+    pragmas = tuning_pragmas(profile, read_only)
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
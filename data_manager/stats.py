@@ -0,0 +1,115 @@
+"""
+Summary statistics of the users' lists.
+
+``movie_stats`` and ``user_stats`` hold, per movie and per user, the
+number of list entries, of ratings and their sum, and of entries in each
+watchlist status. SQLite triggers on ``users_movies`` update them in the
+same transaction as every insert, update and delete, whichever code path
+makes it (the data managers, the bulk import, a migration or a manual
+query), so reading the stats of a movie or a user is a primary key lookup
+instead of an aggregate over the whole list.
+
+The triggers add two small UPSERTs to every write to ``users_movies``.
+``INSERT OR REPLACE`` into ``users_movies`` does not fire the delete
+trigger for the replaced row unless ``PRAGMA recursive_triggers`` is on,
+so the app never writes the table that way; if the stats ever drift,
+``flask rebuild-stats`` recomputes them from scratch.
+"""
+
+from collections import namedtuple
+import click
+from flask.cli import with_appcontext
+from data_manager.data_models import db
+
+STATS_TABLES = {'movie_stats': 'movie_id', 'user_stats': 'user_id'}
+STATS_COLUMNS = ('list_count', 'rating_count', 'rating_sum', 'watched_count', 'watching_count', 'wishlist_count')
+
+
+class ListStats(namedtuple('ListStats', STATS_COLUMNS)):
+    """The stats of a movie or a user, as stored in movie_stats and user_stats."""
+    __slots__ = ()
+
+    @property
+    def average_rating(self):
+        """The average user rating, or None if nobody rated."""
+        return round(self.rating_sum / self.rating_count, 1) if self.rating_count else None
+
+
+EMPTY_STATS = ListStats(*(0 for _ in STATS_COLUMNS))
+
+
+def _deltas(row):
+    """The SQL expressions of a users_movies row's contribution to each stats column."""
+    return ('1',
+            f'coalesce({row}.user_rating, 0) > 0',
+            f'max(coalesce({row}.user_rating, 0), 0)',
+            f"{row}.watchlist_status IS 'watched'",
+            f"{row}.watchlist_status IS 'watching'",
+            f"{row}.watchlist_status IS 'wishlist'")
+
+
+def _add_row(table, key, row, sign):
+    """The statement adding (sign '+') or subtracting (sign '-') a row's contribution to a stats table."""
+    values = ', '.join(f'{sign}({delta})' for delta in _deltas(row))
+    updates = ', '.join(f'{column} = {column} + excluded.{column}' for column in STATS_COLUMNS)
+    return (f"INSERT INTO {table} ({key}, {', '.join(STATS_COLUMNS)}) VALUES ({row}.{key}, {values}) "
+            f"ON CONFLICT ({key}) DO UPDATE SET {updates};")
+
+
+def create_triggers(conn):
+    """
+    Creates the triggers keeping movie_stats and user_stats in sync with users_movies.
+
+    An update subtracts the old row and adds the new one, so it also handles
+    a movie or a user changing. Rows dropping to an empty list are deleted,
+    as is the stats row of a deleted movie or user.
+
+    Args:
+        conn (Connection): A connection inside a transaction.
+    """
+    changes = {
+        'insert': [('new', '+')],
+        'delete': [('old', '-')],
+        'update': [('old', '-'), ('new', '+')],
+    }
+    for operation, rows in changes.items():
+        body = ' '.join(_add_row(table, key, row, sign)
+                        for row, sign in rows for table, key in STATS_TABLES.items())
+        if operation != 'insert':
+            body += ' ' + ' '.join(f'DELETE FROM {table} WHERE {key} = old.{key} AND list_count = 0;'
+                                   for table, key in STATS_TABLES.items())
+        conn.exec_driver_sql(f'CREATE TRIGGER IF NOT EXISTS users_movies_stats_{operation} '
+                             f'AFTER {operation.upper()} ON users_movies BEGIN {body} END')
+    conn.exec_driver_sql('CREATE TRIGGER IF NOT EXISTS movies_stats_delete AFTER DELETE ON movies BEGIN '
+                         'DELETE FROM movie_stats WHERE movie_id = old.id; END')
+    conn.exec_driver_sql('CREATE TRIGGER IF NOT EXISTS users_stats_delete AFTER DELETE ON users BEGIN '
+                         'DELETE FROM user_stats WHERE user_id = old.id; END')
+
+
+def rebuild_stats(conn):
+    """
+    Recomputes movie_stats and user_stats from users_movies.
+
+    Args:
+        conn (Connection): A connection inside a transaction.
+
+    Returns:
+        dict: The number of rows written to each table.
+    """
+    counts = {}
+    sums = ', '.join(f'sum({delta})' for delta in _deltas('users_movies'))
+    for table, key in STATS_TABLES.items():
+        conn.exec_driver_sql(f'DELETE FROM {table}')
+        counts[table] = conn.exec_driver_sql(
+            f"INSERT INTO {table} ({key}, {', '.join(STATS_COLUMNS)}) "
+            f"SELECT {key}, {sums} FROM users_movies GROUP BY {key}").rowcount
+    return counts
+
+
+@click.command('rebuild-stats')
+@with_appcontext
+def rebuild_stats_command():
+    """Recomputes the movie and user list statistics from scratch."""
+    with db.engine.begin() as conn:
+        counts = rebuild_stats(conn)
+    click.echo(', '.join(f'{table}: {count} rows' for table, count in counts.items()))
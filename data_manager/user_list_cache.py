@@ -0,0 +1,119 @@
+import hashlib
+import json
+from collections import namedtuple
+
+# Detached, picklable stand-in for a UserMovie row, with the attributes the templates use
+UserMovieRow = namedtuple('UserMovieRow', ['user_id', 'movie_id', 'watchlist_status', 'user_rating'])
+
+CachedUserMovies = namedtuple('CachedUserMovies', ['user_movies', 'next_cursor', 'pending_movie_ids', 'etag',
+                                                   'version'])
+
+# Bumps the version of a user's list in user_list_versions, for the triggers below
+BUMP_VERSION = ('INSERT INTO user_list_versions (user_id, version) {source} '
+                'ON CONFLICT (user_id) DO UPDATE SET version = version + 1;')
+PENDING = "('pending', 'running')"
+
+
+def create_triggers(conn):
+    """
+    Creates the triggers bumping a user's list version whenever a cached list of theirs may change.
+
+    That is when a row of their list changes, when a movie on it is renamed
+    or gets a poster, and when one of their movie jobs stops or starts
+    pending.
+
+    Args:
+        conn (Connection): A connection inside a transaction.
+    """
+    bump = {row: BUMP_VERSION.format(source=f'VALUES ({row}.user_id, 1)') for row in ('old', 'new')}
+    changes = {'insert': [bump['new']], 'delete': [bump['old']], 'update': [bump['old'], bump['new']]}
+    for operation, statements in changes.items():
+        conn.exec_driver_sql(f'CREATE TRIGGER IF NOT EXISTS users_movies_version_{operation} '
+                             f"AFTER {operation.upper()} ON users_movies BEGIN {' '.join(statements)} END")
+    conn.exec_driver_sql(
+        'CREATE TRIGGER IF NOT EXISTS movies_version_update AFTER UPDATE OF movie_name, movie_poster ON movies '
+        'WHEN old.movie_name IS NOT new.movie_name OR old.movie_poster IS NOT new.movie_poster BEGIN '
+        + BUMP_VERSION.format(source='SELECT user_id, 1 FROM users_movies WHERE movie_id = new.id') + ' END')
+    conn.exec_driver_sql(
+        'CREATE TRIGGER IF NOT EXISTS movie_jobs_version_update AFTER UPDATE OF status ON movie_jobs '
+        f'WHEN (old.status IN {PENDING}) != (new.status IN {PENDING}) BEGIN {bump["new"]} END')
+    conn.exec_driver_sql('CREATE TRIGGER IF NOT EXISTS users_version_delete AFTER DELETE ON users BEGIN '
+                         'DELETE FROM user_list_versions WHERE user_id = old.id; END')
+
+
+class UserMovieListCache:
+    """
+    Read-through cache of users' movie lists, keyed by (user_id, watch_status).
+
+    The data manager invalidates the affected keys whenever it changes a
+    user's list, and each entry carries an ETag, so an unchanged list can be
+    answered with 304 Not Modified without querying the database. Only the
+    first page in the default order is cached, since every visit starts there.
+
+    An invalidation only reaches the cache of the process that made the
+    change, so each entry also records the version of the list it was read
+    at (see user_list_versions), and is only served while that version is
+    the latest.
+    """
+    def __init__(self, backend):
+        """
+        Initializes the cache.
+
+        Args:
+            backend (CacheBackend): The storage for the cached lists.
+        """
+        self.backend = backend
+
+    @staticmethod
+    def key(user_id, watch_status=None):
+        """Returns the cache key of a user's list, None meaning every status."""
+        return f'user_movies:{user_id}:{watch_status or "*"}'
+
+    def get(self, user_id, watch_status=None):
+        """
+        Retrieves a cached list.
+
+        Args:
+            user_id (int): The ID of the user.
+            watch_status (str, optional): The watchlist status the list is filtered by.
+
+        Returns:
+            CachedUserMovies: The cached list, or None on a cache miss.
+        """
+        return self.backend.get(self.key(user_id, watch_status))
+
+    def set(self, user_id, watch_status, user_movies, next_cursor, pending_movie_ids, version=None):
+        """
+        Caches a list.
+
+        Args:
+            user_id (int): The ID of the user.
+            watch_status (str, optional): The watchlist status the list is filtered by.
+            user_movies (list): (UserMovie, movie_name, movie_poster) tuples.
+            next_cursor (str, optional): The cursor of the following page.
+            pending_movie_ids (set): The IDs of the movies still waiting for their details.
+            version (int, optional): The version of the list, read before the list was.
+
+        Returns:
+            CachedUserMovies: The cached entry.
+        """
+        rows = [(UserMovieRow(user_movie.user_id, user_movie.movie_id,
+                              user_movie.watchlist_status, user_movie.user_rating),
+                 movie_name, movie_poster)
+                for user_movie, movie_name, movie_poster in user_movies]
+        digest = hashlib.sha1(json.dumps([rows, next_cursor, sorted(pending_movie_ids)]).encode()).hexdigest()
+        entry = CachedUserMovies(rows, next_cursor, frozenset(pending_movie_ids), digest, version)
+        self.backend.set(self.key(user_id, watch_status), entry)
+        return entry
+
+    def invalidate(self, user_id, *watch_statuses):
+        """
+        Drops the cached lists of a user that a change may have affected.
+
+        The unfiltered list is always dropped, plus the list of every given status.
+
+        Args:
+            user_id (int): The ID of the user.
+            watch_statuses (str): The watchlist statuses touched by the change.
+        """
+        self.backend.delete(self.key(user_id), *(self.key(user_id, status) for status in watch_statuses if status))
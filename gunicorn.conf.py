@@ -0,0 +1,28 @@
+"""
+gunicorn settings: ``gunicorn -c gunicorn.conf.py wsgi:app``.
+
+The app is loaded once in the master process and the workers are forked
+from it, so they start without importing and configuring it again and
+share its memory copy-on-write. Objects alive at that point are moved out
+of the garbage collector's reach with ``gc.freeze()``, since collections
+touching them would otherwise copy their pages into every worker.
+"""
+
+import gc
+import multiprocessing
+import os
+from app import reset_after_fork
+
+bind = os.getenv('GUNICORN_BIND', '127.0.0.1:8000')
+workers = int(os.getenv('WEB_CONCURRENCY', str(multiprocessing.cpu_count() * 2 + 1)))
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+preload_app = True
+
+
+def when_ready(server):
+    # Runs in the master once the app is loaded, before the first worker is forked
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    reset_after_fork(server.app.wsgi())
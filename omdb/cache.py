@@ -0,0 +1,181 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from config.config_files import OMDbCacheConfig
+from data_manager.data_models import OMDbCacheEntry
+from utils.titles import normalize_title
+
+NOT_FOUND = 'Error: Movie not found!'
+
+
+class OMDbCache:
+    """
+    Two-level cache for OMDb title lookups.
+
+    Parsed responses are kept in a bounded in-process LRU and written through
+    to the ``omdb_cache`` table, so they survive restarts and are shared by
+    every worker using the same database. Keys are normalized titles, and
+    "Movie not found!" answers are cached too (with their own, shorter TTL)
+    so misspelled titles do not hit the API over and over.
+    """
+    def __init__(self, db, max_entries=1024, ttl=7 * 24 * 3600, negative_ttl=24 * 3600):
+        """
+        Initializes the cache.
+
+        Args:
+            db (SQLAlchemy): The Flask-SQLAlchemy object holding the cache table.
+            max_entries (int): Number of entries kept in memory.
+            ttl (int): Seconds a found movie stays cached.
+            negative_ttl (int): Seconds a "not found" answer stays cached.
+        """
+        self.db = db
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries = OrderedDict()  # title key -> (expires_at, parsed response)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, movie_name):
+        """
+        Looks up a cached OMDb response for a title.
+
+        Args:
+            movie_name (str): The movie title as typed by the user.
+
+        Returns:
+            dict or str: The cached parsed response (the OMDb JSON body, or
+            the "Movie not found!" error string), or None on a cache miss.
+        """
+        key = normalize_title(movie_name)
+        now = time.time()
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                if cached[0] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return cached[1]
+                del self._entries[key]
+                self.expirations += 1
+
+        entry = self.db.session.get(OMDbCacheEntry, key)
+        if entry is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        if entry.expires_at <= now:
+            self.db.session.delete(entry)
+            self.db.session.commit()
+            with self._lock:
+                self.expirations += 1
+                self.misses += 1
+            return None
+
+        parsed_resp = json.loads(entry.payload) if entry.payload is not None else NOT_FOUND
+        with self._lock:
+            self.persistent_hits += 1
+            self._remember(key, entry.expires_at, parsed_resp)
+        return parsed_resp
+
+    def put(self, movie_name, parsed_resp):
+        """
+        Stores a parsed OMDb response for a title.
+
+        Only successful lookups and "Movie not found!" answers are cached;
+        transient errors (bad status codes, quota errors) are not.
+
+        Args:
+            movie_name (str): The movie title the lookup was made for.
+            parsed_resp (dict or str): The parsed OMDb response.
+        """
+        if isinstance(parsed_resp, dict):
+            payload, ttl = json.dumps(parsed_resp), self.ttl
+        elif parsed_resp == NOT_FOUND:
+            payload, ttl = None, self.negative_ttl
+        else:
+            return
+
+        key = normalize_title(movie_name)
+        expires_at = time.time() + ttl
+        self.db.session.merge(OMDbCacheEntry(title_key=key, payload=payload, expires_at=expires_at))
+        self.db.session.commit()
+        with self._lock:
+            self._remember(key, expires_at, parsed_resp)
+
+    def purge_expired(self):
+        """
+        Deletes every expired entry from the persistent cache table.
+
+        Returns:
+            int: The number of deleted rows.
+        """
+        deleted = self.db.session.query(OMDbCacheEntry) \
+            .filter(OMDbCacheEntry.expires_at <= time.time()).delete()
+        self.db.session.commit()
+        return deleted
+
+    def iter_titles(self, batch_size=1000):
+        """
+        Iterates over the titles of the movies found in the persistent cache table.
+
+        Args:
+            batch_size (int): Rows fetched at a time.
+
+        Yields:
+            tuple: The entry's title key and the title OMDb returned, e.g. ('the matrix', 'The Matrix').
+        """
+        rows = self.db.session.query(OMDbCacheEntry.title_key, OMDbCacheEntry.payload) \
+            .filter(OMDbCacheEntry.payload.isnot(None), OMDbCacheEntry.expires_at > time.time()) \
+            .yield_per(batch_size)
+        for title_key, payload in rows:
+            title = json.loads(payload).get('Title')
+            if title:
+                yield title_key, title
+
+    def stats(self):
+        """
+        Returns the cache counters for monitoring.
+
+        Returns:
+            dict: Hit, miss, eviction and expiration counts and the in-memory size.
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'persistent_hits': self.persistent_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+            }
+
+    def _remember(self, key, expires_at, parsed_resp):
+        """Adds an entry to the in-memory LRU, evicting the oldest if full. Caller holds the lock."""
+        self._entries[key] = (expires_at, parsed_resp)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+
+def create_cache(db):
+    """
+    Creates an OMDb cache from the OMDb cache configuration.
+
+    Args:
+        db (SQLAlchemy): The Flask-SQLAlchemy object holding the cache table.
+
+    Returns:
+        OMDbCache: The configured cache.
+    """
+    return OMDbCache(db,
+                     max_entries=OMDbCacheConfig.max_entries,
+                     ttl=OMDbCacheConfig.ttl,
+                     negative_ttl=OMDbCacheConfig.negative_ttl)
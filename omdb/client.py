@@ -0,0 +1,206 @@
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from config.config_files import APIkeys, OMDbClientConfig
+from utils.instrumentation import record_external
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Raised without touching the network while the OMDb circuit breaker is open."""
+
+
+def parse_response(resp):
+    """
+    Parses the response from an OMDb request and
+    returns the appropriate data or error message.
+
+    The JSON body is decoded only once.
+
+    Args:
+    resp (requests.Response): The response object
+        from the HTTP request.
+
+    Returns:
+    dict or str: If the response status code is OK
+                and the JSON response indicates success,
+                returns the JSON data.
+                If the JSON response indicates failure,
+                returns an error message.
+                If the response status code is not OK,
+                returns an error message with the status code.
+    """
+    if resp.status_code != requests.codes.ok:
+        return f"Error: {resp.status_code}"
+    body = resp.json()
+    if body.get('Response') == 'False':
+        return f"Error: {body.get('Error')}"
+    return body
+
+
+def movie_from_response(parsed_resp, movie_name):
+    """
+    Maps a successful OMDb response to the columns of a Movie row.
+
+    Args:
+        parsed_resp (dict): The OMDb JSON body.
+        movie_name (str): The title to store for the movie.
+
+    Returns:
+        dict: The movie data, ready for the data manager, with the time of the answer as 'enriched_at'.
+
+    Raises:
+        KeyError: If a required field is missing from the response.
+        ValueError: If the rating cannot be parsed.
+    """
+    rating = 0.0
+    if parsed_resp['Ratings']:
+        rating = float(parsed_resp['Ratings'][0]['Value'].split('/')[0])
+    year_str = parsed_resp['Year'][0:4]
+    year = int(year_str) if year_str.isdigit() else 0
+
+    return {
+        'movie_poster': parsed_resp['Poster'],
+        'movie_name': movie_name,
+        'movie_director': parsed_resp['Director'],
+        'release_year': year,
+        'movie_rating': rating,
+        'movie_plot': parsed_resp['Plot'],
+        'enriched_at': time.time()
+    }
+
+
+class OMDbClient:
+    """
+    HTTP client for the OMDb API.
+
+    The client owns a pooled keep-alive ``requests.Session``, so lookups reuse
+    connections instead of paying TCP and DNS setup each time. Every request
+    has connect/read timeouts and a bounded number of retries with backoff,
+    and a circuit breaker fails fast while the upstream keeps failing.
+    """
+    def __init__(self, api_key, base_url='http://www.omdbapi.com/', connect_timeout=3.05,
+                 read_timeout=10, max_retries=2, backoff_factor=0.3, pool_maxsize=10,
+                 failure_threshold=5, reset_timeout=30):
+        """
+        Initializes the client.
+
+        Args:
+            api_key (str): The OMDb API key.
+            base_url (str): The OMDb endpoint (a local stub server in tests).
+            connect_timeout (float): Seconds to wait for the TCP connection.
+            read_timeout (float): Seconds to wait for the response.
+            max_retries (int): Retries for connection errors and 5xx answers.
+            backoff_factor (float): Exponential backoff factor between retries.
+            pool_maxsize (int): Keep-alive connections kept in the pool.
+            failure_threshold (int): Consecutive failures that open the circuit breaker.
+            reset_timeout (float): Seconds the breaker stays open before a trial request.
+        """
+        self.api_key = api_key
+        self.base_url = base_url
+        self.timeout = (connect_timeout, read_timeout)
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+        retry = Retry(total=max_retries, backoff_factor=backoff_factor,
+                      status_forcelist=(500, 502, 503, 504),
+                      allowed_methods=frozenset(['GET']), raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def lookup(self, movie_name):
+        """
+        Looks up a movie by its exact title.
+
+        Args:
+            movie_name (str): The movie title, URL-encoded by the session.
+
+        Returns:
+            dict or str: The parsed response, see parse_response.
+
+        Raises:
+            CircuitOpenError: If the upstream has been failing and the breaker is open.
+            requests.exceptions.RequestException: If the request fails after all retries.
+        """
+        self._before_request()
+        started = time.perf_counter()
+        try:
+            resp = self.session.get(self.base_url, params={'apikey': self.api_key, 't': movie_name},
+                                    timeout=self.timeout)
+            parsed_resp = parse_response(resp)
+        except requests.exceptions.RequestException:
+            self._record_failure()
+            raise
+        finally:
+            record_external('omdb', time.perf_counter() - started)
+        if resp.status_code >= 500:
+            self._record_failure()
+        else:
+            self._record_success()
+        return parsed_resp
+
+    @property
+    def circuit_open(self):
+        """bool: True while lookups are being rejected without a network call."""
+        with self._lock:
+            return self._opened_at is not None and (
+                self._trial_in_flight or time.monotonic() - self._opened_at < self.reset_timeout)
+
+    def close(self):
+        """Closes the pooled connections."""
+        self.session.close()
+
+    def _before_request(self):
+        """
+        Rejects the request while the breaker is open; lets one trial through once it half-opens.
+
+        Other requests are still rejected while the trial is in flight, until
+        its success closes the breaker or its failure opens it again.
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if self._trial_in_flight or time.monotonic() - self._opened_at < self.reset_timeout:
+                raise CircuitOpenError("OMDb is unavailable, skipping the request")
+            self._trial_in_flight = True
+
+    def _record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+    def _record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+
+def create_client(pool_maxsize=None):
+    """
+    Creates an OMDb client from the OMDb client configuration.
+
+    Args:
+        pool_maxsize (int, optional): Overrides the configured connection pool size.
+
+    Returns:
+        OMDbClient: The configured client.
+    """
+    return OMDbClient(APIkeys.APIkey,
+                      base_url=OMDbClientConfig.base_url,
+                      connect_timeout=OMDbClientConfig.connect_timeout,
+                      read_timeout=OMDbClientConfig.read_timeout,
+                      max_retries=OMDbClientConfig.max_retries,
+                      backoff_factor=OMDbClientConfig.backoff_factor,
+                      pool_maxsize=pool_maxsize or OMDbClientConfig.pool_maxsize,
+                      failure_threshold=OMDbClientConfig.failure_threshold,
+                      reset_timeout=OMDbClientConfig.reset_timeout)
@@ -0,0 +1,170 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import click
+import requests
+from flask import current_app
+from flask.cli import with_appcontext
+from data_manager.data_models import db, Movie
+from omdb.client import CircuitOpenError, create_client, movie_from_response
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket shared by all enrichment threads.
+
+    Requests are spaced so that no more than ``rate`` per second are sent
+    on average, with bursts of at most ``burst`` requests.
+    """
+    def __init__(self, rate, burst=1):
+        """
+        Initializes the limiter.
+
+        Args:
+            rate (float): The allowed requests per second.
+            burst (int): The number of requests that may be sent back to back.
+        """
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Blocks until a request may be sent."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class MovieEnricher:
+    """
+    Refreshes OMDb metadata for catalog movies outside the request path.
+
+    Titles are fetched concurrently by a bounded thread pool, throttled by a
+    global rate limiter, and the results are written back through the data
+    manager in one batched update per page of movies.
+    """
+    def __init__(self, data_manager, client, concurrency=8, rate=10.0):
+        """
+        Initializes the enricher.
+
+        Args:
+            data_manager (SQLiteDataManager): The data manager to write results with.
+            client (OMDbClient): The OMDb client, pooled for at least ``concurrency`` connections.
+            concurrency (int): The number of lookups in flight at once.
+            rate (float): The maximum OMDb requests per second.
+        """
+        self.data_manager = data_manager
+        self.client = client
+        self.concurrency = concurrency
+        self.limiter = RateLimiter(rate, burst=concurrency)
+        self.updated = 0
+        self.not_found = 0
+        self.failed = 0
+
+    def enrich(self, movies):
+        """
+        Fetches and stores fresh metadata for a batch of movies.
+
+        Args:
+            movies (list): (id, movie_name) rows.
+
+        Raises:
+            CircuitOpenError: If OMDb stopped answering, so the run should stop. The answers
+                received before are stored first.
+        """
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            results = list(executor.map(self._fetch, [movie_name for _, movie_name in movies]))
+
+        updates = []
+        circuit_open = None
+        for (movie_id, movie_name), parsed_resp in zip(movies, results):
+            if isinstance(parsed_resp, CircuitOpenError):
+                # Skipped without a request: left for the next run
+                circuit_open = parsed_resp
+                continue
+            if parsed_resp == 'Error: Movie not found!':
+                # OMDb answered: the title is not asked for again unless every movie is refreshed
+                self.not_found += 1
+                updates.append({'id': movie_id, 'enriched_at': time.time()})
+                continue
+            if not isinstance(parsed_resp, dict):
+                self.failed += 1
+                continue
+            try:
+                movie = movie_from_response(parsed_resp, movie_name)
+            except (KeyError, ValueError):
+                self.failed += 1
+                continue
+            del movie['movie_name']
+            updates.append(dict(movie, id=movie_id))
+            self.updated += 1
+
+        self.data_manager.update_movies_metadata(updates)
+        if circuit_open is not None:
+            raise circuit_open
+
+    def _fetch(self, movie_name):
+        """Looks up one title, returning the parsed response or the raised error."""
+        self.limiter.acquire()
+        try:
+            return self.client.lookup(movie_name)
+        except requests.exceptions.RequestException as e:
+            return e
+
+
+def iter_movies(stale_only, batch_size):
+    """
+    Walks the catalog in ID order with keyset pagination.
+
+    Args:
+        stale_only (bool): Only yield movies OMDb was never asked about (see Movie.enriched_at).
+        batch_size (int): The number of movies per batch.
+
+    Yields:
+        list: (id, movie_name) rows.
+    """
+    after_id = 0
+    while True:
+        query = db.session.query(Movie.id, Movie.movie_name).filter(Movie.id > after_id)
+        if stale_only:
+            query = query.filter(Movie.enriched_at.is_(None))
+        rows = query.order_by(Movie.id).limit(batch_size).all()
+        if not rows:
+            return
+        yield [tuple(row) for row in rows]
+        after_id = rows[-1].id
+
+
+@click.command('enrich-movies')
+@click.option('--all', 'refresh_all', is_flag=True, help='Refresh every movie, not only those never enriched.')
+@click.option('--concurrency', default=8, show_default=True, help='Lookups in flight at once.')
+@click.option('--rate', default=10.0, show_default=True, help='Maximum OMDb requests per second.')
+@click.option('--batch-size', default=200, show_default=True, help='Movies written per transaction.')
+@with_appcontext
+def enrich_movies_command(refresh_all, concurrency, rate, batch_size):
+    """Fetches OMDb metadata for catalog movies in the background."""
+    client = create_client(pool_maxsize=concurrency)
+    enricher = MovieEnricher(current_app.extensions['data_manager'], client, concurrency, rate)
+
+    started = time.perf_counter()
+    try:
+        for movies in iter_movies(not refresh_all, batch_size):
+            enricher.enrich(movies)
+            elapsed = time.perf_counter() - started
+            done = enricher.updated + enricher.not_found + enricher.failed
+            click.echo(f'{done} titles processed ({done / elapsed * 60:.0f} titles/min)')
+    except CircuitOpenError:
+        click.echo('OMDb is unavailable, stopping early')
+    finally:
+        client.close()
+
+    click.echo(f'Done: {enricher.updated} updated, {enricher.not_found} not found, {enricher.failed} failed')
@@ -0,0 +1,100 @@
+import time
+import click
+import requests
+from flask import current_app
+from flask.cli import with_appcontext
+from config.config_files import MovieJobConfig
+from data_manager.data_models import db
+from omdb.cache import NOT_FOUND, create_cache
+from omdb.client import create_client, movie_from_response
+
+
+class MovieJobWorker:
+    """
+    Resolves the OMDb details of movies added in asynchronous mode.
+
+    The worker claims jobs from the ``movie_jobs`` table, looks each title up
+    through the OMDb cache and client, and fills in the placeholder movie.
+    Titles OMDb does not know are removed from the users' lists again;
+    transient errors are retried until ``max_attempts`` is reached.
+    """
+    def __init__(self, data_manager, client, cache, max_attempts=5, lease=300):
+        """
+        Initializes the worker.
+
+        Args:
+            data_manager (SQLiteDataManager): The data manager holding the job queue.
+            client (OMDbClient): The OMDb client.
+            cache (OMDbCache): The OMDb response cache.
+            max_attempts (int): Claims of a job before it is marked as failed.
+            lease (float): Seconds after which an unfinished claim expires.
+        """
+        self.data_manager = data_manager
+        self.client = client
+        self.cache = cache
+        self.max_attempts = max_attempts
+        self.lease = lease
+
+    def run_once(self, batch_size=10):
+        """
+        Claims and processes one batch of jobs.
+
+        Args:
+            batch_size (int): The maximum number of jobs to claim.
+
+        Returns:
+            int: The number of jobs processed.
+        """
+        jobs = self.data_manager.claim_movie_jobs(batch_size, self.lease)
+        for job in jobs:
+            self.process(job)
+        return len(jobs)
+
+    def process(self, job):
+        """
+        Resolves one claimed job.
+
+        Args:
+            job: A row with the job id, user_id, movie_id, movie_name and attempts.
+        """
+        try:
+            parsed_resp = self.cache.get(job.movie_name)
+            if parsed_resp is None:
+                parsed_resp = self.client.lookup(job.movie_name)
+                self.cache.put(job.movie_name, parsed_resp)
+        except requests.exceptions.RequestException as e:
+            self.data_manager.retry_movie_job(job.id, str(e), give_up=job.attempts >= self.max_attempts)
+            return
+
+        if parsed_resp == NOT_FOUND:
+            self.data_manager.drop_pending_movie(job.movie_id, f"The movie {job.movie_name} doesn't exist")
+        elif isinstance(parsed_resp, str):
+            self.data_manager.retry_movie_job(job.id, parsed_resp, give_up=job.attempts >= self.max_attempts)
+        else:
+            try:
+                # The movie is stored under OMDb's title, as in synchronous mode, not the typed one
+                movie = movie_from_response(parsed_resp, parsed_resp.get('Title') or job.movie_name)
+            except (KeyError, ValueError) as e:
+                self.data_manager.retry_movie_job(job.id, f"Invalid data in API response: {str(e)}", give_up=True)
+                return
+            self.data_manager.complete_movie_job(job.id, job.movie_id, movie)
+
+
+@click.command('run-movie-jobs')
+@click.option('--once', is_flag=True, help='Process the queued jobs and exit instead of polling.')
+@click.option('--batch-size', default=10, show_default=True, help='Jobs claimed at a time.')
+@with_appcontext
+def run_movie_jobs_command(once, batch_size):
+    """Fetches OMDb details for movies added in asynchronous mode."""
+    worker = MovieJobWorker(current_app.extensions['data_manager'], create_client(), create_cache(db),
+                            max_attempts=MovieJobConfig.max_attempts, lease=MovieJobConfig.lease)
+    processed = 0
+    while True:
+        claimed = worker.run_once(batch_size)
+        processed += claimed
+        if claimed:
+            click.echo(f'{processed} jobs processed')
+        elif once:
+            break
+        else:
+            time.sleep(MovieJobConfig.poll_interval)
@@ -0,0 +1,264 @@
+import hashlib
+import io
+import mimetypes
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import click
+import requests
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy.exc import IntegrityError
+from config.config_files import PosterConfig
+from data_manager.data_models import db, Movie, PosterFile
+
+
+def _pillow():
+    """
+    Imports Pillow on first use, in the download threads rather than at startup.
+
+    Returns:
+        module: PIL.Image, or None if Pillow is not installed (lists then show the original posters).
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    return Image
+
+
+def url_hash(url):
+    """Returns the SHA-1 of a poster URL, the key of its PosterFile row."""
+    return hashlib.sha1(url.encode()).hexdigest()
+
+
+def is_remote(url):
+    """Tells whether a movie_poster value is a URL that can be fetched (and not 'N/A')."""
+    return bool(url) and url.startswith(('http://', 'https://'))
+
+
+class PosterStore:
+    """
+    Local cache of the movie posters hosted by OMDb's image CDN.
+
+    Each poster URL is downloaded once. The original is stored under the
+    SHA-256 of its content, so identical images are only stored once,
+    together with a thumbnail for the lists when Pillow is installed, and
+    a ``poster_files`` row maps the URL to the files. Pages link to
+    ``/posters/<movie_id>?v=<URL hash>``: the URL changes with the poster,
+    so the response can be cached forever by browsers and proxies.
+    Downloads run in a small thread pool, so adding a movie or showing a
+    poster that is not cached yet never waits for the image host.
+    """
+    def __init__(self, app, directory, thumbnail_width=240, max_bytes=5 * 1024 * 1024,
+                 timeout=10, retry_after=3600, workers=2):
+        """
+        Initializes the store.
+
+        Args:
+            app (Flask): The Flask application, whose app context the downloads run in.
+            directory (str): The directory the posters are stored in.
+            thumbnail_width (int): Width in pixels of the thumbnails.
+            max_bytes (int): Largest poster downloaded.
+            timeout (float): Seconds to wait for the image host.
+            retry_after (float): Seconds before a failed download is tried again.
+            workers (int): Background download threads.
+        """
+        self.app = app
+        self.directory = directory
+        self.thumbnail_width = thumbnail_width
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self.session = requests.Session()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='poster-fetch')
+        self._pending = set()  # URL hashes queued or being downloaded
+        self._lock = threading.Lock()
+
+    def original_path(self, content_hash, content_type):
+        """Returns the path of an original poster."""
+        extension = mimetypes.guess_extension(content_type) or '.img'
+        return os.path.join(self.directory, content_hash[:2], content_hash + extension)
+
+    def thumbnail_path(self, content_hash):
+        """Returns the path of a poster's thumbnail."""
+        return os.path.join(self.directory, content_hash[:2], f'{content_hash}-w{self.thumbnail_width}.jpg')
+
+    def find(self, url, thumbnail=True):
+        """
+        Looks up the stored files of a poster URL.
+
+        Args:
+            url (str): The remote poster URL.
+            thumbnail (bool): Prefer the thumbnail to the original.
+
+        Returns:
+            tuple: The (path, MIME type) of the file, or None if the poster is not stored.
+        """
+        entry = db.session.get(PosterFile, url_hash(url))
+        if entry is None or entry.content_hash is None:
+            return None
+        if thumbnail and entry.has_thumbnail:
+            return self.thumbnail_path(entry.content_hash), 'image/jpeg'
+        return self.original_path(entry.content_hash, entry.content_type), entry.content_type
+
+    def prefetch(self, url):
+        """
+        Queues the download of a poster, unless it is stored, failed recently or already queued.
+
+        Args:
+            url (str): The remote poster URL.
+        """
+        if not is_remote(url):
+            return
+        key = url_hash(url)
+        with self._lock:
+            if key in self._pending:
+                return
+            self._pending.add(key)
+        self._executor.submit(self._fetch_in_background, url, key)
+
+    def fetch(self, url):
+        """
+        Downloads and stores a poster, unless it is stored or failed recently.
+
+        Args:
+            url (str): The remote poster URL.
+
+        Returns:
+            bool: True if the poster is stored.
+        """
+        key = url_hash(url)
+        entry = db.session.get(PosterFile, key)
+        if entry is not None and (entry.content_hash or time.time() - entry.fetched_at < self.retry_after):
+            return entry.content_hash is not None
+        if entry is None:
+            entry = PosterFile(url_hash=key, source_url=url)
+            db.session.add(entry)
+
+        try:
+            content_type, content = self._download(url)
+            entry.content_hash = hashlib.sha256(content).hexdigest()
+            entry.content_type = content_type
+            self._write(self.original_path(entry.content_hash, content_type), content)
+            entry.has_thumbnail = self._write_thumbnail(entry.content_hash, content)
+        except (requests.exceptions.RequestException, ValueError, OSError) as e:
+            current_app.logger.warning(f'Could not fetch the poster {url}: {e}')
+            entry.content_hash = None
+        entry.fetched_at = time.time()
+        try:
+            db.session.commit()
+        except IntegrityError:  # another process stored the same URL first
+            db.session.rollback()
+            entry = db.session.get(PosterFile, key)
+        return entry.content_hash is not None
+
+    def shutdown(self):
+        """Waits for the queued downloads and closes the connections."""
+        self._executor.shutdown(wait=True)
+        self.session.close()
+
+    def _fetch_in_background(self, url, key):
+        try:
+            with self.app.app_context():
+                self.fetch(url)
+        except Exception:
+            self.app.logger.exception(f'Poster download failed: {url}')
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+
+    def _download(self, url):
+        """Downloads an image, streaming it so oversized files are cut off early."""
+        with self.session.get(url, timeout=self.timeout, stream=True) as resp:
+            resp.raise_for_status()
+            content_type = resp.headers.get('Content-Type', '').split(';')[0].strip()
+            if not content_type.startswith('image/'):
+                raise ValueError(f'not an image ({content_type or "no content type"})')
+            chunks = []
+            size = 0
+            for chunk in resp.iter_content(64 * 1024):
+                size += len(chunk)
+                if size > self.max_bytes:
+                    raise ValueError(f'larger than {self.max_bytes} bytes')
+                chunks.append(chunk)
+        return content_type, b''.join(chunks)
+
+    def _write(self, path, content):
+        """Writes a file atomically, so a concurrent reader never sees half of it."""
+        if os.path.exists(path):
+            return  # content-addressed: same name, same bytes
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        handle, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(handle, 'wb') as f:
+                f.write(content)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def _write_thumbnail(self, content_hash, content):
+        """Writes a JPEG thumbnail of an image, if Pillow is installed and the image is wider."""
+        Image = _pillow()
+        if Image is None:
+            return False
+        path = self.thumbnail_path(content_hash)
+        if os.path.exists(path):
+            return True
+        try:
+            with Image.open(io.BytesIO(content)) as image:
+                if image.width <= self.thumbnail_width:
+                    return False
+                image.thumbnail((self.thumbnail_width, image.height * self.thumbnail_width // image.width + 1))
+                output = io.BytesIO()
+                image.convert('RGB').save(output, 'JPEG', quality=85, optimize=True)
+        except (OSError, Image.DecompressionBombError) as e:
+            current_app.logger.warning(f'Could not make a thumbnail of {content_hash}: {e}')
+            return False
+        self._write(path, output.getvalue())
+        return True
+
+
+def create_poster_store(app):
+    """
+    Creates a poster store from the poster configuration.
+
+    Args:
+        app (Flask): The Flask application instance.
+
+    Returns:
+        PosterStore: The configured store.
+    """
+    directory = PosterConfig.directory or os.path.join(os.getcwd(), 'data', 'posters')
+    return PosterStore(app, directory,
+                       thumbnail_width=PosterConfig.thumbnail_width,
+                       max_bytes=PosterConfig.max_bytes,
+                       timeout=PosterConfig.timeout,
+                       retry_after=PosterConfig.retry_after,
+                       workers=PosterConfig.workers)
+
+
+@click.command('fetch-posters')
+@with_appcontext
+def fetch_posters_command():
+    """Downloads the posters of every catalog movie that are not stored yet."""
+    store = current_app.extensions['poster_store']
+    stored = failed = 0
+    after_id = 0
+    while True:
+        rows = db.session.query(Movie.id, Movie.movie_poster).filter(Movie.id > after_id) \
+            .order_by(Movie.id).limit(200).all()
+        if not rows:
+            break
+        for movie_id, url in rows:
+            if is_remote(url):
+                if store.fetch(url):
+                    stored += 1
+                else:
+                    failed += 1
+        after_id = rows[-1].id
+        click.echo(f'{stored + failed} posters processed')
+    click.echo(f'Done: {stored} stored, {failed} failed')
@@ -0,0 +1,504 @@
+"""
+Local index of known movie titles, consulted before OMDb.
+
+The index holds the titles of the catalog and of the OMDb answers cached
+in ``omdb_cache``. A typed title is resolved to one of them, when it
+clearly names it, without any network I/O:
+
+- exactly, on a match key that ignores case, spacing, punctuation,
+  accents and a leading article, so "the matrix", "The Matrix " and
+  "Matrix" all resolve to "The Matrix";
+- fuzzily, when the trigram similarity (Dice coefficient) of the match
+  keys reaches ``threshold``, no other title comes close, and both
+  titles hold the same numbers. The threshold is high on purpose:
+  "Alien" must not swallow "Aliens". And however similar "Rocky II" and
+  "Rocky III" are, they are two movies.
+
+The same index answers the autocomplete endpoint: titles starting with
+the typed text, completed by fuzzy matches.
+
+Trigram postings are arrays of entry numbers. A query only counts the
+postings of its rarest trigrams (any title similar enough must share one
+of them), then scores the best candidates exactly, so a lookup costs a
+few milliseconds even on a catalog of a million titles. NumPy, when it
+is installed, counts the long postings of a large catalog and looks the
+candidates up in the others with binary searches.
+
+The index is built in a background thread the first time it is used, and
+until then it answers nothing, which only means the lookup goes to the
+OMDb cache and client as before. New catalog movies are picked up every
+``refresh_interval`` seconds through a keyset seek on the movie ID, and
+the app adds the titles it resolves itself right away.
+"""
+
+import bisect
+import heapq
+import re
+import threading
+import time
+import unicodedata
+from array import array
+from collections import Counter, namedtuple
+from itertools import chain
+from flask import current_app
+
+np = None
+
+# A resolved title: movie_id is set for catalog movies, omdb_key for cached OMDb answers
+TitleMatch = namedtuple('TitleMatch', ['title', 'movie_id', 'omdb_key', 'score'])
+
+ARTICLES = ('the', 'a', 'an')
+
+NUMBER_WORDS = {'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6, 'seven': 7, 'eight': 8,
+                'nine': 9, 'ten': 10}
+ROMAN_NUMERAL = re.compile(r'x{0,3}(ix|iv|v?i{0,3})')
+ROMAN_VALUES = {'i': 1, 'v': 5, 'x': 10}
+
+
+def _numpy():
+    """
+    Imports NumPy on first use.
+
+    Returns:
+        module: numpy, or None if it is not installed; postings are then counted in pure Python.
+    """
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            return None
+        np = numpy
+    return np
+
+
+def match_key(title):
+    """
+    Reduces a title to the key titles are matched on.
+
+    Accents, case, punctuation, spacing and a leading article are ignored.
+
+    Args:
+        title (str): A movie title.
+
+    Returns:
+        str: The match key, e.g. "matrix reloaded" for "The Matrix: Reloaded".
+    """
+    folded = unicodedata.normalize('NFKD', title)
+    folded = ''.join(char for char in folded if not unicodedata.combining(char)).casefold()
+    words = re.findall(r'\w+', folded)
+    if len(words) > 1 and words[0] in ARTICLES:
+        words = words[1:]
+    return ' '.join(words)
+
+
+def numbers(key):
+    """
+    Returns the numbers of a match key, which tell sequels and parts apart.
+
+    Args:
+        key (str): A match key.
+
+    Returns:
+        tuple: The numbers written in digits, words or roman numerals up to 39, in order,
+        e.g. (2,) for "godfather part ii" and for "godfather part 2".
+    """
+    found = []
+    for word in key.split():
+        if word.isdigit():
+            found.append(int(word))
+        elif word in NUMBER_WORDS:
+            found.append(NUMBER_WORDS[word])
+        elif ROMAN_NUMERAL.fullmatch(word):
+            values = [ROMAN_VALUES[char] for char in word]
+            found.append(sum(-value if value < following else value
+                             for value, following in zip(values, values[1:] + [0])))
+    return tuple(found)
+
+
+def trigrams(key):
+    """Returns the set of trigrams of a match key, padded so short keys and word edges count."""
+    padded = f'  {key} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def dice(first, second):
+    """Returns the Dice similarity of two trigram sets, between 0 and 1."""
+    return 2 * len(first & second) / (len(first) + len(second)) if first or second else 0.0
+
+
+class TitleIndex:
+    """
+    In-memory exact and trigram index of the catalog titles and the cached OMDb titles.
+    """
+    def __init__(self, threshold=0.85, suggest_threshold=0.45, margin=0.05, refresh_interval=5,
+                 max_scan=200000, max_candidates=200):
+        """
+        Initializes an empty index.
+
+        Args:
+            threshold (float): Smallest similarity a fuzzy match needs to resolve a title.
+            suggest_threshold (float): Smallest similarity of a fuzzy autocomplete suggestion.
+            margin (float): How much better than the runner-up a fuzzy match must be to resolve a title.
+            refresh_interval (float): Seconds between two looks for new catalog movies.
+            max_scan (int): Posting entries counted per query, bounding the cost of vague queries.
+            max_candidates (int): Candidates scored exactly per query.
+        """
+        self.threshold = threshold
+        self.suggest_threshold = suggest_threshold
+        self.margin = margin
+        self.refresh_interval = refresh_interval
+        self.max_scan = max_scan
+        self.max_candidates = max_candidates
+        self.ready = False
+        self._lock = threading.Lock()
+        self._building = False
+        self._refreshed_at = 0.0
+        self._last_movie_id = 0
+        self._titles = []  # entry number -> title
+        self._keys = []  # entry number -> match key
+        self._sizes = array('H')  # entry number -> number of trigrams of the key
+        self._movie_ids = array('q')  # entry number -> movie ID, 0 for OMDb answers
+        self._omdb_keys = {}  # entry number -> omdb_cache key, for OMDb answers
+        self._entries = {}  # match key -> entry number, catalog movies taking precedence
+        self._postings = {}  # trigram -> array of entry numbers
+        self._sorted_keys = []  # match keys in order, for prefix lookups
+        self._sorted_entries = []  # the entry number of each key in _sorted_keys
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Creates an index from a TitleIndexConfig.
+
+        Args:
+            config (TitleIndexConfig): The title index settings.
+
+        Returns:
+            TitleIndex: The new, empty index.
+        """
+        return cls(threshold=config.threshold, suggest_threshold=config.suggest_threshold,
+                   margin=config.margin, refresh_interval=config.refresh_interval)
+
+    def init_app(self, app):
+        """
+        Registers the index in ``app.extensions``.
+
+        Args:
+            app (Flask): The Flask application instance.
+        """
+        app.extensions['title_index'] = self
+
+    def add(self, title, movie_id=None, omdb_key=None):
+        """
+        Adds a title to the index, unless its match key is already taken by a catalog movie.
+
+        Args:
+            title (str): The title to display.
+            movie_id (int, optional): The ID of the catalog movie.
+            omdb_key (str, optional): The omdb_cache key of a cached OMDb answer.
+        """
+        key = match_key(title)
+        if not key or not self.ready:  # a title added while the index is built is found by the next refresh
+            return
+        with self._lock:
+            self._add(title, key, movie_id, omdb_key, keep_sorted=True)
+
+    def load(self, movie_pages, omdb_titles):
+        """
+        Fills the index; meant for a fresh index, see ensure_ready.
+
+        Args:
+            movie_pages (callable): Called with the last movie ID seen, returns the next
+                (movie ID, title) rows of the catalog in ID order, an empty list at the end.
+            omdb_titles (iterable): (omdb_cache key, title) pairs of the cached OMDb answers.
+        """
+        for movie_rows in iter(lambda: movie_pages(self._last_movie_id), []):
+            with self._lock:
+                for movie_id, title in movie_rows:
+                    key = match_key(title)
+                    if key:
+                        self._add(title, key, movie_id, None, keep_sorted=False)
+                    self._last_movie_id = max(self._last_movie_id, movie_id)
+        for omdb_key, title in omdb_titles:
+            key = match_key(title)
+            if key:
+                with self._lock:
+                    self._add(title, key, None, omdb_key, keep_sorted=False)
+        with self._lock:
+            order = sorted(range(len(self._sorted_keys)), key=self._sorted_keys.__getitem__)
+            self._sorted_keys = [self._sorted_keys[i] for i in order]
+            self._sorted_entries = [self._sorted_entries[i] for i in order]
+            self._refreshed_at = time.monotonic()
+            self.ready = True
+        _numpy()  # imported here rather than by the first lookup
+
+    def refresh(self, movie_pages):
+        """
+        Adds the catalog movies created since the last look, at most every refresh_interval seconds.
+
+        Args:
+            movie_pages (callable): See load.
+        """
+        if not self.ready or time.monotonic() - self._refreshed_at < self.refresh_interval:
+            return
+        self._refreshed_at = time.monotonic()
+        for movie_rows in iter(lambda: movie_pages(self._last_movie_id), []):
+            for movie_id, title in movie_rows:
+                self.add(title, movie_id=movie_id)
+                self._last_movie_id = max(self._last_movie_id, movie_id)
+
+    def resolve(self, title):
+        """
+        Resolves a typed title to a known title, if it clearly names one.
+
+        Args:
+            title (str): The title as typed by the user.
+
+        Returns:
+            TitleMatch: The known title, or None.
+        """
+        if not self.ready:
+            return None
+        key = match_key(title)
+        if not key:
+            return None
+        entry = self._entries.get(key)
+        if entry is not None:
+            return self._match(entry, 1.0)
+        # "Rocky II" is as similar to "Rocky III" as to "Rocky 2": titles with other numbers are
+        # other movies, and only count as runner-ups when they are closer than the best match
+        key_numbers = numbers(key)
+        scored = self._fuzzy(key, self.threshold - self.margin, 10)
+        same = [(score, entry) for score, entry in scored if numbers(self._keys[entry]) == key_numbers]
+        if not same or same[0][0] < self.threshold or scored[0][1] != same[0][1]:
+            return None
+        if len(same) > 1 and same[0][0] - same[1][0] < self.margin:
+            return None
+        return self._match(same[0][1], same[0][0])
+
+    def suggest(self, text, limit=10):
+        """
+        Suggests known titles for a partially typed title.
+
+        Args:
+            text (str): The text typed so far.
+            limit (int): The maximum number of suggestions.
+
+        Returns:
+            list: TitleMatch suggestions, the titles starting with the text first.
+        """
+        key = match_key(text)
+        if not self.ready or not key:
+            return []
+        suggestions = []
+        seen = set()
+        with self._lock:
+            start = bisect.bisect_left(self._sorted_keys, key)
+            for position in range(start, min(start + limit, len(self._sorted_keys))):
+                if not self._sorted_keys[position].startswith(key):
+                    break
+                seen.add(self._sorted_entries[position])
+                suggestions.append(self._match(self._sorted_entries[position], 1.0))
+        if len(suggestions) < limit:
+            for score, entry in self._fuzzy(key, self.suggest_threshold, limit):
+                if entry not in seen and len(suggestions) < limit:
+                    suggestions.append(self._match(entry, score))
+        return suggestions
+
+    def stats(self):
+        """
+        Returns the index counters for monitoring.
+
+        Returns:
+            dict: Whether the index is built, and its numbers of titles and trigrams.
+        """
+        return {'ready': self.ready, 'titles': len(self._titles), 'trigrams': len(self._postings),
+                'last_movie_id': self._last_movie_id}
+
+    def _add(self, title, key, movie_id, omdb_key, keep_sorted):
+        """Adds an entry. Caller holds the lock."""
+        existing = self._entries.get(key)
+        if existing is not None and (self._movie_ids[existing] or not movie_id):
+            return  # a catalog movie, or an OMDb answer replaced by nothing better
+        entry = len(self._titles)
+        self._titles.append(title)
+        self._keys.append(key)
+        self._movie_ids.append(movie_id or 0)
+        if omdb_key is not None:
+            self._omdb_keys[entry] = omdb_key
+        self._entries[key] = entry
+        key_trigrams = trigrams(key)
+        self._sizes.append(min(len(key_trigrams), 0xFFFF))
+        for trigram in key_trigrams:
+            postings = self._postings.get(trigram)
+            if postings is None:
+                postings = self._postings[trigram] = array('I')
+            postings.append(entry)
+        if existing is not None:  # the catalog movie replaces the OMDb answer in the prefix lookups
+            self._sizes[existing] = 0xFFFF  # and can no longer be similar enough to anything
+            position = bisect.bisect_left(self._sorted_keys, key)
+            self._sorted_entries[position] = entry
+        elif keep_sorted:
+            position = bisect.bisect_left(self._sorted_keys, key)
+            self._sorted_keys.insert(position, key)
+            self._sorted_entries.insert(position, entry)
+        else:  # sorted by load
+            self._sorted_keys.append(key)
+            self._sorted_entries.append(entry)
+
+    def _fuzzy(self, key, threshold, limit):
+        """
+        Finds the titles whose trigram similarity with a match key reaches a threshold.
+
+        Returns:
+            list: (score, entry number) pairs, best first, at most ``limit``.
+        """
+        query = trigrams(key)
+        postings = sorted((self._postings[trigram] for trigram in query if trigram in self._postings), key=len)
+        # A title with a Dice similarity of at least t shares at least t * n / (2 - t) of the
+        # query's n trigrams, so it is in one of the rarest postings but that many minus one
+        needed = max(1, int(threshold * len(query) / (2 - threshold)))
+        if needed > len(postings):
+            return []
+        selected = []
+        scanned = 0
+        for entries in postings[:len(postings) - needed + 1]:
+            if scanned and scanned + len(entries) > self.max_scan:
+                break
+            selected.append(entries)
+            scanned += len(entries)
+        rest = postings[len(selected):]
+        numpy = _numpy() if scanned > 2000 else None
+        if numpy is None:
+            scored = self._score(selected, rest, query, needed, threshold)
+        else:
+            with self._lock:  # arrays exporting their buffer cannot grow
+                scored = self._score_numpy(numpy, selected, rest, len(query), needed, threshold, limit)
+        return heapq.nlargest(limit, scored, key=lambda item: (item[0], -len(self._titles[item[1]])))
+
+    def _score(self, selected, rest, query, needed, threshold):
+        """
+        Scores the entries of the scanned postings, in pure Python.
+
+        An entry found in ``count`` of them shares at most ``count + len(rest)``
+        trigrams with the query, and at most as many as its key has, which
+        bounds its similarity without looking at its key. The max_candidates
+        entries found most often among those that may reach the threshold
+        are scored on their keys.
+
+        Returns:
+            list: (score, entry number) pairs reaching the threshold.
+        """
+        sizes = self._sizes
+        unscanned = len(rest)
+        found = [(count, entry) for entry, count in Counter(chain.from_iterable(selected)).items()
+                 if count + unscanned >= needed and
+                 2 * min(count + unscanned, sizes[entry]) >= threshold * (len(query) + sizes[entry])]
+        scored = []
+        for _, entry in heapq.nlargest(self.max_candidates, found):
+            candidate_key = self._keys[entry]
+            if self._entries.get(candidate_key) != entry:
+                continue  # replaced by a catalog movie with the same key
+            score = dice(query, trigrams(candidate_key))
+            if score >= threshold:
+                scored.append((score, entry))
+        return scored
+
+    def _score_numpy(self, numpy, selected, rest, query_size, needed, threshold, limit):
+        """
+        Scores the entries of the scanned postings with NumPy. Caller holds the lock.
+
+        Entries are counted by sorting the scanned postings, and the
+        max_candidates found most often are pruned as in _score. Postings hold
+        entry numbers in increasing order, so the number of trigrams the
+        remaining candidates share with the query is completed with binary
+        searches in the other postings, however long they are, and their
+        similarity computed from it.
+
+        Returns:
+            list: At most ``limit`` (score, entry number) pairs reaching the threshold.
+        """
+        entries, counts = numpy.unique(numpy.concatenate([numpy.frombuffer(postings, dtype=numpy.uint32)
+                                                          for postings in selected]), return_counts=True)
+        if len(entries) > self.max_candidates:
+            # Counts are small numbers, with many ties that make argpartition slow: the entries
+            # found most often are those above the count a histogram puts the cutoff at
+            at_least = numpy.cumsum(numpy.bincount(counts)[::-1])[::-1]
+            cutoff = int(numpy.flatnonzero(at_least >= self.max_candidates)[-1])
+            above = numpy.flatnonzero(counts > cutoff)
+            top = numpy.concatenate([above, numpy.flatnonzero(counts == cutoff)[:self.max_candidates - len(above)]])
+            entries, counts = entries[top], counts[top]
+        sizes = numpy.frombuffer(self._sizes, dtype=numpy.uint16)[entries].astype(numpy.int64)
+        bound = numpy.minimum(counts + len(rest), sizes)
+        possible = (bound >= needed) & (2 * bound >= threshold * (query_size + sizes))
+        entries, counts, sizes = entries[possible], counts[possible], sizes[possible]
+        for postings in rest:
+            postings = numpy.frombuffer(postings, dtype=numpy.uint32)
+            counts = counts + (postings[numpy.minimum(numpy.searchsorted(postings, entries), len(postings) - 1)]
+                               == entries)
+        scores = 2 * counts / (query_size + sizes)
+        reached = numpy.flatnonzero(scores >= threshold)
+        if len(reached) > limit * 2:  # ties are broken on the title length by the caller
+            reached = reached[numpy.argpartition(scores[reached], -limit * 2)[-limit * 2:]]
+        return list(zip(scores[reached].tolist(), entries[reached].tolist()))
+
+    def _match(self, entry, score):
+        return TitleMatch(self._titles[entry], self._movie_ids[entry] or None, self._omdb_keys.get(entry),
+                          round(score, 3))
+
+
+def ensure_ready(index, data_manager, omdb_cache, page_size=5000):
+    """
+    Starts building an index in the background the first time it is needed, and keeps it fresh.
+
+    Must be called in an app context; the build pushes one of its own.
+
+    Args:
+        index (TitleIndex): The app's title index.
+        data_manager (DataManagerInterface): The data manager holding the catalog.
+        omdb_cache (OMDbCache): The cache of OMDb answers.
+        page_size (int): Catalog movies read per query.
+
+    Returns:
+        TitleIndex: The index, which may not be ready yet.
+    """
+    def movie_pages(after_id):
+        rows, _ = data_manager.get_movies_page(after_id=after_id, limit=page_size, columns=['id', 'movie_name'])
+        return [(row.id, row.movie_name) for row in rows]
+
+    if index.ready:
+        index.refresh(movie_pages)
+        return index
+    with index._lock:
+        if index._building:
+            return index
+        index._building = True
+    app = current_app._get_current_object()
+
+    def build():
+        started = time.perf_counter()
+        try:
+            with app.app_context():
+                index.load(movie_pages, omdb_cache.iter_titles())
+        except Exception:
+            app.logger.exception('Could not build the title index')
+            with index._lock:
+                index._building = False
+            return
+        app.logger.info(f"Title index built: {index.stats()['titles']} titles in {time.perf_counter() - started:.1f}s")
+
+    threading.Thread(target=build, name='title-index-build', daemon=True).start()
+    return index
+
+
+def current_title_index():
+    """
+    Returns the current app's title index, see ensure_ready.
+
+    Returns:
+        TitleIndex: The index, or None if it is disabled.
+    """
+    index = current_app.extensions.get('title_index')
+    if index is None:
+        return None
+    return ensure_ready(index, current_app.extensions['data_manager'], current_app.extensions['omdb_cache'])
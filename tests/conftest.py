@@ -0,0 +1,73 @@
+"""
+Shared fixtures: the application on a temporary database, and a fresh,
+empty data manager of every storage backend.
+
+- memory: InMemoryDataManager;
+- sqlite: SQLiteDataManager (Flask-SQLAlchemy) on a migrated SQLite file;
+- sql-sqlite: SQLDataManager (SQLAlchemy Core) on a migrated SQLite file;
+- sql-postgresql: SQLDataManager on the database at ``TEST_POSTGRES_URL``,
+  skipped when it is not set. Its tables are dropped and recreated.
+"""
+
+import os
+import pytest
+from flask import Flask
+from app import create_app
+from config.config_files import PosterConfig
+from data_manager.data_models import db
+from data_manager.memory_data_manager import InMemoryDataManager
+from data_manager.migrations import setup_schema
+from data_manager.sql_data_manager import SQLDataManager
+from data_manager.sqlite_data_manager import SQLiteDataManager
+
+BACKENDS = ['memory', 'sqlite', 'sql-sqlite', 'sql-postgresql']
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """The application, made by create_app, on a migrated SQLite file and with posters stored under tmp_path."""
+    monkeypatch.setattr(PosterConfig, 'directory', str(tmp_path / 'posters'))
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'app.sqlite'}", 'TESTING': True},
+                     auto_migrate=True)
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def sqlite_app(tmp_path):
+    """A Flask app with a SQLiteDataManager on a migrated SQLite file, inside an app context."""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'test.sqlite'}"
+    SQLiteDataManager(app)
+    with app.app_context():
+        setup_schema()
+        try:
+            yield app
+        finally:
+            db.session.remove()
+            db.engine.dispose()
+
+
+@pytest.fixture(params=BACKENDS)
+def manager(request, tmp_path):
+    """A fresh, empty data manager of each backend."""
+    if request.param == 'memory':
+        yield InMemoryDataManager()
+    elif request.param == 'sqlite':
+        yield request.getfixturevalue('sqlite_app').extensions['data_manager']
+    elif request.param == 'sql-sqlite':
+        manager = SQLDataManager(f"sqlite:///{tmp_path / 'test.sqlite'}")
+        manager.create_schema()
+        yield manager
+        manager.engine.dispose()
+    else:
+        url = os.getenv('TEST_POSTGRES_URL')
+        if not url:
+            pytest.skip('TEST_POSTGRES_URL is not set')
+        manager = SQLDataManager(url)
+        db.metadata.drop_all(manager.engine)
+        manager.create_schema()
+        yield manager
+        manager.engine.dispose()
@@ -0,0 +1,40 @@
+"""
+Tests of the one-transaction upsert behind add_movie and add_movies, under concurrent writers.
+"""
+
+import threading
+from data_manager.data_models import db
+
+
+def test_concurrent_adds_of_the_same_titles(sqlite_app):
+    data_manager = sqlite_app.extensions['data_manager']
+    for index in range(8):
+        data_manager.add_user({'user_name': f'user{index}'})
+    titles = [f'Title {index}' for index in range(20)]
+    errors = []
+    barrier = threading.Barrier(8)
+
+    def add(user_id):
+        try:
+            with sqlite_app.app_context():
+                barrier.wait()
+                for title in titles:
+                    data_manager.add_movie({'movie_name': title, 'movie_poster': 'N/A', 'movie_director': 'N/A',
+                                            'release_year': 2000, 'movie_rating': 5.0, 'movie_plot': 'N/A'},
+                                           user_id, 'wishlist', None)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=add, args=(user_id,)) for user_id in range(1, 9)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(data_manager.get_all_movies()) == 20
+    assert db.session.execute(db.text('SELECT count(*) FROM users_movies')).scalar() == 160
+    # Adding a movie already on the list is a no-op
+    assert not data_manager.add_movie({'movie_name': 'title 0'}, 1, 'watched', 3)
+    assert data_manager.get_movie_by_movie_by_user(data_manager.get_movie_by_name('Title 0').id, 1) \
+        .watchlist_status == 'wishlist'
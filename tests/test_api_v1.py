@@ -0,0 +1,39 @@
+"""
+Tests of the JSON API (api.v1): keyset paging, sparse fieldsets, ETags and compression.
+"""
+
+import gzip
+import json
+from tests.test_web import add_catalog
+
+
+def test_movies_are_paged_with_the_requested_fields(app):
+    movie_ids = add_catalog(app, 3)
+    client = app.test_client()
+    first = client.get('/api/v1/movies?limit=2&fields=id,movie_name').get_json()
+    assert first['items'] == [{'id': movie_ids[0], 'movie_name': 'Movie 000'},
+                              {'id': movie_ids[1], 'movie_name': 'Movie 001'}]
+    second = client.get(f"/api/v1/movies?limit=2&fields=id&cursor={first['next_cursor']}").get_json()
+    assert second == {'items': [{'id': movie_ids[2]}], 'next_cursor': None}
+
+    response = client.get('/api/v1/movies?fields=id,password')
+    assert response.status_code == 400 and response.get_json() == {'error': 'Unknown fields: password.'}
+    assert client.get('/api/v1/movies?cursor=oops').status_code == 400
+    assert client.get('/api/v1/movies/999').status_code == 404
+
+
+def test_unchanged_responses_are_revalidated_with_a_304(app):
+    add_catalog(app, 1)
+    client = app.test_client()
+    response = client.get('/api/v1/users/1/movies')
+    assert response.headers['Cache-Control'] == 'private, no-cache'
+    assert client.get('/api/v1/users/1/movies', headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+
+
+def test_large_responses_are_compressed(app):
+    add_catalog(app, 40)
+    client = app.test_client()
+    plain = client.get('/api/v1/movies?limit=40')
+    compressed = client.get('/api/v1/movies?limit=40', headers={'Accept-Encoding': 'gzip'})
+    assert compressed.content_encoding == 'gzip' and compressed.headers['ETag'] != plain.headers['ETag']
+    assert json.loads(gzip.decompress(compressed.data)) == plain.get_json()
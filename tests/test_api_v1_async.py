@@ -0,0 +1,70 @@
+"""
+Tests of the async batch add of the JSON API (api.v1_async), with a stub OMDb client.
+"""
+
+import pytest
+import requests
+from omdb.cache import NOT_FOUND
+
+MATRIX = {'Title': 'The Matrix', 'Year': '1999', 'Director': 'Lana Wachowski, Lilly Wachowski',
+          'Plot': 'A hacker learns the truth.', 'Poster': 'N/A', 'Ratings': [{'Value': '8.7/10'}]}
+
+
+class StubClient:
+    def __init__(self, answers):
+        self.answers = answers
+        self.lookups = []
+
+    def lookup(self, movie_name):
+        self.lookups.append(movie_name)
+        answer = self.answers[movie_name]
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+
+@pytest.fixture
+def client(app):
+    with app.app_context():
+        app.extensions['data_manager'].add_user({'user_name': 'ada'})
+    app.extensions['omdb_client'] = StubClient({'the matrix': MATRIX, 'Nowhere': NOT_FOUND,
+                                                'Alien': requests.exceptions.ConnectionError('OMDb is down')})
+    return app.test_client()
+
+
+def test_titles_are_added_at_once(app, client):
+    response = client.post('/api/v1/async/users/1/movies', json={
+        'titles': [' THE  MATRIX ', 'Nowhere', 'Alien', 'the matrix'], 'watchlist_status': 'watched',
+        'user_rating': 5})
+    assert response.status_code == 200
+    assert response.get_json() == {'added': ['the matrix'], 'existing': [], 'not_found': ['Nowhere'],
+                                   'errors': {'Alien': 'OMDb is down'}}
+    with app.app_context():
+        data_manager = app.extensions['data_manager']
+        matrix = data_manager.get_movie_by_name('The Matrix')
+        assert matrix.movie_director == MATRIX['Director']
+        entry = data_manager.get_movie_by_movie_by_user(matrix.id, 1)
+        assert (entry.watchlist_status, entry.user_rating) == ('watched', 5)
+
+    # Known titles are neither looked up again nor added twice
+    lookups = len(app.extensions['omdb_client'].lookups)
+    assert client.post('/api/v1/async/users/1/movies', json={'titles': ['The Matrix']}).get_json()['existing'] == \
+        ['The Matrix']
+    assert len(app.extensions['omdb_client'].lookups) == lookups
+
+
+@pytest.mark.parametrize('body', [
+    {'titles': 'Alien'},
+    {'titles': ['Alien'], 'watchlist_status': 'seen'},
+    {'titles': ['Alien'], 'user_rating': 6},
+    {'titles': ['Alien'], 'user_rating': '5'},
+    {'titles': ['Alien'], 'user_rating': True},
+    {'titles': ['Alien'] * 101},
+])
+def test_invalid_requests_are_rejected(client, body):
+    response = client.post('/api/v1/async/users/1/movies', json=body)
+    assert response.status_code == 400 and 'error' in response.get_json()
+
+
+def test_unknown_user_is_a_404(client):
+    assert client.post('/api/v1/async/users/2/movies', json={'titles': ['Alien']}).status_code == 404
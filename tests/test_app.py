@@ -0,0 +1,52 @@
+"""
+Tests of the application factory (app.create_app): it builds the app without touching the
+database, and the optional subsystems are only loaded when used.
+"""
+
+import os
+import subprocess
+import sys
+from app import create_app, reset_after_fork
+from data_manager.data_models import db
+from data_manager.migrations import MIGRATIONS
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_schema_is_created_by_db_upgrade_only(tmp_path):
+    path = tmp_path / 'app.sqlite'
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}', 'TESTING': True}, auto_migrate=False)
+    try:
+        assert not path.exists()
+        runner = app.test_cli_runner()
+        result = runner.invoke(args=['db-upgrade'])
+        assert result.exit_code == 0, result.output
+        assert result.output.startswith('Applied migrations: 1,')
+        assert runner.invoke(args=['db-upgrade']).output == f'Database is at schema version {MIGRATIONS[-1][0]}\n'
+        assert app.test_client().get('/').status_code == 200
+    finally:
+        with app.app_context():
+            db.engine.dispose()
+
+
+def test_async_data_manager_is_created_by_the_first_async_request(app):
+    assert 'async_data_manager' not in app.extensions
+    client = app.test_client()
+    client.get('/')
+    assert 'async_data_manager' not in app.extensions
+    assert client.post('/api/v1/async/users/1/movies', json={'titles': ['Alien']}).status_code == 404
+    manager = app.extensions['async_data_manager']
+    assert manager.list_cache is app.extensions['data_manager'].list_cache
+    client.post('/api/v1/async/users/1/movies', json={'titles': ['Alien']})
+    assert app.extensions['async_data_manager'] is manager
+
+    reset_after_fork(app)
+    assert client.get('/').status_code == 200
+
+
+def test_building_the_app_does_not_import_the_optional_libraries(tmp_path):
+    script = ('import sys; from app import create_app; '
+              f"create_app({{'SQLALCHEMY_DATABASE_URI': 'sqlite:///{tmp_path / 'app.sqlite'}'}}, auto_migrate=False); "
+              "print(sorted(name for name in ('numpy', 'scipy', 'PIL', 'aiosqlite') if name in sys.modules))")
+    output = subprocess.run([sys.executable, '-c', script], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert output.stdout.strip() == '[]'
@@ -0,0 +1,34 @@
+"""
+Smoke tests of the route benchmark (benchmarks.routes), on a small generated dataset.
+"""
+
+import sqlite3
+import pytest
+from app import create_app
+from benchmarks.common import summarize
+from benchmarks.routes import bench_client, generate_dataset, route_requests
+from data_manager.data_models import db
+
+
+def test_summarize_reports_percentiles():
+    result = summarize([0.001 * step for step in range(1, 101)], 2.0, errors=1)
+    assert (result['requests'], result['errors'], result['rps']) == (100, 1, 50.0)
+    assert result['p50_ms'] == pytest.approx(50.5) and result['p99_ms'] == pytest.approx(99.99)
+    assert summarize([], 0.0)['p50_ms'] == 0.0
+
+
+def test_read_routes_run_without_errors_on_a_generated_dataset(tmp_path):
+    path = tmp_path / 'bench.sqlite'
+    dataset = generate_dataset(str(path), 1000)
+    assert (dataset['movies'], dataset['users'], dataset['users_movies']) == (1000, 10, 1000)
+    with sqlite3.connect(path) as conn:
+        assert conn.execute('SELECT count(*) FROM users_movies').fetchone()[0] == 1000
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}', 'TESTING': True})
+    try:
+        for route in ('home', 'user_movies', 'user_movies_sorted', 'sort'):
+            result = bench_client(app, route_requests(route, dataset['movies'], dataset['users']), 5)
+            assert (result['requests'], result['errors']) == (5, 0), route
+    finally:
+        with app.app_context():
+            db.engine.dispose()
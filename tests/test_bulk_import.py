@@ -0,0 +1,67 @@
+"""
+Tests of the watchlist bulk import (data_manager.bulk_import).
+"""
+
+import json
+import pytest
+from data_manager.bulk_import import read_checkpoint, validate_row
+
+CSV = '''user_name,movie_name,watchlist_status,user_rating
+ada,Alien,watched,4
+ada,  the   matrix ,wishlist,
+grace,ALIEN,watching,9
+grace,Heat,seen,3
+,Brazil,,
+grace,Heat,,2
+'''
+
+
+@pytest.mark.parametrize('row, message', [
+    (None, 'Not a JSON object.'),
+    ({'user_name': 'ada'}, 'Missing movie_name.'),
+    ({'user_name': ' ', 'movie_name': 'Alien'}, 'Missing user_name.'),
+    ({'user_name': 'ada', 'movie_name': 'Alien', 'watchlist_status': 'seen'}, "Invalid watchlist_status 'seen'."),
+    ({'user_name': 'ada', 'movie_name': 'Alien', 'user_rating': 'five'}, 'Invalid user_rating'),
+    ({'user_name': 'ada', 'movie_name': 'Alien', 'user_rating': 0}, 'Invalid user_rating'),
+])
+def test_validate_row_rejects_invalid_rows(row, message):
+    with pytest.raises(ValueError, match=message):
+        validate_row(row)
+
+
+def test_validate_row_cleans_values():
+    assert validate_row({'user_name': ' ada ', 'movie_name': ' the   matrix ', 'watchlist_status': '',
+                         'user_rating': ' 5 '}) == \
+        {'user_name': 'ada', 'movie_name': 'the matrix', 'watchlist_status': None, 'user_rating': 5}
+
+
+def test_import_skips_and_reports_invalid_rows(app, tmp_path):
+    path = tmp_path / 'watchlists.csv'
+    path.write_text(CSV, encoding='utf-8')
+    metadata = tmp_path / 'omdb.jsonl'
+    metadata.write_text(json.dumps({'Title': 'Alien', 'Year': '1979', 'Director': 'Ridley Scott',
+                                    'Plot': 'A crew meets a creature.', 'Poster': 'N/A', 'Ratings': []}) + '\n',
+                        encoding='utf-8')
+    checkpoint = tmp_path / 'checkpoint.json'
+
+    result = app.test_cli_runner().invoke(args=['import-watchlists', str(path), '--metadata', str(metadata),
+                                                '--chunk-size', '2', '--checkpoint', str(checkpoint)])
+    assert result.exit_code == 0, result.output
+    assert 'Done: 3 rows' in result.output and '3 invalid rows skipped' in result.output
+    assert 'line 4: Invalid user_rating' in result.output and 'line 6: Missing user_name.' in result.output
+    assert read_checkpoint(str(checkpoint)) == 6
+
+    data_manager = app.extensions['data_manager']
+    with app.app_context():
+        users = {user.user_name: user.id for user in data_manager.get_all_users()}
+        alien = data_manager.get_movie_by_name('alien')
+        assert alien.movie_director == 'Ridley Scott'
+        assert data_manager.get_movie_by_name('The Matrix').movie_director == 'N/A'  # no metadata
+        assert [name for _, name, _ in data_manager.get_user_movies(users['ada'])] == ['Alien', 'the matrix']
+        heat = data_manager.get_movie_by_movie_by_user(data_manager.get_movie_by_name('Heat').id, users['grace'])
+        assert (heat.watchlist_status, heat.user_rating) == (None, 2)
+        assert data_manager.get_movie_by_movie_by_user(alien.id, users['grace']) is None
+
+    # A rerun with the checkpoint resumes after the rows already imported
+    result = app.test_cli_runner().invoke(args=['import-watchlists', str(path), '--checkpoint', str(checkpoint)])
+    assert 'Resuming after 6 rows' in result.output and 'Done: 0 rows' in result.output
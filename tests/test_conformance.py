@@ -0,0 +1,282 @@
+"""
+Conformance tests shared by every DataManagerInterface implementation.
+
+Each test gets a fresh, empty data manager of every backend (the ``manager``
+fixture of conftest.py) and fails when the backend's observable behavior
+differs from the contract documented on DataManagerInterface: return values,
+ordering, paging, errors, stats and cache invalidation.
+"""
+
+import pytest
+from data_manager.data_models import PLACEHOLDER_MOVIE
+from data_manager.stats import EMPTY_STATS
+
+
+def sample_movie(name, director='Director', year=2000, rating=7.0, plot='A plot.', poster='N/A'):
+    """Returns the dictionary of a movie with every column needed to add it to the catalog."""
+    return {'movie_name': name, 'movie_poster': poster, 'movie_director': director,
+            'release_year': year, 'movie_rating': rating, 'movie_plot': plot}
+
+
+class RecordingPageCache:
+    """Page cache stand-in that records what the data manager invalidated."""
+    enabled = True
+
+    def __init__(self):
+        self.keys = []
+        self.cleared = 0
+
+    def invalidate(self, *keys):
+        self.keys.extend(keys)
+
+    def invalidate_all(self):
+        self.cleared += 1
+
+
+def _seed(manager, users=2):
+    """Adds users and a three-movie list for the first one; returns the user and movie IDs."""
+    for index in range(users):
+        manager.add_user({'user_name': f'user{index}'})
+    user_ids = [user.id for user in manager.get_all_users()]
+    movie_ids = manager.add_movies(user_ids[0], [
+        (sample_movie('Alien', 'Ridley Scott', 1979, 8.5, 'A crew meets a creature in space.'), 'watched', 4),
+        (sample_movie('Heat', 'Michael Mann', 1995, 8.3, 'A detective hunts a crew of thieves.'), 'wishlist', None),
+        (sample_movie('Brazil', 'Terry Gilliam', 1985, 7.9, 'A clerk dreams in a bureaucracy.'), 'watched', 3),
+    ])
+    return user_ids, movie_ids
+
+
+def test_users(manager):
+    assert list(manager.get_all_users()) == []
+    for index in range(5):
+        manager.add_user({'user_name': f'user{index}'})
+    users = manager.get_all_users()
+    assert [user.user_name for user in users] == [f'user{index}' for index in range(5)]
+    assert manager.get_user_by_id(users[2].id).user_name == 'user2'
+    assert manager.get_user_by_id(10 ** 9) is None
+
+    page, cursor = manager.get_users_page(limit=2)
+    assert [user.user_name for user in page] == ['user0', 'user1'] and cursor == page[-1].id
+    seen = [user.id for user in page]
+    while cursor is not None:
+        page, cursor = manager.get_users_page(after_id=cursor, limit=2)
+        seen += [user.id for user in page]
+    assert seen == [user.id for user in users]
+
+
+def test_catalog(manager):
+    user_ids, movie_ids = _seed(manager)
+    assert len(movie_ids) == 3
+    movies = manager.get_all_movies()
+    assert [movie.id for movie in movies] == sorted(movie_ids)
+    alien = manager.get_movie_by_id(movie_ids[0])
+    assert (alien.movie_name, alien.movie_director, alien.release_year) == ('Alien', 'Ridley Scott', 1979)
+    assert manager.get_movie_by_name('  ALIEN ').id == alien.id
+    assert manager.get_movie_by_name('Aliens') is None
+    assert manager.get_movie_by_id(10 ** 9) is None
+
+    page, cursor = manager.get_movies_page(limit=2, columns=['movie_name', 'release_year'])
+    assert [(row.movie_name, row.release_year) for row in page] == [('Alien', 1979), ('Heat', 1995)]
+    page, cursor = manager.get_movies_page(after_id=cursor, limit=2)
+    assert [row.movie_name for row in page] == ['Brazil'] and cursor is None
+    with pytest.raises(ValueError):
+        manager.get_movies_page(columns=['movie_key'])
+
+
+def test_add_movies(manager):
+    user_ids, movie_ids = _seed(manager)
+    # Known titles are matched case-insensitively, and listed movies are left as they are
+    added = manager.add_movies(user_ids[0], [({'movie_name': 'heat'}, 'watched', 4),
+                                             (sample_movie('Ran'), 'watching', 3),
+                                             (sample_movie('RAN'), 'wishlist', 2)])
+    assert len(added) == 1 and manager.get_movie_by_id(added[0]).movie_name == 'Ran'
+    assert manager.get_movie_by_movie_by_user(movie_ids[1], user_ids[0]).watchlist_status == 'wishlist'
+    assert manager.add_movie({'movie_name': 'Alien'}, user_ids[1], 'wishlist', 3) is True
+    assert manager.add_movie({'movie_name': 'Alien'}, user_ids[1], 'watched', 3) is False
+    # A title missing from the catalog needs its details
+    assert manager.add_movie({'movie_name': 'Unknown'}, user_ids[1], 'watched', 3) is False
+    assert len(manager.get_all_movies()) == 4
+    entry = manager.get_movie_by_movie_by_user(movie_ids[0], user_ids[1])
+    assert (entry.user_id, entry.movie_id, entry.watchlist_status, entry.user_rating) == \
+        (user_ids[1], movie_ids[0], 'wishlist', 3)
+
+
+def test_user_movies(manager):
+    user_ids, movie_ids = _seed(manager)
+    rows = manager.get_user_movies(user_ids[0])
+    assert [(entry.movie_id, name) for entry, name, _ in rows] == list(zip(movie_ids, ['Alien', 'Heat', 'Brazil']))
+    assert [entry.movie_id for entry, _, _ in manager.get_movie_by_watch_status(user_ids[0], 'watched')] == \
+        [movie_ids[0], movie_ids[2]]
+    assert list(manager.get_user_movies(user_ids[1])) == []
+
+    for sort, expected in (('title', ['Alien', 'Brazil', 'Heat']), ('year', ['Alien', 'Brazil', 'Heat']),
+                           ('rating', ['Brazil', 'Heat', 'Alien']), ('user_rating', ['Heat', 'Brazil', 'Alien']),
+                           ('added', ['Alien', 'Heat', 'Brazil'])):
+        names, cursor = [], None
+        while True:
+            page, cursor = manager.query_user_movies(user_ids[0], sort=sort, limit=2, cursor=cursor,
+                                                     columns=['movie_name'])
+            names += [row.movie_name for row in page]
+            if cursor is None:
+                break
+        assert names == expected, (sort, names)
+        page, _ = manager.query_user_movies(user_ids[0], sort=sort, direction='desc', columns=['movie_name'])
+        assert [row.movie_name for row in page] == expected[::-1], (sort, 'desc')
+
+    page, cursor = manager.query_user_movies(user_ids[0], 'watched', sort='year',
+                                             columns=['movie_id', 'user_rating', 'release_year'])
+    assert [(row.movie_id, row.user_rating, row.release_year) for row in page] == \
+        [(movie_ids[0], 4, 1979), (movie_ids[2], 3, 1985)] and cursor is None
+    for arguments in ({'sort': 'director'}, {'direction': 'up'}, {'cursor': 'not a cursor'},
+                      {'columns': ['movie_key']}):
+        with pytest.raises(ValueError):
+            manager.query_user_movies(user_ids[0], **arguments)
+
+
+def test_update_and_delete(manager):
+    user_ids, movie_ids = _seed(manager)
+    assert manager.update_movie(user_ids[0], movie_ids[1], 3, 'watching') is True
+    entry = manager.get_movie_by_movie_by_user(movie_ids[1], user_ids[0])
+    assert (entry.watchlist_status, entry.user_rating) == ('watching', 3)
+    assert manager.update_movie(user_ids[1], movie_ids[1], 3, 'watching') is False
+    for rating, status in ((5, 'watched'), (1, 'watched'), ('3', 'watched'), (3, 'seen')):
+        with pytest.raises(ValueError):
+            manager.update_movie(user_ids[0], movie_ids[1], rating, status)
+    # Updating keeps the position of the movie in the 'added' order
+    assert [entry.movie_id for entry, _, _ in manager.get_user_movies(user_ids[0])] == movie_ids
+
+    assert manager.delete_movie(user_ids[0], movie_ids[1]) is True
+    assert manager.delete_movie(user_ids[0], movie_ids[1]) is False
+    assert manager.get_movie_by_movie_by_user(movie_ids[1], user_ids[0]) is None
+    assert manager.get_movie_by_id(movie_ids[1]) is not None  # the catalog keeps the movie
+
+
+def test_stats(manager):
+    user_ids, movie_ids = _seed(manager, users=3)
+    manager.add_movie({'movie_name': 'Alien'}, user_ids[1], 'wishlist', 2)
+    stats = manager.get_movie_stats(movie_ids[0])
+    assert (stats.list_count, stats.rating_count, stats.rating_sum) == (2, 2, 6)
+    assert (stats.watched_count, stats.watching_count, stats.wishlist_count) == (1, 0, 1)
+    assert stats.average_rating == 3
+    assert tuple(manager.get_movie_stats(10 ** 9)) == tuple(EMPTY_STATS)
+
+    manager.update_movie(user_ids[0], movie_ids[0], 3, 'watching')
+    manager.delete_movie(user_ids[1], movie_ids[0])
+    stats = manager.get_movie_stats(movie_ids[0])
+    assert (stats.list_count, stats.rating_sum, stats.watching_count, stats.wishlist_count) == (1, 3, 1, 0)
+
+    by_user = manager.get_user_stats([user_ids[0], user_ids[2]])
+    assert set(by_user) == {user_ids[0], user_ids[2]}
+    assert (by_user[user_ids[0]].list_count, by_user[user_ids[0]].rating_count) == (3, 2)
+    assert tuple(by_user[user_ids[2]]) == tuple(EMPTY_STATS)
+
+
+def test_search(manager):
+    user_ids, movie_ids = _seed(manager)
+    rows, cursor = manager.search_movies('crew')
+    # 'crew' is in two plots; neither title nor director contains it
+    assert sorted(row.id for row in rows) == sorted([movie_ids[0], movie_ids[1]]) and cursor is None
+    rows, _ = manager.search_movies('alien')
+    assert rows[0].id == movie_ids[0] and rows[0].movie_name == 'Alien'
+    rows, _ = manager.search_movies('ridley crea')
+    assert [row.id for row in rows] == [movie_ids[0]]
+    assert list(manager.search_movies('zzzz')[0]) == []
+    assert list(manager.search_movies('  !! ')[0]) == []
+
+    seen, cursor = [], None
+    while True:
+        rows, cursor = manager.search_movies('a', limit=1, cursor=cursor)
+        seen += [row.id for row in rows]
+        if cursor is None:
+            break
+    assert len(seen) == len(set(seen))
+
+
+def test_cache_invalidation(manager):
+    manager.page_cache = RecordingPageCache()
+    user_ids, movie_ids = _seed(manager)
+    assert manager.page_cache.cleared == 1  # new catalog movies change every page
+
+    cached = manager.get_cached_user_movies(user_ids[0], 'watched')
+    assert [entry.movie_id for entry, _, _ in cached.user_movies] == [movie_ids[0], movie_ids[2]]
+    assert manager.get_cached_user_movies(user_ids[0], 'watched').etag == cached.etag
+
+    manager.update_movie(user_ids[0], movie_ids[1], 3, 'watched')
+    assert f'movie:{movie_ids[1]}' in manager.page_cache.keys
+    assert [entry.movie_id for entry, _, _ in manager.get_cached_user_movies(user_ids[0], 'watched').user_movies] \
+        == movie_ids
+
+    manager.update_movies_metadata([{'id': movie_ids[0], 'movie_name': 'Alien (1979)'}])
+    assert manager.page_cache.cleared == 2
+    assert manager.get_cached_user_movies(user_ids[0], 'watched').user_movies[0][1] == 'Alien (1979)'
+
+    manager.delete_movie(user_ids[0], movie_ids[2])
+    assert movie_ids[2] not in [entry.movie_id for entry, _, _ in
+                                manager.get_cached_user_movies(user_ids[0], 'watched').user_movies]
+
+
+def test_pending_movies(manager):
+    user_ids, movie_ids = _seed(manager)
+    manager.add_pending_movie('Solaris', user_ids[1], 'wishlist', 3)
+    manager.add_pending_movie('Nowhere', user_ids[1], 'watched', 2)
+    pending = manager.get_pending_movie_ids(user_ids[1])
+    assert len(pending) == 2 and manager.get_pending_movie_ids(user_ids[0]) == set()
+    placeholder = manager.get_movie_by_name('solaris')
+    assert placeholder.id in pending and placeholder.movie_poster == PLACEHOLDER_MOVIE['movie_poster']
+    # Placeholders stay off the catalog until their details are fetched
+    assert [row.id for row in manager.get_movies_page(limit=10)[0]] == movie_ids
+
+    jobs = manager.claim_movie_jobs(10, lease=300)
+    assert [job.movie_name for job in jobs] == ['Solaris', 'Nowhere'] and jobs[0].attempts == 1
+    assert list(manager.claim_movie_jobs(10, lease=300)) == []
+    solaris, nowhere = jobs
+    manager.retry_movie_job(solaris.id, 'timeout')
+    (retried,) = manager.claim_movie_jobs(10, lease=300)
+    assert (retried.id, retried.attempts) == (solaris.id, 2)
+    # An expired lease can be claimed again
+    assert [job.id for job in manager.claim_movie_jobs(10, lease=-1)] == [solaris.id, nowhere.id]
+
+    manager.complete_movie_job(solaris.id, solaris.movie_id, {'movie_director': 'Andrei Tarkovsky',
+                                                              'release_year': 1972})
+    assert manager.get_movie_by_id(solaris.movie_id).movie_director == 'Andrei Tarkovsky'
+    assert [row.id for row in manager.get_movies_page(limit=10)[0]] == [*movie_ids, solaris.movie_id]
+    manager.retry_movie_job(nowhere.id, 'timeout', give_up=True)
+    assert manager.get_movie_by_id(nowhere.movie_id) is None
+    assert manager.get_movie_by_movie_by_user(nowhere.movie_id, user_ids[1]) is None
+    assert manager.get_pending_movie_ids(user_ids[1]) == set()
+    assert [name for _, name, _ in manager.get_user_movies(user_ids[1])] == ['Solaris']
+
+    # OMDb's title renames the placeholder, or merges it into the movie that already has it
+    manager.add_pending_movie('the matrix', user_ids[1], 'watched', 5)
+    manager.add_pending_movie('alien.', user_ids[1], 'wishlist', 4)
+    manager.add_pending_movie('brazill', user_ids[0], 'wishlist', 1)
+    matrix, alien, brazil = manager.claim_movie_jobs(10, lease=300)
+    assert manager.complete_movie_job(matrix.id, matrix.movie_id, {'movie_name': 'The Matrix'}) == matrix.movie_id
+    assert manager.get_movie_by_id(matrix.movie_id).movie_name == 'The Matrix'
+    assert manager.complete_movie_job(alien.id, alien.movie_id, {'movie_name': 'Alien'}) == movie_ids[0]
+    assert manager.complete_movie_job(brazil.id, brazil.movie_id, {'movie_name': 'Brazil'}) == movie_ids[2]
+    assert manager.get_movie_by_id(alien.movie_id) is None and manager.get_movie_by_id(brazil.movie_id) is None
+    assert manager.get_movie_by_movie_by_user(movie_ids[0], user_ids[1]).watchlist_status == 'wishlist'
+    # A user who already had the movie keeps their own entry
+    assert manager.get_movie_by_movie_by_user(movie_ids[2], user_ids[0]).user_rating == 3
+    assert manager.get_pending_movie_ids(user_ids[0]) == manager.get_pending_movie_ids(user_ids[1]) == set()
+    assert manager.get_user_stats([user_ids[0]])[user_ids[0]].list_count == 3
+    assert manager.get_movie_stats(movie_ids[0]).list_count == 2
+
+    # A title queued twice, e.g. by concurrent requests, shares one placeholder; a fetched one gets no job
+    manager.add_pending_movie('Stalker', user_ids[1], 'wishlist', None)
+    manager.add_pending_movie('stalker', user_ids[0], 'watched', 4)
+    stalker = manager.get_movie_by_name('Stalker')
+    assert manager.get_pending_movie_ids(user_ids[0]) == manager.get_pending_movie_ids(user_ids[1]) == {stalker.id}
+    manager.add_pending_movie('the matrix', user_ids[0], 'wishlist', None)
+    assert manager.get_movie_by_movie_by_user(matrix.movie_id, user_ids[0]).watchlist_status == 'wishlist'
+    assert manager.get_pending_movie_ids(user_ids[0]) == {stalker.id}
+
+
+def test_recommendations(manager):
+    user_ids, movie_ids = _seed(manager)
+    rows = manager.get_recommendations(user_ids[1])
+    assert all(row.movie_id in movie_ids for row in rows)
+    assert len(manager.get_recommendations(user_ids[1], limit=1)) <= 1
+    assert all(hasattr(row, name) for row in rows for name in ('movie_name', 'movie_poster', 'score'))
+
@@ -0,0 +1,67 @@
+"""
+Tests of the background OMDb enrichment (omdb.enrichment), with a stub client.
+"""
+
+import pytest
+from omdb.client import CircuitOpenError
+from omdb.enrichment import MovieEnricher, iter_movies
+
+MATRIX = {'Title': 'The Matrix', 'Year': '1999', 'Director': 'Lana Wachowski, Lilly Wachowski',
+          'Plot': 'A hacker learns the truth.', 'Poster': 'N/A', 'Ratings': [{'Value': '8.7/10'}]}
+
+
+class StubDataManager:
+    def __init__(self):
+        self.updates = []
+
+    def update_movies_metadata(self, updates):
+        self.updates += updates
+
+
+class StubClient:
+    def __init__(self, answers):
+        self.answers = answers
+
+    def lookup(self, movie_name):
+        answer = self.answers[movie_name]
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+
+def test_enrich_stores_details_and_not_found_answers():
+    data_manager = StubDataManager()
+    client = StubClient({'matrix': MATRIX, 'Nowhere': 'Error: Movie not found!', 'Alien': 'Error: 500'})
+    enricher = MovieEnricher(data_manager, client, concurrency=2, rate=1000)
+    enricher.enrich([(1, 'matrix'), (2, 'Nowhere'), (3, 'Alien')])
+
+    assert (enricher.updated, enricher.not_found, enricher.failed) == (1, 1, 1)
+    matrix, nowhere = data_manager.updates
+    assert matrix['id'] == 1 and matrix['movie_director'] == MATRIX['Director'] and 'movie_name' not in matrix
+    assert nowhere.keys() == {'id', 'enriched_at'}
+    assert matrix['enriched_at'] and nowhere['enriched_at']
+
+
+def test_enrich_keeps_the_answers_received_before_the_breaker_opened():
+    data_manager = StubDataManager()
+    client = StubClient({'matrix': MATRIX, 'Nowhere': 'Error: Movie not found!',
+                         'Alien': CircuitOpenError('OMDb is unavailable')})
+    enricher = MovieEnricher(data_manager, client, concurrency=1, rate=1000)
+    with pytest.raises(CircuitOpenError):
+        enricher.enrich([(1, 'matrix'), (2, 'Alien'), (3, 'Nowhere')])
+    assert [update['id'] for update in data_manager.updates] == [1, 3]
+
+
+def test_only_movies_never_enriched_are_stale(sqlite_app):
+    data_manager = sqlite_app.extensions['data_manager']
+    data_manager.add_user({'user_name': 'ada'})
+    data_manager.add_movies(1, [({'movie_name': name, 'movie_poster': 'N/A', 'movie_director': 'N/A',
+                                  'release_year': 0, 'movie_rating': 0.0, 'movie_plot': 'N/A'}, 'watched', None)
+                                for name in ('matrix', 'Nowhere', 'Alien')])
+    client = StubClient({'matrix': dict(MATRIX, Plot='N/A'), 'Nowhere': 'Error: Movie not found!',
+                         'Alien': 'Error: 500'})
+    MovieEnricher(data_manager, client, concurrency=1, rate=1000).enrich(next(iter_movies(True, 10)))
+
+    # A real 'N/A' plot and a title OMDb does not know are not asked for again
+    assert list(iter_movies(True, 10)) == [[(3, 'Alien')]]
+    assert [len(batch) for batch in iter_movies(False, 2)] == [2, 1]
@@ -0,0 +1,69 @@
+"""
+Tests of the streaming table exports (data_manager.export): the /api/v1/export endpoint and flask export.
+"""
+
+import csv
+import gzip
+import io
+import json
+import pytest
+from config.config_files import ExportConfig
+from tests.test_web import add_catalog
+
+TOKEN = 'export-secret'
+
+
+@pytest.fixture
+def export_api(monkeypatch):
+    monkeypatch.setattr(ExportConfig, 'api_enabled', True)
+    monkeypatch.setattr(ExportConfig, 'api_token', TOKEN)
+    return {'Authorization': f'Bearer {TOKEN}'}
+
+
+def test_endpoint_is_off_by_default(app):
+    assert app.test_client().get('/api/v1/export/users').status_code == 404
+
+
+@pytest.mark.parametrize('headers', [{}, {'Authorization': 'Bearer wrong'}, {'Authorization': TOKEN}])
+def test_endpoint_requires_the_token(app, export_api, headers):
+    assert app.test_client().get('/api/v1/export/users', headers=headers).status_code == 401
+
+
+def test_tables_are_streamed(app, export_api):
+    movie_ids = add_catalog(app, 3)
+    client = app.test_client()
+    assert client.get('/api/v1/export/passwords', headers=export_api).status_code == 404
+    assert client.get('/api/v1/export/users?format=xml', headers=export_api).status_code == 400
+
+    response = client.get('/api/v1/export/movies', headers=export_api)
+    assert response.status_code == 200 and response.is_streamed
+    assert response.headers['Content-Disposition'] == 'attachment; filename="movies.csv"'
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert [int(row['id']) for row in rows] == movie_ids and 'movie_key' not in rows[0]
+
+    response = client.get('/api/v1/export/users_movies?format=ndjson',
+                          headers={**export_api, 'Accept-Encoding': 'gzip'})
+    assert response.content_encoding == 'gzip'
+    lines = gzip.decompress(response.data).decode().splitlines()
+    assert [json.loads(line)['movie_id'] for line in lines] == movie_ids
+
+
+def test_export_command_writes_files(app, tmp_path):
+    add_catalog(app, 3)
+    result = app.test_cli_runner().invoke(args=['export', 'users', 'users_movies', '--directory', str(tmp_path),
+                                                '--gzip', '--chunk-size', '2'])
+    assert result.exit_code == 0, result.output
+    with gzip.open(tmp_path / 'users_movies.csv.gz', 'rt') as f:
+        assert len(list(csv.DictReader(f))) == 3
+    assert gzip.decompress((tmp_path / 'users.csv.gz').read_bytes()).decode() == 'id,user_name\n1,ada\n'
+    assert not list(tmp_path.glob('*.tmp'))
+
+
+def test_parquet_export_has_a_row_group_per_chunk(app, tmp_path):
+    parquet = pytest.importorskip('pyarrow.parquet')
+    add_catalog(app, 5)
+    result = app.test_cli_runner().invoke(args=['export', 'movies', '--format', 'parquet',
+                                                '--directory', str(tmp_path), '--chunk-size', '2'])
+    assert result.exit_code == 0, result.output
+    parquet_file = parquet.ParquetFile(tmp_path / 'movies.parquet')
+    assert parquet_file.metadata.num_rows == 5 and parquet_file.num_row_groups == 3
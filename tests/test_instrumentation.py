@@ -0,0 +1,80 @@
+"""
+Tests of the opt-in request instrumentation (utils.instrumentation) and its /metrics endpoint.
+"""
+
+import json
+import logging
+import pytest
+from flask import Flask
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+import utils.instrumentation
+from app import create_app
+from config.config_files import InstrumentationConfig
+from data_manager.data_models import db
+from utils.instrumentation import Instrumentation
+
+
+@pytest.fixture(autouse=True)
+def uninstall(monkeypatch):
+    # The installed instrumentation is global; put the previous one back after each test
+    monkeypatch.setattr(utils.instrumentation, '_instrumentation', utils.instrumentation._instrumentation)
+
+
+def test_requests_are_timed_and_counted(tmp_path, monkeypatch):
+    monkeypatch.setattr(InstrumentationConfig, 'enabled', True)
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'app.sqlite'}", 'TESTING': True},
+                     auto_migrate=True)
+    try:
+        client = app.test_client()
+        response = client.get('/')
+        assert response.status_code == 200
+        timings = response.headers['Server-Timing']
+        assert timings.startswith('app;dur=') and 'queries"' in timings
+
+        metrics = client.get('/metrics').get_data(as_text=True)
+        assert 'http_requests_total{method="GET",route="/",status="200"} 1' in metrics
+        assert 'db_query_duration_seconds_count{operation="SELECT"}' in metrics
+    finally:
+        with app.app_context():
+            db.engine.dispose()
+
+
+def test_repeated_statements_are_flagged_as_n_plus_one():
+    engine = create_engine('sqlite://')
+    app = Flask(__name__)
+    instrumentation = Instrumentation(n_plus_one_threshold=3)
+    instrumentation.init_app(app)
+
+    @app.route('/loop/<int:count>')
+    def loop(count):
+        with engine.connect() as conn:
+            for _ in range(count):
+                conn.execute(text('SELECT 1'))
+        return 'done'
+
+    records = []
+    handler = logging.Handler()
+    handler.emit = records.append
+    instrumentation.logger.addHandler(handler)
+    try:
+        app.test_client().get('/loop/2')
+        app.test_client().get('/loop/3')
+    finally:
+        instrumentation.logger.removeHandler(handler)
+    first, second = (json.loads(record.getMessage()) for record in records)
+    assert records[1].levelno == logging.WARNING
+    assert first['queries'] == 2 and 'n_plus_one' not in first
+    assert second['n_plus_one'] == [{'count': 3, 'sql': 'SELECT 1'}]
+    assert 'db_n_plus_one_total{route="/loop/<int:count>"} 1' in instrumentation.registry.render()
+
+
+def test_failed_statements_leave_no_start_time():
+    engine = create_engine('sqlite://')
+    Instrumentation().init_app(Flask(__name__))
+    with engine.connect() as conn:
+        with pytest.raises(OperationalError):
+            conn.execute(text('SELECT * FROM missing'))
+        assert conn.info['query_started'] == []
+        conn.execute(text('SELECT 1'))
+        assert conn.info['query_started'] == []
@@ -0,0 +1,60 @@
+"""
+Tests of the schema migrations (data_manager.migrations) on a database made with the original schema.
+"""
+
+import sqlite3
+from flask import Flask
+from data_manager.data_models import db
+from data_manager.migrations import MIGRATIONS, setup_schema, upgrade
+from data_manager.sqlite_data_manager import SQLiteDataManager
+
+# The schema and a few rows of a database created before the migrations existed
+LEGACY_DATABASE = '''
+CREATE TABLE users (id INTEGER NOT NULL, user_name VARCHAR(100) NOT NULL, PRIMARY KEY (id));
+CREATE TABLE movies (
+    id INTEGER NOT NULL, movie_poster TEXT NOT NULL, movie_name VARCHAR(250) NOT NULL,
+    movie_director VARCHAR(100) NOT NULL, release_year INTEGER NOT NULL, movie_rating FLOAT NOT NULL,
+    movie_plot TEXT NOT NULL, PRIMARY KEY (id), UNIQUE (movie_name));
+CREATE TABLE users_movies (
+    user_id INTEGER NOT NULL, movie_id INTEGER NOT NULL, watchlist_status VARCHAR(10), user_rating INTEGER,
+    PRIMARY KEY (user_id, movie_id), FOREIGN KEY(user_id) REFERENCES users (id),
+    FOREIGN KEY(movie_id) REFERENCES movies (id));
+INSERT INTO users VALUES (1, 'ada'), (2, 'grace');
+INSERT INTO movies VALUES (1, 'N/A', 'Alien', 'Ridley Scott', 1979, 8.5, 'A crew meets a creature.'),
+                          (2, 'N/A', 'Heat', 'N/A', 0, 0, 'N/A'),
+                          (3, 'N/A', 'alien ', 'Ridley Scott', 1979, 8.5, 'A crew meets a creature.');
+INSERT INTO users_movies VALUES (1, 1, 'watched', 4), (1, 3, 'wishlist', 2), (2, 3, 'watching', 5), (2, 2, NULL, NULL);
+'''
+
+
+def test_legacy_database_is_upgraded(tmp_path):
+    path = tmp_path / 'legacy.sqlite'
+    with sqlite3.connect(path) as conn:
+        conn.executescript(LEGACY_DATABASE)
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    data_manager = SQLiteDataManager(app)
+    with app.app_context():
+        assert setup_schema() == [number for number, _ in MIGRATIONS]
+        assert upgrade(db.engine) == []  # nothing left to apply
+
+        # Titles that only differ in case or spacing are merged into the oldest movie
+        assert [movie.id for movie in data_manager.get_all_movies()] == [1, 2]
+        assert data_manager.get_movie_by_movie_by_user(1, 1).watchlist_status == 'watched'
+        assert data_manager.get_movie_by_movie_by_user(1, 2).watchlist_status == 'watching'
+        assert data_manager.get_movie_stats(1).list_count == 2
+        assert data_manager.search_movies('creature')[0][0].id == 1
+        # Only the movie with real details counts as enriched
+        assert dict(db.session.execute(db.text('SELECT id, enriched_at IS NOT NULL FROM movies')).all()) == \
+            {1: 1, 2: 0}
+        indexes = set(db.session.scalars(db.text("SELECT name FROM sqlite_master WHERE type = 'index'")))
+        db.session.remove()
+        db.engine.dispose()
+    assert {'ix_movies_movie_key', 'ix_users_movies_user_status', 'ix_users_movies_movie_id',
+            'ix_users_movies_user_rating', 'ix_movies_release_year', 'ix_movies_movie_rating'} <= indexes
+
+    with sqlite3.connect(path) as conn:
+        assert conn.execute('PRAGMA user_version').fetchone()[0] == MIGRATIONS[-1][0]
+        plan = ' '.join(row[3] for row in conn.execute(
+            "EXPLAIN QUERY PLAN SELECT movie_id FROM users_movies WHERE user_id = 1 AND watchlist_status = 'watched'"))
+    assert 'ix_users_movies_user_status' in plan
@@ -0,0 +1,88 @@
+"""
+Tests of the movie job worker (omdb.movie_jobs) on a temporary SQLite database, with a stub OMDb client.
+"""
+
+import pytest
+import requests
+from data_manager.data_models import db
+from omdb.cache import NOT_FOUND, OMDbCache
+from omdb.movie_jobs import MovieJobWorker
+
+ALIEN = {'Title': 'Alien', 'Year': '1979', 'Director': 'Ridley Scott', 'Plot': 'A crew meets a creature.',
+         'Poster': 'https://example.com/alien.jpg', 'Ratings': [{'Value': '8.5/10'}]}
+
+
+class StubClient:
+    """Answers lookups from a dictionary of titles; an exception is raised instead of returned."""
+
+    def __init__(self, answers):
+        self.answers = answers
+        self.lookups = []
+
+    def lookup(self, movie_name):
+        self.lookups.append(movie_name)
+        answer = self.answers.get(movie_name, NOT_FOUND)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+
+@pytest.fixture
+def data_manager(sqlite_app):
+    data_manager = sqlite_app.extensions['data_manager']
+    data_manager.add_user({'user_name': 'ada'})
+    return data_manager
+
+
+def make_worker(data_manager, answers, max_attempts=5):
+    return MovieJobWorker(data_manager, StubClient(answers), OMDbCache(db), max_attempts=max_attempts)
+
+
+def test_pending_movie_is_resolved(data_manager):
+    data_manager.add_pending_movie('alien', 1, 'watched', 4)
+    placeholder = data_manager.get_movie_by_name('alien')
+    assert data_manager.get_pending_movie_ids(1) == {placeholder.id}
+
+    assert make_worker(data_manager, {'alien': ALIEN}).run_once() == 1
+    movie = data_manager.get_movie_by_id(placeholder.id)
+    assert (movie.movie_name, movie.movie_director, movie.release_year) == ('Alien', 'Ridley Scott', 1979)
+    assert data_manager.get_pending_movie_ids(1) == set()
+    assert data_manager.get_movie_by_movie_by_user(movie.id, 1).user_rating == 4
+    assert [row.id for row in data_manager.get_movies_page()[0]] == [movie.id]
+
+
+def test_pending_movie_is_merged_into_the_catalog_movie(data_manager):
+    (alien_id,) = data_manager.add_movies(1, [({'movie_name': 'Alien', 'movie_poster': 'N/A',
+                                                'movie_director': 'Ridley Scott', 'release_year': 1979,
+                                                'movie_rating': 8.5, 'movie_plot': 'N/A'}, 'watched', 4)])
+    data_manager.add_user({'user_name': 'grace'})
+    data_manager.add_pending_movie('alien.', 2, 'wishlist', None)
+
+    make_worker(data_manager, {'alien.': ALIEN}).run_once()
+    assert data_manager.get_movie_by_name('alien.') is None
+    assert data_manager.get_movie_by_movie_by_user(alien_id, 2).watchlist_status == 'wishlist'
+
+
+def test_unknown_title_is_dropped(data_manager):
+    data_manager.add_pending_movie('Nowhere', 1, 'watched', None)
+    placeholder_id = data_manager.get_movie_by_name('Nowhere').id
+
+    make_worker(data_manager, {}).run_once()
+    assert data_manager.get_movie_by_id(placeholder_id) is None
+    assert data_manager.get_movie_by_movie_by_user(placeholder_id, 1) is None
+    assert data_manager.get_pending_movie_ids(1) == set()
+
+
+def test_transient_error_is_retried_then_gives_up(data_manager):
+    data_manager.add_pending_movie('Alien', 1, 'watched', None)
+    placeholder_id = data_manager.get_movie_by_name('Alien').id
+    worker = make_worker(data_manager, {'Alien': requests.exceptions.ConnectionError('down')}, max_attempts=2)
+
+    assert worker.run_once() == 1
+    assert data_manager.get_pending_movie_ids(1) == {placeholder_id}  # queued again
+    assert worker.run_once() == 1
+    # The second failed attempt gives up and removes the placeholder from the catalog and the list
+    assert data_manager.get_movie_by_id(placeholder_id) is None
+    assert data_manager.get_movie_by_movie_by_user(placeholder_id, 1) is None
+    assert worker.run_once() == 0
+    assert worker.client.lookups == ['Alien', 'Alien']
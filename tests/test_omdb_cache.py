@@ -0,0 +1,42 @@
+"""
+Tests of the two-level OMDb response cache (omdb.cache) on a temporary SQLite database.
+"""
+
+from data_manager.data_models import db
+from omdb.cache import NOT_FOUND, OMDbCache
+
+ALIEN = {'Title': 'Alien', 'Year': '1979', 'Response': 'True'}
+
+
+def test_responses_are_shared_through_the_table(sqlite_app):
+    cache = OMDbCache(db)
+    assert cache.get('Alien') is None
+    cache.put('Alien', ALIEN)
+    cache.put('Nowhere', NOT_FOUND)
+    cache.put('Heat', 'Error: Request limit reached!')  # transient errors are not cached
+
+    assert cache.get('  alien ') == ALIEN and cache.stats()['hits'] == 1
+    # Another worker's cache, with an empty memory level, reads the table
+    other = OMDbCache(db)
+    assert other.get('ALIEN') == ALIEN and other.get('nowhere') == NOT_FOUND
+    assert other.get('Heat') is None
+    assert (other.stats()['persistent_hits'], other.stats()['misses']) == (2, 1)
+    assert list(other.iter_titles()) == [('alien', 'Alien')]
+
+
+def test_expired_entries_are_dropped(sqlite_app):
+    cache = OMDbCache(db, ttl=-1, negative_ttl=60)
+    cache.put('Alien', ALIEN)
+    cache.put('Nowhere', NOT_FOUND)
+    assert cache.get('Alien') is None and cache.stats()['expirations'] == 2  # memory, then the table
+    assert cache.get('Nowhere') == NOT_FOUND
+    cache.put('Heat', ALIEN)
+    assert cache.purge_expired() == 1
+
+
+def test_memory_level_is_bounded(sqlite_app):
+    cache = OMDbCache(db, max_entries=2)
+    for title in ('Alien', 'Heat', 'Brazil'):
+        cache.put(title, dict(ALIEN, Title=title))
+    assert cache.stats()['size'] == 2 and cache.stats()['evictions'] == 1
+    assert cache.get('Alien')['Title'] == 'Alien'  # still in the table
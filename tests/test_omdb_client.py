@@ -0,0 +1,81 @@
+"""
+Tests of the OMDb client's circuit breaker, with a stub HTTP session.
+"""
+
+import pytest
+import requests
+from omdb.client import CircuitOpenError, OMDbClient
+
+
+class StubResponse:
+    def __init__(self, status_code, body=None):
+        self.status_code = status_code
+        self.body = body
+
+    def json(self):
+        return self.body
+
+
+class StubSession:
+    """Answers each GET with the next outcome: a response, or an exception to raise."""
+
+    def __init__(self, outcomes, during_request=None):
+        self.outcomes = list(outcomes)
+        self.during_request = during_request
+        self.calls = 0
+
+    def get(self, url, params, timeout):
+        self.calls += 1
+        if self.during_request:
+            self.during_request()
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+def make_client(outcomes, reset_timeout=0, during_request=None):
+    client = OMDbClient('key', failure_threshold=2, reset_timeout=reset_timeout)
+    client.session = StubSession(outcomes, during_request)
+    return client
+
+
+def test_breaker_opens_after_consecutive_failures():
+    client = make_client([requests.exceptions.ConnectionError(), StubResponse(503)], reset_timeout=60)
+    with pytest.raises(requests.exceptions.ConnectionError):
+        client.lookup('Alien')
+    assert client.lookup('Alien') == 'Error: 503'
+    assert client.circuit_open
+    with pytest.raises(CircuitOpenError):
+        client.lookup('Alien')
+    assert client.session.calls == 2
+
+
+def test_half_open_breaker_lets_one_trial_through():
+    rejected = []
+
+    def concurrent_lookup():
+        # Another caller arriving while the trial is in flight is rejected without a request
+        if client.session.calls == 3:
+            with pytest.raises(CircuitOpenError):
+                client.lookup('Brazil')
+            rejected.append(True)
+
+    client = make_client([StubResponse(503), StubResponse(503), StubResponse(200, {'Title': 'Alien'})],
+                         during_request=concurrent_lookup)
+    client.lookup('Alien')
+    client.lookup('Alien')
+    assert client.lookup('Alien') == {'Title': 'Alien'}
+    assert rejected == [True] and not client.circuit_open
+
+
+def test_failed_trial_opens_the_breaker_again():
+    client = make_client([StubResponse(503), StubResponse(503), requests.exceptions.Timeout()])
+    client.lookup('Alien')
+    client.lookup('Alien')
+    with pytest.raises(requests.exceptions.Timeout):
+        client.lookup('Alien')
+    client.reset_timeout = 60
+    assert client.circuit_open
+    with pytest.raises(CircuitOpenError):
+        client.lookup('Alien')
@@ -0,0 +1,51 @@
+"""
+Tests of the full-page cache (utils.page_cache) of the catalog and movie pages.
+"""
+
+import gzip
+from tests.test_web import add_catalog
+
+
+def counts(client):
+    stats = client.get('/pages/cache/stats').get_json()
+    return {result: stats[result] for result in ('hit', 'miss', 'not_modified', 'bypass')}
+
+
+def test_movie_page_is_cached_until_its_lists_change(app):
+    movie_id, = add_catalog(app, 1)
+    client = app.test_client()
+    first = client.get(f'/{movie_id}')
+    assert b'1 watched' in first.data
+    assert client.get(f'/{movie_id}').data == first.data
+    assert client.get(f'/{movie_id}', headers={'If-None-Match': first.headers['ETag']}).status_code == 304
+    assert counts(client) == {'hit': 1, 'miss': 1, 'not_modified': 1, 'bypass': 0}
+
+    with app.app_context():
+        app.extensions['data_manager'].update_movie(1, movie_id, 4, 'wishlist')
+    response = client.get(f'/{movie_id}', headers={'If-None-Match': first.headers['ETag']})
+    assert response.status_code == 200 and b'1 on wishlist' in response.data
+
+    # A missing movie flashes an error and redirects, which is not cached
+    assert client.get('/999').status_code == 302
+    assert counts(client)['bypass'] == 1
+
+
+def test_catalog_pages_are_dropped_when_the_catalog_changes(app):
+    add_catalog(app, 1)
+    client = app.test_client()
+    assert b'Movie 000' in client.get('/').data
+    with app.app_context():
+        app.extensions['data_manager'].add_movies(1, [({'movie_name': 'Brazil', 'movie_poster': 'N/A',
+                                                         'movie_director': 'Terry Gilliam', 'release_year': 1985,
+                                                         'movie_rating': 7.9, 'movie_plot': 'A plot.'},
+                                                        'wishlist', None)])
+    assert b'Brazil' in client.get('/').data
+
+
+def test_large_pages_are_served_precompressed(app):
+    add_catalog(app, 30)
+    client = app.test_client()
+    plain = client.get('/')
+    compressed = client.get('/', headers={'Accept-Encoding': 'gzip'})
+    assert compressed.content_encoding == 'gzip' and gzip.decompress(compressed.data) == plain.data
+    assert compressed.get_etag()[0] == f'{plain.get_etag()[0]}-gzip'
@@ -0,0 +1,114 @@
+"""
+Tests of the local poster cache (omdb.posters) and the /posters view, with a stub image host.
+"""
+
+import io
+import os
+import pytest
+import requests
+from data_manager.data_models import db, PosterFile
+from omdb.posters import url_hash
+
+POSTER_URL = 'https://img.example.com/alien.jpg'
+COPY_URL = 'https://img.example.com/alien-copy.jpg'
+
+
+class StubResponse:
+    def __init__(self, content, content_type):
+        self.content = content
+        self.headers = {'Content-Type': content_type}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size):
+        return (self.content[start:start + chunk_size] for start in range(0, len(self.content), chunk_size))
+
+
+class StubSession:
+    def __init__(self, images):
+        self.images = images  # url -> (content, content type), or an exception
+        self.requests = []
+
+    def get(self, url, timeout, stream):
+        self.requests.append(url)
+        image = self.images[url]
+        if isinstance(image, Exception):
+            raise image
+        return StubResponse(*image)
+
+    def close(self):
+        pass
+
+
+def add_movie(app, movie_name, movie_poster):
+    data_manager = app.extensions['data_manager']
+    with app.app_context():
+        if not data_manager.get_all_users():
+            data_manager.add_user({'user_name': 'ada'})
+        movie_id, = data_manager.add_movies(1, [({'movie_name': movie_name, 'movie_poster': movie_poster,
+                                                  'movie_director': 'Ridley Scott', 'release_year': 1979,
+                                                  'movie_rating': 8.5, 'movie_plot': 'A plot.'}, 'watched', None)])
+    return movie_id
+
+
+def test_posters_are_stored_once_per_content_and_served_with_caching(app):
+    store = app.extensions['poster_store']
+    store.session = StubSession({POSTER_URL: (b'GIF89a image', 'image/gif'), COPY_URL: (b'GIF89a image', 'image/gif')})
+    movie_id = add_movie(app, 'Alien', POSTER_URL)
+    client = app.test_client()
+
+    # Not stored yet: the browser is sent to the remote image while it is downloaded
+    response = client.get(f'/posters/{movie_id}')
+    assert response.status_code == 302 and response.location == POSTER_URL
+    store.shutdown()
+
+    version = url_hash(POSTER_URL)[:12]
+    response = client.get(f'/posters/{movie_id}?v={version}')
+    assert response.status_code == 200 and response.data == b'GIF89a image'
+    assert response.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+    assert client.get(f'/posters/{movie_id}').headers['Cache-Control'] == 'public, max-age=300'
+
+    with app.app_context():
+        assert store.fetch(COPY_URL) and store.fetch(POSTER_URL)
+        assert store.session.requests == [POSTER_URL, COPY_URL]
+        assert store.find(COPY_URL) == store.find(POSTER_URL)
+    files = [name for _, _, names in os.walk(store.directory) for name in names]
+    assert len(files) == 1
+
+    assert client.get(f"/posters/{add_movie(app, 'Heat', 'N/A')}").status_code == 404
+
+
+def test_failed_downloads_are_retried_later(app):
+    store = app.extensions['poster_store']
+    store.session = StubSession({POSTER_URL: requests.exceptions.ConnectionError('down'),
+                                 COPY_URL: (b'<html>', 'text/html')})
+    with app.app_context():
+        assert not store.fetch(POSTER_URL) and not store.fetch(COPY_URL)
+        assert not store.fetch(POSTER_URL)
+        assert store.session.requests == [POSTER_URL, COPY_URL]  # not before retry_after
+        store.retry_after = 0
+        store.session.images[POSTER_URL] = (b'GIF89a image', 'image/gif')
+        assert store.fetch(POSTER_URL)
+        assert db.session.get(PosterFile, url_hash(COPY_URL)).content_hash is None
+
+
+def test_wide_posters_get_a_thumbnail(app):
+    Image = pytest.importorskip('PIL.Image')
+    image = io.BytesIO()
+    Image.new('RGB', (600, 900), 'red').save(image, 'PNG')
+    store = app.extensions['poster_store']
+    store.session = StubSession({POSTER_URL: (image.getvalue(), 'image/png')})
+    with app.app_context():
+        assert store.fetch(POSTER_URL)
+        path, content_type = store.find(POSTER_URL)
+        assert content_type == 'image/jpeg'
+        with Image.open(path) as thumbnail:
+            assert thumbnail.width == store.thumbnail_width
+        assert store.find(POSTER_URL, thumbnail=False)[1] == 'image/png'
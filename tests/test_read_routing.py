@@ -0,0 +1,79 @@
+"""
+Tests of the routing of reads to a read-only pool (data_manager.read_routing).
+
+A copy of the database that is not kept up to date stands in for a
+lagging replica, so each read shows which pool served it.
+"""
+
+import sqlite3
+import pytest
+from flask import Flask, jsonify, request
+from config.config_files import SQLiteTuningConfig
+from data_manager.data_models import db
+from data_manager.migrations import setup_schema
+from data_manager.read_routing import STICKY_COOKIE, ReadRouter, primary_reads, read_only_url
+from data_manager.sqlite_data_manager import SQLiteDataManager
+
+
+@pytest.mark.parametrize('url, expected', [
+    ('sqlite:////srv/movie_app.sqlite', 'sqlite:///file:/srv/movie_app.sqlite?mode=ro&uri=true'),
+    ('sqlite:///file:/srv/replica.sqlite?mode=ro&uri=true', 'sqlite:///file:/srv/replica.sqlite?mode=ro&uri=true'),
+])
+def test_read_only_url(url, expected):
+    assert read_only_url(url) == expected
+
+
+@pytest.mark.parametrize('url', ['sqlite://', 'sqlite:///:memory:', 'postgresql://localhost/movies'])
+def test_read_only_url_needs_a_sqlite_file(url):
+    with pytest.raises(ValueError):
+        read_only_url(url)
+
+
+@pytest.fixture
+def routed_app(tmp_path):
+    primary, replica = tmp_path / 'primary.sqlite', tmp_path / 'replica.sqlite'
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{primary}'
+    router = ReadRouter(f'sqlite:///{replica}', SQLiteTuningConfig, pool_size=2, sticky_seconds=60)
+    data_manager = SQLiteDataManager(app, read_router=router)
+    with app.app_context():
+        setup_schema()
+        data_manager.add_user({'user_name': 'ada'})
+    with sqlite3.connect(primary) as source, sqlite3.connect(replica) as target:
+        source.backup(target)
+    with app.app_context():
+        data_manager.add_user({'user_name': 'grace'})  # not on the replica yet
+
+    @app.route('/users', methods=['GET', 'POST'])
+    def users():
+        if request.method == 'POST':
+            data_manager.add_user({'user_name': 'linus'})
+        return jsonify([user.user_name for user in data_manager.get_all_users()])
+
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+    router.engine.dispose()
+
+
+def test_reads_go_to_the_replica_until_the_client_writes(routed_app):
+    app = routed_app
+    client = app.test_client()
+    assert client.get('/users').get_json() == ['ada']
+
+    response = client.post('/users')
+    assert response.get_json() == ['ada', 'grace', 'linus']  # read back on the primary after the write
+    assert STICKY_COOKIE in response.headers['Set-Cookie']
+
+    assert client.get('/users').get_json() == ['ada', 'grace', 'linus']  # the cookie keeps the client on it
+    assert app.test_client().get('/users').get_json() == ['ada']  # other clients read the replica
+
+
+def test_primary_reads_bypass_the_replica(routed_app):
+    app = routed_app
+    data_manager = app.extensions['data_manager']
+    with app.test_request_context():
+        assert [user.user_name for user in data_manager.get_all_users()] == ['ada']
+        with primary_reads():
+            assert [user.user_name for user in data_manager.get_all_users()] == ['ada', 'grace']
@@ -0,0 +1,44 @@
+"""
+Tests of the item-item recommendations (data_manager.recommendations): the batch job and the incremental refresh.
+"""
+
+import pytest
+from data_manager.recommendations import top_per_row
+from tests.test_web import add_catalog
+
+np = pytest.importorskip('numpy')
+sparse = pytest.importorskip('scipy.sparse')
+
+
+def test_top_per_row_ranks_by_value_then_column_and_skips_the_diagonal():
+    block = sparse.csr_matrix(np.array([[9, 3, 3, 0], [5, 0, 7, -1]], dtype=np.float32))
+    rows, ranks, columns, values = top_per_row(block, 2)
+    assert (rows.tolist(), ranks.tolist(), columns.tolist(), values.tolist()) == \
+        ([0, 0, 1, 1], [1, 2, 1, 2], [0, 1, 2, 0], [9, 3, 7, 5])
+    rows, _, columns, _ = top_per_row(block, 2, offset=2)  # the rows of movies 2 and 3
+    assert list(zip(rows.tolist(), columns.tolist())) == [(2, 0), (2, 1), (3, 2), (3, 0)]
+
+
+def test_batch_job_then_incremental_refresh(app):
+    first, second, third = add_catalog(app, 3)
+    data_manager = app.extensions['data_manager']
+    with app.app_context():
+        for name, movie_ids in (('grace', [first, second, third]), ('linus', [first])):
+            data_manager.add_user({'user_name': name})
+            user_id = max(user.id for user in data_manager.get_all_users())
+            data_manager.add_movies(user_id, [({'movie_name': f'Movie {movie_id - 1:03}'}, 'watched', 5)
+                                              for movie_id in movie_ids])
+        data_manager.delete_movie(1, third)
+    # ada: first, second; grace: first, second, third; linus: first
+
+    result = app.test_cli_runner().invoke(args=['refresh-recommendations', '--full'])
+    assert result.exit_code == 0 and result.output.startswith('6 ratings of 3 users on 3 movies'), result.output
+    with app.app_context():
+        assert [row.movie_id for row in data_manager.get_recommendations(1)] == [third]
+        assert [row.movie_id for row in data_manager.get_recommendations(3)] == [second, third]
+
+        # A list change marks the user stale, and the next read refreshes them from the stored neighbors
+        data_manager.add_movies(3, [({'movie_name': 'Movie 001'}, 'watched', 5)])
+        assert [row.movie_id for row in data_manager.get_recommendations(3)] == [third]
+    result = app.test_cli_runner().invoke(args=['refresh-recommendations'])
+    assert result.output.strip() == 'Refreshed the recommendations of 0 users'
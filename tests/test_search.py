@@ -0,0 +1,38 @@
+"""
+Tests of the full-text search on SQLite (the FTS5 index of data_manager.migrations) and its view.
+"""
+
+
+def add_catalog(data_manager, movies):
+    data_manager.add_user({'user_name': 'ada'})
+    return data_manager.add_movies(1, [({'movie_name': name, 'movie_poster': 'N/A', 'movie_director': director,
+                                         'release_year': 2000, 'movie_rating': 7.0, 'movie_plot': plot},
+                                        'watched', None) for name, director, plot in movies])
+
+
+def test_prefix_matching_and_title_ranking(sqlite_app):
+    data_manager = sqlite_app.extensions['data_manager']
+    reloaded, revolutions, heat = add_catalog(data_manager, [
+        ('The Matrix Reloaded', 'Lana Wachowski', 'Neo fights on.'),
+        ('The Matrix Revolutions', 'Lana Wachowski', 'The war ends.'),
+        ('Heat', 'Michael Mann', 'A detective hunts thieves through the matrix of the city.'),
+    ])
+    assert [row.id for row in data_manager.search_movies('matr rev')[0]] == [revolutions]
+    # A title match ranks above a plot match
+    assert [row.id for row in data_manager.search_movies('matrix')[0]][-1] == heat
+
+    # The index follows updates of the catalog
+    data_manager.update_movies_metadata([{'id': heat, 'movie_plot': 'A detective hunts thieves.'}])
+    assert heat not in [row.id for row in data_manager.search_movies('matrix')[0]]
+    assert [row.id for row in data_manager.search_movies('mann')[0]] == [heat]
+
+
+def test_search_view_pages_through_results(app):
+    app.config['SEARCH_PAGE_SIZE'] = 2
+    with app.app_context():
+        add_catalog(app.extensions['data_manager'],
+                    [(f'Night Movie {index}', 'Director', 'A plot.') for index in range(3)])
+    client = app.test_client()
+    page = client.get('/search?q=night').get_data(as_text=True)
+    assert page.count('">Night Movie') == 2 and 'cursor=' in page
+    assert client.get('/search?q=night&cursor=oops').status_code == 200  # falls back to the first page
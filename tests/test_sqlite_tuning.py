@@ -0,0 +1,37 @@
+"""
+Tests of the SQLite tuning profile (data_manager.sqlite_tuning).
+"""
+
+from dataclasses import replace
+import pytest
+from config.config_files import SQLiteTuningConfig
+from data_manager.data_models import db
+from data_manager.sqlite_tuning import engine_options, merge_engine_options
+
+PROFILE = SQLiteTuningConfig(enabled=True, journal_mode='WAL', synchronous='NORMAL', busy_timeout=5000,
+                             mmap_size=0, cache_size=-2000, temp_store='MEMORY', pool_size=4, max_overflow=2)
+
+
+def test_connections_get_the_profile_pragmas(app):
+    with app.app_context():
+        with db.engine.connect() as conn:
+            def pragma(name):
+                return conn.exec_driver_sql(f'PRAGMA {name}').scalar()
+            assert pragma('journal_mode') == SQLiteTuningConfig.journal_mode.lower()
+            assert pragma('busy_timeout') == SQLiteTuningConfig.busy_timeout
+            assert pragma('cache_size') == SQLiteTuningConfig.cache_size
+        assert db.engine.pool.size() == SQLiteTuningConfig.pool_size
+
+
+@pytest.mark.parametrize('options, expected', [
+    (None, engine_options(PROFILE)),
+    ({'pool_pre_ping': True}, {**engine_options(PROFILE), 'pool_pre_ping': True}),
+    ({'pool_size': 1, 'connect_args': {'timeout': 1}},
+     {'pool_size': 1, 'max_overflow': 2, 'connect_args': {'timeout': 1, 'check_same_thread': False}}),
+])
+def test_application_options_are_merged_over_the_profile(options, expected):
+    assert merge_engine_options(options, PROFILE) == expected
+
+
+def test_disabled_profile_keeps_the_application_options():
+    assert merge_engine_options({'pool_pre_ping': True}, replace(PROFILE, enabled=False)) == {'pool_pre_ping': True}
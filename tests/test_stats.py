@@ -0,0 +1,36 @@
+"""
+Tests of the list stats kept by triggers (data_manager.stats), whichever code path writes users_movies.
+"""
+
+from data_manager.data_models import db
+from tests.test_web import add_catalog
+
+
+def stats_rows(table):
+    return db.session.execute(db.text(f'SELECT * FROM {table} ORDER BY 1')).all()
+
+
+def test_raw_writes_keep_the_stats_and_rebuild_repairs_drift(app):
+    movie_ids = add_catalog(app, 2)
+    data_manager = app.extensions['data_manager']
+    with app.app_context():
+        db.session.execute(db.text("INSERT INTO users (id, user_name) VALUES (2, 'grace')"))
+        db.session.execute(db.text("INSERT INTO users_movies (user_id, movie_id, watchlist_status, user_rating) "
+                                   "VALUES (2, :movie_id, 'wishlist', 4)"), {'movie_id': movie_ids[0]})
+        db.session.execute(db.text('DELETE FROM users_movies WHERE user_id = 1 AND movie_id = :movie_id'),
+                           {'movie_id': movie_ids[1]})
+        db.session.commit()
+        stats = data_manager.get_movie_stats(movie_ids[0])
+        assert (stats.list_count, stats.rating_count, stats.average_rating, stats.wishlist_count) == (2, 1, 4, 1)
+        assert data_manager.get_movie_stats(movie_ids[1]).list_count == 0
+        assert data_manager.get_user_stats([1])[1].list_count == 1
+        expected = {table: stats_rows(table) for table in ('movie_stats', 'user_stats')}
+
+        db.session.execute(db.text('UPDATE movie_stats SET list_count = 99'))
+        db.session.execute(db.text('DELETE FROM user_stats'))
+        db.session.commit()
+
+    result = app.test_cli_runner().invoke(args=['rebuild-stats'])
+    assert result.exit_code == 0 and result.output.strip() == 'movie_stats: 1 rows, user_stats: 2 rows'
+    with app.app_context():
+        assert {table: stats_rows(table) for table in expected} == expected
@@ -0,0 +1,75 @@
+"""
+Tests of the local title index (omdb.title_index) and the autocomplete endpoint.
+"""
+
+import time
+import pytest
+from omdb.title_index import TitleIndex, match_key, numbers
+from tests.test_web import add_catalog
+
+CATALOG = [(1, 'The Matrix'), (2, 'Alien'), (3, 'Aliens'), (4, 'Rocky II'), (5, 'Rocky III'),
+           (6, 'The Godfather Part II'), (7, 'Amélie')]
+
+
+@pytest.fixture
+def index():
+    index = TitleIndex(refresh_interval=0)
+    pages = [CATALOG[:4], CATALOG[4:]]
+    index.load(lambda after_id: pages.pop(0) if pages else [], [('heat', 'Heat')])
+    return index
+
+
+@pytest.mark.parametrize('title, key', [
+    ('The Matrix: Reloaded', 'matrix reloaded'),
+    ('  AMÉLIE ', 'amelie'),
+    ('The', 'the'),
+])
+def test_match_key(title, key):
+    assert match_key(title) == key
+
+
+@pytest.mark.parametrize('key, expected', [
+    ('godfather part ii', (2,)), ('godfather part 2', (2,)), ('ocean s eleven', ()), ('se7en', ()),
+    ('rocky iv', (4,)), ('apollo thirteen', ()), ('three colors', (3,)),
+])
+def test_numbers(key, expected):
+    assert numbers(key) == expected
+
+
+@pytest.mark.parametrize('typed, movie_id', [
+    ('the matrix', 1), ('Matrix', 1), ('amelie', 7), ('Godfather Part 2', 6),
+    ('Godfathr Part II', 6),  # a typo
+    ('The Matrx', None),  # too far from a short title
+    ('Alien', 2), ('Aliens', 3),
+    ('Rocky IV', None),  # another sequel is another movie
+    ('Brazil', None),
+])
+def test_resolve(index, typed, movie_id):
+    match = index.resolve(typed)
+    assert (match.movie_id if match else None) == movie_id
+
+
+def test_cached_omdb_titles_and_added_titles_are_resolved(index):
+    assert index.resolve('heat') == ('Heat', None, 'heat', 1.0)
+    index.add('Brazil', movie_id=8)
+    assert index.resolve('brazil').movie_id == 8
+    index.add('heat', movie_id=9)  # the catalog movie takes over the OMDb answer
+    assert index.resolve('Heat').movie_id == 9
+
+
+def test_suggest_puts_prefixes_first(index):
+    assert [match.title for match in index.suggest('ali')] == ['Alien', 'Aliens']
+    assert [match.title for match in index.suggest('rocky', limit=1)] == ['Rocky II']
+    assert [match.title for match in index.suggest('matrx')] == ['The Matrix']
+    assert TitleIndex().suggest('ali') == []  # not built yet
+
+
+def test_autocomplete_endpoint(app):
+    add_catalog(app, 2)
+    client = app.test_client()
+    assert client.get('/api/v1/titles?q=movie').status_code == 200  # starts building the index
+    deadline = time.monotonic() + 5
+    while not app.extensions['title_index'].ready and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert client.get('/api/v1/titles?q=movie 00').get_json() == {
+        'items': [{'title': 'Movie 000', 'movie_id': 1}, {'title': 'Movie 001', 'movie_id': 2}], 'ready': True}
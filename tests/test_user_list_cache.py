@@ -0,0 +1,52 @@
+"""
+Tests of the cache of users' movie lists (data_manager.user_list_cache) across processes and in the view.
+"""
+
+from data_manager.sql_data_manager import SQLDataManager
+
+ALIEN = {'movie_name': 'Alien', 'movie_poster': 'N/A', 'movie_director': 'Ridley Scott', 'release_year': 1979,
+         'movie_rating': 8.5, 'movie_plot': 'A crew meets a creature.'}
+
+
+def movie_ids(cached):
+    return [entry.movie_id for entry, _, _ in cached.user_movies]
+
+
+def test_changes_from_another_process_are_not_served_from_the_cache(sqlite_app):
+    data_manager = sqlite_app.extensions['data_manager']
+    # A second manager on the same file, with its own cache, stands in for another worker
+    other = SQLDataManager(sqlite_app.config['SQLALCHEMY_DATABASE_URI'])
+    try:
+        data_manager.add_user({'user_name': 'ada'})
+        user_id = 1
+        alien, = data_manager.add_movies(user_id, [(ALIEN, 'watched', None)])
+        assert movie_ids(other.get_cached_user_movies(user_id)) == [alien]
+
+        heat, = other.add_movies(user_id, [(dict(ALIEN, movie_name='Heat'), 'watched', None)])
+        cached = data_manager.get_cached_user_movies(user_id)
+        assert movie_ids(cached) == [alien, heat]
+        assert data_manager.get_cached_user_movies(user_id).etag == cached.etag
+
+        # A rename reaches every list the movie is on
+        data_manager.update_movies_metadata([{'id': heat, 'movie_name': 'Heat (1995)'}])
+        assert other.get_cached_user_movies(user_id).user_movies[1][1] == 'Heat (1995)'
+    finally:
+        other.engine.dispose()
+
+
+def test_unchanged_list_is_revalidated_with_a_304(app):
+    data_manager = app.extensions['data_manager']
+    with app.app_context():
+        data_manager.add_user({'user_name': 'ada'})
+        user_id = 1
+        alien, = data_manager.add_movies(user_id, [(ALIEN, 'watched', None)])
+    client = app.test_client()
+    response = client.get(f'/users/{user_id}')
+    assert response.status_code == 200 and 'Alien' in response.get_data(as_text=True)
+    etag = response.headers['ETag']
+
+    assert client.get(f'/users/{user_id}', headers={'If-None-Match': etag}).status_code == 304
+    with app.app_context():
+        data_manager.update_movie(user_id, alien, 3, 'wishlist')
+    response = client.get(f'/users/{user_id}', headers={'If-None-Match': etag})
+    assert response.status_code == 200 and response.headers['ETag'] != etag
@@ -0,0 +1,55 @@
+"""
+Tests of the HTML views (web/views.py) through the Flask test client.
+"""
+
+import re
+
+
+def add_catalog(app, count):
+    """Adds ``count`` movies to the catalog through a user's list; returns their IDs."""
+    data_manager = app.extensions['data_manager']
+    with app.app_context():
+        data_manager.add_user({'user_name': 'ada'})
+        return data_manager.add_movies(1, [({'movie_name': f'Movie {index:03}', 'movie_poster': 'N/A',
+                                             'movie_director': 'Director', 'release_year': 2000,
+                                             'movie_rating': 7.0, 'movie_plot': 'A plot.'}, 'watched', None)
+                                           for index in range(count)])
+
+
+def test_home_pages_through_the_catalog_with_a_keyset_cursor(app):
+    app.config['CATALOG_PAGE_SIZE'] = 4
+    movie_ids = add_catalog(app, 10)
+    client = app.test_client()
+
+    seen, path = [], '/'
+    while path:
+        page = client.get(path).get_data(as_text=True)
+        shown = re.findall(r'Movie \d{3}', page)
+        assert 0 < len(shown) <= 4
+        seen += shown
+        match = re.search(r'href="(/\?after=\d+)"', page)
+        path = match.group(1) if match else None
+    assert seen == [f'Movie {index:03}' for index in range(10)]
+    assert f'/?after={movie_ids[3]}' in client.get('/').get_data(as_text=True)
+
+
+def test_user_movies_are_filtered_sorted_and_paged(app):
+    app.config['USER_MOVIES_PAGE_SIZE'] = 2
+    movie_ids = add_catalog(app, 6)
+    with app.app_context():
+        for movie_id, rating in zip(movie_ids, (3, 4, 2, 3, 4, 2)):
+            app.extensions['data_manager'].update_movie(1, movie_id, rating, 'watched' if rating > 2 else 'wishlist')
+    client = app.test_client()
+
+    seen, path = [], '/users/1?status=watched&sort=title&direction=desc'
+    while path:
+        page = client.get(path).get_data(as_text=True)
+        shown = re.findall(r'> (Movie \d{3}) <', page)
+        assert 0 < len(shown) <= 2
+        seen += shown
+        match = re.search(r'href="(/users/1\?[^"]*cursor=[^"]+)">Load more', page)
+        path = match.group(1).replace('&amp;', '&') if match else None
+    assert seen == ['Movie 004', 'Movie 003', 'Movie 001', 'Movie 000']
+
+    response = client.get('/users/1?sort=password', follow_redirects=True)
+    assert response.request.path == '/users/1' and 'Invalid sort' in response.get_data(as_text=True)
@@ -0,0 +1,127 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+
+class CacheBackend(ABC):
+    """
+    Interface for key-value cache backends.
+
+    Keys are strings and values must be picklable, so that a networked
+    backend (for example a Redis-compatible store shared by all workers)
+    can implement the same interface as the in-process LRU.
+    """
+
+    @abstractmethod
+    def get(self, key):
+        """
+        Retrieves a cached value.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            The cached value, or None if the key is missing or expired.
+        """
+        pass
+
+    @abstractmethod
+    def set(self, key, value):
+        """
+        Stores a value.
+
+        Args:
+            key (str): The cache key.
+            value: The value to cache.
+        """
+        pass
+
+    @abstractmethod
+    def delete(self, *keys):
+        """
+        Removes values from the cache.
+
+        Args:
+            keys (str): The cache keys.
+        """
+        pass
+
+    @abstractmethod
+    def clear(self):
+        """Removes every value from the cache."""
+        pass
+
+    @abstractmethod
+    def stats(self):
+        """
+        Returns the cache counters for monitoring.
+
+        Returns:
+            dict: Hit, miss and eviction counts and the current size.
+        """
+        pass
+
+
+class LRUCache(CacheBackend):
+    """
+    Thread-safe in-process LRU cache with an optional time-to-live.
+
+    Entries expire after ``ttl`` seconds, which bounds how stale a value can
+    get when it is changed by another process that cannot invalidate it.
+    """
+    def __init__(self, max_entries=1024, ttl=None):
+        """
+        Initializes the cache.
+
+        Args:
+            max_entries (int): The number of entries kept before the least recently used is evicted.
+            ttl (float, optional): Seconds an entry stays valid; entries never expire if None.
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (entry[0] is not None and entry[0] <= time.monotonic()):
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+            }
@@ -1,4 +1,4 @@
-from flask import flash, render_template
+from flask import flash, render_template, request
 
 class CustomError(Exception):
     """Base class for custom errors."""
@@ -43,8 +43,8 @@ class InternalServerError(CustomError):
 
 
 def handle_internal_server_error(app, e):
-    """Handles internal server errors."""
-    app.logger.error(f"Internal Server Error: {str(e)}")
+    """Handles internal server errors, logging the request and the traceback."""
+    app.logger.error(f"Internal Server Error on {request.method} {request.path}: {str(e)}", exc_info=e)
     flash("An unexpected error occurred. Please try again later.", "error")
     return render_template('error.html', error_message="Internal Server Error")
         
\ No newline at end of file
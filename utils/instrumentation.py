@@ -0,0 +1,254 @@
+"""
+Opt-in request instrumentation.
+
+Every request records its wall time, the time spent in SQL statements (via
+SQLAlchemy engine events), its query count and slowest statements, and the
+time spent calling upstream services such as OMDb. The numbers are sent
+back in a ``Server-Timing`` header, written as one JSON log line per
+request, and aggregated into Prometheus metrics served at ``/metrics``.
+A statement repeated many times within one request is flagged as a likely
+N+1 query pattern, and a sample of requests can be run under the sampling
+profiler.
+"""
+
+import contextvars
+import heapq
+import json
+import logging
+import os
+import random
+import time
+from collections import Counter
+from flask import Response, g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from utils.metrics import Registry
+from utils.profiler import SamplingProfiler
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+_instrumentation = None  # the installed Instrumentation, if any
+
+
+class RequestMetrics:
+    """The measurements of one request."""
+    __slots__ = ('started', 'db_time', 'query_count', 'statements', 'slowest', 'external')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_time = 0.0
+        self.query_count = 0
+        self.statements = Counter()
+        self.slowest = []  # min-heap of (seconds, statement)
+        self.external = {}  # service -> [calls, seconds]
+
+    def record_query(self, statement, seconds, keep):
+        self.db_time += seconds
+        self.query_count += 1
+        self.statements[statement] += 1
+        if len(self.slowest) < keep:
+            heapq.heappush(self.slowest, (seconds, statement))
+        elif seconds > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, (seconds, statement))
+
+    def record_external(self, service, seconds):
+        calls = self.external.setdefault(service, [0, 0.0])
+        calls[0] += 1
+        calls[1] += seconds
+
+
+def record_external(service, seconds):
+    """
+    Records a call to an upstream service, if instrumentation is installed.
+
+    Args:
+        service (str): The name of the service (e.g. 'omdb').
+        seconds (float): The duration of the call.
+    """
+    instrumentation = _instrumentation
+    if instrumentation is None:
+        return
+    instrumentation.external_duration.observe(seconds, service=service)
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.record_external(service, seconds)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_started'].pop()
+    instrumentation = _instrumentation
+    if instrumentation is not None:
+        instrumentation.record_query(statement, elapsed)
+
+
+def _handle_error(context):
+    # A failed statement gets no after_cursor_execute: drop its start time
+    started = context.connection.info.get('query_started') if context.connection is not None else None
+    if started and context.execution_context is not None:
+        started.pop()
+
+
+class Instrumentation:
+    """
+    Flask extension recording per-request timings, SQL statistics and metrics.
+
+    Recording costs a few microseconds per request and per statement, so it
+    can stay on in production; only the sampled profiling is expensive, and
+    it is off unless ``profile_rate`` is set.
+    """
+    def __init__(self, registry=None, slowest_statements=3, n_plus_one_threshold=10,
+                 profile_rate=0.0, profile_interval=0.005, profile_dir=None):
+        """
+        Initializes the extension.
+
+        Args:
+            registry (Registry, optional): The metrics registry, a new one by default.
+            slowest_statements (int): Slowest statements kept and logged per request.
+            n_plus_one_threshold (int): Executions of one statement within a request
+                from which the request is flagged as an N+1 pattern.
+            profile_rate (float): Fraction of requests run under the sampling profiler.
+            profile_interval (float): Seconds between two profiler samples.
+            profile_dir (str, optional): Directory the folded stacks of profiled requests are written to.
+        """
+        self.registry = registry or Registry()
+        self.slowest_statements = slowest_statements
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.profile_rate = profile_rate
+        self.profile_interval = profile_interval
+        self.profile_dir = profile_dir
+        self.logger = logging.getLogger('movieweb.requests')
+
+        self.requests_total = self.registry.counter(
+            'http_requests_total', 'HTTP requests by route, method and status.')
+        self.request_duration = self.registry.histogram(
+            'http_request_duration_seconds', 'Wall time of HTTP requests by route.')
+        self.request_db_duration = self.registry.histogram(
+            'http_request_db_duration_seconds', 'Time spent in SQL statements per request, by route.')
+        self.request_queries = self.registry.histogram(
+            'http_request_queries', 'SQL statements executed per request, by route.',
+            buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500))
+        self.query_duration = self.registry.histogram(
+            'db_query_duration_seconds', 'Duration of SQL statements by operation.')
+        self.n_plus_one_total = self.registry.counter(
+            'db_n_plus_one_total', 'Requests flagged with a repeated statement (N+1 pattern), by route.')
+        self.external_duration = self.registry.histogram(
+            'external_request_duration_seconds', 'Duration of calls to upstream services, by service.')
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Creates the extension from an InstrumentationConfig.
+
+        Args:
+            config (InstrumentationConfig): The instrumentation settings.
+
+        Returns:
+            Instrumentation: The new extension.
+        """
+        return cls(slowest_statements=config.slowest_statements,
+                   n_plus_one_threshold=config.n_plus_one_threshold,
+                   profile_rate=config.profile_rate,
+                   profile_interval=config.profile_interval,
+                   profile_dir=config.profile_dir)
+
+    def init_app(self, app):
+        """
+        Installs the request hooks, the SQL event listeners and the ``/metrics`` endpoint.
+
+        Args:
+            app (Flask): The Flask application instance.
+        """
+        global _instrumentation
+        _instrumentation = self
+        if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+            event.listen(Engine, 'handle_error', _handle_error)
+        if not self.logger.handlers:
+            handler = logging.StreamHandler()
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            self.logger.addHandler(handler)
+            self.logger.setLevel(logging.INFO)
+            self.logger.propagate = False
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        app.add_url_rule('/metrics', 'metrics', self.metrics)
+        app.extensions['instrumentation'] = self
+
+    def metrics(self):
+        """Serves the metrics in the Prometheus text format."""
+        return Response(self.registry.render(), mimetype='text/plain; version=0.0.4')
+
+    def record_query(self, statement, seconds):
+        """Records one SQL statement, and attributes it to the current request if there is one."""
+        self.query_duration.observe(seconds, operation=statement.lstrip().split(' ', 1)[0].upper())
+        metrics = _current.get()
+        if metrics is not None:
+            metrics.record_query(statement, seconds, self.slowest_statements)
+
+    def _before_request(self):
+        _current.set(RequestMetrics())
+        if self.profile_rate and random.random() < self.profile_rate:
+            g.profiler = SamplingProfiler(interval=self.profile_interval)
+            g.profiler.start()
+
+    def _after_request(self, response):
+        metrics = _current.get()
+        if metrics is None:
+            return response
+        duration = time.perf_counter() - metrics.started
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+
+        self.requests_total.inc(route=route, method=request.method, status=response.status_code)
+        self.request_duration.observe(duration, route=route)
+        self.request_db_duration.observe(metrics.db_time, route=route)
+        self.request_queries.observe(metrics.query_count, route=route)
+
+        timings = [f'app;dur={duration * 1000:.1f}',
+                   f'db;dur={metrics.db_time * 1000:.1f};desc="{metrics.query_count} queries"']
+        timings += [f'{service};dur={seconds * 1000:.1f};desc="{calls} calls"'
+                    for service, (calls, seconds) in metrics.external.items()]
+        response.headers.add('Server-Timing', ', '.join(timings))
+
+        line = {
+            'event': 'request',
+            'method': request.method,
+            'path': request.path,
+            'route': route,
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 2),
+            'db_ms': round(metrics.db_time * 1000, 2),
+            'queries': metrics.query_count,
+            'external': {service: {'calls': calls, 'ms': round(seconds * 1000, 2)}
+                         for service, (calls, seconds) in metrics.external.items()},
+            'slowest': [{'ms': round(seconds * 1000, 2), 'sql': ' '.join(statement.split())[:300]}
+                        for seconds, statement in sorted(metrics.slowest, reverse=True)],
+        }
+        repeated = [(statement, count) for statement, count in metrics.statements.most_common(3)
+                    if count >= self.n_plus_one_threshold]
+        if repeated:
+            self.n_plus_one_total.inc(route=route)
+            line['n_plus_one'] = [{'count': count, 'sql': ' '.join(statement.split())[:300]}
+                                  for statement, count in repeated]
+
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.stop()
+            line['profile'] = [{'samples': count, 'stack': stack.split(';')[-5:]} for stack, count in profiler.top()]
+            if self.profile_dir:
+                name = f"{time.strftime('%Y%m%d-%H%M%S')}-{request.endpoint or 'unmatched'}-{os.getpid()}.folded"
+                profiler.dump(os.path.join(self.profile_dir, name))
+
+        self.logger.log(logging.WARNING if repeated else logging.INFO, json.dumps(line))
+        return response
+
+    def _teardown_request(self, exc):
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.stop()
+        _current.set(None)
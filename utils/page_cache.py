@@ -0,0 +1,205 @@
+import functools
+import gzip
+import hashlib
+import threading
+import time
+from collections import namedtuple
+from flask import current_app, make_response, request, session
+from data_manager.read_routing import primary_reads
+from utils.cache import LRUCache
+
+CachedPage = namedtuple('CachedPage', ['body', 'gzip_body', 'mimetype', 'etag', 'last_modified'])
+
+# The key of a movie's detail page, which the data manager invalidates when the movie's lists change
+MOVIE_PAGE_KEY = 'movie:{movie_id}'
+
+
+class PageCache:
+    """
+    Full-page cache for pages that render the same HTML for every visitor.
+
+    A page is rendered once, then served from the cache together with its
+    gzip-compressed bytes, a strong ETag and a Last-Modified date, so a hit
+    neither queries the database nor runs Jinja nor compresses, and a
+    client revalidating an unchanged page gets a 304.
+
+    The data manager invalidates the pages its writes affect: the page of a
+    movie whose lists changed, or every page when the catalog changed.
+    Clearing every page only bumps a generation number that is part of the
+    keys; the old entries age out of the LRU. Entries also expire after
+    ``ttl`` seconds, which bounds staleness after writes made by other
+    processes.
+    """
+    def __init__(self, backend, max_age=0, min_compress_size=1024, registry=None, enabled=True):
+        """
+        Initializes the cache.
+
+        Args:
+            backend (CacheBackend): The storage for the cached pages.
+            max_age (int): Seconds browsers may reuse a page without revalidating it.
+            min_compress_size (int): Smallest body stored precompressed.
+            registry (Registry, optional): The metrics registry to report hits and misses to.
+            enabled (bool): If False, the decorated views render every request.
+        """
+        self.enabled = enabled
+        self.backend = backend
+        self.max_age = max_age
+        self.min_compress_size = min_compress_size
+        self.generation = 0
+        self._lock = threading.Lock()
+        self.counts = {'hit': 0, 'miss': 0, 'not_modified': 0, 'bypass': 0}
+        self.requests_total = registry.counter(
+            'page_cache_requests_total', 'Cacheable page requests by endpoint and result.') if registry else None
+
+    @classmethod
+    def from_config(cls, config, registry=None):
+        """
+        Creates the cache from a PageCacheConfig.
+
+        Args:
+            config (PageCacheConfig): The page cache settings.
+            registry (Registry, optional): The metrics registry to report hits and misses to.
+
+        Returns:
+            PageCache: The new cache.
+        """
+        return cls(LRUCache(config.max_entries, config.ttl), max_age=config.max_age,
+                   min_compress_size=config.min_compress_size, registry=registry, enabled=config.enabled)
+
+    def init_app(self, app):
+        """
+        Registers the cache in ``app.extensions``, where the ``cached`` views find it.
+
+        Args:
+            app (Flask): The Flask application instance.
+        """
+        app.extensions['page_cache'] = self
+
+    def serve(self, view, key, *args, **kwargs):
+        """
+        Serves a request to a view from the cache, rendering and storing the page on a miss.
+
+        Args:
+            view (callable): The view function.
+            key (callable): Builds the cache key of a request from the view arguments.
+            args, kwargs: The view arguments.
+
+        Returns:
+            Response: The cached page, a 304, or the view's own response if it is not cacheable.
+        """
+        # Pending flash messages are part of the page, so it must be rendered for them
+        if request.method != 'GET' or self._has_session() and session.get('_flashes'):
+            self._count('bypass')
+            return view(*args, **kwargs)
+        cache_key = f'page:{self.generation}:{key(*args, **kwargs)}'
+        page = self.backend.get(cache_key)
+        if page is None:
+            # The page is served to everybody, so it is not rendered from a replica that may lag behind
+            with primary_reads():
+                response = make_response(view(*args, **kwargs))
+            # A page that flashed a message (e.g. an error) is not the page everybody gets
+            if response.status_code != 200 or response.direct_passthrough or session.modified:
+                self._count('bypass')
+                return response
+            page = self._store(cache_key, response)
+            self._count('miss')
+        elif self._is_current(page):
+            self._count('not_modified')
+        else:
+            self._count('hit')
+        return self._respond(page)
+
+    def invalidate(self, *keys):
+        """
+        Drops cached pages.
+
+        Args:
+            keys (str): The keys of the pages, as built by the ``key`` functions.
+        """
+        self.backend.delete(*(f'page:{self.generation}:{key}' for key in keys))
+
+    def invalidate_all(self):
+        """Drops every cached page."""
+        with self._lock:
+            self.generation += 1
+
+    def stats(self):
+        """
+        Returns the cache counters for monitoring.
+
+        Returns:
+            dict: The hit, miss, 304 and bypass counts, the hit rate and the backend counters.
+        """
+        with self._lock:
+            counts = dict(self.counts)
+        lookups = counts['hit'] + counts['not_modified'] + counts['miss']
+        return {**counts,
+                'hit_rate': round((counts['hit'] + counts['not_modified']) / lookups, 4) if lookups else None,
+                'backend': self.backend.stats()}
+
+    @staticmethod
+    def _has_session():
+        """Tells whether the request carries a session, without loading it (which adds Vary: Cookie)."""
+        return current_app.config['SESSION_COOKIE_NAME'] in request.cookies
+
+    def _store(self, cache_key, response):
+        body = response.get_data()
+        compressed = gzip.compress(body, compresslevel=6) if len(body) >= self.min_compress_size else None
+        page = CachedPage(body, compressed, response.mimetype, hashlib.sha1(body).hexdigest(),
+                          int(time.time()))
+        self.backend.set(cache_key, page)
+        return page
+
+    def _is_current(self, page):
+        """Tells whether the client's copy of a page, if any, is the cached one."""
+        if request.if_none_match:
+            return page.etag in request.if_none_match or f'{page.etag}-gzip' in request.if_none_match
+        since = request.if_modified_since
+        return since is not None and since.timestamp() >= page.last_modified
+
+    def _respond(self, page):
+        use_gzip = page.gzip_body is not None and request.accept_encodings['gzip']
+        if self._is_current(page):
+            response = make_response('', 304)
+        else:
+            response = make_response(page.gzip_body if use_gzip else page.body)
+            response.mimetype = page.mimetype
+            if use_gzip:
+                response.content_encoding = 'gzip'
+        # Each encoding gets its own ETag, since the bytes differ
+        response.set_etag(f'{page.etag}-gzip' if use_gzip else page.etag)
+        response.last_modified = page.last_modified
+        response.vary.add('Accept-Encoding')
+        response.headers['Cache-Control'] = f'public, max-age={self.max_age}' if self.max_age else 'public, no-cache'
+        return response
+
+    def _count(self, result):
+        with self._lock:
+            self.counts[result] += 1
+        if self.requests_total is not None:
+            self.requests_total.inc(endpoint=request.endpoint, result=result)
+
+
+def cached(key):
+    """
+    Decorates a view whose successful GET responses are served from the app's page cache.
+
+    The cache is looked up in ``current_app.extensions`` on each request, so
+    views can be declared before the app exists; without an enabled cache
+    the view runs as usual.
+
+    Args:
+        key (callable): Builds the cache key of a request from the view arguments.
+
+    Returns:
+        callable: The decorator.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            page_cache = current_app.extensions.get('page_cache')
+            if page_cache is None or not page_cache.enabled:
+                return view(*args, **kwargs)
+            return page_cache.serve(view, key, *args, **kwargs)
+        return wrapper
+    return decorator
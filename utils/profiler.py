@@ -0,0 +1,74 @@
+import collections
+import os
+import sys
+import threading
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler of a single thread.
+
+    A background thread records the target thread's call stack every
+    ``interval`` seconds. Unlike cProfile, the profiled code is not traced,
+    so it runs at full speed; the result is in the "folded stacks" format
+    read by flamegraph.pl and speedscope.
+    """
+    def __init__(self, thread_id=None, interval=0.005):
+        """
+        Initializes the profiler.
+
+        Args:
+            thread_id (int, optional): The ident of the thread to sample, the current thread by default.
+            interval (float): Seconds between two samples.
+        """
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.samples = collections.Counter()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Starts sampling."""
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stops sampling.
+
+        Returns:
+            collections.Counter: The number of samples of each folded stack.
+        """
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.samples
+
+    def top(self, count=5):
+        """Returns the ``count`` most sampled stacks, as (folded stack, samples) pairs."""
+        return self.samples.most_common(count)
+
+    def dump(self, path):
+        """
+        Writes the samples as folded stacks, one ``frame;frame;frame count`` line per stack.
+
+        Args:
+            path (str): The file to write.
+        """
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w') as f:
+            for stack, count in self.samples.items():
+                f.write(f'{stack} {count}\n')
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                return
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}')
+                frame = frame.f_back
+            self.samples[';'.join(reversed(stack))] += 1
+            del frame
@@ -0,0 +1,15 @@
+def normalize_title(title):
+    """
+    Normalizes a movie title into a lookup key.
+
+    Surrounding whitespace is stripped, inner runs of whitespace are
+    collapsed to a single space and the result is case-folded, so
+    "The Matrix", " the  matrix " and "THE MATRIX" share one key.
+
+    Args:
+        title (str): The movie title as typed by the user or returned by OMDb.
+
+    Returns:
+        str: The normalized title key.
+    """
+    return ' '.join(title.split()).casefold()
@@ -0,0 +1,523 @@
+"""
+The HTML pages of the app, registered on the Flask app by ``create_app``.
+
+The views reach the data manager, the OMDb cache and client and the
+poster store through ``current_app.extensions``, so this module can be
+imported before any app exists.
+"""
+
+import os
+import requests
+from flask import (Blueprint, abort, current_app, flash, jsonify, make_response, redirect, render_template,
+                   request, send_file, session, url_for)
+from config.config_files import MovieJobConfig
+from omdb.client import CircuitOpenError, movie_from_response
+from omdb.posters import is_remote, url_hash
+from omdb.title_index import current_title_index
+from utils.errors import NotFoundError, handle_internal_server_error
+from utils.page_cache import MOVIE_PAGE_KEY, cached
+from utils.titles import normalize_title
+
+web = Blueprint('web', __name__)
+
+
+def data_manager():
+    return current_app.extensions['data_manager']
+
+
+def omdb_cache():
+    return current_app.extensions['omdb_cache']
+
+
+def omdb_client():
+    return current_app.extensions['omdb_client']
+
+
+def poster_store():
+    return current_app.extensions['poster_store']
+
+
+@web.app_template_global()
+def poster_url(movie_id, movie_poster, size='thumb'):
+    """
+    Returns the local URL of a movie's poster, for the templates.
+
+    The URL carries a hash of the remote poster URL, so it changes when
+    the poster does and the image can be cached as immutable.
+
+    Args:
+        movie_id (int): The ID of the movie.
+        movie_poster (str): The movie's remote poster URL.
+        size (str): 'thumb' for lists, 'full' for the movie page.
+
+    Returns:
+        str: The URL to put in the img tag; placeholders such as 'N/A' are returned unchanged.
+    """
+    if not is_remote(movie_poster):
+        return movie_poster
+    return url_for('web.poster', movie_id=movie_id, size=size, v=url_hash(movie_poster)[:12])
+
+
+@web.route('/', methods=['GET'])
+@cached(lambda: f'catalog:{request.full_path}')
+def home():
+    """
+    Handles the home page request.
+
+    The catalog is paginated with a keyset cursor: the ``after`` query
+    parameter holds the ID of the last movie shown on the previous page.
+    Rendered pages are served from the page cache until the catalog changes.
+
+    Returns:
+        The rendered index.html template with one page of movies.
+    """
+    after_id = request.args.get('after', type=int)
+    try:
+        movies, next_cursor = data_manager().get_movies_page(
+            after_id=after_id, limit=current_app.config['CATALOG_PAGE_SIZE'])
+        return render_template('index.html', movies=movies,
+                               after_id=after_id, next_cursor=next_cursor)
+    except Exception as e:
+        flash(f'An error occurred while retrieving movies: {str(e)}', 'error')
+        return render_template('index.html', movies=[])
+
+
+@web.route('/search', methods=['GET'])
+def search():
+    """
+    Handles full-text movie searches.
+
+    The ``q`` query parameter holds the search text and ``cursor``
+    the position returned with the previous page of results.
+
+    Returns:
+        The rendered search.html template with one page of ranked results.
+    """
+    query = request.args.get('q', '')
+    try:
+        movies, next_cursor = data_manager().search_movies(
+            query, limit=current_app.config['SEARCH_PAGE_SIZE'], cursor=request.args.get('cursor'))
+    except ValueError:
+        flash('Invalid search page, showing the first results instead.', 'error')
+        movies, next_cursor = data_manager().search_movies(query, limit=current_app.config['SEARCH_PAGE_SIZE'])
+    except Exception as e:
+        return handle_internal_server_error(current_app, e)
+    return render_template('search.html', query=query, movies=movies, next_cursor=next_cursor)
+
+
+@web.route('/<int:movie_id>', methods=['GET'])
+@cached(lambda movie_id: MOVIE_PAGE_KEY.format(movie_id=movie_id))
+def movie_details(movie_id):
+    """
+    Handles requests for individual movie details.
+
+    Rendered pages are served from the page cache until the movie's lists change.
+
+    Args:
+        movie_id (int): The ID of the movie to retrieve.
+
+    Returns:
+        The rendered movie.html template with the movie details.
+        Raises a NotFoundError if the movie is not found.
+    """
+    try:
+        movie = data_manager().get_movie_by_id(movie_id)
+        if movie is None:
+            raise NotFoundError(f"Movie with ID {movie_id} not found")
+        stats = data_manager().get_movie_stats(movie_id)
+        return render_template('movie.html', movie=movie, stats=stats)
+    except NotFoundError as e:
+        flash(str(e), 'error')
+        return redirect(url_for('.home'))
+    except Exception as e:
+        return handle_internal_server_error(current_app, e)
+
+
+@web.route('/posters/<int:movie_id>', methods=['GET'])
+def poster(movie_id):
+    """
+    Serves a movie's poster from the local poster cache.
+
+    Stored posters are sent with send_file, which hands the file to the
+    server's sendfile support (or to the front server with X-Sendfile)
+    instead of copying it through Python. A poster that is not stored yet
+    is queued for download and the browser is redirected to the remote
+    image meanwhile.
+
+    Args:
+        movie_id (int): The ID of the movie.
+
+    Returns:
+        The image, a redirect to the remote image, or 404 if the movie has no poster.
+    """
+    movie = data_manager().get_movie_by_id(movie_id)
+    if movie is None or not is_remote(movie.movie_poster):
+        abort(404)
+    stored = poster_store().find(movie.movie_poster, thumbnail=request.args.get('size') != 'full')
+    if stored is None or not os.path.exists(stored[0]):
+        poster_store().prefetch(movie.movie_poster)
+        response = redirect(movie.movie_poster)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+
+    response = send_file(stored[0], mimetype=stored[1], conditional=True)
+    if request.args.get('v') == url_hash(movie.movie_poster)[:12]:
+        # The versioned URL changes whenever the movie's poster does
+        response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    else:
+        response.headers['Cache-Control'] = 'public, max-age=300'
+    return response
+
+
+@web.route('/users', methods=['GET'])
+def list_users():
+    """
+    Handles requests for a list of all users.
+
+    Returns:
+        The rendered users.html template with a list of users and their list stats.
+    """
+    try:
+        users = data_manager().get_all_users()
+        stats = data_manager().get_user_stats(user.id for user in users)
+        return render_template('users.html', users=users, stats=stats)
+    except Exception as e:
+        return handle_internal_server_error(current_app, e)
+
+
+@web.route('/users/<int:user_id>',methods=['GET'])
+def user_movies(user_id):
+    """
+    Handles requests for a user's movies.
+
+    The ``status``, ``sort``, ``direction`` and ``cursor`` query parameters
+    filter, order and page the list in the database. The first page in the
+    default order is served from the list cache with an ETag, so a browser
+    revalidating an unchanged list gets a 304 without a database query.
+
+    Args:
+        user_id (int): The ID of the user.
+
+    Returns:
+        The rendered user_movies.html template with one page of the user's movies,
+        or an empty 304 response if the client's copy is current.
+    """
+    status = request.args.get('status') or None
+    sort = request.args.get('sort', 'added')
+    direction = request.args.get('direction', 'asc')
+    cursor = request.args.get('cursor')
+    page_size = current_app.config['USER_MOVIES_PAGE_SIZE']
+    page = {'user_id': user_id, 'status': status, 'sort': sort, 'direction': direction}
+    try:
+        if sort == 'added' and direction == 'asc' and not cursor:
+            cached = data_manager().get_cached_user_movies(user_id, status, limit=page_size)
+            # Pending flash messages are part of the page, so it must be rendered again
+            if not session.get('_flashes') and cached.etag in request.if_none_match:
+                response = make_response('', 304)
+            else:
+                response = make_response(render_template(
+                    'user_movies.html', user_movies=cached.user_movies, next_cursor=cached.next_cursor,
+                    pending_movie_ids=cached.pending_movie_ids, **page))
+            response.set_etag(cached.etag)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+
+        movies, next_cursor = data_manager().query_user_movies(user_id, status, sort, direction, page_size, cursor)
+        return render_template('user_movies.html', user_movies=movies, next_cursor=next_cursor,
+                               pending_movie_ids=data_manager().get_pending_movie_ids(user_id), **page)
+    except ValueError as e:
+        flash(str(e), 'error')
+        return redirect(url_for('.user_movies', user_id=user_id))
+    except Exception as e:
+        return handle_internal_server_error(current_app, e)
+
+
+@web.route('/users/<int:user_id>/recommendations', methods=['GET'])
+def user_recommendations(user_id):
+    """
+    Handles requests for a user's movie recommendations.
+
+    The recommendations are precomputed, so this reads one short range
+    of the user_recommendations table.
+
+    Args:
+        user_id (int): The ID of the user.
+
+    Returns:
+        The rendered recommendations.html template with the user's recommendations.
+        Redirects to the users page if the user is not found.
+    """
+    try:
+        user = data_manager().get_user_by_id(user_id)
+        if user is None:
+            raise NotFoundError(f"User with ID {user_id} not found")
+        recommendations = data_manager().get_recommendations(user_id)
+        return render_template('recommendations.html', user=user, recommendations=recommendations)
+    except NotFoundError as e:
+        flash(str(e), 'error')
+        return redirect(url_for('.list_users'))
+    except Exception as e:
+        return handle_internal_server_error(current_app, e)
+
+
+@web.route('/users/<int:user_id>/movies.json', methods=['GET'])
+def user_movies_json(user_id):
+    """
+    Returns one page of a user's movies as JSON, for lazy loading.
+
+    Accepts the same ``status``, ``sort``, ``direction`` and ``cursor``
+    query parameters as the HTML view, plus ``limit``.
+
+    Args:
+        user_id (int): The ID of the user.
+
+    Returns:
+        A JSON object with the page's items and the cursor of the next page,
+        or a 400 error if a parameter is invalid.
+    """
+    limit = min(request.args.get('limit', current_app.config['USER_MOVIES_PAGE_SIZE'], type=int), 200)
+    try:
+        movies, next_cursor = data_manager().query_user_movies(
+            user_id, request.args.get('status') or None, request.args.get('sort', 'added'),
+            request.args.get('direction', 'asc'), max(limit, 1), request.args.get('cursor'))
+        pending_movie_ids = data_manager().get_pending_movie_ids(user_id)
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+    except Exception as e:
+        current_app.logger.error(f"Internal Server Error on {request.method} {request.path}: {str(e)}", exc_info=e)
+        return jsonify(error="Internal Server Error"), 500
+
+    items = [{
+        'movie_id': user_movie.movie_id,
+        'movie_name': movie_name,
+        'movie_poster': movie_poster,
+        'watchlist_status': user_movie.watchlist_status,
+        'user_rating': user_movie.user_rating,
+        'pending': user_movie.movie_id in pending_movie_ids
+    } for user_movie, movie_name, movie_poster in movies]
+    return jsonify(items=items, next_cursor=next_cursor)
+
+
+@web.route('/users/<int:user_id>/sort', methods=['POST'])
+def movies_sort(user_id):
+    """
+    Handles requests for sorting a user's movies based on watch status.
+
+    Kept for old forms; the filter now lives in the list's query string.
+
+    Args:
+        user_id (int): The ID of the user.
+
+    Returns:
+        Redirects to the user's movie list filtered by the posted watch status.
+    """
+    watch_status = request.form.get('watch_status') or None
+    return redirect(url_for('.user_movies', user_id=user_id, status=watch_status))
+
+
+@web.route('/add_user', methods=['GET', 'POST'])
+def add_user():
+    """
+    Handles requests for adding a new user.
+
+    Returns:
+        The rendered add_user.html template if the request is a GET.
+        Redirects to the users page if the request 
+        is a POST and the user is successfully added.
+    """
+    if request.method == 'POST':
+        username = request.form['username']
+
+        # Create a new user object
+        user = {'user_name': username}
+
+        # Add the user to the database
+        try:
+            data_manager().add_user(user)
+            return redirect('/users', code=302)
+        except Exception as e:
+            return handle_internal_server_error(current_app, e)
+
+    return render_template('add_user.html')
+
+
+@web.route('/omdb/cache/stats', methods=['GET'])
+def omdb_cache_stats():
+    """
+    Exposes the OMDb response cache counters for monitoring.
+
+    Returns:
+        A JSON object with the cache hit, miss and eviction counts.
+    """
+    return jsonify(omdb_cache().stats())
+
+
+@web.route('/pages/cache/stats', methods=['GET'])
+def page_cache_stats():
+    """
+    Exposes the page cache counters for monitoring.
+
+    Returns:
+        A JSON object with the page cache hit, miss, 304 and bypass counts and its hit rate.
+    """
+    return jsonify(current_app.extensions['page_cache'].stats())
+
+
+@web.route('/users/<int:user_id>/add_movie', methods=['GET', 'POST'])
+def add_movie(user_id):
+    """
+    Handles requests for adding a new movie to a user's list.
+
+    Args:
+        user_id (int): The ID of the user.
+
+    Returns:
+        The rendered add_movie.html template for GET requests.
+        Redirects to the user_movies page if the request 
+        is a POST and the movie is successfully added.
+    """
+    if request.method == 'POST':
+        movie_name = request.form['movie_name']
+        watchlist_status = request.form['watchlist_status']
+        user_rating = request.form.get('user_rating')
+
+        try:
+            existing_movie = data_manager().get_movie_by_name(movie_name)
+            # A title typed differently ("matrix" for "The Matrix") is resolved locally, without OMDb
+            title_index = current_title_index()
+            match = title_index.resolve(movie_name) if existing_movie is None and title_index else None
+            if match and match.movie_id:
+                existing_movie = data_manager().get_movie_by_id(match.movie_id)
+            if existing_movie:
+                # The movie is already in the catalog, so OMDb is not needed
+                try:
+                    data_manager().add_movie({'movie_name': existing_movie.movie_name},
+                                           user_id, watchlist_status, user_rating)
+                    return redirect(url_for('.user_movies', user_id=user_id))
+                except Exception as e:
+                    flash(f"An error occurred while adding the movie: {str(e)}", 'error')
+                    return render_template('add_movie.html')
+
+            parsed_resp = omdb_cache().get(match.omdb_key if match and match.omdb_key else movie_name)
+            if parsed_resp is None and MovieJobConfig.async_add:
+                # Queue the OMDb lookup for the job worker and answer right away
+                try:
+                    data_manager().add_pending_movie(movie_name, user_id, watchlist_status, user_rating)
+                    flash(f"{movie_name} was added, its details are being fetched", 'info')
+                    return redirect(url_for('.user_movies', user_id=user_id))
+                except Exception as e:
+                    flash(f"An error occurred while adding the movie: {str(e)}", 'error')
+                    return render_template('add_movie.html')
+            if parsed_resp is None:
+                parsed_resp = omdb_client().lookup(movie_name)
+                omdb_cache().put(movie_name, parsed_resp)
+                if title_index and isinstance(parsed_resp, dict) and parsed_resp.get('Title'):
+                    title_index.add(parsed_resp['Title'], omdb_key=normalize_title(movie_name))
+
+            if parsed_resp == 'Error: Movie not found!':
+                flash(f"The movie {movie_name} doesn't exist", 'warning')
+            elif type(parsed_resp) == str:
+                flash(parsed_resp, 'error')
+            else:
+                try:
+                    # Store OMDb's spelling of the title, so other spellings find the same movie
+                    canonical_title = parsed_resp.get('Title') or movie_name
+                    existing_movie = data_manager().get_movie_by_name(canonical_title) \
+                        if normalize_title(canonical_title) != normalize_title(movie_name) else None
+                    movie = {'movie_name': existing_movie.movie_name} if existing_movie \
+                        else movie_from_response(parsed_resp, canonical_title)
+
+                    # Add the movie to the user's list (handle potential data errors)
+                    try:
+                        data_manager().add_movie(movie, user_id, watchlist_status, user_rating)
+                        poster_store().prefetch(movie.get('movie_poster'))
+                        return redirect(url_for('.user_movies', user_id=user_id))
+                    except Exception as e:
+                        flash(f"An error occurred while adding the movie: {str(e)}", 'error')
+                        return render_template('add_movie.html')
+
+                except (ValueError, KeyError) as e:
+                    flash(f"Invalid data in API response: {str(e)}", 'error')
+                    return render_template('add_movie.html')
+
+        except CircuitOpenError:
+            flash("The movie database is unavailable right now. Please try again later.", 'error')
+            return render_template('add_movie.html')
+        except requests.exceptions.RequestException as e:
+            # Handle any errors during the API request
+            return handle_internal_server_error(current_app, e)
+
+    # Render the form for GET requests
+    return render_template('add_movie.html')
+
+
+@web.route('/users/<int:user_id>/update_movie/<int:movie_id>', methods=['GET', 'POST'])
+def update_movie(user_id, movie_id):
+    """
+    Handles requests for updating a movie in a user's list.
+
+    Args:
+        user_id (int): The ID of the user.
+        movie_id (int): The ID of the movie to update.
+
+    Returns:
+        The rendered update_movie.html template for GET 
+        requests with pre-filled user movie data.
+        Redirects to the user_movies page if the request 
+        is a POST and the movie is successfully updated.
+    """
+    try:
+        user_movie = data_manager().get_movie_by_movie_by_user(movie_id, user_id)
+        if user_movie is None:
+            raise NotFoundError("Movie not found or not in user's list")
+
+        if request.method == 'POST':
+            # Extract the rating and status from the request data
+            try:
+                rating = int(request.form.get('rating'))
+                status = request.form.get('status')
+
+                # Update the movie using the data manager
+                if data_manager().update_movie(user_id, movie_id, rating, status):
+                    return redirect(url_for('.user_movies', user_id=user_id))
+                else:
+                    # Use custom error
+                    raise NotFoundError("Movie not found or not in user's list")
+            except ValueError:
+                flash("Invalid rating. Please enter a valid integer.", "error")
+                return render_template('update_movie.html', user_movie=user_movie)
+
+        # Render the HTML form for updating the movie
+        return render_template('update_movie.html', user_movie=user_movie)
+    except NotFoundError as e:
+        flash(str(e), 'error')
+        return redirect(url_for('.user_movies', user_id=user_id))
+    except Exception as e:
+        return handle_internal_server_error(current_app, e)  # Handle unexpected errors
+
+
+@web.route('/users/<int:user_id>/delete_movie/<int:movie_id>', methods = ['POST'])
+def delete_movie(user_id, movie_id):
+    """
+    Deletes a movie from a user's list.
+
+    Args:
+        user_id (int): The ID of the user.
+        movie_id (int): The ID of the movie.
+
+    Returns:
+        Redirect to the user's movie list if successful, 
+        or to the user's movie list with an error message if unsuccessful.
+    """
+    try:
+        if data_manager().delete_movie(user_id, movie_id):
+            flash('Movie deleted successfully', 'success')
+            return redirect(url_for('.user_movies', user_id=user_id))
+        else:
+            raise NotFoundError("Movie not found or not associated with the user")
+    except NotFoundError as e:
+        flash(str(e), 'error')
+        return redirect(url_for('.user_movies', user_id=user_id))
+    except Exception as e:
+        return handle_internal_server_error(current_app, e)
+
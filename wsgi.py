@@ -0,0 +1,13 @@
+"""
+WSGI entry point, for WSGI servers such as gunicorn:
+
+    flask --app app db-upgrade
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+The schema is migrated once by ``flask db-upgrade`` when deploying; the
+workers only build the app.
+"""
+
+from app import create_app
+
+app = create_app()